@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for WhatEELS.
+
+Each module is a standalone script, run from the repository root, e.g.
+``python -m benchmarks.bench_dm_info_parser``.
+"""
@@ -0,0 +1,114 @@
+"""
+Benchmark: a dropped batch of N files loaded through the UploadQueue.
+
+Writes N DM4 spectrum images with many metadata tags, streams each to a spool
+file (StreamingUpload, as the file dropper does), then queues them all at once,
+the way a dropped acquisition session is, and loads them with
+EELSFileProcessor.process_upload: one file at a time, then k at a time, read in
+the server process (workers 0) or in a ParsePool of k worker processes.
+
+Reported per case: wall time and throughput in files and MB per second, next to
+the cores of the machine (parallel parsing only pays off with several cores).
+
+Usage
+-----
+    python -m benchmarks.bench_batch_upload --files 16 --parallel 1,2,4 --tags 50000 [--memory-map]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import (
+    ChunkedBackend,
+    EELSFileProcessor,
+    ParsePool,
+    StreamingUpload,
+    UploadQueue,
+)
+from whateels.pages.home.MVC.model import Model
+
+
+def _run_case(uploads, parallel, workers, memory_map=False):
+    pool = ParsePool(workers) if workers else None
+    model = Model()
+    processor = EELSFileProcessor(
+        model, memory_map=memory_map, chunked_backend=ChunkedBackend(2**62), parse_pool=pool, publish_metadata=False
+    )
+    if pool is not None:
+        pool.start()  # Outside the timing
+
+    loaded = []
+    queue = UploadQueue(
+        lambda filename, content, token, progress: processor.process_upload(filename, content),
+        max_parallel=parallel,
+        max_workers=max(parallel, UploadQueue.DEFAULT_MAX_PARALLEL),
+        on_loaded=lambda item: loaded.append(item.result),
+    )
+    start = time.perf_counter()
+    for filename, content in uploads:
+        queue.submit(filename, content)
+    queue.wait()
+    elapsed = time.perf_counter() - start
+
+    if pool is not None:
+        for dataset in loaded:
+            pool.release(dataset)
+        pool.shutdown()
+    return elapsed, len(loaded)
+
+
+def _write_uploads(directory, count, shape, first_tags, chunk_size=2**20):
+    """Write count DM4 files, one more tag each (distinct files), streamed to spool files."""
+    uploads = []
+    for i in range(count):
+        path = os.path.join(directory, f"si_{first_tags + i}.dm4")
+        DM_EELS_Writer(version=4, dtype="float32", fill="ramp", n_tags=first_tags + i).write(path, shape=shape)
+        upload = StreamingUpload(os.path.basename(path), directory=directory)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                upload.write(chunk)
+        upload.finish()
+        uploads.append((upload.filename, upload))
+        os.remove(path)
+    return uploads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=16, help="Files of the dropped batch")
+    parser.add_argument("--parallel", default="1,2,4", help="Comma separated files loaded at a time")
+    parser.add_argument("--size-mb", type=int, default=16, help="Size of the cube of each file")
+    parser.add_argument("--energy", type=int, default=1024, help="Energy channels per spectrum")
+    parser.add_argument("--tags", type=int, default=50_000, help="Metadata tags of each file")
+    parser.add_argument("--memory-map", action="store_true", help="Map the cubes from the spool files, as the app does")
+    args = parser.parse_args()
+
+    side = max(2, int(np.sqrt(args.size_mb * 2**20 / (4 * args.energy))))
+    shape = (side, side, args.energy)
+    cases = [(k, workers) for k in (int(p) for p in args.parallel.split(",")) for workers in (0, k)]
+    print(
+        f"{args.files} files of {shape} float32 with {args.tags} tags, {os.cpu_count()} cores, "
+        f"{'memory-mapped' if args.memory_map else 'read into memory'}"
+    )
+    print(f"{'parallel':<10}{'workers':<9}{'wall s':>8}{'files/s':>9}{'MB/s':>8}{'loaded':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        # Imports and JIT compilation of the parsers, outside the timings
+        _run_case(_write_uploads(tmp, 1, shape, args.tags - 1), 1, 0, args.memory_map)
+        for case, (parallel, workers) in enumerate(cases):
+            # Fresh uploads for every case, their spool files are removed once loaded
+            uploads = _write_uploads(tmp, args.files, shape, args.tags + case * args.files)
+            total_mb = sum(upload.received_bytes for _, upload in uploads) / 2**20
+            elapsed, loaded = _run_case(uploads, parallel, workers, args.memory_map)
+            print(
+                f"{parallel:<10}{workers:<9}{elapsed:>8.2f}{args.files / elapsed:>9.1f}"
+                f"{total_mb / elapsed:>8.0f}{loaded:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
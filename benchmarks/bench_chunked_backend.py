@@ -0,0 +1,152 @@
+"""
+Benchmark: chunked (dask) backend vs in-memory numpy processing of a large spectrum image.
+
+Writes a DM4 spectrum image of --size-gb (with a few NaN spectra, so it gets cleaned),
+then a fresh child process per mode loads it with EELSFileProcessor and computes
+the sum image, as the spectrum image page does:
+
+- numpy: the cube is read into RAM (memory_map=False, no chunking)
+- mmap: the cube is memory-mapped, checks and sums run on the whole map
+- chunked: memory-mapped and chunked within --budget-mb, streamed chunk by chunk
+
+Reported: load s (read, NaN/inf checks, cleaning), sum s, the peak resident memory
+of the child and its anonymous (non file-backed) part at the end. Pick a size
+larger than the RAM of the machine to check that only the chunked mode copes.
+
+Usage
+-----
+    python -m benchmarks.bench_chunked_backend --size-gb 4 --budget-mb 512
+"""
+
+import argparse
+import json
+import math
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer, DM_InfoParser
+from whateels.pages.home.MVC.controller.services import ChunkedBackend, EELSFileProcessor
+from whateels.pages.home.MVC.model import Model
+
+
+def _status_mb(field):
+    """A memory field of /proc/self/status (Linux), in MiB."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1]) / 2**10
+    return float("nan")
+
+
+def _measure(path, mode, budget_mb):
+    """Child process: load the file and compute its sum image."""
+    model = Model()
+    if mode == "chunked":
+        backend = ChunkedBackend(budget_mb * 2**20)
+    else:
+        backend = ChunkedBackend(sys.maxsize)  # Never chunks
+    processor = EELSFileProcessor(model, memory_map=mode != "numpy", chunked_backend=backend)
+    rss_before = _status_mb("VmRSS")
+
+    start = time.perf_counter()
+    dataset = processor.load_dm_file(path)
+    load_time = time.perf_counter() - start
+    if dataset is None:
+        return {"error": "load failed (out of memory?)"}
+
+    start = time.perf_counter()
+    image, = backend.compute(dataset.ElectronCount.sum(model.constants.ELOSS))
+    sum_time = time.perf_counter() - start
+    checksum = float(np.asarray(image).sum())
+
+    return {
+        "load": load_time,
+        "sum": sum_time,
+        "peak": _status_mb("VmHWM") - rss_before,
+        "anon": _status_mb("RssAnon"),
+        "chunked": ChunkedBackend.is_chunked(dataset.ElectronCount.data),
+        "checksum": checksum,
+    }
+
+
+def _run_child(path, mode, budget_mb):
+    command = [
+        sys.executable, "-m", "benchmarks.bench_chunked_backend",
+        "--child", path, "--mode", mode, "--budget-mb", str(budget_mb),
+    ]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        # e.g. killed by the out-of-memory killer
+        last_error = (result.stderr.strip().splitlines() or [""])[-1]
+        return {"error": f"exit code {result.returncode} {last_error}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def _write_cube(path, size_gb, n_energy):
+    """DM4 spectrum image of about size_gb float32, with a row of NaN spectra."""
+    pixels = int(size_gb * 2**30) // (n_energy * 4)
+    side = max(2, math.isqrt(pixels))
+    shape = (side, max(2, pixels // side), n_energy)
+    DM_EELS_Writer(version=4, dtype="float32", fill="ramp").write(path, shape=shape)
+    # NaN spectra in the first row of pixels: float32 NaN bytes over its spectra
+    data = np.memmap(path, dtype="float32", mode="r+", offset=_data_offset(path), shape=(n_energy, shape[0], shape[1]))
+    data[:, 0, :8] = np.nan
+    data.flush()
+    del data
+    return shape
+
+
+def _data_offset(path):
+    parser = DM_InfoParser(use_mmap=True)
+    with open(path, "rb") as f:
+        parser.file = f
+        tags = parser.parse_file(include=["ImageList"])
+    image = next(iter(tags["ImageList"].values()))
+    return image["ImageData"]["Data"]["offset"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-gb", type=float, default=4.0)
+    parser.add_argument("--energy", type=int, default=2048, help="Energy channels per spectrum")
+    parser.add_argument("--budget-mb", type=int, default=512, help="Memory budget of the chunked mode")
+    parser.add_argument("--modes", nargs="+", default=["numpy", "mmap", "chunked"])
+    parser.add_argument("--dir", default=None, help="Where the cube is written (default: a temporary directory)")
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--mode", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.mode, args.budget_mb)))
+        return
+
+    if not ChunkedBackend.is_available():
+        print("dask is not installed, the chunked mode falls back to numpy")
+
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        path = os.path.join(tmp, "large_si.dm4")
+        shape = _write_cube(path, args.size_gb, args.energy)
+        print(f"cube {shape} float32, {os.path.getsize(path) / 2**30:.1f} GB, budget {args.budget_mb} MB")
+        print(f"{'mode':<10}{'load s':>9}{'sum s':>9}{'peak RSS MB':>13}{'anon MB':>10}{'chunked':>9}")
+        checksums = set()
+        for mode in args.modes:
+            result = _run_child(path, mode, args.budget_mb)
+            if "error" in result:
+                print(f"{mode:<10}  failed: {result['error']}")
+                continue
+            checksums.add(round(result["checksum"]))
+            print(
+                f"{mode:<10}{result['load']:>9.2f}{result['sum']:>9.2f}"
+                f"{result['peak']:>13.0f}{result['anon']:>10.0f}{str(result['chunked']):>9}"
+            )
+        if len(checksums) > 1:
+            raise AssertionError(f"Sum images differ between modes: {checksums}")
+
+
+if __name__ == "__main__":
+    main()
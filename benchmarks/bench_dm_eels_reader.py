@@ -0,0 +1,148 @@
+"""
+Benchmark: DM_EELS_Reader over a synthetic DM3/DM4 corpus, from 1 MB to several GB.
+
+For each DM version and file size, DM_EELS_Writer generates a spectrum image
+(plus a DocumentObjectList of filler tags), then a fresh child process reads it
+with DM_EELS_Reader (index cache disabled) and reports:
+
+- header s: parse_file() of the tag tree, lazy as configured by the reader
+  (DM4 groups are skipped by seeking, DM3 ones are walked)
+- tags/s: full (eager) parse_file() of the tag tree
+- read s / MB/s: the whole DM_EELS_Reader, header and image data
+- peak RSS MB: peak resident memory of the child, above its level after imports
+- traced MB: peak of the Python and NumPy allocations (tracemalloc, separate run)
+
+DM3 files store sizes as 32 bit integers, sizes past 2 GB are DM4 only. Files are
+sparse by default (zeros); ``--fill ramp`` writes actual data, to include disk reads.
+
+Usage
+-----
+    python -m benchmarks.bench_dm_eels_reader --sizes-mb 1 64 1024 4096 --tags 20000
+"""
+
+import argparse
+import json
+import math
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer, DM_InfoParser
+
+_DM3_MAX_MB = 2047
+
+
+def _peak_rss_mb():
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 2**10
+
+
+def _count_tags(tree):
+    count, stack = 0, [tree]
+    while stack:
+        for value in stack.pop().values():
+            count += 1
+            if isinstance(value, dict):
+                stack.append(value)
+    return count
+
+
+def _measure(path, repeat):
+    """Child process: time, memory and tag count of reading one file."""
+    baseline_rss = _peak_rss_mb()
+    header_time = full_time = read_time = float("inf")
+    for _ in range(repeat):
+        for lazy in (True, False):
+            parser = DM_InfoParser(use_mmap=True, lazy=lazy)
+            with open(path, "rb") as f:
+                parser.file = f
+                start = time.perf_counter()
+                tags = parser.parse_file()
+                elapsed = time.perf_counter() - start
+            if lazy:
+                header_time = min(header_time, elapsed)
+            else:
+                full_time = min(full_time, elapsed)
+                n_tags = _count_tags(tags)
+            del parser, tags
+
+        start = time.perf_counter()
+        reader = DM_EELS_Reader(path, index_cache=False)
+        read_time = min(read_time, time.perf_counter() - start)
+        del reader
+    peak_rss = _peak_rss_mb() - baseline_rss
+
+    tracemalloc.start()
+    reader = DM_EELS_Reader(path, index_cache=False)
+    traced_peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    del reader
+    return {
+        "tags": n_tags, "header": header_time, "full": full_time, "read": read_time,
+        "rss": peak_rss, "traced": traced_peak,
+    }
+
+
+def _run_child(path, repeat):
+    command = [sys.executable, "-m", "benchmarks.bench_dm_eels_reader", "--child", path, "--repeat", str(repeat)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _cube_shape(size_mb, n_energy, itemsize):
+    """(y, x, Eloss) spectrum image shape of about size_mb."""
+    pixels = max(1, size_mb * 2**20 // (n_energy * itemsize))
+    side = max(1, math.isqrt(pixels))
+    return side, max(1, pixels // side), n_energy
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 16, 256, 1024, 4096])
+    parser.add_argument("--versions", type=int, nargs="+", default=[3, 4])
+    parser.add_argument("--tags", type=int, default=20000, help="Filler tags of the DocumentObjectList")
+    parser.add_argument("--tag-depth", type=int, default=2)
+    parser.add_argument("--energy", type=int, default=1024, help="Energy channels per spectrum")
+    parser.add_argument("--dtype", default="float32")
+    parser.add_argument("--fill", choices=["zeros", "ramp"], default="zeros")
+    parser.add_argument("--dir", default=None, help="Where the corpus is written (default: a temporary directory)")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child, args.repeat)))
+        return
+
+    print(
+        f"{'file':<6}{'size MB':>9}{'shape':>20}{'tags':>8}{'header s':>10}{'tags/s':>12}"
+        f"{'read s':>9}{'MB/s':>9}{'peak RSS MB':>13}{'traced MB':>11}"
+    )
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for version in args.versions:
+            writer = DM_EELS_Writer(
+                version=version, dtype=args.dtype, n_tags=args.tags, tag_depth=args.tag_depth, fill=args.fill
+            )
+            for size_mb in args.sizes_mb:
+                if version == 3 and size_mb > _DM3_MAX_MB:
+                    print(f"{'dm3':<6}{size_mb:>9}  skipped, DM3 files are limited to 2 GB")
+                    continue
+                path = os.path.join(tmp, f"corpus_{size_mb}mb.dm{version}")
+                shape = _cube_shape(size_mb, args.energy, writer.dtype.itemsize)
+                size = writer.write(path, shape=shape) / 2**20
+                result = _run_child(path, args.repeat)
+                print(
+                    f"{'dm' + str(version):<6}{size:>9.0f}{str(shape):>20}{result['tags']:>8}"
+                    f"{result['header']:>10.4f}{result['tags'] / result['full']:>12,.0f}"
+                    f"{result['read']:>9.3f}{size / result['read']:>9.0f}"
+                    f"{result['rss']:>13.0f}{result['traced']:>11.0f}"
+                )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
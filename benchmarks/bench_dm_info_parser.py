@@ -0,0 +1,81 @@
+"""
+Benchmark: DM_InfoParser stream reads vs memory-mapped and lazy parsing.
+
+Generates synthetic DM3/DM4 spectrum images with a large tag tree and a
+sparse data cube, then times ``parse_file`` in each mode and checks that
+they produce the same information dictionary. The lazy timing includes
+decoding the ImageList entry, which is what the home page needs to plot.
+
+Usage
+-----
+    python -m benchmarks.bench_dm_info_parser --groups 5000 --cube-mb 1024
+"""
+
+import argparse
+import copy
+import os
+import tempfile
+import time
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer, DM_InfoParser
+
+
+def _parse(path, use_mmap, lazy=False):
+    parser = DM_InfoParser(use_mmap=use_mmap, lazy=lazy)
+    with open(path, "rb") as f:
+        parser.file = f
+        start = time.perf_counter()
+        info = parser.parse_file()
+        for image in info["ImageList"].values():
+            image["ImageData"]["Dimensions"].items()
+        elapsed = time.perf_counter() - start
+    return info, elapsed
+
+
+def _best_of(path, use_mmap, repeat, lazy=False):
+    timings = []
+    for _ in range(repeat):
+        info, elapsed = _parse(path, use_mmap, lazy)
+        timings.append(elapsed)
+    return info, min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, nargs="+", default=[500, 2000, 8000],
+                        help="Number of DocumentObjectList groups (20 tags each)")
+    parser.add_argument("--cube-mb", type=int, default=1024, help="Approximate size of the sparse data cube")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    e_size = 1024
+
+    print(
+        f"{'file':<10}{'tags':>10}{'size MB':>10}{'stream s':>11}{'mmap s':>10}{'speedup':>9}"
+        f"{'lazy s':>10}{'speedup':>9}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in (3, 4):
+            # DM3 stores sizes as 32 bit integers, so its cube stays below 2 GB
+            cube_mb = args.cube_mb if version == 4 else min(args.cube_mb, 1024)
+            side = max(1, int(((cube_mb * 2**20) / (4 * e_size)) ** 0.5))
+            for n_groups in args.groups:
+                path = os.path.join(tmp, f"synthetic_{n_groups}.dm{version}")
+                writer = DM_EELS_Writer(version=version, n_tags=n_groups * 20)
+                size = writer.write(path, shape=(side, side, e_size))
+                stream_info, stream_time = _best_of(path, False, args.repeat)
+                mmap_info, mmap_time = _best_of(path, True, args.repeat)
+                lazy_info, lazy_time = _best_of(path, True, args.repeat, lazy=True)
+                if stream_info != mmap_info or stream_info != copy.deepcopy(lazy_info):
+                    raise AssertionError(f"Parsing modes differ for {path}")
+                del lazy_info  # releases the mapping held by the lazy groups
+                print(
+                    f"{'dm' + str(version):<10}{n_groups * 20:>10}{size / 2**20:>10.0f}"
+                    f"{stream_time:>11.3f}{mmap_time:>10.3f}{stream_time / mmap_time:>8.1f}x"
+                    f"{lazy_time:>10.3f}{stream_time / lazy_time:>8.1f}x"
+                )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
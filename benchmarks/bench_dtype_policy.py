@@ -0,0 +1,134 @@
+"""
+Benchmark: memory of the load pipeline per DM data type.
+
+For every data type DM files store counts in, writes a spectrum image of the same
+shape, then a fresh child process loads it with EELSFileProcessor (read into RAM,
+memory_map=False) and computes its sum image, as the spectrum image page does.
+
+Reported per type: the type of the loaded cube and of its sum image, the memory
+saved by keeping the cube native instead of float64 (DTypePolicy.memory_report),
+the peak resident memory of the load, and the peak of the sum image with the
+policy (explicit accumulator, no NaN-skipping copy) vs a default xarray sum.
+
+Usage
+-----
+    python -m benchmarks.bench_dtype_policy --size-mb 256
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers.dm_eels_data import DM_EELS_data
+from whateels.pages.home.MVC.controller.services import ChunkedBackend, DTypePolicy, EELSFileProcessor
+from whateels.pages.home.MVC.model import Model
+
+# Every type of DM_EELS_data._supported_dtypes, once
+DTYPES = list(dict.fromkeys(DM_EELS_data._supported_dtypes.values()))
+
+
+def _status_mb(field):
+    """A memory field of /proc/self/status (Linux), in MiB."""
+    with open("/proc/self/status") as status:
+        for line in status:
+            if line.startswith(field):
+                return int(line.split()[1]) / 2**10
+    return float("nan")
+
+
+def _reset_peak():
+    """Reset the peak resident memory (VmHWM) of the process, returns the current RSS."""
+    with open("/proc/self/clear_refs", "w") as clear_refs:
+        clear_refs.write("5")
+    return _status_mb("VmRSS")
+
+
+def _measure(path):
+    """Child process: load the file and compute its sum image."""
+    model = Model()
+    policy = DTypePolicy()
+    processor = EELSFileProcessor(
+        model, memory_map=False, chunked_backend=ChunkedBackend(sys.maxsize), dtype_policy=policy
+    )
+
+    rss = _reset_peak()
+    dataset = processor.load_dm_file(path)
+    load_peak = _status_mb("VmHWM") - rss
+    if dataset is None:
+        return {"error": "load failed"}
+    electron_count = dataset.ElectronCount
+
+    rss = _reset_peak()
+    image = policy.sum(electron_count, model.constants.ELOSS).values
+    sum_peak = _status_mb("VmHWM") - rss
+    del image
+
+    rss = _reset_peak()
+    default_image = electron_count.sum(model.constants.ELOSS).values
+    default_sum_peak = _status_mb("VmHWM") - rss
+
+    return {
+        "cube": electron_count.dtype.name,
+        "image": policy.reduction_dtype(electron_count.dtype).name,
+        "default_image": default_image.dtype.name,
+        "load_peak": load_peak,
+        "sum_peak": sum_peak,
+        "default_sum_peak": default_sum_peak,
+        "report": policy.memory_report(electron_count.dtype, electron_count.shape),
+    }
+
+
+def _run_child(path):
+    command = [sys.executable, "-m", "benchmarks.bench_dtype_policy", "--child", path]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        last_error = (result.stderr.strip().splitlines() or [""])[-1]
+        return {"error": f"exit code {result.returncode} {last_error}"}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=256, help="Size of the float32 cube, the same shape for every type")
+    parser.add_argument("--energy", type=int, default=1024, help="Energy channels per spectrum")
+    parser.add_argument("--dtypes", nargs="+", default=DTYPES)
+    parser.add_argument("--child", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_measure(args.child)))
+        return
+
+    side = max(2, int(np.sqrt(args.size_mb * 2**20 / (4 * args.energy))))
+    shape = (side, side, args.energy)
+    print(f"spectrum image {shape}, read into RAM")
+    print(
+        f"{'file':<9}{'cube':<9}{'image':<9}{'cube MB':>9}{'float64 MB':>12}{'saved MB':>10}"
+        f"{'load peak':>11}{'sum peak':>10}{'xr sum peak':>13}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for dtype in args.dtypes:
+            path = os.path.join(tmp, f"si_{dtype}.dm4")
+            DM_EELS_Writer(version=4, dtype=dtype, fill="ramp").write(path, shape=shape)
+            result = _run_child(path)
+            os.remove(path)
+            if "error" in result:
+                print(f"{dtype:<9}  failed: {result['error']}")
+                continue
+            report = result["report"]
+            print(
+                f"{dtype:<9}{result['cube']:<9}{result['image']:<9}"
+                f"{report['native_bytes'] / 2**20:>9.0f}{report['float64_bytes'] / 2**20:>12.0f}"
+                f"{report['saved_bytes'] / 2**20:>10.0f}"
+                f"{result['load_peak']:>11.0f}{result['sum_peak']:>10.1f}{result['default_sum_peak']:>13.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark: N concurrent uploads parsed in the server process or in a ParsePool.
+
+Writes N DM4 spectrum images with many metadata tags (distinct files, so the
+header index cache never hits), then loads them all at once, from N threads, with
+EELSFileProcessor.process_upload, the way concurrent sessions do: in process
+(workers 0), then with ParsePool worker processes handing the cubes back in
+shared memory.
+
+Reported per case: wall time, throughput in files and MB per second, and the
+longest stall of a heartbeat thread ticking every millisecond next to the
+uploads, a stand-in for the server event loop (the GIL held by the tag walking
+shows up there).
+
+Usage
+-----
+    python -m benchmarks.bench_parse_pool --uploads 8 --workers 0,2,4 --tags 50000
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import ChunkedBackend, EELSFileProcessor, ParsePool
+from whateels.pages.home.MVC.model import Model
+
+
+class _Heartbeat(threading.Thread):
+    """Ticks every millisecond and records the longest gap between two ticks."""
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.longest = 0.0
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = time.perf_counter()
+        while not self._stop_event.wait(0.001):
+            now = time.perf_counter()
+            self.longest = max(self.longest, now - last)
+            last = now
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _run_case(uploads, workers):
+    pool = ParsePool(workers) if workers else None
+    model = Model()
+    processor = EELSFileProcessor(model, memory_map=False, chunked_backend=ChunkedBackend(2**62), parse_pool=pool)
+    if pool is not None:
+        pool.start()  # Outside the timing
+
+    heartbeat = _Heartbeat()
+    heartbeat.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(len(uploads)) as executor:
+        datasets = list(executor.map(lambda upload: processor.process_upload(*upload), uploads))
+    elapsed = time.perf_counter() - start
+    heartbeat.stop()
+
+    loaded = sum(dataset is not None for dataset in datasets)
+    if pool is not None:
+        for dataset in datasets:
+            pool.release(dataset)
+        pool.shutdown()
+    return elapsed, loaded, heartbeat.longest
+
+
+def _write_uploads(directory, count, shape, first_tags):
+    """Write count DM4 files, one more tag each (distinct index cache keys), and read them back."""
+    uploads = []
+    for i in range(count):
+        path = os.path.join(directory, f"si_{first_tags + i}.dm4")
+        DM_EELS_Writer(version=4, dtype="float32", fill="ramp", n_tags=first_tags + i).write(path, shape=shape)
+        with open(path, "rb") as f:
+            uploads.append((os.path.basename(path), f.read()))
+        os.remove(path)
+    return uploads
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--uploads", type=int, default=8, help="Concurrent uploads")
+    parser.add_argument("--workers", default="0,2,4", help="Comma separated worker process counts (0: in process)")
+    parser.add_argument("--size-mb", type=int, default=64, help="Size of the cube of each file")
+    parser.add_argument("--energy", type=int, default=1024, help="Energy channels per spectrum")
+    parser.add_argument("--tags", type=int, default=50_000, help="Metadata tags of each file")
+    args = parser.parse_args()
+
+    side = max(2, int(np.sqrt(args.size_mb * 2**20 / (4 * args.energy))))
+    shape = (side, side, args.energy)
+    cases = [int(w) for w in args.workers.split(",")]
+    print(f"{args.uploads} uploads of {shape} float32 with {args.tags} tags")
+    print(f"{'workers':<9}{'wall s':>8}{'files/s':>9}{'MB/s':>8}{'loaded':>8}{'stall ms':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for case, workers in enumerate(cases):
+            # Fresh files for every case, so none is in the header index cache
+            uploads = _write_uploads(tmp, args.uploads, shape, args.tags + case * args.uploads)
+            total_mb = sum(len(content) for _, content in uploads) / 2**20
+            elapsed, loaded, stall = _run_case(uploads, workers)
+            print(
+                f"{workers:<9}{elapsed:>8.2f}{args.uploads / elapsed:>9.1f}{total_mb / elapsed:>8.0f}"
+                f"{loaded:>8}{stall * 1e3:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark: latency of the first powerlaw background fit of a process.
+
+The spectrum image visualizer fits a powerlaw background on every hover. Each
+case runs in a fresh Python process, the way a new server process starts:
+
+- lazy jit: the kernel as a bare ``@jit``, compiled by the first fit
+- kernels: whateels.helpers.kernels, compiled ahead (or loaded from its disk
+  cache) when imported, as the App.run warm-up does before the first session
+
+Reported per case: the warm-up (import of the kernel), the first fit, and the
+median of the next fits (steady state).
+
+Usage
+-----
+    python -m benchmarks.bench_powerlaw_fit --fits 50 --energy 2048
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+_CASE = """
+import json, time
+import numpy as np
+from scipy.optimize import curve_fit
+
+start = time.perf_counter()
+if {lazy!r}:
+    from numba import jit
+
+    @jit
+    def powerlaw(x, A, k):
+        return A * x ** k
+else:
+    from whateels.helpers.kernels import powerlaw, warm_up
+    warm_up()
+warm = time.perf_counter() - start
+
+x = np.linspace(100.0, 100.0 + 0.25 * {energy}, {energy}).astype({dtype!r})
+y = 3e5 * x.astype(float) ** -2.5
+fits = []
+for i in range({fits}):
+    selection = slice(i % 100, i % 100 + {energy} // 4)
+    start = time.perf_counter()
+    params, _ = curve_fit(powerlaw, x[selection], y[selection], p0=(1e5, -2.0))
+    powerlaw(x, *params)
+    fits.append(time.perf_counter() - start)
+print(json.dumps([warm, fits[0], sorted(fits[1:])[len(fits[1:]) // 2]]))
+"""
+
+
+def _run_case(lazy, dtype, fits, energy):
+    code = _CASE.format(lazy=lazy, dtype=dtype, fits=fits, energy=energy)
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fits", type=int, default=50, help="Fits per process")
+    parser.add_argument("--energy", type=int, default=2048, help="Energy channels of the spectrum")
+    args = parser.parse_args()
+
+    print(f"{'case':<12}{'dtype':<9}{'warm-up ms':>12}{'first fit ms':>14}{'steady ms':>11}")
+    for lazy, name in ((True, "lazy jit"), (False, "kernels")):
+        for dtype in ("float64", "float32"):
+            warm, first, steady = _run_case(lazy, dtype, args.fits, args.energy)
+            print(f"{name:<12}{dtype:<9}{warm * 1e3:>12.1f}{first * 1e3:>14.2f}{steady * 1e3:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
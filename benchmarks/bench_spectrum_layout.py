@@ -0,0 +1,110 @@
+"""
+Benchmark: per-hover spectrum read before and after the spectrum-contiguous layout.
+
+Writes a DM4 spectrum image, loads it with EELSFileProcessor (memory-mapped and
+read into RAM), then times what a hover does in SpectrumImageVisualizer: read the
+spectrum of a random pixel from the ElectronCount array. Each case is timed on
+the DM (Eloss, y, x) layout as loaded, and after SpectrumLayout switched the
+dataset to its contiguous copy (in memory or on disk).
+
+Reported: time of the background copy, then median (and 99th percentile) read
+times in microseconds: the spectrum array on a first hover of each pixel ("first",
+from disk for memory-mapped data when --drop-caches can drop the page cache, root
+on Linux), on later hovers ("array"), and through xarray indexing instead
+("xarray", whose overhead hides the layout).
+
+Usage
+-----
+    python -m benchmarks.bench_spectrum_layout --size-mb 512
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import ChunkedBackend, EELSFileProcessor, SpectrumLayout
+from whateels.pages.home.MVC.model import Model
+
+
+def _drop_caches():
+    os.sync()
+    try:
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3")
+    except OSError:
+        print("cannot drop the page cache (needs root), reads may hit it")
+
+
+def _time_hovers(read, pixels):
+    times = []
+    for y, x in pixels:
+        start = time.perf_counter()
+        read(y, x)
+        times.append(time.perf_counter() - start)
+    return np.median(times) * 1e6, np.percentile(times, 99) * 1e6
+
+
+def _run_case(path, memory_map, storage, pixels, drop_caches):
+    model = Model()
+    processor = EELSFileProcessor(model, memory_map=memory_map, chunked_backend=ChunkedBackend(sys.maxsize))
+    dataset = processor.load_dm_file(path)
+    copy_time = 0.0
+    if storage is not None:
+        layout = SpectrumLayout(storage)
+        start = time.perf_counter()
+        layout.start(dataset)
+        layout.wait()
+        copy_time = time.perf_counter() - start
+    data = dataset.ElectronCount.data
+    contiguous = SpectrumLayout.is_spectrum_contiguous(data)
+    on_disk = memory_map or storage == SpectrumLayout.DISK
+    # The first pass reads from disk (once the page cache is dropped), the second from memory
+    if drop_caches and on_disk:
+        _drop_caches()
+    first = _time_hovers(lambda y, x: np.array(data[y, x, :]), pixels)
+    array = _time_hovers(lambda y, x: np.array(data[y, x, :]), pixels)
+    indexed = _time_hovers(lambda y, x: dataset.ElectronCount[y, x, :].values, pixels)
+    return copy_time, contiguous, first, array, indexed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=512)
+    parser.add_argument("--energy", type=int, default=2048, help="Energy channels per spectrum")
+    parser.add_argument("--hovers", type=int, default=500)
+    parser.add_argument("--drop-caches", action="store_true")
+    args = parser.parse_args()
+
+    side = max(2, int(np.sqrt(args.size_mb * 2**20 / (4 * args.energy))))
+    shape = (side, side, args.energy)
+    rng = np.random.default_rng(0)
+    pixels = [tuple(p) for p in rng.integers(0, side, size=(args.hovers, 2))]
+
+    cases = [
+        ("mmap", True, None),
+        ("mmap", True, SpectrumLayout.DISK),
+        ("mmap", True, SpectrumLayout.MEMORY),
+        ("ram", False, None),
+        ("ram", False, SpectrumLayout.MEMORY),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "si.dm4")
+        DM_EELS_Writer(version=4, dtype="float32", fill="ramp").write(path, shape=shape)
+        print(f"spectrum image {shape} float32, {args.hovers} hovers")
+        print(
+            f"{'load':<6}{'layout':<8}{'copy s':>8}{'contiguous':>12}"
+            f"{'first us':>18}{'array us':>16}{'xarray us':>16}"
+        )
+        for load, memory_map, storage in cases:
+            copy_time, contiguous, *timings = _run_case(path, memory_map, storage, pixels, args.drop_caches)
+            columns = "".join(f"{median:>9.1f} ({p99:>5.0f})" for median, p99 in timings)
+            print(f"{load:<6}{storage or 'DM':<8}{copy_time:>8.2f}{str(contiguous):>12}{columns}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""
+Benchmark: server startup, time to listen and time to the first page.
+
+Starts the application the way main.py does (App.run), in a fresh Python process
+so nothing is imported yet, and polls its port. Reported per run:
+
+- listen: from the process start until the port accepts connections (imports,
+  Panel setup, server start)
+- first page: the first request of a route, which imports the modules of its
+  page and builds it
+- next page: a second request of the same route, the page built for a new
+  session with everything imported
+
+Usage
+-----
+    python -m benchmarks.bench_startup --runs 3 --routes /,/metadata-details
+"""
+
+import argparse
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+_SERVER = (
+    "from whateels import App\n"
+    "App('bench').run(port={port}, show=False)\n"
+)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def _wait_listening(port, process, timeout) -> bool:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        if process.poll() is not None:
+            return False
+        try:
+            with socket.create_connection(("localhost", port), timeout=0.05):
+                return True
+        except OSError:
+            time.sleep(0.005)
+    return False
+
+
+def _get(port, route) -> float:
+    start = time.perf_counter()
+    with urllib.request.urlopen(f"http://localhost:{port}{route}", timeout=120) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def _run(routes, timeout):
+    """One server start: (listen seconds, {route: (first page, next page) seconds})."""
+    port = _free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", _SERVER.format(port=port)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        if not _wait_listening(port, process, timeout):
+            raise RuntimeError("the server did not start")
+        listen = time.perf_counter() - start
+        pages = {route: (_get(port, route), _get(port, route)) for route in routes}
+        return listen, pages
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Server starts")
+    parser.add_argument("--routes", default="/", help="Comma separated routes requested, in order")
+    parser.add_argument("--timeout", type=float, default=120, help="Seconds to wait for the server")
+    args = parser.parse_args()
+
+    routes = args.routes.split(",")
+    print(f"{'run':<5}{'listen s':>10}" + "".join(f"{route + ' first/next s':>34}" for route in routes))
+    listens = []
+    for run in range(args.runs):
+        listen, pages = _run(routes, args.timeout)
+        listens.append(listen)
+        timings = "".join(f"{f'{first:.2f} / {second:.2f}':>34}" for first, second in pages.values())
+        print(f"{run:<5}{listen:>10.2f}{timings}")
+    print(f"best listen: {min(listens):.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: numba DM_TagScanner vs the interpreted DM_InfoParser walker.
+
+For synthetic DM3/DM4 files with a large tag tree, reports:
+
+- scan: tags/s of the compiled scan alone (tag table, no value decoded) against
+  the tags/s of the interpreted walker parsing the whole tree
+- full: parse_file() of the whole tree with each parser
+- ImageList: parse_file(include=["ImageList"]), i.e. only the image entries.
+  DM4 groups are skipped by seeking with both parsers, DM3 ones have to be walked.
+
+The first call compiles the scanner (cached on disk afterwards) and is not timed.
+
+Usage
+-----
+    python -m benchmarks.bench_tag_scanner --groups 5000 20000
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer, DM_InfoParser, DM_TagScanner
+
+
+def _parse(parser, path, **kwargs):
+    with open(path, "rb") as f:
+        parser.file = f
+        start = time.perf_counter()
+        parser.parse_file(**kwargs)
+        return time.perf_counter() - start
+
+
+def _scan(path):
+    scanner = DM_TagScanner()
+    with open(path, "rb") as f:
+        scanner.file = f
+        scanner._check_extension_in_fname()
+        scanner._open_cursor()
+        try:
+            scanner._process_file_header()
+            nnames = scanner._read_ParentBlockSize_info()
+            start = time.perf_counter()
+            table = scanner._scan(nnames)
+            elapsed = time.perf_counter() - start
+        finally:
+            scanner._close_cursor()
+    return table.size, elapsed
+
+
+def _best(function, repeat):
+    return min(function() for _ in range(repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, nargs="+", default=[5000, 20000],
+                        help="Number of DocumentObjectList groups (20 tags each)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'file':<6}{'tags':>9}{'walker tags/s':>15}{'scan tags/s':>14}{'speedup':>9}"
+        f"{'full walker s':>15}{'full scanner s':>16}{'ImageList walker s':>20}{'ImageList scanner s':>21}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in (3, 4):
+            for n_groups in args.groups:
+                path = os.path.join(tmp, f"scanner_{n_groups}.dm{version}")
+                DM_EELS_Writer(version=version, n_tags=n_groups * 20).write(path, shape=(16, 16, 64))
+                _parse(DM_TagScanner(), path)  # Compilation
+
+                n_tags = _scan(path)[0]
+                scan_time = _best(lambda: _scan(path)[1], args.repeat)
+                walker_full = _best(lambda: _parse(DM_InfoParser(use_mmap=True), path), args.repeat)
+                scanner_full = _best(lambda: _parse(DM_TagScanner(), path), args.repeat)
+                include = {"include": ["ImageList"]}
+                walker_images = _best(lambda: _parse(DM_InfoParser(use_mmap=True), path, **include), args.repeat)
+                scanner_images = _best(lambda: _parse(DM_TagScanner(), path, **include), args.repeat)
+
+                walker_rate = n_tags / walker_full
+                scan_rate = n_tags / scan_time
+                print(
+                    f"{'dm' + str(version):<6}{n_tags:>9}{walker_rate:>15,.0f}{scan_rate:>14,.0f}"
+                    f"{scan_rate / walker_rate:>8.1f}x{walker_full:>15.3f}{scanner_full:>16.3f}"
+                    f"{walker_images:>20.4f}{scanner_images:>21.4f}"
+                )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Benchmark: tags parsed per second by the iterative DM_InfoParser walker.
+
+Compares ``DM_InfoParser._parse_Blocks`` (explicit stack, dispatch table built
+once per parser) with the previous recursive walker, which rebuilt the
+dictionary of bound parser methods for every data tag. Two tree shapes are
+measured: a wide one (many groups of 20 tags, like the DocumentObjectList of
+real files) and a deep chain of nested groups, which the recursive walker
+cannot parse past the interpreter recursion limit.
+
+Usage
+-----
+    python -m benchmarks.bench_tag_walker --groups 5000 --depth 200 5000
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from whateels.errors.dm.parsing import DMIdentifierError
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer, DM_InfoParser
+
+
+class RecursiveInfoParser(DM_InfoParser):
+    """DM_InfoParser with the previous recursive tag walker, as reference."""
+
+    def _parse_Blocks(self, nnames, info_dictionary, parentBlock_name="root", parent_path=None,
+                      parent_included=False):
+        noNameData = 0
+        noNameBlock = 0
+        for _ in range(nnames):
+            identifier, childrenBlock_name = self._read_ChildrenBlock_header()
+            callable_id = 2 if (parentBlock_name == "ImageData" and childrenBlock_name == "Data") else 1
+            if identifier == 21:
+                if not childrenBlock_name:
+                    childrenBlock_name = f"DataBlock{noNameData}"
+                    noNameData += 1
+                keyword = self._read_DataBlock_keyword()
+                parsers_dict = self._get_callable_parsers_dictionary()
+                catcher = parsers_dict[keyword][0]
+                caller = parsers_dict[keyword][callable_id]
+                info_dictionary[childrenBlock_name] = caller(**catcher())
+            elif identifier == 20:
+                if not childrenBlock_name:
+                    childrenBlock_name = f"GroupBlock{noNameBlock}"
+                    noNameBlock += 1
+                nnames = self._read_ParentBlockSize_info(read_block_size=True)
+                info_dictionary[childrenBlock_name] = dict()
+                self._parse_Blocks(nnames, info_dictionary[childrenBlock_name], childrenBlock_name)
+            else:
+                raise DMIdentifierError(f"Identifier missread while parsing the file. {identifier =}")
+
+
+def _count_tags(tree):
+    count, stack = 0, [tree]
+    while stack:
+        for value in stack.pop().values():
+            count += 1
+            if isinstance(value, dict):
+                stack.append(value)
+    return count
+
+
+def _tags_per_second(parser_class, path, repeat):
+    best, info = float("inf"), None
+    for _ in range(repeat):
+        parser = parser_class(use_mmap=True)
+        with open(path, "rb") as f:
+            parser.file = f
+            start = time.perf_counter()
+            try:
+                info = parser.parse_file()
+            except RecursionError:
+                return None, None
+            best = min(best, time.perf_counter() - start)
+    return _count_tags(info) / best, info
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--groups", type=int, nargs="+", default=[1000, 5000],
+                        help="Number of 20 tag groups of the wide trees")
+    parser.add_argument("--depth", type=int, nargs="+", default=[200, 5000],
+                        help="Nesting depth of the deep trees")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"recursion limit: {sys.getrecursionlimit()}")
+    print(f"{'file':<8}{'tree':<14}{'recursive tags/s':>18}{'iterative tags/s':>18}{'speedup':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for version in (3, 4):
+            cases = [(f"wide {n}", n, None) for n in args.groups]
+            cases += [(f"deep {d}", None, d) for d in args.depth]
+            for label, n_groups, depth in cases:
+                path = os.path.join(tmp, f"walker.dm{version}")
+                if depth is None:
+                    writer = DM_EELS_Writer(version=version, n_tags=n_groups * 20)
+                else:
+                    writer = DM_EELS_Writer(version=version, n_tags=1, tag_depth=depth)
+                writer.write(path, shape=(8, 8, 64))
+                reference_rate, reference_info = _tags_per_second(RecursiveInfoParser, path, args.repeat)
+                rate, info = _tags_per_second(DM_InfoParser, path, args.repeat)
+                if reference_info is not None and reference_info != info:
+                    raise AssertionError(f"Walkers differ for {label} dm{version}")
+                reference = "RecursionError" if reference_rate is None else f"{reference_rate:,.0f}"
+                speedup = "-" if reference_rate is None else f"{rate / reference_rate:.2f}x"
+                print(f"{'dm' + str(version):<8}{label:<14}{reference:>18}{rate:>18,.0f}{speedup:>9}")
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+AppState: one state per browser session, found by token from the other tabs, dropped with its session.
+"""
+
+import pytest
+
+from whateels.pages.home.MVC.model import Model
+from whateels.shared_state import AppState
+
+
+class _Document:
+    """Document of a server session: the part of bokeh.document.Document AppState uses."""
+
+    def __init__(self):
+        self.session_context = object()
+        self.destroyed_callbacks = []
+
+    def on_session_destroyed(self, callback):
+        self.destroyed_callbacks.append(callback)
+
+    def destroy(self):
+        for callback in self.destroyed_callbacks:
+            callback(self.session_context)
+
+
+@pytest.fixture
+def sessions(monkeypatch):
+    """Two server sessions, with the states of this test only."""
+    monkeypatch.setattr(AppState, "_sessions", {})
+    monkeypatch.setattr(AppState, "_tokens", {})
+    return _Document(), _Document()
+
+
+def test_sessions_have_states_of_their_own(sessions):
+    first, second = sessions
+    state = AppState.for_session(first)
+    assert AppState.for_session(first) is state
+    assert AppState.for_session(second) is not state
+    assert AppState.session_count() == 2
+
+    state.metadata = {"ImageList": {}}
+    assert AppState.for_session(second).metadata is None
+    # The models of a session share its state
+    assert Model(AppState.for_session(first)).app_state is state
+
+
+def test_other_tabs_find_a_state_by_its_token(sessions):
+    first, second = sessions
+    state = AppState.for_session(first)
+    assert AppState.from_token(state.token) is state
+    assert state.token != AppState.for_session(second).token
+    assert AppState.from_token("unknown") is None and AppState.from_token(None) is None
+
+
+def test_states_are_dropped_with_their_session(sessions):
+    first, second = sessions
+    state = AppState.for_session(first)
+    state.metadata = {"ImageList": {}}
+    other = AppState.for_session(second)
+    first.destroy()
+    assert state.metadata is None
+    assert AppState.from_token(state.token) is None
+    assert AppState.session_count() == 1
+    assert AppState.for_session(second) is other
+    # A new state for a document whose session was destroyed
+    assert AppState.for_session(first) is not state
+    AppState.discard(first)
+    AppState.discard(first)  # Dropping it twice is harmless
+    assert AppState.session_count() == 1
+
+
+def test_scripts_share_one_state_per_process(sessions):
+    assert AppState.for_session(None) is AppState.for_session(None)
+    outside = _Document()
+    outside.session_context = None
+    assert AppState.for_session(outside) is AppState.for_session(None)
+    assert outside.destroyed_callbacks == []
@@ -0,0 +1,215 @@
+"""
+Batch uploads: the bounded UploadQueue, the files of a drop in the FileDropper, and the loaded datasets of a session.
+"""
+
+import threading
+
+import pytest
+
+from whateels.components.file_dropper import FileDropper
+from whateels.pages.home.MVC import Model, Controller, View
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import MemoryDatasetCache, ParsePool
+from whateels.pages.home.MVC.controller.services.upload_queue import UploadItem, UploadQueue
+
+
+class _Loads:
+    """work of an UploadQueue, holding each file until it is released."""
+
+    def __init__(self):
+        self.running = 0
+        self.max_running = 0
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self, filename, content, token, progress):
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            progress(0.5, "Reading...")
+            self.release.wait(10)
+            token.raise_if_cancelled()
+            return None if content is None else f"{filename}:{content}"
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+@pytest.fixture
+def pool():
+    pool = ParsePool(1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def session(pool, monkeypatch):
+    monkeypatch.setattr(ParsePool, "_shared", pool)
+    monkeypatch.setattr(MemoryDatasetCache, "_shared", MemoryDatasetCache(max_bytes=0))
+    model = Model()
+    controller = Controller(model, View(model))
+    yield model, controller._file_operation_service
+    controller._file_operation_service.close()
+
+
+def _drop(file_operation, tmp_path, names, little_endian=True):
+    """Upload the files of a drop, and wait until they are loaded and the first one shown."""
+    uploads = {}
+    for name in names:
+        path = tmp_path / name
+        DM_EELS_Writer(little_endian=little_endian, fill="ramp", n_tags=200, tag_depth=3).write(
+            str(path), shape=(3, 4, 32)
+        )
+        uploads[name] = file_operation.start_streaming_upload(name)
+        assert uploads[name].write(path.read_bytes())
+        assert uploads[name].finish()
+    # The first file does not load before the others are queued, as in a single drop
+    queue, dropped = file_operation._upload_queue, threading.Event()
+    work = queue.work
+    queue.work = lambda *args: dropped.wait(10) and work(*args)
+    try:
+        for name, upload in uploads.items():
+            assert file_operation.handle_file_upload(name, upload)
+    finally:
+        dropped.set()
+        queue.work = work
+    file_operation.wait_for_processing(30)
+
+
+def test_queue_loads_at_most_max_parallel_files_at_once():
+    loads = _Loads()
+    updates, loaded = [], []
+    queue = UploadQueue(
+        loads, max_parallel=2,
+        on_update=lambda item: updates.append((item.filename, item.status, item.fraction)),
+        on_loaded=loaded.append,
+    )
+    items = [queue.submit(f"eels_{i}.dm4", i) for i in range(5)]
+    # Only the first file of the drop is shown once loaded
+    assert [item.activate for item in items] == [True, False, False, False, False]
+    assert [item.status for item in items[2:]] == [UploadItem.QUEUED] * 3
+    loads.release.set()
+    queue.wait(10)
+    assert queue.idle
+    assert loads.max_running == 2
+    assert [item.status for item in queue.items] == [UploadItem.LOADED] * 5
+    assert sorted(item.result for item in loaded) == [f"eels_{i}.dm4:{i}" for i in range(5)]
+    # Each file reported its own progress
+    for item in items:
+        assert (item.filename, UploadItem.LOADING, 0.5) in updates
+
+
+def test_queue_status_is_per_file():
+    loads = _Loads()
+    queue = UploadQueue(loads, max_parallel=1)
+    loading = queue.submit("a.dm4", "a")
+    failing = queue.submit("b.dm4", None)
+    cancelled = queue.submit("c.dm4", "c")
+    assert queue.cancel("c.dm4") is cancelled
+    loads.release.set()
+    queue.wait(10)
+    assert loading.status == UploadItem.LOADED
+    assert failing.status == UploadItem.FAILED
+    assert cancelled.status == UploadItem.CANCELLED
+    assert [item.filename for item in queue.items] == ["a.dm4", "b.dm4"]
+
+
+def test_cancelled_loads_are_not_dispatched_and_free_their_slot():
+    loads = _Loads()
+    loaded = []
+    queue = UploadQueue(loads, max_parallel=1, on_loaded=loaded.append)
+    loading = queue.submit("a.dm4", "a")
+    waiting = queue.submit("b.dm4", "b")
+    assert loading.status == UploadItem.LOADING and waiting.status == UploadItem.QUEUED
+    assert queue.cancel("a.dm4") is loading
+    assert loading.status == UploadItem.CANCELLED and loading.content is None
+    loads.release.set()
+    queue.wait(10)
+    # The next file took the slot, the cancelled one was never shown
+    assert [item.filename for item in loaded] == ["b.dm4"]
+    assert [item.filename for item in queue.items] == ["b.dm4"]
+    assert queue.cancel("missing.dm4") is None
+
+
+def test_dropping_a_file_again_cancels_its_previous_load():
+    loads = _Loads()
+    loaded = []
+    queue = UploadQueue(loads, max_parallel=2, on_loaded=loaded.append)
+    first = queue.submit("a.dm4", "old")
+    second = queue.submit("a.dm4", "new")
+    assert first.status == UploadItem.CANCELLED
+    loads.release.set()
+    queue.wait(10)
+    assert [item.result for item in loaded] == ["a.dm4:new"]
+    assert queue.items == [second]
+
+
+def test_cancel_all_forgets_every_file():
+    loads = _Loads()
+    loaded = []
+    queue = UploadQueue(loads, max_parallel=1, on_loaded=loaded.append)
+    items = [queue.submit(f"eels_{i}.dm4", i) for i in range(3)]
+    queue.cancel_all()
+    loads.release.set()
+    queue.wait(10)
+    assert queue.idle and queue.items == [] and loaded == []
+    assert [item.status for item in items] == [UploadItem.CANCELLED] * 3
+
+
+def test_dropper_reports_each_file_of_a_drop_and_each_removal():
+    uploaded, removed = [], []
+    dropper = FileDropper(on_file_uploaded_callback=lambda name, _: uploaded.append(name),
+                          on_file_removed_callback=removed.append)
+    dropper.file_widget.value = {"a.dm4": b"a", "b.dm3": b"b", "notes.txt": b"c"}
+    assert uploaded == ["a.dm4", "b.dm3"]
+    # Dropping more files reports only the new ones
+    dropper.file_widget.value = {"a.dm4": b"a", "b.dm3": b"b", "notes.txt": b"c", "c.dm4": b"c"}
+    assert uploaded == ["a.dm4", "b.dm3", "c.dm4"]
+    dropper.file_widget.value = {"a.dm4": b"a", "c.dm4": b"c"}
+    assert removed == ["b.dm3"]
+
+
+def test_session_keeps_every_file_of_a_batch_and_switches_between_them(session, tmp_path):
+    model, file_operation = session
+    names = ["a.dm4", "b.dm4", "c.dm4"]
+    _drop(file_operation, tmp_path, names)
+    assert list(model.datasets) == names
+    assert all(item.status == UploadItem.LOADED for item in file_operation._upload_queue.items)
+    # The first file of the drop is shown, the others are listed
+    assert model.active_filename == "a.dm4"
+    assert list(file_operation.controller.view.dataset_selector.options) == names
+
+    assert file_operation.show_dataset("c.dm4")
+    file_operation.wait_for_processing(30)
+    assert model.active_filename == "c.dm4"
+    assert model.dataset is model.datasets["c.dm4"]
+    assert model.app_state.metadata is model.file_metadata["c.dm4"]
+    assert not file_operation.show_dataset("missing.dm4")
+
+
+def test_removing_a_file_of_a_batch_keeps_the_others(session, tmp_path):
+    model, file_operation = session
+    _drop(file_operation, tmp_path, ["a.dm4", "b.dm4", "c.dm4"])
+    file_operation.handle_file_removal("b.dm4")
+    file_operation.wait_for_processing(30)
+    assert list(model.datasets) == ["a.dm4", "c.dm4"]
+    assert model.active_filename == "a.dm4"
+    # Removing the one shown shows the last loaded file
+    file_operation.handle_file_removal("a.dm4")
+    file_operation.wait_for_processing(30)
+    assert model.active_filename == "c.dm4"
+    assert [item.filename for item in file_operation._upload_queue.items] == ["c.dm4"]
+
+
+def test_removal_releases_the_shared_memory_of_the_file(session, pool, tmp_path):
+    model, file_operation = session
+    # Big-endian: the worker copies the cube into a segment
+    _drop(file_operation, tmp_path, ["a.dm4", "b.dm4"], little_endian=False)
+    (segment,) = pool.segments_of(model.datasets["b.dm4"])
+    file_operation.handle_file_removal("b.dm4")
+    file_operation.wait_for_processing(30)
+    assert "b.dm4" not in model.datasets
+    assert segment.refcount == 0
+    assert len(pool.segments_of(model.datasets["a.dm4"])) == 1
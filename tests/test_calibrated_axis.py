@@ -0,0 +1,73 @@
+"""
+CalibratedAxis: constant-time value/index lookups and range slices, matching the axis values and their masks.
+"""
+
+import numpy as np
+import pytest
+
+from whateels.helpers import CalibratedAxis
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import EELSFileProcessor
+from whateels.pages.home.MVC.model import Model
+
+
+def _mask(values, low, high):
+    return (values >= low) & (values <= high)
+
+
+@pytest.mark.parametrize("scale, offset", [(0.25, 100.0), (0.1, -3.3), (-0.5, 12.0), (1e-3, 283.7)])
+def test_slices_select_what_the_mask_selects(scale, offset):
+    axis = CalibratedAxis(2048, scale, offset, "eV")
+    values = axis.values
+    rng = np.random.default_rng(0)
+    # Bounds on samples, between samples and outside the axis
+    bounds = np.concatenate([
+        rng.choice(values, 200),
+        rng.uniform(values.min(), values.max(), 200),
+        [values.min() - 1, values.max() + 1],
+    ])
+    for low, high in rng.choice(bounds, (500, 2)):
+        np.testing.assert_array_equal(values[axis.slice(low, high)], values[_mask(values, low, high)])
+
+
+def test_indices_and_values_round_trip():
+    axis = CalibratedAxis(2048, scale=0.25, offset=100.0, units="eV")
+    indices = np.arange(axis.size)
+    np.testing.assert_array_equal(axis.value_of(indices), axis.values)
+    np.testing.assert_array_equal(axis.index_of(axis.values), indices)
+    assert axis.index_of(150.1) == 200
+    # Clipped to the axis unless asked otherwise
+    assert axis.index_of(0.0) == 0 and axis.index_of(1e6) == axis.size - 1
+    assert axis.index_of(0.0, clip=False) == -400
+    assert axis.slice(200.0, 100.0) == slice(400, 400)
+    with pytest.raises(ValueError):
+        CalibratedAxis(10, scale=0)
+
+
+def test_axes_from_values():
+    axis = CalibratedAxis(50, scale=0.3, offset=-2.0)
+    restored = CalibratedAxis.from_values(axis.values, units="eV")
+    np.testing.assert_allclose(restored.values, axis.values)
+    assert CalibratedAxis.from_values(np.geomspace(1, 100, 50)) is None
+    # Axes with non-finite values have no calibration
+    assert CalibratedAxis.from_values([np.nan, 1.0, 2.0]) is None
+    assert CalibratedAxis.from_values([0.0, np.nan, 2.0]) is None
+    assert CalibratedAxis.from_dict(axis.to_dict()).to_dict() == axis.to_dict()
+
+
+@pytest.mark.parametrize("shape", [(3, 4, 64), (64,)], ids=["spectrum-image", "spectrum"])
+def test_energy_axes_match_the_calibration_formula(shape, tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(energy_offset=283.7, energy_scale=0.05).write(path, shape=shape)
+    spectrum = DM_EELS_Reader(path, index_cache=False).processed_eels_spectrum
+    energy = 0 if len(spectrum.shape) == 3 else -1
+    # The formula the energy axis was computed with before the calibrated axis
+    expected = (
+        np.arange(spectrum.shape[energy]) * spectrum._get_scales()[energy] + spectrum._get_unit_origins()[energy]
+    )
+    np.testing.assert_array_equal(spectrum.energy_axis, expected)
+    assert spectrum.energy_calibration.units == "eV"
+
+    dataset = EELSFileProcessor(Model()).load_dm_file(path)
+    stored = CalibratedAxis.from_dict(dataset.attrs[Model().constants.ENERGY_CALIBRATION])
+    np.testing.assert_array_equal(stored.values, dataset.Eloss.values)
@@ -0,0 +1,77 @@
+"""
+ChunkedBackend: spectrum images past the memory budget become dask arrays of whole spectra, with the same values.
+"""
+
+import numpy as np
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import ChunkedBackend, EELSFileProcessor
+from whateels.pages.home.MVC.model import Model
+
+requires_dask = pytest.mark.skipif(not ChunkedBackend.is_available(), reason="dask is optional")
+
+
+def _cube(shape=(32, 12, 10)):
+    return np.arange(np.prod(shape), dtype=np.float32).reshape(shape)
+
+
+def test_cubes_within_the_budget_are_not_chunked():
+    cube = _cube()
+    backend = ChunkedBackend(memory_budget=cube.nbytes, num_workers=1)
+    assert not backend.should_chunk(cube)
+    # Only spectrum images are chunked
+    assert not ChunkedBackend(memory_budget=1).should_chunk(cube[0])
+
+
+@requires_dask
+@pytest.mark.parametrize("energy_axis", [0, 2])
+@pytest.mark.parametrize("spectra_per_chunk", [20, 3], ids=["rows", "columns"])
+def test_chunks_hold_whole_spectra_within_the_budget(energy_axis, spectra_per_chunk):
+    cube = _cube() if energy_axis == 0 else np.moveaxis(_cube(), 0, 2).copy()
+    spectrum_bytes = 32 * cube.itemsize
+    backend = ChunkedBackend(
+        memory_budget=spectra_per_chunk * spectrum_bytes * ChunkedBackend._TEMPORARIES, num_workers=1
+    )
+    assert backend.should_chunk(cube)
+    chunked = backend.chunk(cube, energy_axis=energy_axis)
+    assert ChunkedBackend.is_chunked(chunked)
+    # The energy axis is never split, rows are split before columns
+    assert chunked.chunks[energy_axis] == (32,)
+    chunk_shape = chunked.chunksize
+    assert np.prod(chunk_shape) * cube.itemsize <= backend.chunk_bytes
+    y_axis, x_axis = [axis for axis in range(3) if axis != energy_axis]
+    if spectra_per_chunk >= cube.shape[x_axis]:
+        assert chunk_shape[x_axis] == cube.shape[x_axis] and chunk_shape[y_axis] == 2
+    else:
+        assert chunk_shape[y_axis] == 1 and chunk_shape[x_axis] == 3
+
+    np.testing.assert_array_equal(backend.compute(chunked)[0], cube)
+    (total,) = backend.compute(chunked.sum(axis=energy_axis))
+    np.testing.assert_allclose(total, cube.sum(axis=energy_axis))
+
+
+@requires_dask
+def test_blocks_and_spectra_map_to_the_unchunked_results():
+    cube = np.moveaxis(_cube(), 0, 2).copy()  # (y, x, Eloss)
+    backend = ChunkedBackend(memory_budget=3 * 32 * cube.itemsize * ChunkedBackend._TEMPORARIES, num_workers=2)
+    chunked = backend.chunk(cube, energy_axis=2)
+    assert sum(backend.reduce_blocks(np.sum, chunked)) == cube.sum()
+    (argmax,) = backend.compute(backend.map_spectra(lambda block: block.argmax(axis=2), chunked, dtype=np.intp))
+    np.testing.assert_array_equal(argmax, cube.argmax(axis=2))
+    # Plain arrays are processed as they are
+    np.testing.assert_array_equal(backend.map_spectra(lambda block: block.max(axis=2), cube), cube.max(axis=2))
+
+
+@pytest.mark.parametrize("memory_budget", [2**30, 1024], ids=["below-budget", "above-budget"])
+def test_loaded_cubes_past_the_budget_are_chunked(memory_budget, tmp_path):
+    if memory_budget == 1024 and not ChunkedBackend.is_available():
+        pytest.skip("dask is optional")
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp").write(path, shape=(4, 5, 64))
+    model = Model()
+    backend = ChunkedBackend(memory_budget=memory_budget, num_workers=1)
+    dataset = EELSFileProcessor(model, chunked_backend=backend).load_dm_file(path)
+    expected = EELSFileProcessor(model, memory_map=False).load_dm_file(path)
+    assert ChunkedBackend.is_chunked(dataset.ElectronCount.data) == (memory_budget == 1024)
+    np.testing.assert_array_equal(dataset.ElectronCount.values, expected.ElectronCount.values)
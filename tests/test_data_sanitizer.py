@@ -0,0 +1,145 @@
+"""
+DataSanitizer: NaN/inf replacement and data quality profile in one pass, memory-mapped cubes left unscanned.
+"""
+
+import numpy as np
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import (
+    ChunkedBackend, DataQualityProfile, DataSanitizer, EELSFileProcessor,
+)
+from whateels.pages.home.MVC.model import Model
+
+requires_dask = pytest.mark.skipif(not ChunkedBackend.is_available(), reason="dask is optional")
+
+
+def _memmap(tmp_path, data):
+    path = tmp_path / "cube.npy"
+    np.save(path, data)
+    return path, np.load(path, mmap_mode="c")
+
+
+def test_memory_maps_are_left_unscanned(tmp_path):
+    data = np.arange(24, dtype=np.float32).reshape(2, 3, 4)
+    data[0, 1, 2] = np.nan
+    path, mapped = _memmap(tmp_path, data)
+    content = path.read_bytes()
+    sanitized, profile = DataSanitizer().sanitize(mapped)
+    assert sanitized is mapped
+    assert not profile.scanned and not profile.sanitized and not profile.is_clean
+    assert profile.size == data.size
+    assert profile.non_finite_count is None and profile.mean is None
+    # Neither patched (private pages) nor written to the file
+    assert np.isnan(mapped[0, 1, 2])
+    assert path.read_bytes() == content
+
+
+@requires_dask
+def test_chunked_memory_maps_are_left_unscanned(tmp_path):
+    _, mapped = _memmap(tmp_path, np.ones((4, 4, 8), dtype=np.float32))
+    backend = ChunkedBackend(memory_budget=256, num_workers=1)
+    chunked = backend.chunk(mapped)
+    sanitized, profile = DataSanitizer(backend).sanitize(chunked, memory_mapped=True)
+    assert sanitized is chunked
+    assert not profile.scanned
+    _, profile = DataSanitizer(backend).sanitize(chunked)
+    assert profile.scanned and profile.total == mapped.size
+
+
+def test_memory_mapped_files_load_unscanned(tmp_path):
+    data = np.ones((3, 4, 16), dtype=np.float32)
+    data[1, 2, 3] = np.inf
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer().write(path, shape=data.shape, data=data)
+    model = Model()
+    dataset = EELSFileProcessor(model, memory_map=True).load_dm_file(path)
+    assert isinstance(dataset.ElectronCount.data, np.memmap)
+    profile = dataset.attrs[model.constants.DATA_QUALITY]
+    assert profile["nan_count"] is None and not profile["sanitized"]
+    # Read into memory, the cube is scanned and cleaned
+    dataset = EELSFileProcessor(model, memory_map=False).load_dm_file(path)
+    profile = dataset.attrs[model.constants.DATA_QUALITY]
+    assert profile["posinf_count"] == 1 and profile["sanitized"]
+    assert np.isfinite(dataset.ElectronCount.values).all()
+
+
+def _dirty(dtype=np.float32):
+    data = np.linspace(-3, 5, 60, dtype=dtype).reshape(3, 4, 5)
+    data[0, 0, 0] = data[1, 2, 3] = np.nan
+    data[2, 1, 1] = np.inf
+    data[0, 3, 4] = -np.inf
+    return data
+
+
+def _assert_profile_of(profile, data):
+    finite = data[np.isfinite(data)]
+    assert profile.scanned and profile.size == data.size
+    assert (profile.nan_count, profile.posinf_count, profile.neginf_count) == (2, 1, 1)
+    assert profile.non_finite_count == 4
+    assert profile.minimum == finite.min() and profile.maximum == finite.max()
+    assert profile.total == pytest.approx(float(finite.sum(dtype=np.float64)))
+    assert profile.mean == pytest.approx(float(finite.mean(dtype=np.float64)))
+
+
+@pytest.mark.parametrize("dtype", [np.float32, np.float64])
+def test_writable_arrays_are_profiled_and_cleaned_in_place(dtype):
+    data = _dirty(dtype)
+    original = data.copy()
+    sanitized, profile = DataSanitizer(replacement=-1.0).sanitize(data)
+    assert sanitized is data
+    _assert_profile_of(profile, original)
+    assert profile.sanitized and profile.is_clean
+    np.testing.assert_array_equal(data, np.where(np.isfinite(original), original, -1.0))
+
+
+def test_transposed_arrays_are_cleaned_in_place():
+    data = _dirty().transpose(2, 0, 1)
+    original = data.copy()
+    sanitized, profile = DataSanitizer().sanitize(data)
+    assert np.shares_memory(sanitized, data)
+    _assert_profile_of(profile, original)
+    assert np.isfinite(data).all()
+
+
+def test_read_only_arrays_are_copied_only_to_be_cleaned():
+    clean = np.linspace(1, 2, 60, dtype=np.float32).reshape(3, 4, 5)
+    clean.flags.writeable = False
+    sanitized, profile = DataSanitizer().sanitize(clean)
+    assert sanitized is clean and profile.non_finite_count == 0
+
+    dirty = _dirty()
+    original = dirty.copy()
+    dirty.flags.writeable = False
+    sanitized, profile = DataSanitizer().sanitize(dirty)
+    assert not np.shares_memory(sanitized, dirty)
+    _assert_profile_of(profile, original)
+    assert np.isfinite(sanitized).all()
+    np.testing.assert_array_equal(dirty, original)
+
+
+def test_integer_arrays_are_not_scanned():
+    data = np.arange(60, dtype=np.uint16).reshape(3, 4, 5)
+    sanitized, profile = DataSanitizer().sanitize(data)
+    assert sanitized is data
+    assert profile.non_finite_count == 0 and profile.total is None and profile.is_clean
+
+
+def test_profiles_survive_the_dataset_attributes():
+    _, profile = DataSanitizer().sanitize(_dirty())
+    restored = DataQualityProfile.from_dict(profile.to_dict())
+    assert restored.to_dict() == profile.to_dict()
+    unscanned = DataQualityProfile.from_dict(DataQualityProfile.unscanned(60).to_dict())
+    assert not unscanned.scanned and not unscanned.is_clean
+
+
+@requires_dask
+def test_chunked_arrays_are_profiled_in_one_pass():
+    data = _dirty()
+    original = data.copy()
+    backend = ChunkedBackend(memory_budget=256, num_workers=2)
+    chunked = backend.chunk(data)
+    sanitized, profile = DataSanitizer(backend).sanitize(chunked)
+    _assert_profile_of(profile, original)
+    (values,) = backend.compute(sanitized)
+    assert np.isfinite(values).all()
@@ -0,0 +1,131 @@
+"""
+On-disk dataset cache: memory-mapped entries, content keys, integrity checks and quota.
+"""
+
+import json
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from whateels.pages.home.MVC.controller.dm_file_processing.cache import ContentKey
+from whateels.pages.home.MVC.controller.services import DatasetCache
+
+
+def _dataset(seed=0, shape=(4, 5, 16)):
+    data = np.random.default_rng(seed).random(shape, dtype=np.float32)
+    dataset = xr.Dataset(
+        {"ElectronCount": (("y", "x", "Eloss"), data)},
+        coords={"y": np.arange(shape[0]), "x": np.arange(shape[1]), "Eloss": 100.0 + np.arange(shape[2])},
+    )
+    dataset.attrs.update(original_name=f"eels_{seed}.dm4", dataset_type="SIm", shape=list(shape))
+    return dataset
+
+
+def _key(seed):
+    return ContentKey.of(np.random.default_rng(seed).bytes(200_000))
+
+
+def test_entries_open_memory_mapped(tmp_path):
+    cache = DatasetCache(tmp_path, verify_data=True, min_load_seconds=0)
+    dataset = _dataset()
+    assert cache.store(_key(0), dataset, {"ImageList": {"Name": "a"}})
+    loaded, metadata = cache.load(_key(0))
+    xr.testing.assert_identical(loaded, dataset)
+    assert metadata == {"ImageList": {"Name": "a"}}
+    electron_count = loaded["ElectronCount"].data
+    assert isinstance(electron_count, np.memmap)
+    assert electron_count.flags.c_contiguous  # Spectrum-contiguous on disk
+
+
+def test_sidecar_records_the_dm_file(tmp_path):
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    key = _key(0)
+    cache.store(key, _dataset(), None)
+    with open(cache._entry_path(key) / "dataset.json") as f:
+        content = json.load(f)["content"]
+    assert content == {"size": key.size, "digest": key.digest}
+
+
+def test_probe_collisions_are_confirmed_by_the_digest(tmp_path):
+    first = bytes(200_000)
+    second = bytearray(first)
+    second[100_000] = 1
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    cache.store(ContentKey.of(first), _dataset(), None)
+    assert cache.load(ContentKey.of(bytes(second))) is None
+    assert cache.load(ContentKey.of(first)) is not None
+    assert DatasetCache(tmp_path, fast_key=True).load(ContentKey.of(bytes(second))) is not None
+
+
+def test_files_sharing_a_probe_get_entries_of_their_own(tmp_path):
+    first = bytes(200_000)
+    second = bytearray(first)
+    second[100_000] = 1
+    first_key, second_key = ContentKey.of(first), ContentKey.of(bytes(second))
+    assert first_key.probe == second_key.probe
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    assert cache.store(first_key, _dataset(0), None)
+    assert cache.load(second_key) is None
+    assert cache.store(second_key, _dataset(1), None)
+    assert not cache.store(ContentKey.of(bytes(second)), _dataset(1), None)
+    assert len(cache.entries()) == 2
+    xr.testing.assert_identical(cache.load(ContentKey.of(first))[0], _dataset(0))
+    xr.testing.assert_identical(cache.load(ContentKey.of(bytes(second)))[0], _dataset(1))
+
+
+def test_misses_do_not_hash_the_file(tmp_path, monkeypatch):
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    cache.store(_key(0), _dataset(), None)
+    key = _key(1)
+    monkeypatch.setattr(ContentKey, "digest", property(lambda _: pytest.fail("hashed on a miss")))
+    assert cache.load(key) is None
+
+
+def test_corrupted_entries_are_dropped(tmp_path):
+    cache = DatasetCache(tmp_path, verify_data=True, min_load_seconds=0)
+    key = _key(0)
+    cache.store(key, _dataset(), None)
+    array = cache._entry_path(key) / "ElectronCount.npy"
+    content = bytearray(array.read_bytes())
+    content[-1] ^= 0xFF
+    array.write_bytes(bytes(content))
+    assert cache.load(key) is None
+    assert not cache._entry_path(key).exists()
+
+
+def test_fast_conversions_are_not_stored(tmp_path):
+    cache = DatasetCache(tmp_path, min_load_seconds=1.0)
+    assert not cache.store(_key(0), _dataset(), None, load_seconds=0.01)
+    assert cache.entries() == []
+
+
+def test_background_writes(tmp_path):
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    assert cache.store(_key(0), _dataset(), None, background=True)
+    cache.wait()
+    assert cache.load(_key(0)) is not None
+
+
+def test_quota_evicts_least_recently_used(tmp_path):
+    cache = DatasetCache(tmp_path, min_load_seconds=0)
+    for seed in range(3):
+        cache.store(_key(seed), _dataset(seed), None)
+        sidecar = cache._entry_path(_key(seed)) / "dataset.json"
+        os.utime(sidecar, (sidecar.stat().st_atime - 100 * (3 - seed),) * 2)
+    entry_size = max(size for _, size, _ in cache.entries())
+    assert cache.prune(max_bytes=2 * entry_size) == 1
+    assert cache.load(_key(0)) is None
+    assert cache.load(_key(1)) is not None
+
+
+def test_shared_cache_is_opt_in(tmp_path):
+    try:
+        assert DatasetCache.shared() is None
+        cache = DatasetCache.configure(2**20, directory=tmp_path)
+        assert DatasetCache.shared() is cache
+        assert cache.max_bytes == 2**20
+    finally:
+        DatasetCache.configure(0)
+    assert DatasetCache.shared() is None
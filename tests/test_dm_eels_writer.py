@@ -0,0 +1,120 @@
+"""
+Synthetic DM3/DM4 files of DM_EELS_Writer: file layout, and round trips through DM_EELS_Reader.
+"""
+
+import os
+import struct
+
+import numpy as np
+import pytest
+
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+
+DTYPES = ["int8", "uint8", "int16", "uint16", "int32", "uint32", "float32", "float64"]
+
+
+def _read(path, **options):
+    return DM_EELS_Reader(path, lazy=False, index_cache=False, **options)
+
+
+def _ramp(shape, dtype):
+    return (np.arange(int(np.prod(shape))) % 97).astype(dtype).reshape(shape)
+
+
+def _dm_order(data):
+    """The reader returns spectrum images energy first, (Eloss, y, x)."""
+    return data.transpose(2, 0, 1) if data.ndim == 3 else data
+
+
+@pytest.mark.parametrize("version", [3, 4])
+@pytest.mark.parametrize("little_endian", [True, False])
+def test_header_declares_the_file_size_and_byte_order(tmp_path, version, little_endian):
+    path = tmp_path / f"eels.dm{version}"
+    size = DM_EELS_Writer(version=version, little_endian=little_endian).write(str(path), shape=(2, 3, 16))
+    assert os.path.getsize(path) == size
+    with open(path, "rb") as f:
+        header = f.read(16)
+    assert struct.unpack(">l", header[:4])[0] == version
+    declared = struct.unpack(">l", header[4:8])[0] if version == 3 else struct.unpack(">q", header[4:12])[0]
+    assert declared == size
+    byte_order = header[8:12] if version == 3 else header[12:16]
+    assert struct.unpack(">l", byte_order)[0] == int(little_endian)
+
+
+@pytest.mark.parametrize("version", [3, 4])
+def test_filler_tags(tmp_path, version):
+    path = str(tmp_path / f"eels.dm{version}")
+    DM_EELS_Writer(version=version, n_tags=250, tag_depth=3, tags_per_group=20).write(path, shape=(16,))
+    documents = sanitize_for_json(_read(path).file_metadata["DocumentObjectList"])
+
+    def leaves(group, depth=1):
+        if all(not isinstance(value, dict) for value in group.values()):
+            return [(len(group), depth)]
+        return [leaf for value in group.values() for leaf in leaves(value, depth + 1)]
+
+    found = leaves(documents)
+    assert sum(count for count, _ in found) == 250
+    assert {depth for _, depth in found} == {1 + 3}  # Below DocumentObjectList
+    assert max(count for count, _ in found) == 20
+
+
+@pytest.mark.parametrize("version", [3, 4])
+@pytest.mark.parametrize("little_endian", [True, False])
+@pytest.mark.parametrize("shape", [(16,), (5, 16), (3, 4, 16)])
+def test_data_round_trip(tmp_path, version, little_endian, shape):
+    path = str(tmp_path / f"eels.dm{version}")
+    data = _ramp(shape, "float32")
+    DM_EELS_Writer(version=version, little_endian=little_endian).write(path, shape=shape, data=data)
+    reader = _read(path)
+    np.testing.assert_array_equal(reader.processed_eels_spectrum.data, _dm_order(data))
+    image = reader.file_metadata["ImageList"]["GroupBlock0"]
+    assert image["ImageTags"]["Meta Data Format"] == DM_EELS_Writer.dataset_type(shape)
+
+
+@pytest.mark.parametrize("dtype", DTYPES)
+@pytest.mark.parametrize("little_endian", [True, False])
+def test_data_types_round_trip(tmp_path, dtype, little_endian):
+    path = str(tmp_path / "eels.dm4")
+    data = _ramp((3, 4, 16), dtype)
+    DM_EELS_Writer(dtype=dtype, little_endian=little_endian).write(path, shape=data.shape, data=data)
+    spectrum = _read(path).processed_eels_spectrum
+    assert spectrum.data.dtype == np.dtype(dtype)
+    np.testing.assert_array_equal(spectrum.data, _dm_order(data))
+
+
+@pytest.mark.parametrize("little_endian", [True, False])
+def test_ramp_fill_matches_in_memory_and_mapped_reads(tmp_path, little_endian):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp", little_endian=little_endian).write(path, shape=(3, 4, 16))
+    with open(path, "rb") as f:
+        content = f.read()
+    expected = _read(path).processed_eels_spectrum.data
+    assert expected.any()
+    np.testing.assert_array_equal(_read(path, memory_map=True).processed_eels_spectrum.data, expected)
+    np.testing.assert_array_equal(_read(path, content=content).processed_eels_spectrum.data, expected)
+
+
+def test_zeros_fill_is_sparse_and_reads_back_as_zeros(tmp_path):
+    path = str(tmp_path / "zeros.dm4")
+    DM_EELS_Writer(fill="zeros").write(path, shape=(2, 3, 8))
+    assert not _read(path).processed_eels_spectrum.data.any()
+
+
+def test_calibrations_round_trip(tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(
+        energy_offset=250.0, energy_scale=0.5, beam_energy=300000.0, convergence_angle=12.0, collection_angle=24.0
+    ).write(path, shape=(3, 4, 16))
+    spectrum = _read(path).processed_eels_spectrum
+    np.testing.assert_allclose(spectrum.energy_axis, 250.0 + 0.5 * np.arange(16))
+    assert spectrum.beam_energy == pytest.approx(300.0)  # kV
+    assert spectrum.convergence_angle == pytest.approx(12.0)
+    assert spectrum.collection_angle == pytest.approx(24.0)
+
+
+def test_dm3_size_limit(tmp_path):
+    path = tmp_path / "too_large.dm3"
+    with pytest.raises(ValueError, match="2 GB"):
+        DM_EELS_Writer(version=3, dtype="float32").write(str(path), shape=(2**12, 2**12, 2**5))
+    assert not path.exists()
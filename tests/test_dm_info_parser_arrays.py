@@ -0,0 +1,148 @@
+"""
+Tag arrays decoded with one numpy buffer read: simple-type arrays, ushort (UTF-16) strings and struct arrays.
+"""
+
+import struct
+
+import numpy as np
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser
+
+# DM simple type code -> numpy type of its values
+_ARRAY_TYPES = {2: "i2", 3: "i4", 5: "u4", 6: "f4", 7: "f8", 8: "u1", 10: "i1", 11: "i8", 12: "u8"}
+_LENGTH = 8
+
+
+class _TagWriter(DM_EELS_Writer):
+    """Writer of a DocumentObjectList holding the given data tags: name -> (type info, payload)."""
+
+    def __init__(self, tags, **kwargs):
+        super().__init__(n_tags=1, **kwargs)
+        self.tags = tags
+
+    def _document_object_list(self):
+        return self._group("DocumentObjectList", [
+            self._data_tag(name, info, payload) for name, (info, payload) in self.tags.items()
+        ])
+
+
+def _array_tag(values, type_code, little_endian):
+    payload = values.astype(values.dtype.newbyteorder("<" if little_endian else ">")).tobytes()
+    return (20, type_code, len(values)), payload
+
+
+def _parse(path, array_threshold):
+    parser = DM_InfoParser(array_threshold=array_threshold)
+    with open(path, "rb") as f:
+        parser.file = f
+        return parser.parse_file()["DocumentObjectList"]
+
+
+@pytest.fixture(params=[(3, True), (3, False), (4, True), (4, False)], ids=["dm3-le", "dm3-be", "dm4-le", "dm4-be"])
+def layout(request):
+    version, little_endian = request.param
+    return version, little_endian
+
+
+def _values(type_code):
+    dtype = np.dtype(_ARRAY_TYPES[type_code])
+    if dtype.kind == "f":
+        return np.linspace(-2.5, 2.5, _LENGTH).astype(dtype)
+    # Both ends of the range, where a wrong byte order or sign shows
+    info = np.iinfo(dtype)
+    return np.array([info.min, info.max, 0, 1, info.max - 1, info.min + 1, 2, info.max // 3], dtype=dtype)
+
+
+@pytest.mark.parametrize("array_threshold", [_LENGTH - 1, _LENGTH], ids=["above-threshold", "below-threshold"])
+def test_simple_arrays_decode_to_their_values(layout, array_threshold, tmp_path):
+    version, little_endian = layout
+    tags = {f"Type {code}": _array_tag(_values(code), code, little_endian) for code in _ARRAY_TYPES}
+    tags["Chars"] = (20, 9, 4), b"DM\x00s"
+    path = str(tmp_path / f"arrays.dm{version}")
+    _TagWriter(tags, version=version, little_endian=little_endian).write(path, shape=(4,))
+    tree = _parse(path, array_threshold)
+
+    for code in _ARRAY_TYPES:
+        decoded, expected = tree[f"Type {code}"], _values(code)
+        if _LENGTH > array_threshold:
+            # Own array in native byte order
+            assert isinstance(decoded, np.ndarray)
+            assert decoded.dtype == expected.dtype and decoded.dtype.isnative
+            assert decoded.flags.owndata
+            np.testing.assert_array_equal(decoded, expected)
+        else:
+            assert decoded == expected.tolist()
+            assert all(type(value) is type(item) for value, item in zip(decoded, expected.tolist()))
+    # Short char arrays keep one bytes object per char, null characters included
+    assert tree["Chars"] == [b"D", b"M", b"\x00", b"s"]
+
+
+@pytest.mark.parametrize("array_threshold", [4, 1024], ids=["above-threshold", "below-threshold"])
+def test_ushort_arrays_decode_to_strings(layout, array_threshold, tmp_path):
+    version, little_endian = layout
+    texts = {"Short": "eV", "Accents": "Énergie — 200 kV", "Astral": "α 𝛽 ∞", "Long": "Spectrum image " * 20}
+    codec = "utf-16-le" if little_endian else "utf-16-be"
+    tags = {name: ((20, 4, len(text.encode(codec)) // 2), text.encode(codec)) for name, text in texts.items()}
+    path = str(tmp_path / f"strings.dm{version}")
+    _TagWriter(tags, version=version, little_endian=little_endian).write(path, shape=(4,))
+    tree = _parse(path, array_threshold)
+    for name, text in texts.items():
+        assert tree[name] == text
+
+
+def test_lone_surrogates_are_kept(layout, tmp_path):
+    version, little_endian = layout
+    units = np.array([ord("a"), 0xD800, ord("b")], dtype=np.uint16)  # Lone surrogate
+    path = str(tmp_path / f"units.dm{version}")
+    _TagWriter({"Units": _array_tag(units, 4, little_endian)}, version=version, little_endian=little_endian).write(
+        path, shape=(4,)
+    )
+    assert _parse(path, 1024)["Units"] == "a\ud800b"
+
+
+# Field types of a struct array: all widths, signed and unsigned, floats and a char
+_STRUCT_FORMAT = (2, 7, 9, 12, 8, 3)
+
+
+def _struct_array_tag(rows, little_endian):
+    element = struct.Struct(("<" if little_endian else ">") + "".join(
+        DM_InfoParser._simple_formats[num_type] for num_type in _STRUCT_FORMAT
+    ))
+    info = (20, 15, 0, len(_STRUCT_FORMAT)) + sum(((0, num_type) for num_type in _STRUCT_FORMAT), ()) + (len(rows),)
+    return info, b"".join(element.pack(*row) for row in rows)
+
+
+def _parse_struct_by_struct(path, monkeypatch):
+    """Parse struct arrays one element at a time with _read_structure, as before the buffer read."""
+    with monkeypatch.context() as patch:
+        patch.setattr(DM_InfoParser, "_read_structuresArray", lambda self, array_size, struct_format: [
+            self._read_structure(struct_format) for _ in range(array_size)
+        ])
+        return _parse(path, 1024)
+
+
+@pytest.mark.parametrize("array_threshold", [_LENGTH - 1, _LENGTH], ids=["above-threshold", "below-threshold"])
+def test_struct_arrays_decode_to_their_values(layout, array_threshold, tmp_path, monkeypatch):
+    version, little_endian = layout
+    rows = [
+        (-(2 ** 15) + i, i * 0.25 - 1, bytes([i]), 2 ** 64 - 1 - i, 255 - i, 2 ** 31 - 1 - i) for i in range(_LENGTH)
+    ]
+    path = str(tmp_path / f"structs.dm{version}")
+    _TagWriter({"Table": _struct_array_tag(rows, little_endian)}, version=version, little_endian=little_endian).write(
+        path, shape=(4,)
+    )
+    expected = _parse_struct_by_struct(path, monkeypatch)["Table"]
+    assert expected == rows
+    decoded = _parse(path, array_threshold)["Table"]
+    if _LENGTH > array_threshold:
+        # Record array in native byte order, one field per struct member
+        assert isinstance(decoded, np.recarray)
+        assert decoded.dtype.names == tuple(f"f{i}" for i in range(len(_STRUCT_FORMAT)))
+        assert all(decoded.dtype[name].isnative for name in decoded.dtype.names)
+        assert decoded.base.flags.owndata  # A view of its own copy, not of the file buffer
+        assert decoded.tolist() == expected
+        np.testing.assert_array_equal(decoded.f3, np.array([row[3] for row in rows], dtype=np.uint64))
+    else:
+        assert decoded == expected
@@ -0,0 +1,83 @@
+"""
+Zero-copy parsing of the DM tag tree: memory-mapped files and in-memory content.
+"""
+
+import io
+
+import pytest
+
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.decoders import BufferCursor, StreamCursor
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser
+
+
+@pytest.fixture(params=[(3, True), (3, False), (4, True), (4, False)], ids=["dm3-le", "dm3-be", "dm4-le", "dm4-be"])
+def dm_file(request, tmp_path):
+    version, little_endian = request.param
+    path = tmp_path / f"eels.dm{version}"
+    writer = DM_EELS_Writer(version=version, little_endian=little_endian, n_tags=200, tag_depth=3)
+    writer.write(str(path), shape=(2, 3, 32))
+    return str(path), version, little_endian
+
+
+def _parse(source, use_mmap, filename=None):
+    parser = DM_InfoParser(use_mmap=use_mmap)
+    parser.filename = filename
+    parser.file = source
+    return parser, sanitize_for_json(parser.parse_file())
+
+
+def test_mapped_walk_matches_stream_reads(dm_file):
+    path, version, little_endian = dm_file
+    with open(path, "rb") as f:
+        stream_parser, expected = _parse(f, use_mmap=False)
+    with open(path, "rb") as f:
+        mapped_parser, tree = _parse(f, use_mmap=True)
+    assert tree == expected
+    assert mapped_parser.version == stream_parser.version == version
+    assert mapped_parser.endianness == ("little" if little_endian else "big")
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview, io.BytesIO])
+def test_in_memory_content_is_walked_in_place(dm_file, wrap):
+    path, _, _ = dm_file
+    with open(path, "rb") as f:
+        content = f.read()
+    with open(path, "rb") as f:
+        _, expected = _parse(f, use_mmap=False)
+    source = wrap(content)
+    _, tree = _parse(source, use_mmap=False, filename=path)
+    assert tree == expected
+    if isinstance(source, io.BytesIO):
+        source.write(b"")  # BufferError if the parser still exported the buffer
+
+
+def test_map_is_closed_after_an_eager_walk(dm_file):
+    path, _, _ = dm_file
+    parser = DM_InfoParser(use_mmap=True)
+    with open(path, "rb") as f:
+        parser.file = f
+        parser._open_cursor()
+        assert isinstance(parser._cursor, BufferCursor)
+        parser._close_cursor()
+        parser.parse_file()
+    assert parser._mapping is None and parser._cursor is None
+
+
+def test_unmappable_files_fall_back_to_stream_reads(dm_file):
+    path, _, _ = dm_file
+
+    class Unmappable(io.BufferedReader):
+        def fileno(self):
+            raise io.UnsupportedOperation("no descriptor")
+
+    with open(path, "rb") as f:
+        _, expected = _parse(f, use_mmap=False)
+    with Unmappable(io.FileIO(path)) as f:
+        parser = DM_InfoParser(use_mmap=True)
+        parser.file = f
+        parser._open_cursor()
+        assert isinstance(parser._cursor, StreamCursor)
+        parser._close_cursor()
+        assert sanitize_for_json(parser.parse_file()) == expected
@@ -0,0 +1,80 @@
+"""
+Iterative tag walk: the same tree as a recursive walk, at any nesting depth.
+"""
+
+import sys
+
+import numpy as np
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser
+
+
+def _recursive_walk(parser, nnames, tree, parent_name="root"):
+    """Reference walk, one call per group, with the readers of the parser."""
+    data_blocks = group_blocks = 0
+    for _ in range(nnames):
+        identifier, name = parser._read_ChildrenBlock_header()
+        if identifier == 21:
+            if not name:
+                name, data_blocks = f"DataBlock{data_blocks}", data_blocks + 1
+            catcher, reader, skipper = parser._parsers[parser._read_DataBlock_keyword()]
+            read = skipper if name == "Data" and parent_name == "ImageData" else reader
+            tree[name] = read(**catcher())
+        else:
+            if not name:
+                name, group_blocks = f"GroupBlock{group_blocks}", group_blocks + 1
+            tree[name] = dict()
+            _recursive_walk(parser, parser._read_ParentBlockSize_info(read_block_size=True), tree[name], name)
+    return tree
+
+
+def _recursive_parse(path):
+    parser = DM_InfoParser()
+    with open(path, "rb") as f:
+        parser.file = f
+        parser._open_cursor()
+        try:
+            parser._process_file_header()
+            return _recursive_walk(parser, parser._read_ParentBlockSize_info(), {"root": dict()})
+        finally:
+            parser._close_cursor()
+
+
+def _parse(path, **kwargs):
+    parser = DM_InfoParser(**kwargs)
+    with open(path, "rb") as f:
+        parser.file = f
+        return parser.parse_file()
+
+
+def _assert_same_tree(tree, expected):
+    assert tree.keys() == expected.keys()
+    for name, value in expected.items():
+        if isinstance(value, dict):
+            _assert_same_tree(tree[name], value)
+        elif isinstance(value, np.ndarray):
+            np.testing.assert_array_equal(tree[name], value)
+        else:
+            assert tree[name] == value, name
+
+
+@pytest.mark.parametrize("version", [3, 4])
+@pytest.mark.parametrize("tag_depth", [1, 8, 200])
+def test_walk_matches_the_recursive_walk(version, tag_depth, tmp_path):
+    path = str(tmp_path / f"eels.dm{version}")
+    DM_EELS_Writer(version=version, n_tags=300, tag_depth=tag_depth, tags_per_group=7).write(path, shape=(2, 3, 16))
+    expected = _recursive_parse(path)
+    _assert_same_tree(_parse(path), expected)
+    _assert_same_tree(_parse(path, use_mmap=True), expected)
+
+
+def test_trees_deeper_than_the_recursion_limit(tmp_path):
+    depth = sys.getrecursionlimit() + 500
+    path = str(tmp_path / "deep.dm4")
+    DM_EELS_Writer(n_tags=3, tag_depth=depth).write(path, shape=(4,))
+    group = _parse(path)["DocumentObjectList"]["GroupBlock0"]
+    for _ in range(depth - 1):
+        (group,) = group.values()
+    assert group == {"Tag 0": 0, "Tag 1": 1, "Tag 2": 2}
@@ -0,0 +1,74 @@
+"""
+Numba tag scanner: the flat tag table, and trees decoded from it matching the eager walk.
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser, DM_TagScanner
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import dm_tag_scanner
+
+
+@pytest.fixture(params=[(3, True), (3, False), (4, True), (4, False)], ids=["dm3-le", "dm3-be", "dm4-le", "dm4-be"])
+def dm_file(request, tmp_path):
+    version, little_endian = request.param
+    path = tmp_path / f"eels.dm{version}"
+    writer = DM_EELS_Writer(version=version, little_endian=little_endian, n_tags=500, tag_depth=3)
+    writer.write(str(path), shape=(2, 3, 32))
+    return str(path)
+
+
+def _parse(parser, source, filename=None):
+    parser.filename = filename
+    parser.file = source
+    return parser.parse_file()
+
+
+def test_tree_matches_the_eager_walk(dm_file):
+    with open(dm_file, "rb") as f:
+        expected = sanitize_for_json(_parse(DM_InfoParser(), f))
+    scanner = DM_TagScanner()
+    with open(dm_file, "rb") as f:
+        tree = sanitize_for_json(_parse(scanner, f))
+    assert scanner.table is not None  # Decoded from the table, not walked
+    assert tree == expected
+
+
+def test_table_rows(dm_file):
+    scanner = DM_TagScanner()
+    with open(dm_file, "rb") as f:
+        _parse(scanner, f)
+    table = scanner.table
+    assert np.all(np.isin(table["tag"], (20, 21)))
+    rows = np.arange(table.size)
+    assert np.all(table["end"] > rows)
+    # A group holds exactly its descendants: rows up to its end have deeper depths
+    groups = np.flatnonzero(table["tag"] == 20)
+    for row in groups[:50]:
+        inside = table["depth"][row + 1:table["end"][row]]
+        assert np.all(inside > table["depth"][row])
+    children = table["parent"] == groups[0]
+    assert np.count_nonzero(children) == table["count"][groups[0]]
+    assert np.all(table["byte_size"][groups] == 0)
+
+
+def test_in_memory_content(dm_file):
+    with open(dm_file, "rb") as f:
+        content = f.read()
+    with open(dm_file, "rb") as f:
+        expected = sanitize_for_json(_parse(DM_InfoParser(), f))
+    assert sanitize_for_json(_parse(DM_TagScanner(), io.BytesIO(content), dm_file)) == expected
+
+
+def test_failed_scans_fall_back_to_the_walker(dm_file, monkeypatch):
+    monkeypatch.setattr(dm_tag_scanner.DM_TagScanner, "_scan", lambda self, nnames: None)
+    with open(dm_file, "rb") as f:
+        expected = sanitize_for_json(_parse(DM_InfoParser(), f))
+    scanner = DM_TagScanner()
+    with open(dm_file, "rb") as f:
+        assert sanitize_for_json(_parse(scanner, f)) == expected
+    assert scanner.table is None
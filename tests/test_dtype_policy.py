@@ -0,0 +1,69 @@
+"""
+DTypePolicy: cubes keep their native type from the file, sums accumulate in a wider type.
+"""
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import DTypePolicy, EELSFileProcessor
+from whateels.pages.home.MVC.model import Model
+
+
+@pytest.mark.parametrize("dtype", ["uint16", "int32", "float32"])
+def test_loaded_cubes_keep_their_native_type(dtype, tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(dtype=dtype, fill="ramp").write(path, shape=(3, 4, 16))
+    model = Model()
+    for memory_map in (True, False):
+        dataset = EELSFileProcessor(model, memory_map=memory_map).load_dm_file(path)
+        assert dataset.ElectronCount.dtype == np.dtype(dtype)
+    profile = dataset.attrs[model.constants.DATA_QUALITY]
+    # Integer cubes are not scanned for NaN/inf
+    assert (profile["total"] is None) == (dtype != "float32")
+
+
+@pytest.mark.parametrize(
+    "dtype, accumulator, result",
+    [
+        ("uint16", "uint64", "uint64"),
+        ("int32", "int64", "int64"),
+        ("bool", "int64", "int64"),
+        ("float32", "float64", "float32"),
+        ("float64", "float64", "float64"),
+    ],
+)
+def test_sums_accumulate_in_a_wider_type(dtype, accumulator, result):
+    policy = DTypePolicy()
+    assert policy.accumulation_dtype(dtype) == np.dtype(accumulator)
+    assert policy.reduction_dtype(dtype) == np.dtype(result)
+    assert DTypePolicy.can_hold_non_finite(dtype) == dtype.startswith("float")
+
+
+def test_integer_sums_do_not_overflow():
+    data = xr.DataArray(np.full((2, 3, 70000), 60000, dtype=np.uint16), dims=("y", "x", "Eloss"))
+    total = DTypePolicy().sum(data, "Eloss")
+    assert total.dtype == np.uint64
+    assert (total.values == 60000 * 70000).all()
+    data = xr.DataArray(np.full((2, 70000), -(2**31), dtype=np.int32), dims=("x", "Eloss"))
+    assert (DTypePolicy().sum(data, "Eloss").values == -(2**31) * 70000).all()
+
+
+def test_float32_sums_are_accumulated_in_float64():
+    values = np.full((2, 2**20), 0.1, dtype=np.float32)
+    values[:, 0] = 1e8
+    data = xr.DataArray(values, dims=("x", "Eloss"))
+    total = DTypePolicy().sum(data, "Eloss")
+    assert total.dtype == np.float32
+    np.testing.assert_array_equal(total.values, values.sum(axis=1, dtype=np.float64).astype(np.float32))
+    # skipna only applies to float data
+    values[0, 1] = np.nan
+    total = DTypePolicy().sum(xr.DataArray(values, dims=("x", "Eloss")), "Eloss", skipna=True)
+    assert np.isfinite(total.values).all()
+
+
+def test_memory_report_compares_with_float64():
+    report = DTypePolicy().memory_report("uint16", (10, 20, 30))
+    assert report["native_bytes"] == 6000 * 2 and report["float64_bytes"] == 6000 * 8
+    assert report["saved_bytes"] == 6000 * 6 and report["saved_ratio"] == pytest.approx(0.75)
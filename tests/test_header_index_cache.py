@@ -0,0 +1,163 @@
+"""
+Header index cache: layered content keys, hashing only to confirm hits, LRU eviction.
+"""
+
+import io
+import os
+
+import numpy as np
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.cache import ContentKey, HeaderIndexCache
+from whateels.pages.home.MVC.controller.dm_file_processing.cache import content_key as content_key_module
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser
+
+posix_only = pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+
+TAGS = {"ImageList": {"GroupBlock0": {"Name": "a"}}}
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """Count the whole-file digests computed."""
+    calls = []
+    digest = content_key_module.content_digest
+
+    def counting(source, *args, **kwargs):
+        calls.append(source)
+        return digest(source, *args, **kwargs)
+
+    monkeypatch.setattr(content_key_module, "content_digest", counting)
+    return calls
+
+
+def _same_ends(size=300_000):
+    """Two contents with the same size, head and tail, differing in the middle."""
+    first = bytes(size)
+    second = bytearray(first)
+    second[size // 2] = 1
+    return first, bytes(second)
+
+
+def test_miss_reads_only_the_probe(tmp_path, digests):
+    cache = HeaderIndexCache(tmp_path)
+    assert cache.load(io.BytesIO(os.urandom(300_000))) is None
+    assert digests == []
+
+
+def test_store_after_miss_hashes_once(tmp_path, digests):
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0)
+    content = io.BytesIO(os.urandom(300_000))
+    key = cache.key(content)
+    assert cache.load(content, key) is None
+    assert cache.store(content, TAGS, parse_seconds=1.0, key=key)
+    assert len(digests) == 1
+    assert cache.load(content, key) == TAGS
+    assert len(digests) == 1
+
+
+def test_probe_collisions_are_confirmed_by_the_digest(tmp_path):
+    first, second = _same_ends()
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0)
+    assert cache.key(first).probe == cache.key(second).probe
+    cache.store(io.BytesIO(first), TAGS)
+    assert cache.load(io.BytesIO(first)) == TAGS
+    assert cache.load(io.BytesIO(second)) is None
+
+
+def test_fast_key_trusts_the_probe(tmp_path, digests):
+    first, second = _same_ends()
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0, fast_key=True)
+    cache.store(io.BytesIO(first), TAGS)
+    assert cache.load(io.BytesIO(second)) == TAGS
+    assert digests == []
+
+
+def test_parses_faster_than_hashing_are_not_stored(tmp_path):
+    content = os.urandom(300_000)
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0)
+    key = cache.key(content)
+    assert not cache.store(content, TAGS, parse_seconds=key.hash_seconds() / 2, key=key)
+    assert cache.entries() == []
+    # Known digest (e.g. hashed while uploaded): storing costs no hashing
+    hashed = ContentKey.of(content, digest=key.digest)
+    assert cache.store(content, TAGS, parse_seconds=key.hash_seconds() / 2, key=hashed)
+    assert cache.load(content) == TAGS
+
+
+def test_key_of_file_and_content_agree(tmp_path):
+    content = os.urandom(300_000)
+    path = tmp_path / "content.dm4"
+    path.write_bytes(content)
+    with open(path, "rb") as f:
+        f.seek(10)
+        key = ContentKey.of(f)
+        assert f.tell() == 10
+        assert key.digest == ContentKey.of(content).digest
+    assert ContentKey.of(str(path)).matches(ContentKey.of(content))
+
+
+def test_corrupted_entries_are_dropped(tmp_path):
+    content = os.urandom(300_000)
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0)
+    cache.store(content, TAGS)
+    (path, _, _), = cache.entries()
+    path.write_bytes(path.read_bytes()[:-4])
+    assert cache.load(content) is None
+    assert not path.exists()
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    cache = HeaderIndexCache(tmp_path, min_parse_seconds=0)
+    contents = [bytes([i]) * 1000 for i in range(3)]
+    for i, content in enumerate(contents):
+        cache.store(content, {"index": i})
+        path = cache._entry_path(cache.key(content).probe)
+        os.utime(path, (path.stat().st_mtime - 100 * (3 - i),) * 2)
+    # A hit refreshes the entry: 1 becomes the least recently used
+    assert cache.load(contents[0]) == {"index": 0}
+    entry_size = max(size for _, size, _ in cache.entries())
+    assert cache.prune(max_bytes=2 * entry_size) == 1
+    assert cache.load(contents[1]) is None
+    assert cache.load(contents[0]) is not None
+    assert cache.load(contents[2]) is not None
+
+
+@posix_only
+def test_entries_are_not_read_from_a_shared_directory(tmp_path):
+    content = os.urandom(300_000)
+    directory = tmp_path / "index"
+    cache = HeaderIndexCache(directory, min_parse_seconds=0)
+    cache.store(content, TAGS)
+    assert directory.stat().st_mode & 0o777 == 0o700
+    os.chmod(directory, 0o777)
+    assert cache.load(content) is None
+    os.chmod(directory, 0o700)
+    assert cache.load(content) == TAGS
+
+
+def test_eager_reader_skips_the_parse_on_a_hit(tmp_path, monkeypatch):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(version=4, n_tags=300, tag_depth=3).write(path, shape=(2, 3, 32))
+    cache = HeaderIndexCache(tmp_path / "index", min_parse_seconds=0)
+    monkeypatch.setattr(content_key_module, "HASH_BYTES_PER_SECOND", float("inf"))
+    eager = DM_EELS_Reader(path, lazy=False, index_cache=cache)
+    assert len(cache.entries()) == 1
+
+    def no_parse(parser):
+        raise AssertionError("the tag tree comes from the index cache")
+
+    monkeypatch.setattr(DM_InfoParser, "parse_file", no_parse)
+    cached = DM_EELS_Reader(path, lazy=False, index_cache=cache)
+    assert cached.file_metadata == eager.file_metadata
+    np.testing.assert_array_equal(cached.processed_eels_spectrum.data, eager.processed_eels_spectrum.data)
+
+
+def test_lazy_reader_leaves_the_index_cache_alone(tmp_path, digests):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(version=4, n_tags=300, tag_depth=3).write(path, shape=(2, 3, 32))
+    cache = HeaderIndexCache(tmp_path / "index", min_parse_seconds=0)
+    DM_EELS_Reader(path, index_cache=cache).close()
+    assert cache.entries() == []
+    assert digests == []
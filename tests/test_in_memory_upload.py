@@ -0,0 +1,58 @@
+"""
+Uploads parsed in place from memory (bytes, bytearray, memoryview, BytesIO), without a temporary file.
+"""
+
+import io
+
+import numpy as np
+import pytest
+
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import EELSFileProcessor
+from whateels.pages.home.MVC.controller.services import eels_file_processor as eels_file_processor_module
+from whateels.pages.home.MVC.model import Model
+
+
+@pytest.fixture(params=[(3, True), (4, False)], ids=["dm3-le", "dm4-be"])
+def dm_file(request, tmp_path):
+    version, little_endian = request.param
+    path = tmp_path / f"eels.dm{version}"
+    DM_EELS_Writer(version=version, little_endian=little_endian, fill="ramp", n_tags=50).write(
+        str(path), shape=(3, 4, 32)
+    )
+    return str(path), path.read_bytes(), little_endian
+
+
+@pytest.mark.parametrize("wrap", [bytes, bytearray, memoryview, io.BytesIO])
+def test_reader_parses_uploads_in_place(dm_file, wrap):
+    path, content, little_endian = dm_file
+    expected = DM_EELS_Reader(path, index_cache=False)
+    upload = wrap(content)
+    reader = DM_EELS_Reader("upload.dm4" if path.endswith("4") else "upload.dm3", content=upload, index_cache=False)
+    np.testing.assert_array_equal(reader.processed_eels_spectrum.data, expected.processed_eels_spectrum.data)
+    assert sanitize_for_json(reader.file_metadata) == sanitize_for_json(expected.file_metadata)
+    data = reader.processed_eels_spectrum.data
+    if not isinstance(upload, io.BytesIO) and little_endian:
+        # A view on the upload, not a copy (big-endian data is swapped into a copy)
+        assert np.shares_memory(data, np.frombuffer(upload, dtype=np.uint8))
+        assert not data.flags.writeable
+
+
+def test_uploads_need_their_original_name(dm_file):
+    _, content, _ = dm_file
+    with pytest.raises(Exception, match="file name"):
+        DM_EELS_Reader(None, content=content, index_cache=False)
+
+
+def test_processor_loads_uploads_without_a_temporary_file(dm_file, monkeypatch):
+    path, content, _ = dm_file
+
+    def no_spool(*args, **kwargs):
+        raise AssertionError("the upload was written to a temporary file")
+
+    monkeypatch.setattr(eels_file_processor_module, "SpoolFile", no_spool)
+    processor = EELSFileProcessor(Model())
+    dataset = processor.process_upload(path.rsplit("/", 1)[-1], content)
+    expected = EELSFileProcessor(Model(), memory_map=False).load_dm_file(path)
+    np.testing.assert_array_equal(dataset.ElectronCount.values, expected.ElectronCount.values)
@@ -0,0 +1,45 @@
+"""
+Plot kernels compiled ahead of their first use: explicit signatures, same values as the lazily compiled formula.
+"""
+
+import numpy as np
+import pytest
+
+from whateels.helpers import kernels
+
+
+def _old_powerlaw(x, A, k):
+    """The formula of the @jit powerlaw the kernel replaces."""
+    return A * x ** k
+
+
+def test_powerlaw_is_compiled_for_float64_and_float32_axes():
+    signatures = kernels.powerlaw.signatures
+    assert [str(signature[0].dtype) for signature in signatures] == ["float64", "float32"]
+    assert not any(signature[0].mutable for signature in signatures)  # Read-only arrays, writable ones convert
+    # Calls dispatch to those, nothing more is compiled
+    for dtype in (np.float64, np.float32):
+        x = np.linspace(100, 200, 16, dtype=dtype)
+        kernels.powerlaw(x, 2.0, -3.0)
+        kernels.powerlaw(x[::2], 2.0, -3.0)
+        x.flags.writeable = False
+        kernels.powerlaw(x, 2.0, -3.0)
+    assert len(kernels.powerlaw.overloads) == 2
+    with pytest.raises(TypeError):
+        kernels.powerlaw(np.arange(4), 2.0, -3.0)
+
+
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+@pytest.mark.parametrize("A, k", [(1.0, -1.0), (3.2e9, -2.7), (0.5, 0.0), (1e-3, 1.5)])
+def test_powerlaw_matches_the_formula(dtype, A, k):
+    x = np.linspace(150.0, 800.0, 1024).astype(dtype)
+    result = kernels.powerlaw(x, A, k)
+    # Evaluated in float64, whatever the type of the axis
+    assert result.dtype == np.float64
+    np.testing.assert_allclose(result, _old_powerlaw(x.astype(np.float64), A, k), rtol=1e-13)
+    np.testing.assert_allclose(result, _old_powerlaw(x, A, k), rtol=1e-5 if dtype == np.float32 else 1e-13)
+
+
+def test_warm_up_runs_every_signature():
+    assert kernels.warm_up() >= 0
+    assert len(kernels.powerlaw.overloads) == 2
@@ -0,0 +1,44 @@
+"""
+Startup imports: the plotting libraries and numba load with the first page, plot or scan that needs them.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+_HEAVY = ("holoviews", "numba", "scipy.optimize")
+
+
+def _loaded_after(code, names=_HEAVY):
+    """Modules of names loaded by running code in a fresh interpreter."""
+    check = f"import sys\n{code}\nprint(' '.join(name for name in {tuple(names)!r} if name in sys.modules))"
+    result = subprocess.run([sys.executable, "-c", check], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    return result.stdout.split()
+
+
+def test_importing_whateels_loads_no_page():
+    assert _loaded_after("import whateels", _HEAVY + ("xarray",)) == []
+
+
+def test_the_home_page_loads_no_plotting_library_nor_numba():
+    assert _loaded_after("import whateels.pages.home") == []
+    assert _loaded_after("from whateels.pages import Home") == []
+
+
+def test_the_first_scan_loads_numba():
+    code = (
+        "import numpy as np\n"
+        "from whateels.pages.home.MVC.controller.services import DataSanitizer\n"
+        "DataSanitizer().sanitize(np.ones(8, dtype=np.float32))"
+    )
+    assert _loaded_after(code) == ["numba"]
+
+
+def test_pages_are_resolved_on_first_access():
+    import whateels.pages as pages
+
+    assert "Home" in dir(pages)
+    with pytest.raises(AttributeError):
+        pages.Missing
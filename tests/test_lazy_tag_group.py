@@ -0,0 +1,65 @@
+"""
+Lazy TagGroup decoding: groups are skimmed by the parser and decoded on first access.
+"""
+
+import pytest
+
+from whateels.errors import DMFileError
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser, LazyTagGroup
+
+
+@pytest.fixture(params=[3, 4], ids=["dm3", "dm4"])
+def dm_file(request, tmp_path):
+    path = tmp_path / f"eels.dm{request.param}"
+    DM_EELS_Writer(version=request.param, n_tags=300, tag_depth=3).write(str(path), shape=(2, 3, 32))
+    return str(path)
+
+
+def _lazy_tree(path):
+    parser = DM_InfoParser(lazy=True)
+    with open(path, "rb") as f:
+        parser.file = f
+        tree = parser.parse_file()
+    return parser, tree
+
+
+def test_groups_are_decoded_on_first_access(dm_file):
+    _, tree = _lazy_tree(dm_file)
+    documents = tree["DocumentObjectList"]
+    assert isinstance(documents, LazyTagGroup)
+    assert not documents.is_loaded
+    assert dict.__len__(documents) == 0  # Nothing decoded yet
+    assert len(documents) == documents.n_tags
+    assert documents.is_loaded
+
+
+def test_decoded_tree_matches_the_eager_walk(dm_file):
+    parser = DM_InfoParser()
+    with open(dm_file, "rb") as f:
+        parser.file = f
+        expected = sanitize_for_json(parser.parse_file())
+    _, tree = _lazy_tree(dm_file)
+    assert sanitize_for_json(tree) == expected
+
+
+def test_buffer_is_released_once_every_group_is_decoded(dm_file):
+    parser, tree = _lazy_tree(dm_file)
+    assert parser._mapping is not None  # Held for the groups not decoded yet
+    sanitize_for_json(tree)
+    assert parser._mapping is None
+
+
+def test_groups_cannot_load_after_close(dm_file):
+    parser, tree = _lazy_tree(dm_file)
+    parser.close()
+    with pytest.raises(DMFileError):
+        tree["DocumentObjectList"].keys()
+
+
+def test_reader_leaves_unused_groups_undecoded(dm_file):
+    reader = DM_EELS_Reader(dm_file, index_cache=False)
+    assert reader.processed_eels_spectrum.data.shape == (32, 2, 3)
+    assert not reader.file_metadata["DocumentObjectList"].is_loaded
+    reader.close()
@@ -0,0 +1,209 @@
+"""
+Process-wide in-memory dataset cache: layered content keys, budget and LRU eviction.
+"""
+
+import os
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.cache import ContentKey
+from whateels.pages.home.MVC.controller.dm_file_processing.cache import content_key as content_key_module
+from whateels.pages.home.MVC.controller.services import (
+    EELSFileProcessor,
+    MemoryDatasetCache,
+    ParsePool,
+    SpectrumLayout,
+    StreamingUpload,
+)
+from whateels.pages.home.MVC.model import Model
+
+
+@pytest.fixture
+def digests(monkeypatch):
+    """Count the whole-file digests computed."""
+    calls = []
+    digest = content_key_module.content_digest
+
+    def counting(source, *args, **kwargs):
+        calls.append(source)
+        return digest(source, *args, **kwargs)
+
+    monkeypatch.setattr(content_key_module, "content_digest", counting)
+    return calls
+
+
+def _dataset(seed=0, shape=(2, 3, 8)):
+    data = np.random.default_rng(seed).random(shape, dtype=np.float32)
+    return xr.Dataset(
+        {"ElectronCount": (("y", "x", "Eloss"), data)},
+        coords={"y": np.arange(shape[0]), "x": np.arange(shape[1]), "Eloss": 100.0 + np.arange(shape[2])},
+    )
+
+
+def _transposed_dataset(seed=0, shape=(3, 4, 16)):
+    """A (y, x, Eloss) view on an (Eloss, x, y) cube, as converted from a DM file."""
+    cube = np.random.default_rng(seed).random(shape[::-1], dtype=np.float32)
+    return xr.Dataset({"ElectronCount": (("y", "x", "Eloss"), cube.T)})
+
+
+def _switch_layout(dataset, cache):
+    layout = SpectrumLayout(mode=SpectrumLayout.MEMORY)
+    assert layout.start(dataset, on_ready=cache.share_layout) is not None
+    assert layout.wait(5)
+
+
+def _key(seed):
+    return ContentKey.of(np.random.default_rng(seed).bytes(300_000))
+
+
+def _processor(cache):
+    return EELSFileProcessor(Model(), memory_cache=cache, publish_metadata=False)
+
+
+def test_miss_reads_only_the_probe(digests):
+    cache = MemoryDatasetCache()
+    cache.store(_key(0), _dataset(0))
+    assert cache.load(_key(1)) is None
+    # Only the background digest of the stored key, never the one of the missed key
+    assert len(digests) <= 1
+
+
+def test_probe_collisions_are_confirmed_by_the_digest():
+    first = bytes(300_000)
+    second = bytearray(first)
+    second[150_000] = 1
+    cache = MemoryDatasetCache()
+    cache.store(ContentKey.of(first), _dataset(0), {"file": "first"})
+    assert cache.load(ContentKey.of(bytes(second))) is None
+    _, metadata = cache.load(ContentKey.of(first))
+    assert metadata == {"file": "first"}
+    assert MemoryDatasetCache(fast_key=True).fast_key
+
+
+def test_stored_keys_are_hashed_in_the_background():
+    cache = MemoryDatasetCache()
+    key = _key(0)
+    cache.store(key, _dataset(0))
+    key._thread.join(5)
+    assert key.known
+
+
+def test_hits_share_read_only_arrays():
+    cache = MemoryDatasetCache()
+    dataset = _dataset(0)
+    cache.store(_key(0), dataset)
+    first, _ = cache.load(_key(0))
+    second, _ = cache.load(_key(0))
+    assert np.shares_memory(first["ElectronCount"].data, second["ElectronCount"].data)
+    assert not first["ElectronCount"].data.flags.writeable
+    first.attrs["original_name"] = "renamed.dm4"
+    assert "original_name" not in second.attrs
+
+
+def test_contiguous_layout_is_shared_through_the_entry():
+    cache = MemoryDatasetCache()
+    dataset = _transposed_dataset()
+    cache.store(_key(0), dataset)
+    early, _ = cache.load(_key(0))  # Loaded before the layout switch
+    bytes_before = cache.total_bytes
+    _switch_layout(dataset, cache)
+    contiguous = dataset["ElectronCount"].data
+    assert SpectrumLayout.is_spectrum_contiguous(contiguous)
+    # The entry keeps the copy in place of the transposed view, recounted in the budget
+    (entry,) = cache._entries.values()
+    assert entry.dataset["ElectronCount"].data is contiguous
+    assert cache.total_bytes == entry.nbytes == contiguous.nbytes == bytes_before
+    assert not contiguous.flags.writeable
+    # Later hits need no copy of their own
+    late, _ = cache.load(_key(0))
+    assert late["ElectronCount"].data is contiguous
+    assert SpectrumLayout().storage_for(late["ElectronCount"].data) is None
+    # An early hit drops its own copy for the shared one
+    _switch_layout(early, cache)
+    assert early["ElectronCount"].data is contiguous
+    xr.testing.assert_equal(early, dataset)
+
+
+def test_layout_of_a_dataset_no_longer_cached_is_not_shared():
+    cache = MemoryDatasetCache()
+    dataset = _transposed_dataset()
+    cache.store(_key(0), dataset)
+    cache.store(_key(0), _transposed_dataset(1))  # Replaces the entry
+    _switch_layout(dataset, cache)
+    (entry,) = cache._entries.values()
+    assert not SpectrumLayout.is_spectrum_contiguous(entry.dataset["ElectronCount"].data)
+    assert not cache.share_layout(_transposed_dataset())  # Never cached
+
+
+def test_shared_layout_releases_the_shared_memory_of_the_entry(tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp").write(path, shape=(3, 4, 16))
+    pool = ParsePool(1)
+    try:
+        spectrum, _ = pool.read(path)
+        # (Eloss, y, x) in the file, a transposed view as converted
+        dataset = xr.Dataset({"ElectronCount": (("y", "x", "Eloss"), spectrum.data.transpose(1, 2, 0))})
+        pool.bind(dataset, spectrum.data)
+        (segment,) = pool.segments_of(dataset)
+        cache = MemoryDatasetCache()
+        cache.store(_key(0), dataset, parse_pool=pool)
+        assert segment.refcount == 2  # The load and the entry
+        _switch_layout(dataset, cache)
+        assert segment.refcount == 1  # The entry holds the contiguous copy (ParsePool.unbind)
+        late, _ = cache.load(_key(0))
+        assert pool.segments_of(late) == []
+        assert pool.release(dataset) == 1
+    finally:
+        pool.shutdown()
+
+
+def test_budget_evicts_least_recently_used():
+    dataset_bytes = MemoryDatasetCache.dataset_bytes(_dataset())
+    cache = MemoryDatasetCache(max_bytes=2 * dataset_bytes)
+    for seed in range(3):
+        cache.store(_key(seed), _dataset(seed), {"seed": seed})
+    assert len(cache) == 2
+    assert cache.load(_key(0)) is None
+    loaded, metadata = cache.load(_key(2))
+    assert metadata == {"seed": 2}
+    xr.testing.assert_equal(loaded, _dataset(2))
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["bytes"] == 2 * dataset_bytes
+
+
+def test_streamed_uploads_are_hashed_as_they_arrive(tmp_path):
+    path = tmp_path / "eels.dm4"
+    DM_EELS_Writer(fill="ramp").write(str(path), shape=(4, 4, 64))
+    content = path.read_bytes()
+    upload = StreamingUpload(path.name, directory=str(tmp_path))
+    for start in range(0, len(content), 1000):
+        upload.write(content[start:start + 1000])
+    assert upload.digest is None  # Not complete yet
+    upload.finish()
+    assert upload.digest == ContentKey.of(content).digest
+    upload.abort()
+
+
+def test_processor_hashes_only_to_confirm_a_hit(tmp_path, digests):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp", n_tags=100).write(path, shape=(4, 5, 64))
+    cache = MemoryDatasetCache()
+    first = _processor(cache).load_dm_file(path)
+    assert cache.stats()["misses"] == 1
+    (entry,) = cache._entries.values()
+    entry.key._thread.join(5)
+    assert len(digests) == 1  # The stored key, in the background
+    second = _processor(cache).load_dm_file(path)
+    assert cache.stats()["hits"] == 1
+    assert len(digests) == 1  # The same unchanged file: no hash to confirm the hit
+    xr.testing.assert_equal(first, second)
+    assert second.attrs["original_name"] == os.path.basename(path)
+    with open(path, "rb") as f:
+        uploaded = _processor(cache).process_upload("upload.dm4", f.read())
+    assert cache.stats()["hits"] == 2
+    assert len(digests) == 2  # The uploaded bytes, to confirm the hit
+    assert uploaded.attrs["original_name"] == "upload.dm4"
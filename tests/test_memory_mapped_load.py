@@ -0,0 +1,66 @@
+"""
+ElectronCount cubes memory-mapped copy-on-write: same values, the file is never written.
+"""
+
+import gc
+import os
+
+import numpy as np
+import pytest
+
+from whateels.helpers import SpoolFile
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import EELSFileProcessor
+from whateels.pages.home.MVC.controller.services import eels_file_processor as eels_file_processor_module
+from whateels.pages.home.MVC.model import Model
+
+
+@pytest.fixture(params=[True, False], ids=["le", "be"])
+def dm_file(request, tmp_path):
+    path = tmp_path / "eels.dm4"
+    DM_EELS_Writer(little_endian=request.param, fill="ramp").write(str(path), shape=(3, 4, 32))
+    return path, request.param
+
+
+def test_mapped_reads_leave_the_file_untouched(dm_file):
+    path, little_endian = dm_file
+    content = path.read_bytes()
+    expected = DM_EELS_Reader(str(path), index_cache=False).processed_eels_spectrum.data
+    data = DM_EELS_Reader(str(path), memory_map=True, index_cache=False).processed_eels_spectrum.data
+    np.testing.assert_array_equal(data, expected)
+    if little_endian:
+        assert isinstance(data, np.memmap) and data.mode == "c"
+    else:
+        # Byte-swapped data cannot be mapped, it is read into memory
+        assert not isinstance(data, np.memmap)
+    # Writes go to private pages, never to the file
+    data[...] = -1
+    if isinstance(data, np.memmap):
+        data.flush()
+    del data
+    gc.collect()
+    assert path.read_bytes() == content
+
+
+def test_spooled_uploads_are_mapped_and_removed_with_their_dataset(dm_file, monkeypatch):
+    path, little_endian = dm_file
+    spools = []
+
+    class RecordedSpoolFile(SpoolFile):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            spools.append(self.path)
+
+    monkeypatch.setattr(eels_file_processor_module, "SpoolFile", RecordedSpoolFile)
+    processor = EELSFileProcessor(Model(), spool_threshold=0)
+    dataset = processor.process_upload(path.name, path.read_bytes())
+    expected = EELSFileProcessor(Model(), memory_map=False).load_dm_file(str(path))
+    np.testing.assert_array_equal(dataset.ElectronCount.values, expected.ElectronCount.values)
+    (spool,) = spools
+    if little_endian:
+        assert isinstance(dataset.ElectronCount.data, np.memmap)
+        # The spool lives as long as the dataset maps it
+        assert os.path.exists(spool)
+        del dataset
+        gc.collect()
+    assert not os.path.exists(spool)
@@ -0,0 +1,78 @@
+"""
+ParsePool: lazy reads in worker processes, the shared-memory hand-off of the cube and its reference counts.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Reader, DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import LazyTagGroup
+from whateels.pages.home.MVC.controller.services import ParsePool
+
+
+@pytest.fixture(scope="module")
+def pool():
+    pool = ParsePool(1)
+    pool.start()
+    yield pool
+    pool.shutdown()
+
+
+@pytest.fixture
+def dm_file(tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp", n_tags=200, tag_depth=3).write(path, shape=(3, 4, 32))
+    return path
+
+
+def _dataset(data):
+    return xr.Dataset({"ElectronCount": (("Eloss", "y", "x"), data)})
+
+
+def test_worker_read_matches_the_reader(pool, dm_file):
+    spectrum, metadata = pool.read(dm_file)
+    reader = DM_EELS_Reader(dm_file, index_cache=False)
+    np.testing.assert_array_equal(spectrum.data, reader.processed_eels_spectrum.data)
+    assert spectrum.beam_energy == reader.processed_eels_spectrum.beam_energy
+    assert sanitize_for_json(metadata) == sanitize_for_json(reader.file_metadata)
+    assert pool.release(spectrum.data) == 1
+
+
+def test_groups_not_decoded_by_the_worker_are_decoded_on_access(pool, dm_file):
+    spectrum, metadata = pool.read(dm_file, memory_map=True)
+    documents = metadata["DocumentObjectList"]
+    assert isinstance(documents, LazyTagGroup)
+    assert not documents.is_loaded
+    assert len(documents) == documents.n_tags
+    # The spectrum images were decoded by the worker
+    assert not isinstance(metadata["ImageList"], LazyTagGroup)
+
+
+def test_memory_mapped_cubes_need_no_segment(pool, dm_file):
+    spectrum, _ = pool.read(dm_file, memory_map=True)
+    assert isinstance(spectrum.data, np.memmap)
+    assert pool.segments_of(spectrum.data) == []
+
+
+def test_segment_is_unlinked_with_its_last_reference(pool, dm_file):
+    spectrum, _ = pool.read(dm_file)
+    (segment,) = pool.segments_of(spectrum.data)
+    dataset = _dataset(spectrum.data)
+    pool.bind(dataset, spectrum.data)
+    copy = dataset.copy(deep=False)
+    assert pool.retain(copy) == 1
+    assert segment.refcount == 2
+    # Bound: the reference follows the dataset once its cube is replaced
+    dataset["ElectronCount"] = (("Eloss", "y", "x"), np.array(spectrum.data))
+    assert pool.release(dataset) == 0
+    assert segment.refcount == 1
+    assert pool.release(copy) == 1
+    assert pool.total_bytes() == 0
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=segment.name)
+    # Unlinked, its memory stays valid for the arrays still using it
+    np.testing.assert_array_equal(copy["ElectronCount"].data, dataset["ElectronCount"].data)
@@ -0,0 +1,83 @@
+"""
+SpectrumLayout: spectrum images switched to a spectrum-contiguous copy in the background, with the same values.
+"""
+
+import gc
+import os
+import threading
+
+import numpy as np
+import pytest
+import xarray as xr
+
+from whateels.pages.home.MVC.controller.services import SpectrumLayout
+
+
+def _dataset(cube=None):
+    """(y, x, Eloss) dataset over a DM-ordered (Eloss, y, x) cube, as loaded from a file."""
+    if cube is None:
+        cube = np.arange(16 * 5 * 6, dtype=np.float32).reshape(16, 5, 6)
+    return xr.Dataset({"ElectronCount": (("y", "x", "Eloss"), cube.transpose(1, 2, 0))})
+
+
+def _memmap(tmp_path):
+    path = tmp_path / "cube.npy"
+    np.save(path, np.arange(16 * 5 * 6, dtype=np.float32).reshape(16, 5, 6))
+    return np.load(path, mmap_mode="c")
+
+
+@pytest.mark.parametrize("mode", [SpectrumLayout.MEMORY, SpectrumLayout.DISK])
+def test_switched_data_has_the_same_values_and_calls_on_ready(mode, tmp_path):
+    dataset = _dataset()
+    expected = dataset.ElectronCount.values.copy()
+    ready = []
+    layout = SpectrumLayout(mode, block_bytes=1, directory=str(tmp_path))
+    assert layout.start(dataset, on_ready=ready.append) is not None
+    assert layout.wait(10)
+    assert ready == [dataset]
+    data = dataset.ElectronCount.data
+    assert SpectrumLayout.is_spectrum_contiguous(data)
+    np.testing.assert_array_equal(data, expected)
+    assert isinstance(data, np.memmap) == (mode == SpectrumLayout.DISK)
+    # Nothing left to copy
+    assert layout.start(dataset, on_ready=ready.append) is None and ready == [dataset]
+
+
+def test_disk_copies_are_removed_with_their_data(tmp_path):
+    dataset = _dataset()
+    layout = SpectrumLayout(SpectrumLayout.DISK, directory=str(tmp_path))
+    layout.start(dataset)
+    layout.wait(10)
+    (copy,) = os.listdir(tmp_path)
+    del dataset
+    gc.collect()
+    assert copy not in os.listdir(tmp_path)
+
+
+def test_auto_mode_copies_large_and_mapped_cubes_to_disk(tmp_path):
+    layout = SpectrumLayout(memory_budget=10**6)
+    cube = _dataset().ElectronCount.data
+    assert layout.storage_for(cube) == SpectrumLayout.MEMORY
+    assert SpectrumLayout(memory_budget=100).storage_for(cube) == SpectrumLayout.DISK
+    assert layout.storage_for(_memmap(tmp_path).transpose(1, 2, 0)) == SpectrumLayout.DISK
+    assert layout.storage_for(np.ascontiguousarray(cube)) is None
+    assert SpectrumLayout(SpectrumLayout.OFF).storage_for(cube) is None
+    with pytest.raises(ValueError):
+        SpectrumLayout("elsewhere")
+
+
+def test_cancelled_copies_leave_the_dataset_as_is(tmp_path):
+    dataset = _dataset()
+    source = dataset.ElectronCount.data
+    cancelled = threading.Event()
+    cancelled.set()
+    layout = SpectrumLayout(SpectrumLayout.DISK, block_bytes=1, directory=str(tmp_path))
+    assert layout.materialize(source, SpectrumLayout.DISK, cancelled) is None
+    assert os.listdir(tmp_path) == []
+
+    ready = []
+    layout.start(dataset, on_ready=ready.append)
+    layout.cancel()
+    layout.wait(10)
+    if not ready:
+        assert dataset.ElectronCount.data is source
@@ -0,0 +1,108 @@
+"""
+Streaming uploads: chunks spooled to disk, the DM header scanned as they arrive.
+"""
+
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from whateels.components.file_dropper import FileDropper
+from whateels.helpers.json_sanitizer import sanitize_for_json
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser, DM_StreamParser
+from whateels.pages.home.MVC.controller.services import StreamingUpload
+
+
+@pytest.fixture(params=[(3, True), (4, True), (4, False)], ids=["dm3-le", "dm4-le", "dm4-be"])
+def dm_content(request, tmp_path):
+    version, little_endian = request.param
+    path = tmp_path / f"eels.dm{version}"
+    DM_EELS_Writer(version=version, little_endian=little_endian, n_tags=100, fill="ramp").write(
+        str(path), shape=(8, 8, 256)
+    )
+    return path.name, path.read_bytes()
+
+
+def _chunks(content, size):
+    return [content[start:start + size] for start in range(0, len(content), size)]
+
+
+def test_spool_holds_the_upload_and_the_header_is_parsed_on_the_way(dm_content, tmp_path):
+    name, content = dm_content
+    messages = []
+    upload = StreamingUpload(name, directory=str(tmp_path), on_progress=messages.append)
+    for chunk in _chunks(content, 4096):
+        assert upload.write(chunk)
+    # The tags past the data block come with the last chunks
+    assert upload.parser.complete
+    assert upload.expected_bytes == len(content)
+    assert upload.finish()
+    assert upload.progress == 1.0
+    with open(upload.path, "rb") as f:
+        assert f.read() == content
+    assert len(messages) == len(_chunks(content, 4096)) + 1
+    upload.abort()
+    assert not os.path.exists(upload.path)
+
+
+def test_non_dm_uploads_are_rejected_with_their_first_chunk(tmp_path):
+    upload = StreamingUpload("notes.dm4", directory=str(tmp_path))
+    assert not upload.write(b"this is not a DM file" * 10)
+    assert upload.error
+    assert not os.path.exists(upload.path)
+    assert not upload.write(b"more")
+    assert not upload.finish()
+
+
+def test_truncated_uploads_are_rejected(dm_content, tmp_path):
+    name, content = dm_content
+    upload = StreamingUpload(name, directory=str(tmp_path))
+    assert upload.write(content[:-100])
+    assert not upload.finish()
+    assert upload.error
+    assert not upload.complete
+    assert upload.digest is None
+    assert not os.path.exists(upload.path)
+
+
+def test_dropper_forgets_rejected_uploads_and_drops_their_next_chunks(tmp_path):
+    uploads, uploaded = [], []
+
+    def factory(filename, on_progress):
+        uploads.append(StreamingUpload(filename, directory=str(tmp_path), on_progress=on_progress))
+        return uploads[-1]
+
+    dropper = FileDropper(on_file_uploaded_callback=lambda name, _: uploaded.append(name), upload_factory=factory)
+    widget = dropper.file_widget
+    chunks = [b"this is not a DM file" * 10, b"more", b"end"]
+    for number, chunk in enumerate(chunks, start=1):
+        widget._process_event(SimpleNamespace(event_name="upload_event", data={
+            "name": "notes.dm4", "chunk": number, "total_chunks": len(chunks), "data": chunk, "type": "",
+        }))
+        assert "notes.dm4" not in widget._streams
+    (upload,) = uploads
+    assert upload.error
+    assert upload.received_bytes == len(chunks[0])
+    assert uploaded == []
+    assert not widget.value
+
+
+def test_stream_parse_matches_the_eager_walk(dm_content, tmp_path):
+    name, content = dm_content
+    path = tmp_path / name
+    path.write_bytes(content)
+    parser = DM_StreamParser(filename=name)
+    scans = 0
+    for end in range(1024, len(content) + 1024, 1024):
+        scans += parser.update(content[:end])
+    assert parser.complete
+    # The data block is jumped over: far fewer productive scans than chunks
+    assert scans < len(content) // 1024 // 4
+    eager = DM_InfoParser()
+    with open(path, "rb") as f:
+        eager.file = f
+        expected = sanitize_for_json(eager.parse_file())
+    with open(path, "rb") as f:
+        parser.file = f
+        assert sanitize_for_json(parser.parse_file()) == expected
@@ -0,0 +1,67 @@
+"""
+Selective parsing: include/exclude tag paths, and DM4 groups jumped over by their stored size.
+"""
+
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers import DM_InfoParser, DM_TagScanner
+from whateels.pages.home.MVC.controller.dm_file_processing.parsers.tag_path_filter import (
+    FULL,
+    SKIP,
+    WALK,
+    TagPathFilter,
+)
+
+
+def _parse(path, parser=None, **filters):
+    parser = parser or DM_InfoParser()
+    with open(path, "rb") as f:
+        parser.file = f
+        return parser.parse_file(**filters)
+
+
+@pytest.fixture(params=[3, 4], ids=["dm3", "dm4"])
+def dm_file(request, tmp_path):
+    path = tmp_path / f"eels.dm{request.param}"
+    DM_EELS_Writer(version=request.param, n_tags=200, tag_depth=2).write(str(path), shape=(2, 3, 16))
+    return str(path)
+
+
+def test_group_actions():
+    path_filter = TagPathFilter(include=["**/ImageTags/EELS"], exclude=["DocumentObjectList"])
+    assert path_filter.group_action(("DocumentObjectList",), False) == (SKIP, False)
+    assert path_filter.group_action(("ImageList",), False) == (WALK, False)
+    assert path_filter.group_action(("ImageList", "GroupBlock0", "ImageTags", "EELS"), False) == (FULL, True)
+    assert path_filter.group_action(("ImageList", "GroupBlock0", "ImageData"), False) == (WALK, False)
+    assert not path_filter.selects_data(("ImageList", "GroupBlock0", "Name"), False)
+
+
+@pytest.mark.parametrize("parser", [DM_InfoParser, DM_TagScanner])
+def test_include_keeps_only_the_selected_paths(dm_file, parser):
+    full = _parse(dm_file)
+    tree = _parse(dm_file, parser(), include=["ImageList/*/ImageData"])
+    assert set(tree) == {"root", "ImageList"}
+    image = tree["ImageList"]["GroupBlock0"]
+    assert set(image) == {"ImageData"}
+    assert image["ImageData"]["Data"] == full["ImageList"]["GroupBlock0"]["ImageData"]["Data"]
+
+
+@pytest.mark.parametrize("parser", [DM_InfoParser, DM_TagScanner])
+def test_exclude_drops_the_subtree(dm_file, parser):
+    full = _parse(dm_file)
+    tree = _parse(dm_file, parser(), exclude=["DocumentObjectList", "**/Microscope Info"])
+    assert "DocumentObjectList" not in tree
+    assert "Microscope Info" not in tree["ImageList"]["GroupBlock0"]["ImageTags"]
+    assert tree["ImageList"]["GroupBlock0"]["ImageData"] == full["ImageList"]["GroupBlock0"]["ImageData"]
+
+
+def test_dm4_groups_are_jumped_over_without_walking(tmp_path, monkeypatch):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(version=4, n_tags=200, tag_depth=2).write(path, shape=(2, 3, 16))
+
+    def walk(self, nnames):
+        raise AssertionError("DM4 groups are skipped with a single seek")
+
+    monkeypatch.setattr(DM_InfoParser, "_skip_Blocks", walk)
+    assert "DocumentObjectList" not in _parse(path, exclude=["DocumentObjectList"])
@@ -0,0 +1,119 @@
+"""
+TaskRunner: background tasks with progress, whose cancelled results are never dispatched.
+"""
+
+import threading
+
+import pytest
+
+from whateels.pages.home.MVC.controller.dm_file_processing import DM_EELS_Writer
+from whateels.pages.home.MVC.controller.services import (
+    CancellationToken, EELSFileProcessor, OperationCancelled, TaskRunner,
+)
+from whateels.pages.home.MVC.model import Model
+
+
+class _Calls:
+    """Results, errors and progress dispatched by a TaskRunner."""
+
+    def __init__(self):
+        self.done, self.errors, self.progress = [], [], []
+
+    def submit(self, runner, work):
+        return runner.submit(work, self.done.append, self.errors.append,
+                             lambda fraction, message: self.progress.append((fraction, message)))
+
+
+def test_results_and_progress_are_dispatched():
+    runner, calls = TaskRunner(), _Calls()
+
+    def work(token, progress):
+        progress(0.5, "Half way")
+        return "loaded"
+
+    calls.submit(runner, work)
+    runner.wait(10)
+    assert calls.done == ["loaded"] and calls.errors == []
+    assert calls.progress == [(0.5, "Half way")]
+
+
+def test_errors_are_dispatched_to_on_error():
+    runner, calls = TaskRunner(), _Calls()
+
+    def work(token, progress):
+        raise ValueError("Not a DM file")
+
+    calls.submit(runner, work)
+    runner.wait(10)
+    assert calls.done == [] and [str(error) for error in calls.errors] == ["Not a DM file"]
+
+
+def test_a_new_task_cancels_the_previous_one():
+    runner, calls = TaskRunner(), _Calls()
+    started, release, finished = threading.Event(), threading.Event(), threading.Event()
+    stopped = []
+
+    def first(token, progress):
+        started.set()
+        release.wait(10)
+        try:
+            progress(0.5, "Checkpoint")  # Raises: the task was cancelled meanwhile
+        except OperationCancelled:
+            stopped.append(True)
+            raise
+        finally:
+            finished.set()
+        return "first"
+
+    first_token = calls.submit(runner, first)
+    assert started.wait(10)
+    second_token = calls.submit(runner, lambda token, progress: "second")
+    assert first_token.cancelled and not second_token.cancelled
+    release.set()
+    runner.wait(10)
+    assert finished.wait(10)
+    assert stopped == [True]
+    assert calls.done == ["second"] and calls.errors == []
+
+
+def test_cancelled_tasks_dispatch_nothing():
+    runner, calls = TaskRunner(), _Calls()
+    release = threading.Event()
+
+    def work(token, progress):
+        release.wait(10)
+        if token.cancelled:
+            raise RuntimeError("Failed while being cancelled")
+        return "loaded"
+
+    calls.submit(runner, work)
+    runner.cancel()
+    release.set()
+    runner.wait(10)
+    assert calls.done == [] and calls.errors == [] and calls.progress == []
+
+
+def test_tokens_raise_at_checkpoints_once_cancelled():
+    token = CancellationToken()
+    token.raise_if_cancelled()
+    token.cancel()
+    assert token.cancelled
+    with pytest.raises(OperationCancelled):
+        token.raise_if_cancelled()
+
+
+def test_cancelled_loads_stop_at_their_next_checkpoint(tmp_path):
+    path = str(tmp_path / "eels.dm4")
+    DM_EELS_Writer(fill="ramp").write(path, shape=(3, 4, 32))
+    token = CancellationToken()
+    reports = []
+
+    def progress(fraction, message):
+        reports.append(message)
+        token.cancel()
+        token.raise_if_cancelled()
+
+    processor = EELSFileProcessor(Model(), progress=progress)
+    with pytest.raises(OperationCancelled):
+        processor.process_upload("eels.dm4", (tmp_path / "eels.dm4").read_bytes())
+    assert len(reports) == 1
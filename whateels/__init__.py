@@ -1,3 +1,5 @@
+import threading
+
 import panel as pn
 from pathlib import Path
 
@@ -5,7 +7,8 @@ from pathlib import Path
 pn.extension('filedropper', 'floatpanel', theme='default')
 
 from whateels.helpers import LoadCSS, CSS_ROOT
-from whateels.pages import Home, NLLS, Login, GOS, Metadata
+# The pages are imported on the first request of their route (see whateels.pages)
+import whateels.pages
 
 class App:
     """
@@ -16,11 +19,92 @@ class App:
 
     _DEFAULT_TITLE = "App"
     _DEFAULT_PORT = 5006
+    _DEFAULT_PARSE_WORKERS = None
+    _DEFAULT_MEMORY_CACHE_BYTES = 1 * 2**30
+    _DEFAULT_DATASET_CACHE_BYTES = 0
+    _DEFAULT_NUM_PROCS = 1
+    _DEFAULT_NUM_THREADS = None
+    _DEFAULT_WARM_UP = True
+
+    # Pages of the application (names in whateels.pages), built for every session
+    # (so sessions share no state), their modules imported on the first request
+    _PAGES = {
+        "/": "Home",
+        "/metadata-details": "Metadata",
+        "/gos": "GOS",
+        "/nlls": "NLLS",
+        "/login": "Login",
+    }
     
     def __init__(self, title : str = _DEFAULT_TITLE):
         self.title = title
+        self._services_config = None
+        self._services_lock = threading.Lock()
+
+    def run(
+        self,
+        port : int = _DEFAULT_PORT,
+        parse_workers : int = _DEFAULT_PARSE_WORKERS,
+        num_procs : int = _DEFAULT_NUM_PROCS,
+        num_threads : int = _DEFAULT_NUM_THREADS,
+        memory_cache_bytes : int = _DEFAULT_MEMORY_CACHE_BYTES,
+        dataset_cache_bytes : int = _DEFAULT_DATASET_CACHE_BYTES,
+        show : bool = True,
+        warm_up : bool = _DEFAULT_WARM_UP,
+    ):
+        """
+        Serve the application.
+
+        Every browser session gets its own pages, model and AppState. The server
+        listens before the pages are imported: each is imported (with its plotting
+        and numeric libraries) by the first request of its route.
+
+        Parameters
+        ----------
+        port : int, optional
+            Port of the server
+        parse_workers : int, optional
+            Worker processes reading the uploaded DM files, so parsing does not
+            hold the GIL of the server and the files of a batch are parsed on
+            several cores (default: one per file of a batch loading at once, see
+            BATCH_PARALLEL; 0 reads them in the server process). Compare both with
+            benchmarks/bench_batch_upload.py on the server machine
+        num_procs : int, optional
+            Server processes sharing the port (0: one per core). Session states
+            (AppState) live in the memory of their process, so the metadata page
+            only finds a session served by the same process: a warning is printed
+            when more than one process may serve the sessions.
+        num_threads : int, optional
+            Threads handling the events of the sessions in each process (default:
+            the event loop only)
+        memory_cache_bytes : int, optional
+            Memory budget of the converted datasets kept for every session of a
+            process, least recently used evicted past it (0 disables it)
+        dataset_cache_bytes : int, optional
+            Disk quota of the converted datasets kept in the per-user cache
+            directory ($WHATEELS_CACHE_DIR, else $XDG_CACHE_HOME/whateels), so
+            dropping the same file again skips the conversion (0, the default,
+            disables it)
+        show : bool, optional
+            Open the application in a browser once the server is listening
+        warm_up : bool, optional
+            Compile the numba kernels of the plots (or load them from their disk
+            cache) in a background thread, before the first session needs them.
+            With several server processes, each warms up when its first session
+            arrives: a thread started before the processes fork would not run in
+            them, and could hold a lock they inherit.
+        """
+        # Shared by every session of the server, set up by the first session (of each process)
+        warm_up_per_process = warm_up and num_procs != 1
+        self._services_config = (parse_workers, memory_cache_bytes, dataset_cache_bytes, warm_up_per_process)
+        if num_threads is not None:
+            pn.config.nthreads = num_threads
+        if num_procs != 1:
+            print(
+                f"Warning: num_procs={num_procs}, the metadata page only shows the metadata of the "
+                "sessions served by its own process (a link opened in another process shows none)"
+            )
 
-    def run(self, port : int = _DEFAULT_PORT):
         # Load CSS files only once
         LoadCSS([
             str(CSS_ROOT / "home.css"),
@@ -28,17 +112,53 @@ class App:
             str(CSS_ROOT / "custom_page.css"),
         ])
         
-        # Define the pages for the application
-        pages = {
-            "/": Home(),
-            "/metadata-details": Metadata(),
-            "/gos": GOS(),
-            "/nlls": NLLS(),
-            "/login": Login(),
-        }
+        if warm_up and not warm_up_per_process:
+            threading.Thread(target=self._warm_up_kernels, name="kernel-warm-up", daemon=True).start()
+
+        # Define the pages for the application, as factories called for every session
+        pages = {route: self._page_factory(page) for route, page in self._PAGES.items()}
 
         return pn.serve(
             pages,
             title=self.title,
             port=port,
-        )
\ No newline at end of file
+            num_procs=num_procs,
+            show=show,
+        )
+
+    def _page_factory(self, page_name: str):
+        """Function building the page for a new session (pn.serve calls functions, not classes)."""
+        def create_page():
+            self._configure_services()
+            return getattr(whateels.pages, page_name)()
+        create_page.__name__ = f"create_{page_name.lower()}"
+        return create_page
+
+    @staticmethod
+    def _warm_up_kernels():
+        """Background thread: compile the numba kernels (see whateels.helpers.kernels)."""
+        try:
+            from whateels.helpers import kernels
+            kernels.warm_up()
+        except Exception as e:
+            print(f"Warning: Could not warm up the numba kernels: {e}")
+
+    def _configure_services(self):
+        """Set up the services shared by the sessions, once (their modules load with the home page)."""
+        with self._services_lock:
+            if self._services_config is None:
+                return
+            from whateels.pages.home.MVC.controller.services import ParsePool, MemoryDatasetCache, DatasetCache
+            from whateels.pages.home.MVC.model.constants import Constants
+            parse_workers, memory_cache_bytes, dataset_cache_bytes, warm_up = self._services_config
+            if warm_up:
+                threading.Thread(target=self._warm_up_kernels, name="kernel-warm-up", daemon=True).start()
+            if parse_workers is None:
+                parse_workers = Constants.BATCH_PARALLEL
+            pool = ParsePool.configure(parse_workers)
+            if pool.enabled:
+                # Spawning the workers takes a while, not paid by the first upload
+                threading.Thread(target=pool.start, name="parse-pool-start", daemon=True).start()
+            MemoryDatasetCache.configure(memory_cache_bytes)
+            DatasetCache.configure(dataset_cache_bytes)
+            self._services_config = None
@@ -5,21 +5,83 @@ This module provides a Panel-based file upload component specifically designed
 for DM3/DM4 EELS data files with validation and feedback.
 
 Features:
-- Drag-and-drop file upload interface
+- Drag-and-drop file upload interface, several files at once
 - File type validation (DM3/DM4 only)
 - Visual feedback for upload status
-- File content stored in memory for processing
+- Uploads streamed to disk chunk by chunk with an upload factory, with their
+  progress in the feedback pane (stored in memory otherwise)
 """
 
+import html
 import panel as pn
-from typing import Callable, Optional
+from typing import Any, Callable, Optional
+
+
+class _StreamingFileDropper(pn.widgets.FileDropper):
+    """
+    Panel FileDropper handing each chunk to an upload object as it arrives.
+
+    stream_factory(filename) returns the upload receiving the chunks of a file
+    (write(chunk), finish() -> bool, abort()), or None to keep that file in
+    memory as usual. Once its last chunk is written, the upload itself becomes
+    the value of the file, so the chunks are never joined in memory.
+    """
+
+    def __init__(self, **params):
+        super().__init__(**params)
+        self.stream_factory = None
+        self._streams = {}  # Uploads in flight, by file name
+        self._rejected = set()  # Uploads rejected before their last chunk, whose next chunks are dropped
+
+    def _process_event(self, event):
+        data = event.data
+        name = data['name']
+        if event.event_name == 'delete_event':
+            self._rejected.discard(name)
+            upload = self._streams.pop(name, None)
+            if upload is not None:
+                upload.abort()
+            return super()._process_event(event)
+
+        if data['chunk'] == 1:
+            self._rejected.discard(name)
+            upload = self._streams.pop(name, None)
+            if upload is not None:
+                upload.abort()  # Dropped again before the previous upload ended
+            if self.stream_factory is not None:
+                upload = self.stream_factory(name)
+                if upload is not None:
+                    self._streams[name] = upload
+        if name in self._rejected:
+            return
+        upload = self._streams.get(name)
+        if upload is None:
+            return super()._process_event(event)
+
+        if not upload.write(data['data']):
+            # Rejected, the upload reported why
+            del self._streams[name]
+            if data['chunk'] != data['total_chunks']:
+                self._rejected.add(name)
+            return
+        if data['chunk'] != data['total_chunks']:
+            return
+        del self._streams[name]
+        if not upload.finish():
+            return  # Rejected, the upload reported why
+        self.value[name] = upload
+        self.mime_type[name] = data['type']
+        self.param.trigger('mime_type', 'value')
+
 
 class FileDropper(pn.WidgetBox):
     """
     A specialized file upload component for EELS data files.
     
     This class extends Panel's WidgetBox to create a complete file upload
-    interface with validation, feedback, and in-memory file handling.
+    interface with validation, feedback, and in-memory file handling. With an
+    upload factory, valid files are streamed to it chunk by chunk instead, and
+    the upload callback receives the upload object it returned.
 
     Attributes:
         valid_extensions (tuple): Allowed file extensions for upload
@@ -30,6 +92,7 @@ class FileDropper(pn.WidgetBox):
         self,
         on_file_uploaded_callback: 'Optional[Callable[[str, bytes], None]]' = None,
         on_file_removed_callback: 'Optional[Callable[[str], None]]' = None,
+        upload_factory: 'Optional[Callable[[str, Callable[[str], None]], Any]]' = None,
         valid_extensions: tuple = ('.dm3', '.dm4'),
         reject_message: str = "❌ Rejected",
         success_message: str = "✅ Processed file",
@@ -44,6 +107,9 @@ class FileDropper(pn.WidgetBox):
         Args:
             on_file_uploaded_callback: Callback function to call when a file is successfully uploaded
             on_file_removed_callback: Callback function to call when a file is removed
+            upload_factory: Called with the file name and a progress callback (taking a
+                status message) when a valid file starts uploading, returns the upload
+                receiving its chunks
             valid_extensions: Tuple of allowed file extensions (e.g., ('.dm3', '.dm4'))
             reject_message: Message to display when rejecting invalid files
             success_message: Message to display on successful file upload
@@ -57,9 +123,11 @@ class FileDropper(pn.WidgetBox):
         self.feedback_message = feedback_message
         self._on_file_uploaded_callback = on_file_uploaded_callback
         self._on_file_removed_callback = on_file_removed_callback
+        self._upload_factory = upload_factory
 
-        # Track the currently uploaded filename for removal callback
-        self._current_filename = None
+        # Track the uploaded files (content by filename) for the removal callback
+        self._current_files = {}
+        self._rejected_files = {}  # Rejected once, not again on the next drops
 
         # Create UI components in logical order
         self.upload_title = self._create_title()
@@ -86,6 +154,21 @@ class FileDropper(pn.WidgetBox):
         """Callback for file removal events."""
         return self._on_file_removed_callback
     
+    @property
+    def upload_factory(self) -> Optional[Callable[[str, Callable[[str], None]], Any]]:
+        """Factory of the uploads streamed to disk (None keeps uploads in memory)."""
+        return self._upload_factory
+
+    @upload_factory.setter
+    def upload_factory(self, factory: Optional[Callable[[str, Callable[[str], None]], Any]]):
+        """
+        Set the factory of the uploads streamed to disk.
+
+        Args:
+            factory: Function called with the file name and a progress callback
+        """
+        self._upload_factory = factory
+
     @on_file_uploaded_callback.setter
     def on_file_uploaded_callback(self, callback: Optional[Callable[[str, bytes], None]]):
         """
@@ -122,10 +205,18 @@ class FileDropper(pn.WidgetBox):
     
     def _create_file_widget(self) -> pn.widgets.FileDropper:
         """Create the main file dropper widget."""
-        return pn.widgets.FileDropper(
+        widget = _StreamingFileDropper(
             sizing_mode='stretch_width',
-            multiple=False,  # Only allow single file uploads
+            multiple=True,  # Whole acquisition sessions are dropped at once
         )
+        widget.stream_factory = self._start_upload
+        return widget
+
+    def _start_upload(self, filename: str):
+        """Upload receiving the chunks of filename, None to keep it in memory."""
+        if self._upload_factory is None or not self._is_valid_file_extension(filename):
+            return None
+        return self._upload_factory(filename, self._show_progress)
     
     def _setup_event_handlers(self):
         """Set up event handlers for file upload events."""
@@ -140,23 +231,29 @@ class FileDropper(pn.WidgetBox):
                 _: Panel parameter change event (unused, but required by Panel)
             """
             
-            # If value is empty (cleared/deleted)
-            if not self.file_widget.value:
-                # Only call removal callback if this wasn't a programmatic clear
-                if self._current_filename:  # Only call if we had a file before
-                    self._on_file_removed_callback(self._current_filename)
-                    self._current_filename = None  # Clear the stored filename
+            files = self.file_widget.value or {}
+
+            # Files removed from the dropper (one of them, or all when cleared)
+            for filename in sorted(self._current_files.keys() - files.keys()):
+                del self._current_files[filename]
+                self._on_file_removed_callback(filename)
+            self._rejected_files = {name: content for name, content in self._rejected_files.items() if name in files}
+            if not files:
                 self.clear_feedback() # Clear previous feedback
                 return
             
-            # Process each uploaded file (though we only allow single uploads)
-            for filename, file_content in self.file_widget.value.items():
+            # Process each newly uploaded file (the value holds every file dropped so far,
+            # a file dropped again has a new content)
+            for filename, file_content in files.items():
+                if self._current_files.get(filename) is file_content or self._rejected_files.get(filename) is file_content:
+                    continue
                 if self._is_valid_file_extension(filename):
-                    self._current_filename = filename  # Store current filename
+                    self._current_files[filename] = file_content  # Store current file
                     self._show_success()
                     # Call the required callback function
                     self._on_file_uploaded_callback(filename, file_content)
                 else:
+                    self._rejected_files[filename] = file_content
                     self._reject_file_and_show_error()
         
         # Connect the event handler to the file widget
@@ -198,6 +295,14 @@ class FileDropper(pn.WidgetBox):
         
         self.feedback_pane.object = success_message
 
+    def _show_progress(self, message: str):
+        """Display the progress of an upload in the feedback pane."""
+        self.feedback_pane.object = (
+            f"<p class='feedback-message progress'>"
+            f"{html.escape(message)}"
+            f"</p>"
+        )
+
     def _reject_file_and_show_error(self):
         """
         Handle rejection of invalid files and display error feedback.
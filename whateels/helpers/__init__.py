@@ -1,3 +1,4 @@
 from .load_css import LoadCSS
-from .temp_file import TempFile
+from .temp_file import TempFile, SpoolFile
+from .calibrated_axis import CalibratedAxis
 from .constants import *
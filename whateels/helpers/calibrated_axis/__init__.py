@@ -0,0 +1,117 @@
+import numpy as np
+
+
+class CalibratedAxis:
+    """
+    A uniformly sampled, calibrated axis: value = offset + index * scale.
+
+    DM files calibrate every dimension with an origin (in pixels), a scale and units.
+    This compact form is computed once at load and converts between values and
+    indices in constant time, so selecting a value range is a slice instead of a
+    mask over the whole axis.
+
+    Args:
+        size (int): Number of samples
+        scale (float): Step between samples (non-zero)
+        offset (float): Value of the first sample
+        units (str): Units of the values (e.g. 'eV')
+        name (str): Name of the axis (e.g. 'Eloss')
+
+    Example:
+        axis = CalibratedAxis(2048, scale=0.25, offset=100.0, units='eV')
+        axis.index_of(150.0)        # 200
+        axis.slice(150.0, 160.0)    # slice(200, 241)
+    """
+
+    __slots__ = ("size", "scale", "offset", "units", "name")
+
+    # Relative tolerance of the range bounds, so values computed as offset + i * scale
+    # are not excluded by rounding
+    _TOLERANCE = 1e-9
+
+    def __init__(self, size, scale=1.0, offset=0.0, units="", name=""):
+        if not scale:
+            raise ValueError("The scale of a calibrated axis cannot be zero")
+        self.size = int(size)
+        self.scale = float(scale)
+        self.offset = float(offset)
+        self.units = units
+        self.name = name
+
+    @classmethod
+    def from_dm(cls, calibration, size, name=""):
+        """Axis of a DM calibration (a Calibrations/Dimension entry: Origin, Scale, Units)."""
+        scale = calibration.get("Scale") or 1.0
+        origin = calibration.get("Origin", 0.0)
+        # DM stores the origin in pixels: the value of index 0 is -origin * scale
+        return cls(size, scale, -1 * origin * scale, calibration.get("Units") or "a.u.", name)
+
+    @classmethod
+    def from_values(cls, values, units="", name=""):
+        """Axis of uniformly spaced values, None if they are not uniform (or not finite)."""
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 1 or values.size == 0 or not np.isfinite(values[[0, -1]]).all():
+            return None
+        if values.size == 1:
+            return cls(1, 1.0, values[0], units, name)
+        scale = (values[-1] - values[0]) / (values.size - 1)
+        if not scale:
+            return None
+        axis = cls(values.size, scale, values[0], units, name)
+        if not np.allclose(axis.values, values, rtol=0, atol=abs(scale) * 1e-6):
+            return None
+        return axis
+
+    @classmethod
+    def from_dict(cls, values):
+        """Axis stored with to_dict(), None if there is none."""
+        return cls(**values) if values else None
+
+    def to_dict(self):
+        """Plain values, e.g. to be stored in dataset attributes."""
+        return {
+            "size": self.size,
+            "scale": self.scale,
+            "offset": self.offset,
+            "units": self.units,
+            "name": self.name,
+        }
+
+    @property
+    def values(self):
+        """All the values of the axis."""
+        return np.arange(self.size) * self.scale + self.offset
+
+    def value_of(self, index):
+        """Value(s) at index (scalar or array)."""
+        return self.offset + np.asarray(index) * self.scale
+
+    def index_of(self, value, clip=True):
+        """Index (or indices) of the sample(s) nearest to value, clipped to the axis."""
+        index = np.rint((np.asarray(value, dtype=float) - self.offset) / self.scale).astype(np.int64)
+        if clip:
+            index = np.clip(index, 0, self.size - 1)
+        return index if index.ndim else int(index)
+
+    def slice(self, low, high):
+        """
+        Slice of the samples with values within [low, high], as the mask
+        (values >= low) & (values <= high) would select. Empty if there are none.
+        """
+        first = (low - self.offset) / self.scale
+        last = (high - self.offset) / self.scale
+        if self.scale < 0:
+            first, last = last, first
+        tolerance = self._TOLERANCE * max(1.0, abs(first), abs(last))
+        start = max(0, int(np.ceil(first - tolerance)))
+        stop = min(self.size, int(np.floor(last + tolerance)) + 1)
+        return slice(start, max(start, stop))
+
+    def __len__(self):
+        return self.size
+
+    def __repr__(self):
+        return (
+            f"CalibratedAxis({self.name or 'axis'}: size={self.size}, scale={self.scale}, "
+            f"offset={self.offset}, units={self.units!r})"
+        )
@@ -6,6 +6,8 @@ used throughout the application, avoiding circular imports and providing
 a single source of truth for project configuration.
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Project root path - points to the whateels package directory
@@ -15,3 +17,20 @@ PROJECT_ROOT = Path(__file__).parent.parent
 ASSETS_ROOT = PROJECT_ROOT / "assets"
 CSS_ROOT = ASSETS_ROOT / "css"
 HTML_ROOT = ASSETS_ROOT / "html"
+
+
+
+def _user_cache_root() -> Path:
+    """Per-user cache directory: $WHATEELS_CACHE_DIR, else the cache directory of the platform."""
+    override = os.environ.get("WHATEELS_CACHE_DIR")
+    if override:
+        return Path(override).expanduser()
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA") or Path.home() / "AppData" / "Local"
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+    return Path(base) / "whateels"
+
+
+# Persistent caches (parsed DM headers, converted datasets), private to the user
+CACHE_ROOT = _user_cache_root()
@@ -0,0 +1,49 @@
+"""
+Numba kernels of the interactive plots, compiled ahead of their first use.
+
+A bare ``@jit`` compiles on the first call, i.e. inside the first interaction of
+every fresh server process (e.g. the first hover of a spectrum image fitting the
+powerlaw background). The kernels here are declared with explicit signatures,
+float64 and float32, so they are compiled when this module is imported, and with
+``cache=True``, so the compiled code is stored on disk and later processes load
+it instead of compiling again. Arrays shared between sessions are read-only (see
+MemoryDatasetCache): the signatures take read-only arrays, writable ones convert.
+
+App.run imports this module in a background thread (see warm_up()) before the
+first session arrives. It is not imported by whateels.helpers: numba stays off
+the startup path of the server.
+"""
+
+import time
+
+import numpy as np
+from numba import njit, types
+
+# Energy axes are float64, or float32 when the data is (see DTypePolicy)
+_ARRAY_TYPES = [types.Array(dtype, 1, "A", readonly=True) for dtype in (types.float64, types.float32)]
+_POWERLAW_SIGNATURES = [types.float64[::1](array, types.float64, types.float64) for array in _ARRAY_TYPES]
+
+
+@njit(_POWERLAW_SIGNATURES, cache=True, nogil=True)
+def powerlaw(x, A, k):
+    """Powerlaw background A * x**k of an EELS spectrum, over the energy axis x."""
+    result = np.empty(x.size, dtype=np.float64)
+    for i in range(x.size):
+        result[i] = A * np.float64(x[i]) ** k
+    return result
+
+
+def warm_up() -> float:
+    """
+    Run every kernel once for each of its signatures.
+
+    Importing the module compiles them (or loads them from the disk cache), this
+    also runs their first dispatch. Returns the seconds taken by the calls.
+    """
+    start = time.perf_counter()
+    for dtype in (np.float64, np.float32):
+        x = np.ones(2, dtype=dtype)
+        powerlaw(x, 1.0, -1.0)
+        x.flags.writeable = False
+        powerlaw(x, 1.0, -1.0)
+    return time.perf_counter() - start
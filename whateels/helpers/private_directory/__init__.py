@@ -0,0 +1,47 @@
+"""
+Private Directory Helper
+
+The persistent caches unpickle what they find on disk, so they must only read
+from directories no other user can write to. These helpers create such a
+directory and check an existing one.
+"""
+
+import os
+import stat
+from pathlib import Path
+from typing import Union
+
+
+def make_private_directory(path: Union[str, Path]) -> None:
+    """Create the directory path (and its parents), readable and writable by its owner only."""
+    Path(path).mkdir(parents=True, exist_ok=True, mode=0o700)
+
+
+def is_private_directory(path: Union[str, Path]) -> bool:
+    """
+    Whether no other user can write into the directory path.
+
+    The directory must be owned by the current user and not writable by its group
+    or others. Its parents must be owned by the user or root, and may only be
+    writable by others when sticky (like /tmp), so nobody can swap the directory.
+    Always True on platforms without POSIX ownership (Windows).
+    """
+    if not hasattr(os, "getuid"):
+        return True
+    uid = os.getuid()
+    path = Path(path).absolute()
+    try:
+        info = os.stat(path)
+        if not stat.S_ISDIR(info.st_mode) or info.st_uid != uid:
+            return False
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            return False
+        for parent in path.parents:
+            info = os.stat(parent)
+            if info.st_uid not in (uid, 0):
+                return False
+            if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH) and not info.st_mode & stat.S_ISVTX:
+                return False
+    except OSError:
+        return False
+    return True
@@ -2,6 +2,7 @@ import os
 import time
 import threading
 import tempfile
+import weakref
 
 
 class TempFile:
@@ -79,3 +80,71 @@ class TempFile:
             thread.start()
         else:
             delayed_delete()  # Delete immediately if no delay
+
+
+class SpoolFile:
+    """
+    A temporary file holding in-memory content on disk, removed once its owner is gone.
+
+    Unlike TempFile, the file outlives any 'with' block: it is meant to back objects
+    that keep using it, like a memory map of an uploaded file. bind() ties its
+    removal to the lifetime of such an object, and the file is removed at interpreter
+    exit at the latest. append() grows the file, e.g. chunk by chunk as an upload arrives.
+
+    Args:
+        content (bytes-like or BytesIO): Content written to the file
+        suffix (str): File extension (e.g., '.dm4'). Default: ''
+        prefix (str): Filename prefix. Default: 'tmp_'
+        dir (str, optional): Directory for the file. Default: system temp directory
+        chunk_size (int): Bytes written per call, so large content is not copied at once
+
+    Example:
+        spool = SpoolFile(upload_bytes, suffix='.dm4', prefix='whateels_')
+        data = np.memmap(spool.path, dtype='float32', mode='r')
+        spool.bind(data.base)  # Removed when the map is released
+    """
+
+    def __init__(self, content, suffix='', prefix='tmp_', dir=None, chunk_size=64 * 2**20):
+        self.chunk_size = chunk_size
+        fd, self.path = tempfile.mkstemp(suffix=suffix, prefix=prefix, dir=dir)
+        self._finalizer = weakref.finalize(self, SpoolFile._remove, self.path)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                self._write(f, content)
+        except Exception:
+            self.remove()
+            raise
+
+    def append(self, content):
+        """Write content at the end of the file (e.g. the next chunk of an upload)."""
+        with open(self.path, 'ab') as f:
+            self._write(f, content)
+
+    def _write(self, f, content):
+        view = content.getbuffer() if hasattr(content, 'getbuffer') else memoryview(content)
+        view = view.cast('B')
+        for start in range(0, view.nbytes, self.chunk_size):
+            f.write(view[start:start + self.chunk_size])
+
+    def bind(self, owner):
+        """Remove the file once owner is garbage collected (instead of this SpoolFile)."""
+        self._finalizer.detach()
+        self._finalizer = weakref.finalize(owner, SpoolFile._remove, self.path)
+
+    def remove(self):
+        """Remove the file now."""
+        self._finalizer()
+
+    @staticmethod
+    def _remove(path):
+        # Retries for Windows, where a file cannot be removed while it is open or mapped
+        for attempt in range(3):
+            try:
+                if os.path.exists(path):
+                    os.remove(path)
+                return
+            except (PermissionError, OSError) as e:
+                if attempt < 2:
+                    time.sleep(0.1)
+                else:
+                    print(f"⚠️ Warning: Could not remove spool file {path}: {e}")
@@ -1,7 +1,25 @@
-from .home import Home
-from .gos import GOS
-from .nlls import NLLS
-from .login import Login
-from .metadata import Metadata
+import importlib
 
-__all__ = [Home, GOS, NLLS, Login, Metadata]
\ No newline at end of file
+# Pages by name and module, imported on first access: the server starts listening
+# before the modules of the pages (and their plotting and numeric libraries) load
+_PAGE_MODULES = {
+    "Home": ".home",
+    "GOS": ".gos",
+    "NLLS": ".nlls",
+    "Login": ".login",
+    "Metadata": ".metadata",
+}
+
+__all__ = list(_PAGE_MODULES)
+
+
+def __getattr__(name):
+    if name not in _PAGE_MODULES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    page = getattr(importlib.import_module(_PAGE_MODULES[name], __name__), name)
+    globals()[name] = page  # Later accesses skip __getattr__
+    return page
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -1,4 +1,6 @@
-from .services import EELSFileProcessor, EELSDataProcessor, FileOperation
+import panel as pn
+
+from .services import EELSDataProcessor, FileOperation, ChunkedBackend, DTypePolicy, SpectrumLayout, DatasetCache, MemoryDatasetCache, ParsePool
 from .managers import LayoutManager
 
 from typing import TYPE_CHECKING
@@ -20,9 +22,23 @@ class Controller:
         self.model = model
         self.view = view
         
+        # Chunked processing of spectrum images larger than the memory budget, shared by the services
+        self._chunked_backend = ChunkedBackend(model.constants.MEMORY_BUDGET)
+        # Data types of the pipeline: native cubes, explicit accumulation types
+        self._dtype_policy = DTypePolicy()
+        # Spectrum-contiguous copies of spectrum images, made in the background
+        self._spectrum_layout = SpectrumLayout(
+            model.constants.SPECTRUM_LAYOUT, model.constants.MEMORY_BUDGET, prefix=model.constants.TEMP_PREFIX
+        )
+        # Converted datasets kept on disk, shared by the sessions (off unless App.run sets a quota)
+        self._dataset_cache = DatasetCache.shared()
+        # Converted datasets kept in memory, shared by the sessions (budget set by App.run)
+        self._memory_cache = MemoryDatasetCache.shared()
+        # Worker processes reading DM files, shared by the sessions (configured by App.run)
+        self._parse_pool = ParsePool.shared()
+
         # Initialize services
-        self._file_service = EELSFileProcessor(model)
-        self._data_service = EELSDataProcessor(self.model)
+        self._data_service = EELSDataProcessor(self.model, self._chunked_backend, self._dtype_policy)
         self._file_operation_service = FileOperation(model, self)
         
         # Initialize manager
@@ -31,12 +47,58 @@ class Controller:
         # Set up callbacks for file dropper events
         self.view.file_dropper.on_file_uploaded_callback = self._file_operation_service.handle_file_upload
         self.view.file_dropper.on_file_removed_callback = self._file_operation_service.handle_file_removal
+        self.view.file_dropper.upload_factory = self._file_operation_service.start_streaming_upload
+        self.view.dataset_selector.param.watch(self._handle_dataset_selected, 'value')
+
+        # Release the dataset of the session once its browser tab is gone
+        document = pn.state.curdoc
+        if document is not None and document.session_context is not None:
+            document.on_session_destroyed(self.handle_session_destroyed)
 
     @property
     def layout(self) -> LayoutManager:
         """Expose the layout manager for external use."""
         return self._layout_manager
 
+    @property
+    def chunked_backend(self) -> ChunkedBackend:
+        """Backend computing chunked (dask) datasets within the memory budget."""
+        return self._chunked_backend
+
+    @property
+    def dtype_policy(self) -> DTypePolicy:
+        """Data types used to process and reduce the datasets."""
+        return self._dtype_policy
+
+    @property
+    def spectrum_layout(self) -> SpectrumLayout:
+        """Switches spectrum images to a spectrum-contiguous layout for per-pixel reads."""
+        return self._spectrum_layout
+
+    @property
+    def dataset_cache(self):
+        """Cache of converted datasets (None if disabled)."""
+        return self._dataset_cache
+
+    @property
+    def memory_cache(self) -> MemoryDatasetCache:
+        """Converted datasets kept in memory, with their hit, miss and eviction counters."""
+        return self._memory_cache
+
+    @property
+    def parse_pool(self) -> ParsePool:
+        """Worker processes reading DM files, and the shared memory of their cubes."""
+        return self._parse_pool
+
+    def _handle_dataset_selected(self, event):
+        """Show the dataset picked in the dataset selector."""
+        if event.new is not None and event.new != self.model.active_filename:
+            self._file_operation_service.show_dataset(event.new)
+
+    def handle_session_destroyed(self, session_context):
+        """Handle the end of the session: release its dataset and stop its processing."""
+        self._file_operation_service.close()
+
     # TODO this is just a test so if this function is only printing it should be removed
     def handle_load_page(self):
         """Handle the load page event."""
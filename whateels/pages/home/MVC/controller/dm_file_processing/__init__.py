@@ -7,6 +7,8 @@ It contains all the components needed for the complete DM file processing pipeli
 - readers: High-level file reading coordination and orchestration
 - parsers: File structure parsing and metadata extraction  
 - decoders: Low-level binary data decoding functions
+- cache: Persistent index of parsed headers, and the content keys of the caches
+- writers: Synthetic DM3/DM4 files, for tests and benchmarks
 
 The components work together in a pipeline:
 1. Readers coordinate the overall process and use parsers
@@ -19,4 +21,6 @@ to understand, test, and maintain the file format support.
 
 # Import main classes for external use
 from .readers import DM_EELS_Reader
-from .parsers import DM_InfoParser, DM_EELS_data
+from .parsers import DM_InfoParser, DM_EELS_data, DM_TagScanner, DM_StreamParser
+from .cache import HeaderIndexCache, ContentKey
+from .writers import DM_EELS_Writer
@@ -0,0 +1,16 @@
+"""
+Caches for DM File Processing
+
+This module contains the persistent caches that let repeated uploads of the
+same DM3/DM4 file skip work already done.
+"""
+
+from .content_key import ContentKey, content_hasher
+from .header_index_cache import HeaderIndexCache, data_block_summary
+
+__all__ = [
+    'ContentKey',
+    'content_hasher',
+    'HeaderIndexCache',
+    'data_block_summary'
+]
@@ -0,0 +1,42 @@
+"""
+Command line maintenance of the DM header index cache.
+
+Usage
+-----
+    python -m whateels.pages.home.MVC.controller.dm_file_processing.cache info
+    python -m whateels.pages.home.MVC.controller.dm_file_processing.cache prune --max-mb 128 --max-days 30
+    python -m whateels.pages.home.MVC.controller.dm_file_processing.cache clear
+"""
+
+import argparse
+
+from .header_index_cache import HeaderIndexCache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and prune the DM header index cache")
+    parser.add_argument("--dir", default=None, help="Cache directory (default: the application cache)")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("info", help="Show the number of entries and the cache size")
+    prune = commands.add_parser("prune", help="Evict least recently used entries")
+    prune.add_argument("--max-mb", type=float, default=None,
+                       help="Size cap in MiB (default: the cache default cap)")
+    prune.add_argument("--max-days", type=float, default=None,
+                       help="Also evict entries unused for this many days")
+    commands.add_parser("clear", help="Remove every entry")
+    args = parser.parse_args(argv)
+
+    cache = HeaderIndexCache(directory=args.dir)
+    if args.command == "prune":
+        max_bytes = None if args.max_mb is None else int(args.max_mb * 2**20)
+        max_age = None if args.max_days is None else args.max_days * 86400
+        print(f"Evicted {cache.prune(max_bytes=max_bytes, max_age=max_age)} entries")
+    elif args.command == "clear":
+        print(f"Removed {cache.clear()} entries")
+    entries = cache.entries()
+    total = sum(size for _, size, _ in entries)
+    print(f"{cache.directory}: {len(entries)} entries, {total / 2**20:.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+"""
+Layered content keys of DM files.
+
+The caches are keyed by file content, but hashing a whole multi-GB file costs
+more than parsing its header, and most lookups are misses. A ContentKey has two
+layers:
+
+- the probe: a digest of the file size and of its first and last blocks, read
+  in two seeks whatever the file size. It names the candidate entry of a cache.
+- the digest: the BLAKE2b digest of the whole content. It is only computed to
+  confirm that a candidate entry is for the same bytes, or to store a new one,
+  and at most once per key: the caches of a load share its key.
+
+A digest already known (e.g. computed with content_hasher() while an upload was
+streamed to disk) is given to the key, which then never reads the file again.
+Keys of the same path, unchanged since (same device, inode, size and
+modification time), match without their digests.
+"""
+
+import hashlib
+import io
+import os
+import struct
+import threading
+from typing import Optional
+
+# Rough BLAKE2b throughput, to weigh hashing a file against parsing it
+HASH_BYTES_PER_SECOND = 512 * 2**20
+
+
+class ContentKey:
+    """
+    Content key of a DM file: a cheap probe, and the digest of the whole file on demand.
+
+    Parameters
+    ----------
+    size : int
+        Size of the file in bytes
+    probe : str
+        Digest of the size, head and tail blocks of the file
+    source : str, binary file or in-memory content, optional
+        Where the digest is computed from when first needed. It must stay
+        readable until then (a file object is read from its current state).
+    digest : str, optional
+        BLAKE2b digest of the whole file, when already known
+
+    Build keys with ContentKey.of().
+    """
+
+    BLOCK_SIZE = 64 * 2**10
+
+    def __init__(self, size: int, probe: str, source=None, digest: Optional[str] = None):
+        self.size = size
+        self.probe = probe
+        self._source = source if digest is None else None
+        self._digest = digest
+        self._identity = None  # Path and stat of a file on disk, see matches()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @classmethod
+    def of(cls, source, block_size: int = BLOCK_SIZE, digest: Optional[str] = None) -> "ContentKey":
+        """
+        Key of a DM file: a path, an open binary file or in-memory content.
+
+        Only the head and tail blocks are read here, the file position is restored.
+        """
+        if isinstance(source, (str, os.PathLike)):
+            with open(source, "rb") as f:
+                key = cls.of(f, block_size, digest)
+                stat = os.fstat(f.fileno())
+            key._source = os.fspath(source) if digest is None else None
+            key._identity = (
+                os.path.abspath(source), stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns
+            )
+            return key
+
+        view = _buffer_view(source)
+        if view is not None:
+            size = view.nbytes
+            head = view[:block_size]
+            tail = view[max(block_size, size - block_size):]
+        else:
+            position = source.tell()
+            try:
+                source.seek(0, os.SEEK_END)
+                size = source.tell()
+                source.seek(0)
+                head = source.read(block_size)
+                source.seek(max(block_size, size - block_size))
+                tail = source.read(block_size)
+            finally:
+                source.seek(position)
+        probe = hashlib.blake2b(struct.pack("<Q", size), digest_size=20)
+        probe.update(head)
+        probe.update(tail)
+        return cls(size, probe.hexdigest(), source, digest)
+
+    @property
+    def known(self) -> bool:
+        """Whether the digest is already computed (confirming a hit is then free)."""
+        return self._digest is not None
+
+    @property
+    def digest(self) -> str:
+        """
+        BLAKE2b digest of the whole file, computed from the source on first use.
+
+        Raises OSError (or ValueError for a closed file) if the source can no longer be read.
+        """
+        if self._digest is None:
+            with self._lock:
+                if self._digest is None:
+                    self._digest = content_digest(self._source)
+                    self._source = None
+        return self._digest
+
+    def hash_seconds(self) -> float:
+        """Estimated time to compute the digest, 0 once it is known."""
+        return 0.0 if self.known else self.size / HASH_BYTES_PER_SECOND
+
+    def prefetch(self) -> None:
+        """Compute the digest in a background thread, if it is not known yet."""
+        if self.known or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._prefetch, name="content-digest", daemon=True)
+        self._thread.start()
+
+    def matches(self, other: "ContentKey") -> bool:
+        """
+        Whether both keys are for the same bytes: equal probes, then equal digests.
+
+        Keys of the same unchanged file on disk match without hashing it.
+        """
+        if self.size != other.size or self.probe != other.probe:
+            return False
+        if self._identity is not None and self._identity == other._identity:
+            return True
+        try:
+            return self.digest == other.digest
+        except (OSError, ValueError):
+            return False  # A source gone before its digest was computed
+
+    def _prefetch(self) -> None:
+        try:
+            self.digest
+        except (OSError, ValueError):
+            pass  # Reported by matches()
+
+    def __repr__(self):
+        state = self._digest[:12] if self.known else "pending"
+        return f"ContentKey({self.size} bytes, probe={self.probe[:12]}, digest={state})"
+
+
+def content_hasher():
+    """Incremental hasher of the ContentKey digest, e.g. fed with the chunks of an upload."""
+    return hashlib.blake2b(digest_size=32)
+
+
+def content_digest(source, chunk_size: int = 16 * 2**20) -> str:
+    """BLAKE2b digest of a whole file: a path, an open binary file (position restored) or in-memory content."""
+    digest = content_hasher()
+    view = _buffer_view(source)
+    if view is not None:
+        digest.update(view)
+        return digest.hexdigest()
+
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    position = source.tell()
+    try:
+        source.seek(0)
+        for chunk in iter(lambda: source.read(chunk_size), b""):
+            digest.update(chunk)
+    finally:
+        source.seek(position)
+    return digest.hexdigest()
+
+
+def _buffer_view(source) -> Optional[memoryview]:
+    """Byte view of in-memory content (bytes, memoryview, BytesIO), None for file objects."""
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source).cast("B")
+    return None
@@ -0,0 +1,336 @@
+"""
+Persistent index of parsed DM3/DM4 headers.
+
+The same microscope files are uploaded again and again, and each upload used
+to re-walk the whole tag tree. HeaderIndexCache stores the parsed tag tree of
+a file on disk, keyed by its content, so a later upload of the same bytes
+(whatever its name) skips DM_InfoParser entirely.
+
+Keys
+----
+Entries are named by the probe of a ContentKey: a digest of the file size and
+of its first and last blocks (64 KiB each by default), read in two seeks. A
+lookup that finds no entry is a miss without reading the rest of the file. An
+entry found is only a hit once the BLAKE2b digest of the whole file matches
+the one it records, so two files only share an entry when their bytes are
+equal. With ``fast_key=True`` the probe alone decides, which matches files that
+only differ in between: an explicit opt-in, for trusted files that are never
+edited in place.
+
+Hashing the whole file can cost more than parsing its header, so a tree is only
+stored when its parse took longer than hashing the file would (or when the
+digest is already known, e.g. shared with the dataset caches of the load).
+Callers pass the same key to load() and store(), so a miss followed by a
+store hashes the file at most once.
+
+Entries
+-------
+One ``<key>.idx`` file per DM file: a small fixed header (magic, format
+version, payload length) followed by the zlib compressed pickle of the tag
+tree and of a summary of its data blocks (offset, size, DataType, shape).
+Entries are written atomically, and the modification time of an entry is its
+last use, which drives the LRU eviction once the cache exceeds ``max_bytes``.
+
+Entries are pickles, so they are only read from a directory private to the
+user (see is_private_directory); the default one is under the per-user cache
+directory (``$WHATEELS_CACHE_DIR``, else ``$XDG_CACHE_HOME/whateels``).
+
+The cache can be inspected and pruned from the command line::
+
+    python -m whateels.pages.home.MVC.controller.dm_file_processing.cache info
+    python -m whateels.pages.home.MVC.controller.dm_file_processing.cache prune --max-mb 128
+"""
+
+import os
+import pickle
+import struct
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List, Optional, Tuple, Union
+
+from whateels.helpers.constants import CACHE_ROOT
+from .content_key import ContentKey
+from whateels.helpers.private_directory import is_private_directory, make_private_directory
+from whateels.helpers.logging import Logger
+
+_logger = Logger.get_logger("dm_index_cache.log", __name__)
+
+_MAGIC = b"WEIX"
+_FORMAT_VERSION = 2
+_ENTRY_HEADER = struct.Struct("<4sHQ")  # magic, format version, payload length
+_ENTRY_SUFFIX = ".idx"
+
+
+class HeaderIndexCache:
+    """
+    On-disk LRU cache of parsed DM tag trees.
+
+    Parameters
+    ----------
+    directory : str or Path, optional
+        Where entries are stored (default: ``CACHE_ROOT / "dm_index"``). Entries
+        are not read while other users can write to it.
+    max_bytes : int, optional
+        Size cap of the cache, least recently used entries are evicted past it
+    block_size : int, optional
+        Size of the head and tail blocks of the key probes
+    fast_key : bool, optional
+        Take the probe match of an entry as a hit, without confirming it with the
+        digest of the whole file (default: False)
+    min_parse_seconds : float, optional
+        Only store trees whose parsing took at least this long (and longer than
+        hashing the file, unless the key digest is known or fast_key is set).
+        Lazy DM4 parses seek over the groups and are faster than loading a cached tree.
+    """
+
+    DEFAULT_MAX_BYTES = 256 * 2**20
+    DEFAULT_BLOCK_SIZE = 64 * 2**10
+    DEFAULT_MIN_PARSE_SECONDS = 0.05
+
+    def __init__(
+        self,
+        directory: Optional[Union[str, Path]] = None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        fast_key: bool = False,
+        min_parse_seconds: float = DEFAULT_MIN_PARSE_SECONDS,
+    ):
+        self.directory = Path(directory) if directory is not None else CACHE_ROOT / "dm_index"
+        self.max_bytes = max_bytes
+        self.block_size = block_size
+        self.fast_key = fast_key
+        self.min_parse_seconds = min_parse_seconds
+        self._unsafe_logged = False  # The unsafe directory warning is only logged once
+
+    # ==================== KEYS ====================
+
+    def key(self, file: BinaryIO) -> ContentKey:
+        """Key of an open binary file (or in-memory content), to pass to load() and store()."""
+        return ContentKey.of(file, self.block_size)
+
+    # ==================== LOOKUP / STORE ====================
+
+    def load(self, file: BinaryIO, key: Optional[ContentKey] = None) -> Optional[Dict[str, Any]]:
+        """
+        Return the cached tag tree of an open DM file, or None on a miss.
+
+        key is the key of the file (default: computed here), to pass on to store()
+        after a miss. The file is only hashed whole when an entry is found for its
+        probe. A hit refreshes the entry for the LRU eviction.
+        """
+        key = key or self.key(file)
+        path = self._entry_path(key.probe)
+        entry = self._read_entry(path)
+        if entry is None or not self._confirms(entry, key):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        _logger.info(f"Index cache hit: {path.name}")
+        return entry["tags"]
+
+    def store(
+        self,
+        file: BinaryIO,
+        tags: Dict[str, Any],
+        parse_seconds: Optional[float] = None,
+        key: Optional[ContentKey] = None,
+    ) -> bool:
+        """
+        Store the parsed tag tree of an open DM file, then enforce the size cap.
+
+        Lazy TagGroups are fully decoded on the way. Failures are logged and ignored,
+        the cache is only an optimization.
+
+        Parameters
+        ----------
+        file : binary file
+            The open DM file, or its in-memory content
+        tags : dict
+            Its parsed tag tree
+        parse_seconds : float, optional
+            How long parsing took. Trees faster than min_parse_seconds, or than
+            hashing the file to confirm a later hit, are not stored.
+        key : ContentKey, optional
+            Key of the file, as given to load() (default: computed here)
+
+        Returns
+        -------
+        bool
+            Whether the entry was written
+        """
+        key = key or self.key(file)
+        if parse_seconds is not None and parse_seconds < self.min_parse_seconds:
+            return False
+        if parse_seconds is not None and not self.fast_key and parse_seconds < key.hash_seconds():
+            return False  # Confirming a later hit would cost more than the parse it saves
+        try:
+            entry = {
+                "size": key.size,
+                "digest": None if self.fast_key else key.digest,
+                "tags": tags,
+                "data_blocks": data_block_summary(tags),
+                "created": time.time(),
+            }
+            payload = zlib.compress(pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            make_private_directory(self.directory)
+            path = self._entry_path(key.probe)
+            # Write next to the entry and rename, so readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+            with os.fdopen(fd, "wb") as tmp:
+                tmp.write(_ENTRY_HEADER.pack(_MAGIC, _FORMAT_VERSION, len(payload)))
+                tmp.write(payload)
+            os.replace(tmp_path, path)
+            _logger.info(f"Index cache store: {path.name} ({len(payload)} bytes)")
+        except Exception:
+            _logger.exception("Could not store the parsed header in the index cache")
+            return False
+        self.prune()
+        return True
+
+    def data_blocks(self, file: BinaryIO, key: Optional[ContentKey] = None) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached data block summary of an open DM file, or None on a miss."""
+        key = key or self.key(file)
+        entry = self._read_entry(self._entry_path(key.probe))
+        if entry is None or not self._confirms(entry, key):
+            return None
+        return entry["data_blocks"]
+
+    # ==================== MAINTENANCE ====================
+
+    def entries(self) -> List[Tuple[Path, int, float]]:
+        """List (path, size in bytes, last use time) of the entries, least recently used first."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.glob(f"*{_ENTRY_SUFFIX}"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Removed meanwhile
+            found.append((path, stat.st_size, stat.st_mtime))
+        found.sort(key=lambda entry: entry[2])
+        return found
+
+    def total_bytes(self) -> int:
+        """Current size of the cache in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self, max_bytes: Optional[int] = None, max_age: Optional[float] = None) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes.
+
+        Parameters
+        ----------
+        max_bytes : int, optional
+            Size cap to enforce (default: the cache max_bytes)
+        max_age : float, optional
+            Also evict entries not used for this many seconds
+
+        Returns
+        -------
+        int
+            Number of evicted entries
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        oldest_allowed = time.time() - max_age if max_age is not None else None
+        evicted = 0
+        for path, size, last_use in entries:
+            if total <= max_bytes and (oldest_allowed is None or last_use >= oldest_allowed):
+                continue
+            if self._remove(path):
+                total -= size
+                evicted += 1
+        if evicted:
+            _logger.info(f"Index cache pruned: {evicted} entries evicted, {total} bytes left")
+        return evicted
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of removed entries."""
+        return sum(self._remove(path) for path, _, _ in self.entries())
+
+    # ==================== PRIVATE METHODS ====================
+
+    def _entry_path(self, key: str) -> Path:
+        return self.directory / f"{key}{_ENTRY_SUFFIX}"
+
+    def _confirms(self, entry: Dict[str, Any], key: ContentKey) -> bool:
+        """Whether an entry found by the probe of key is for the same bytes (hashes the file once)."""
+        if entry["size"] != key.size:
+            return False
+        if self.fast_key or entry["digest"] is None:
+            return self.fast_key
+        try:
+            return entry["digest"] == key.digest
+        except (OSError, ValueError):
+            return False
+
+    def _read_entry(self, path: Path) -> Optional[Dict[str, Any]]:
+        """Read and validate an entry file, dropping it if it is corrupted."""
+        if not self._directory_is_private():
+            return None
+        try:
+            with open(path, "rb") as f:
+                magic, version, length = _ENTRY_HEADER.unpack(f.read(_ENTRY_HEADER.size))
+                if magic != _MAGIC or version != _FORMAT_VERSION:
+                    raise ValueError(f"unknown entry format {magic!r} v{version}")
+                payload = f.read(length)
+            if len(payload) != length:
+                raise ValueError("truncated entry")
+            return pickle.loads(zlib.decompress(payload))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            _logger.warning(f"Dropping unreadable index entry {path.name}: {e}")
+            self._remove(path)
+            return None
+
+    def _directory_is_private(self) -> bool:
+        """Whether entries can be unpickled, i.e. no other user can write to the directory."""
+        if is_private_directory(self.directory):
+            return True
+        if self.directory.exists() and not self._unsafe_logged:
+            self._unsafe_logged = True
+            _logger.warning(f"Index cache {self.directory} is writable by other users, not reading it")
+        return False
+
+    @staticmethod
+    def _remove(path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except OSError:
+            return False
+
+
+def data_block_summary(tags: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Summarize the image data blocks of a parsed tag tree.
+
+    Returns one dict per ImageList entry holding image data, with the name of the
+    entry, the offset, size (bytes) and endianness of the data block, the DataType
+    index and the shape (DM order, i.e. x first).
+    """
+    blocks = []
+    for name, image in tags.get("ImageList", {}).items():
+        if not isinstance(image, dict):
+            continue
+        image_data = image.get("ImageData")
+        data = image_data.get("Data") if isinstance(image_data, dict) else None
+        if not isinstance(data, dict) or "offset" not in data:
+            continue
+        dimensions = image_data.get("Dimensions", {})
+        blocks.append({
+            "image": name,
+            "offset": data["offset"],
+            "bytes_size": data.get("bytes_size"),
+            "endian": data.get("endian"),
+            "data_type": image_data.get("DataType"),
+            "shape": tuple(dimensions.values()) if isinstance(dimensions, dict) else (),
+        })
+    return blocks
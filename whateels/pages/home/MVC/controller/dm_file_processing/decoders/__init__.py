@@ -12,6 +12,11 @@ The decoders handle various data types with proper endianness support:
 Functions
 ---------
 Binary data readers for different data types with big/little endian support
+
+Classes
+-------
+StreamCursor, BufferCursor: byte cursors over file objects or mapped buffers
 """
 
 from .decoders import *
+from .cursors import StreamCursor, BufferCursor
@@ -0,0 +1,92 @@
+"""
+Byte cursors for DM3/DM4 tag parsing.
+
+A cursor hides where the bytes of a DM file come from, so the tag parser can
+walk the same tag tree either through a regular file object or over a buffer
+(an ``mmap`` of the file, or the uploaded ``bytes`` themselves).
+
+Both cursors expose the same small interface:
+
+- ``unpack(s)``: decode one value with a precompiled ``struct.Struct``
+- ``read(n)``: return the next ``n`` raw bytes
+- ``skip(n)``: advance (or rewind, with ``n < 0``) the position
+- ``seek(position)`` / ``tell()``: absolute positioning
+"""
+
+import struct
+
+
+class StreamCursor:
+    """Cursor over a seekable binary file object (one ``read`` per value)."""
+
+    __slots__ = ("_stream",)
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def unpack(self, s: struct.Struct):
+        """Read and decode a single value with the given struct."""
+        return s.unpack(self._stream.read(s.size))[0]
+
+    def read(self, n: int) -> bytes:
+        """Return the next n bytes."""
+        return self._stream.read(n)
+
+    def skip(self, n: int) -> None:
+        """Move the position n bytes relative to the current one."""
+        self._stream.seek(n, 1)
+
+    def seek(self, position: int) -> None:
+        """Move to an absolute position."""
+        self._stream.seek(position, 0)
+
+    def tell(self) -> int:
+        """Current absolute position."""
+        return self._stream.tell()
+
+    def release(self) -> None:
+        """Nothing to release, the stream belongs to the caller."""
+        return None
+
+
+class BufferCursor:
+    """
+    Zero-copy cursor over any object supporting the buffer protocol.
+
+    Values are decoded in place with ``struct.unpack_from`` at a tracked
+    offset, and ``read`` returns ``memoryview`` slices instead of copies.
+    """
+
+    __slots__ = ("view", "offset")
+
+    def __init__(self, buffer, offset: int = 0):
+        self.view = memoryview(buffer).cast("B")
+        self.offset = offset
+
+    def unpack(self, s: struct.Struct):
+        """Decode a single value with the given struct at the current offset."""
+        value = s.unpack_from(self.view, self.offset)[0]
+        self.offset += s.size
+        return value
+
+    def read(self, n: int) -> memoryview:
+        """Return a view on the next n bytes."""
+        start = self.offset
+        self.offset = start + n
+        return self.view[start:self.offset]
+
+    def skip(self, n: int) -> None:
+        """Move the offset n bytes relative to the current one."""
+        self.offset += n
+
+    def seek(self, position: int) -> None:
+        """Move to an absolute offset."""
+        self.offset = position
+
+    def tell(self) -> int:
+        """Current absolute offset."""
+        return self.offset
+
+    def release(self) -> None:
+        """Release the view so the underlying buffer (e.g. an mmap) can be closed."""
+        self.view.release()
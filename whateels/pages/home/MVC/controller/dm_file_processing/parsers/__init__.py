@@ -7,8 +7,16 @@ particularly for processing DM3/DM4 files and extracting EELS data.
 
 from .dm_eels_data import DM_EELS_data
 from .dm_info_parser import DM_InfoParser
+from .lazy_tag_group import LazyTagGroup
+from .tag_path_filter import TagPathFilter
+from .dm_tag_scanner import DM_TagScanner
+from .dm_stream_parser import DM_StreamParser
 
 __all__ = [
     'DM_EELS_data',
-    'DM_InfoParser'
+    'DM_InfoParser',
+    'LazyTagGroup',
+    'TagPathFilter',
+    'DM_TagScanner',
+    'DM_StreamParser'
 ]
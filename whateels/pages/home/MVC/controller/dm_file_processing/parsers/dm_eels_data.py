@@ -1,8 +1,10 @@
 
+import io
 import numpy as np
 import json
 from typing import List
 from whateels.helpers.logging import Logger
+from whateels.helpers.calibrated_axis import CalibratedAxis
 from whateels.errors import *
 from whateels.shared_state import AppState
 
@@ -28,12 +30,18 @@ class DM_EELS_data:
         23: "float32"
     }
 
-    def __init__(self):
-        """Initialize instance attributes."""
+    def __init__(self, memory_map: bool = False):
+        """Initialize instance attributes.
+
+        memory_map: map the EELS data of an opened file (copy-on-write np.memmap)
+        instead of reading it, so only the pages actually accessed are read from disk.
+        """
         self.spectrum_images = {}
         self.spectralInfo = None
         self.f = None
         self.data = None
+        self.memory_map = memory_map
+        self._axes = None
 
     # ==================== PUBLIC INTERFACE ====================
     
@@ -42,6 +50,8 @@ class DM_EELS_data:
         Store metadata and filter spectrum images from parsed info dictionary.
         
         This method combines metadata storage and spectrum filtering for backward compatibility.
+        file is the opened DM file, or the in-memory upload (bytes, memoryview, BytesIO),
+        in which case the EELS data is a read-only view on it.
         """
 
         self.f = file
@@ -57,6 +67,7 @@ class DM_EELS_data:
         # For backward compatibility, set the first image as spectralInfo
         imageKeys = list(self.spectrum_images.keys())
         self.spectralInfo = self.spectrum_images[imageKeys[0]] if imageKeys else None
+        self._axes = None
 
     def handle_EELS_data(self):
         """
@@ -158,15 +169,35 @@ class DM_EELS_data:
         )
         return dims[::-1]
 
+    @property
+    def axes(self):
+        """Calibrated axes of the dataset, one per dimension in shape order.
+        Computed once from the calibrations read from file.
+        Returns
+        --------------
+        axes : tuple of CalibratedAxis"""
+        if self._axes is None:
+            calibrations = list(self.spectralInfo["ImageData"]["Calibrations"]["Dimension"].values())[::-1]
+            self._axes = tuple(
+                CalibratedAxis.from_dm(calibration, size)
+                for calibration, size in zip(calibrations, self.shape)
+            )
+        return self._axes
+
+    @property
+    def energy_calibration(self):
+        """Calibrated energy axis. DM stores spectrum images as (Eloss,Y,X)
+        and spectrum lines and single spectra with the energy last"""
+        if len(self.shape) == 3:
+            return self.axes[0]
+        return self.axes[-1]
+
     @property
     def energy_axis(self):
         """Energy axis for the spectral dataset.
         This is one of the more confusing properties to extract
         from DM. By some unknown reason, it is stored"""
-        if len(self.shape) == 3:
-            return np.arange(self.shape[0]) * self._get_scales()[0] + self._get_unit_origins()[0]
-        # For Slines and single spectra, this works ...
-        return np.arange(self.shape[-1]) * self._get_scales()[-1] + self._get_unit_origins()[-1]
+        return self.energy_calibration.values
 
     # ==================== PRIVATE METHODS ====================
 
@@ -244,7 +275,7 @@ class DM_EELS_data:
             dtype = self._supported_dtypes[idx]
         except KeyError as e:
             message = (
-                f"Data Type index ({idx}) read from file ({self.f.name}) not supported."
+                f"Data Type index ({idx}) read from file ({getattr(self.f, 'name', 'in-memory upload')}) not supported."
             )
             _logger.exception(message)
             raise DMNonSupportedDataType(message)
@@ -259,10 +290,38 @@ class DM_EELS_data:
             _logger.error(message)
             raise DMConflictingDataTypeRead(message)
 
-        self.f.seek(0)
-        data = np.fromfile(self.f, count=nItems, offset=offset, dtype=dtype)
+        # The data block is stored in the file byte order
+        endian = self.spectralInfo["ImageData"]["Data"].get("endian", "little")
+        file_dtype = np.dtype(dtype).newbyteorder("<" if endian == "little" else ">")
+
+        buffer = self._as_buffer(self.f)
+        if buffer is not None:
+            # In-memory upload: a view on the uploaded bytes, no copy. Read-only,
+            # so the caller's buffer is never modified through it.
+            data = np.frombuffer(buffer, count=nItems, offset=offset, dtype=file_dtype)
+            data.flags.writeable = False
+        elif self.memory_map and file_dtype.isnative:
+            # Copy-on-write map of the data block: pages are read from the file on
+            # access and in-place changes (e.g. NaN cleaning) stay private. The map
+            # keeps the file open for as long as the array (or any view of it) is
+            # referenced, closing f is fine.
+            return np.memmap(self.f, dtype=file_dtype, mode="c", offset=offset, shape=self.shape)
+        else:
+            self.f.seek(0)
+            data = np.fromfile(self.f, count=nItems, offset=offset, dtype=file_dtype)
+        if not file_dtype.isnative:
+            data = data.astype(file_dtype.newbyteorder("="))
         return data.reshape(self.shape)
 
+    @staticmethod
+    def _as_buffer(source):
+        """Return the buffer of in-memory content (bytes, memoryview, BytesIO), None for files."""
+        if isinstance(source, io.BytesIO):
+            return source.getbuffer()
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            return source
+        return None
+
     def _recursively_add_key(self, infoD, keylist):
         """Method used to expand the dictionary recursevely, if a keyError is raised during
         the info reading. This is useful to create the dictionary structure expected for the
@@ -329,6 +388,7 @@ class DM_EELS_data:
         self.spectralInfo["ImageData"]["Calibrations"]["Dimension"][scale_items[0]][
             "Scale"
         ] = scale_val
+        self._axes = None
 
     def _set_energy_origin(self, offset_val):
         """Method that changes the offset value of the energy axis"""
@@ -344,4 +404,5 @@ class DM_EELS_data:
         self.spectralInfo["ImageData"]["Calibrations"]["Dimension"][scale_items[0]][
             "Origin"
         ] = offset_val
+        self._axes = None
 
@@ -1,7 +1,17 @@
+import gc
+import io
 import re
+import mmap
+import struct
+import threading
+import numpy as np
+from functools import partial
 from whateels.errors import *
 
 from ..decoders import decoders as dec
+from ..decoders import StreamCursor, BufferCursor
+from .lazy_tag_group import LazyTagGroup
+from .tag_path_filter import TagPathFilter, SKIP, FULL
 from whateels.errors.dm.parsing import (
     DMVersionError, 
     DMDelimiterCharacterError, 
@@ -35,6 +45,36 @@ class DM_InfoParser:
         11: (dec.read_long_long, 8),
         12: (dec.read_ulong_long, 8),
     }
+    # struct format characters for the simple types (standard sizes, endianness prefixed at runtime)
+    _simple_formats = {
+        2: "h",
+        3: "l",
+        4: "H",
+        5: "L",
+        6: "f",
+        7: "d",
+        8: "B",
+        9: "c",
+        10: "b",
+        11: "q",
+        12: "Q",
+    }
+    # numpy dtypes for the simple types, used to decode whole arrays in one buffer read
+    _numpy_formats = {
+        2: "i2",
+        3: "i4",
+        4: "u2",
+        5: "u4",
+        6: "f4",
+        7: "f8",
+        8: "u1",
+        9: "S1",
+        10: "i1",
+        11: "i8",
+        12: "u8",
+    }
+    # Arrays longer than this are kept as numpy arrays instead of Python lists
+    _DEFAULT_ARRAY_THRESHOLD = 1024
     # SizeId - Encryption | allowed pairs
     # The pairings are written literaly here ... for more clarity
     _id_pairings = [
@@ -57,13 +97,57 @@ class DM_InfoParser:
     # Valid extensions for the file reading
     _valid_extensions = (".dm3$", ".dm4$")
 
-    def __init__(self) -> None:
-        """Initialize parser with empty information dictionary and default values."""
+    def __init__(
+        self,
+        use_mmap: bool = False,
+        array_threshold: int = _DEFAULT_ARRAY_THRESHOLD,
+        lazy: bool = False,
+    ) -> None:
+        """
+        Initialize parser with empty information dictionary and default values.
+
+        Parameters
+        ----------
+        use_mmap : bool, optional
+            If True, the file is memory-mapped and the tags are decoded in place
+            with ``struct.unpack_from`` instead of one ``read`` call per value.
+            Falls back to stream reading for file objects without a descriptor.
+        array_threshold : int, optional
+            Tag arrays with more elements than this are returned as numpy arrays
+            (native byte order) instead of Python lists.
+        lazy : bool, optional
+            If True, TagGroups are only skimmed: their offset and child count are
+            recorded in a LazyTagGroup, decoded on first access. Needs a mapped
+            buffer that stays open with the tree, so it implies ``use_mmap``.
+
+        In lazy mode the returned tree owns the buffer of the parser: it is closed
+        once the last lazy group is decoded, by close(), or when the tree is
+        garbage collected. A file object given as ``file`` can be closed as soon as
+        parse_file returns, the memory map holds its own descriptor.
+        """
         self.information_dictionary: Dict[str, Any] = dict()
         self._file: Optional[TextIO] = None  # File handle to be set via get_file()
+        self.filename: Optional[str] = None  # Original file name, needed for in-memory sources
+        self._exported_view: Optional[memoryview] = None  # Buffer of a BytesIO source
         self.version: Optional[int] = None  # DM file version (3 or 4)
-        self.parser: Optional[Callable] = None  # Parser function (read_long or read_long_long)
+        self.file_size: Optional[int] = None  # File size declared in the header
         self.endianness: Optional[str] = None  # File endianness ('big' or 'little')
+        self.use_mmap = use_mmap
+        self._cursor: Optional[StreamCursor | BufferCursor] = None  # Byte source for the tag walk
+        self._mapping: Optional[mmap.mmap] = None  # Memory map of the file (mmap mode only)
+        self._size_struct: Optional[struct.Struct] = None  # Big endian long (dm3) or long long (dm4)
+        self._simple_structs: Dict[int, struct.Struct] = dict()  # Simple type readers in file endianness
+        self._numpy_dtypes: Dict[int, np.dtype] = dict()  # Simple type array dtypes in file endianness
+        self._utf16_codec: Optional[str] = None  # Codec for ushort (UTF-16) tag strings
+        self._struct_dtypes: Dict[Tuple[int, ...], np.dtype] = dict()  # Structured dtypes per struct format
+        self.array_threshold = array_threshold
+        self.lazy = lazy
+        self._lazy_lock = threading.Lock()  # Serializes group loads sharing the cursor
+        self._pending_groups = 0  # Lazy groups not decoded yet, the buffer is closed at 0
+        self._path_filter: Optional[TagPathFilter] = None  # include/exclude paths of parse_file
+        self._block_end: Optional[int] = None  # End offset of the last DM4 group header read
+        # Dispatch table keyword -> (format catcher, reader, skipper), built once
+        self._parsers = self._get_callable_parsers_dictionary()
 
     # =============================================================================
     # PUBLIC METHODS
@@ -76,113 +160,317 @@ class DM_InfoParser:
 
     @file.setter
     def file(self, file: TextIO) -> None:
-        """Set the file handle for parsing operations."""
+        """
+        Set the file handle for parsing operations.
+
+        Besides binary file objects, the uploaded content itself can be given as
+        ``bytes``, ``bytearray``, ``memoryview`` or ``BytesIO``; it is then parsed in
+        place, and ``filename`` must hold the original file name.
+        """
         self._file = file
 
-    def parse_file(self) -> Dict[str, Any]:
-        """Parse the entire DM file and return the information dictionary."""
+    def parse_file(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Parse the DM file and return the information dictionary.
+
+        Parameters
+        ----------
+        include : list of str, optional
+            Only parse the tags under these paths (e.g. ``["ImageList/*/ImageData",
+            "**/ImageTags/EELS"]``), see TagPathFilter. Everything by default.
+        exclude : list of str, optional
+            Skip the tags under these paths (e.g. ``["DocumentObjectList"]``).
+            Skipped DM4 groups are jumped over using their stored size.
+
+        Groups walked on the way to an included path are kept, even when none of
+        their children was selected.
+        """
         self._check_extension_in_fname()
-        self._process_file_header()
-        nnames = self._read_ParentBlockSize_info()
-        self.information_dictionary["root"] = dict()
-        self._parse_Blocks(nnames, self.information_dictionary, "root")
+        self._path_filter = TagPathFilter(include, exclude) if (include is not None or exclude) else None
+        self._pending_groups = 0
+        self._open_cursor()
+        if self.lazy and not isinstance(self._cursor, BufferCursor):
+            _logger.warning("Lazy parsing needs a mapped buffer, parsing the whole tag tree instead.")
+            self.lazy = False
+        try:
+            self._process_file_header()
+            nnames = self._read_ParentBlockSize_info()
+            self.information_dictionary["root"] = dict()
+            root_path = () if self._path_filter is not None else None
+            self._parse_Blocks(nnames, self.information_dictionary, "root", root_path)
+        except Exception:
+            self._close_cursor()
+            raise
+        if not self._pending_groups:
+            # Lazy groups keep reading from the buffer until the last one is decoded
+            self._close_cursor()
         return self.information_dictionary
 
+    def open_groups(self, groups: List[Tuple[int, int, str]]) -> List[Dict[str, Any]]:
+        """
+        TagGroups of the file from their (offset, child count, name), as recorded
+        by a lazy parse of the same file (e.g. in a worker process).
+
+        The groups are LazyTagGroups owning the buffer of the parser, as after a lazy
+        parse_file(); they are decoded right away if the file cannot be mapped.
+        """
+        if not groups:
+            return []
+        self._check_extension_in_fname()
+        self._path_filter = None
+        self._open_cursor()
+        try:
+            self._process_file_header()
+        except Exception:
+            self._close_cursor()
+            raise
+        self._pending_groups = len(groups)
+        if not isinstance(self._cursor, BufferCursor):
+            self.lazy = False
+            return [self._load_group(offset, nnames, name) for offset, nnames, name in groups]
+        self.lazy = True
+        return [
+            LazyTagGroup(partial(self._load_group, offset, nnames, name), offset, nnames)
+            for offset, nnames, name in groups
+        ]
+
+    def close(self) -> None:
+        """
+        Release the file buffer. Lazy groups not yet accessed can no longer be loaded.
+
+        Only needed to release it early, the buffer is also closed once every lazy
+        group has been decoded.
+        """
+        with self._lazy_lock:
+            self._close_cursor()
+
     # =============================================================================
     # CORE PARSING METHODS
     # =============================================================================
 
     def _process_file_header(self) -> None:
         """Read and validate DM file header (version, size, endianness)."""
-        self._file.seek(0)  # Pointer to the 0 possition
-        self.version = dec.read_long(self._file, "big")  # version : <4 bytes> big endian
+        self._cursor.seek(0)  # Pointer to the 0 possition
+        self.version = self._cursor.unpack(dec.B_long)  # version : <4 bytes> big endian
         if self.version not in [3, 4]:
             # If version != 3 or 4 -> Raises an error -> Unsuported file for DM
             message = f"Expected versions 3 or 4 (.dm3/.dm4). Got {self.version} instead\
-            -> from the header of {self._file.name}"
+            -> from the header of {self._source_name}"
             raise DMVersionError(message)
 
         # The general parser/reader - reads in chuncks of 4 or 8 bytes returning integer values
-        self.parser = dec.read_long if self.version == 3 else dec.read_long_long
-        file_size = self.parser(self._file, "big")  # Full size of file <4 or 8 bytes>
+        self._size_struct = dec.B_long if self.version == 3 else dec.B_long_long
+        file_size = self._cursor.unpack(self._size_struct)  # Full size of file <4 or 8 bytes>
+        self.file_size = file_size
         self.endianness = (
-            "little" if dec.read_long(self._file, "big") else "big"
+            "little" if self._cursor.unpack(dec.B_long) else "big"
         )  # True - little / #False - big
+        # Simple type structs are resolved once per file, not once per value
+        prefix = "<" if self.endianness == "little" else ">"
+        self._simple_structs = {
+            key: struct.Struct(prefix + fmt) for key, fmt in self._simple_formats.items()
+        }
+        self._numpy_dtypes = {
+            key: np.dtype(prefix + fmt) for key, fmt in self._numpy_formats.items()
+        }
+        self._utf16_codec = "utf-16-le" if self.endianness == "little" else "utf-16-be"
+        self._struct_dtypes = dict()
 
         # logging header read - info level
         msg = f"DM version = {self.version} - File size (Bytes) = {file_size} - {self.endianness} endian"
         _logger.info(msg)
 
-    def _parse_Blocks(self, nnames, info_dictionary, parentBlock_name: str = "root"):
+    def _parse_Blocks(
+        self,
+        nnames,
+        info_dictionary,
+        parentBlock_name: str = "root",
+        parent_path: Optional[Tuple[str, ...]] = None,
+        parent_included: bool = False,
+    ):
         """
-        Recursively parse all blocks in the file structure.
+        Parse all blocks in the file structure.
         
         Handles both data blocks (id=21) and parent blocks (id=20) that contain subblocks.
+        parent_path is the path of the parent block while a path filter applies to its
+        children, None when the whole subtree is parsed.
+
+        The tree is walked with an explicit stack of open groups instead of recursion,
+        so any nesting depth can be parsed. Each frame holds, for one group: the number
+        of children left, its dictionary, its filter path and included flag, the index
+        of the reader for its data blocks, and its counters of unnamed data/group blocks.
         """
-        # Local indices for unnamed data/group Blocks
-        noNameData = 0
-        noNameBlock = 0
+        parsers_dict = self._parsers
+        path_filter = self._path_filter
+        lazy = self.lazy
+        read_header = self._read_ChildrenBlock_header
+        read_keyword = self._read_DataBlock_keyword
+        # The Data block of an ImageData group is only skipped (callable_id 2)
+        stack = [[nnames, info_dictionary, parent_path, parent_included,
+                  2 if parentBlock_name == "ImageData" else 1, 0, 0]]
+
+        while stack:
+            frame = stack[-1]
+            if not frame[0]:
+                stack.pop()  # Group finished, back to its parent
+                continue
+            frame[0] -= 1
+            _, info_dictionary, parent_path, parent_included, data_callable_id = frame[:5]
 
-        for _ in range(nnames):
             # NameSpace - Header info
-            identifier, childrenBlock_name = self._read_ChildrenBlock_header()
-            # This is coupled with the dictionary of callers
-            callable_id = (
-                2
-                if (parentBlock_name == "ImageData" and childrenBlock_name == "Data")
-                else 1
-            )
+            identifier, childrenBlock_name = read_header()
 
             if identifier == 21:
                 if not childrenBlock_name:
-                    childrenBlock_name = f"DataBlock{noNameData}"  # NoNameData
-                    noNameData += 1
-                self._read_delimiter()  # Checks the delimiter name - data
-                (
-                    sizeBlock_id,
-                    encryption_type,
-                ) = self._read_DataType_info()  # Type of data header
-                self._check_sizeID_encryption_pair(
-                    sizeBlock_id, encryption_type
-                )  # Checking types
-                # The type pairings are check, so we can use the size to get the correct callables
-                if sizeBlock_id > 3 and encryption_type == 20:  # Array of complex types
-                    keyword = "complexArray"
-                    pass  # Do something -> implement complex type caller
-                else:
-                    keyword = self._get_callable_word(encryption_type)
-
-                parsers_dict = self._get_callable_parsers_dictionary()
-                catcher = parsers_dict[keyword][0]
-                caller = parsers_dict[keyword][callable_id]
-                data = self._process_ChildrensDataBlock(catcher, caller)
+                    childrenBlock_name = f"DataBlock{frame[5]}"  # NoNameData
+                    frame[5] += 1
+                callables = parsers_dict[read_keyword()]
+                callable_id = data_callable_id if childrenBlock_name == "Data" else 1
+                if parent_path is not None and not path_filter.selects_data(
+                    parent_path + (childrenBlock_name,), parent_included
+                ):
+                    callables[2](**callables[0]())  # Filtered out, only skipped
+                    continue
                 # The endgame - creating a dictionary of things ...
-                info_dictionary[childrenBlock_name] = data
+                info_dictionary[childrenBlock_name] = callables[callable_id](**callables[0]())
 
-            elif identifier == 20:  # ChildrenBlock becoming a ParentBlock -> Recursion
+            elif identifier == 20:  # ChildrenBlock becoming a ParentBlock -> new frame
                 if not childrenBlock_name:
-                    childrenBlock_name = f"GroupBlock{noNameBlock}"  # NoNameBlock
-                    noNameBlock += 1
+                    childrenBlock_name = f"GroupBlock{frame[6]}"  # NoNameBlock
+                    frame[6] += 1
                 nnames = self._read_ParentBlockSize_info(
                     read_block_size=True
                 )  # Number of names inside
 
-                info_dictionary[childrenBlock_name] = dict()
-                # Recursion !
-                self._parse_Blocks(
-                    nnames, info_dictionary[childrenBlock_name], childrenBlock_name
-                )
+                child_path, included = None, False
+                if parent_path is not None:
+                    child_path = parent_path + (childrenBlock_name,)
+                    action, included = path_filter.group_action(child_path, parent_included)
+                    if action == SKIP:
+                        self._skip_Group(nnames)
+                        continue
+                    if action == FULL:
+                        child_path = None  # No pattern applies below, parse everything
+
+                if lazy:
+                    # Only the position is recorded, children are decoded on first access
+                    info_dictionary[childrenBlock_name] = self._create_LazyTagGroup(
+                        nnames, childrenBlock_name, child_path, included
+                    )
+                    continue
+
+                group = info_dictionary[childrenBlock_name] = dict()
+                stack.append([nnames, group, child_path, included,
+                              2 if childrenBlock_name == "ImageData" else 1, 0, 0])
 
             else:
                 raise DMIdentifierError(
                     f"Identifier missread while parsing the file. {identifier =}"
                 )
 
-    def _process_ChildrensDataBlock(self, formatCallable, readerCallable):
-        """Process data block using format catcher and data reader."""
-        format_header = formatCallable()
-        data = readerCallable(**format_header)
-        return data
+    def _skip_Group(self, nnames: int) -> None:
+        """
+        Move the pointer past the group whose header was just read.
+
+        DM4 groups are jumped over with a single seek using their stored size.
+        DM3 groups have no size, so their blocks are walked with the _skip_* methods.
+        """
+        if self._block_end is not None and self._seek_block_end():
+            return
+        self._skip_Blocks(nnames)
+
+    def _seek_block_end(self) -> bool:
+        """Seek to the end of the current DM4 group, if its stored size looks consistent."""
+        position = self._cursor.tell()
+        if self._block_end < position:
+            return False
+        try:
+            # The next byte must start a block (20/21) or be end-of-file padding
+            self._cursor.seek(self._block_end)
+            next_identifier = self._cursor.unpack(dec.B_byte)
+        except struct.error:
+            next_identifier = None
+        if next_identifier in (0, 20, 21):
+            self._cursor.seek(self._block_end)
+            return True
+        _logger.warning(f"Inconsistent DM4 group size at offset {position}, walking the group instead.")
+        self._cursor.seek(position)
+        return False
+
+    def _skip_Blocks(self, nnames: int) -> None:
+        """
+        Move the pointer past nnames blocks without decoding them.
+
+        Data blocks only have their format header read, their payload is jumped over.
+        Nested groups are walked with a stack of remaining children counts.
+        """
+        parsers_dict = self._parsers
+        pending = [nnames]
+        while pending:
+            if not pending[-1]:
+                pending.pop()
+                continue
+            pending[-1] -= 1
+            identifier = self._cursor.unpack(dec.B_byte)
+            self._cursor.skip(self._cursor.unpack(dec.B_short))  # Block name is not needed
+
+            if identifier == 21:
+                catcher, _, skipper = parsers_dict[self._read_DataBlock_keyword()]
+                skipper(**catcher())
+            elif identifier == 20:
+                group_nnames = self._read_ParentBlockSize_info(read_block_size=True)
+                if self._block_end is None or not self._seek_block_end():
+                    pending.append(group_nnames)
+            else:
+                raise DMIdentifierError(
+                    f"Identifier missread while skimming the file. {identifier =}"
+                )
+
+    def _create_LazyTagGroup(
+        self,
+        nnames: int,
+        block_name: str,
+        path: Optional[Tuple[str, ...]] = None,
+        included: bool = False,
+    ) -> LazyTagGroup:
+        """Record the current group position and skim past it."""
+        offset = self._cursor.tell()
+        loader = partial(self._load_group, offset, nnames, block_name, path, included)
+        group = LazyTagGroup(loader, offset, nnames)
+        self._skip_Group(nnames)
+        self._pending_groups += 1
+        return group
+
+    def _load_group(
+        self,
+        offset: int,
+        nnames: int,
+        block_name: str,
+        path: Optional[Tuple[str, ...]] = None,
+        included: bool = False,
+    ) -> Dict[str, Any]:
+        """Decode the children of a lazy group (its own subgroups stay lazy)."""
+        with self._lazy_lock:
+            if self._cursor is None:
+                message = f"Cannot load the tag group {block_name}, the parser was closed."
+                _logger.error(message)
+                raise DMFileError(message)
+            position = self._cursor.tell()
+            self._cursor.seek(offset)
+            group = dict()
+            try:
+                self._parse_Blocks(nnames, group, block_name, path, included)
+            finally:
+                self._cursor.seek(position)
+            self._pending_groups -= 1
+            if not self._pending_groups:
+                # The whole tree is decoded, it no longer needs the buffer
+                self._close_cursor()
+        return group
 
     # =============================================================================
     # BLOCK READING METHODS
@@ -192,16 +480,20 @@ class DM_InfoParser:
         """
         Read number of named subblocks in current block.
         
-        For DM4 files, optionally reads block size if read_block_size=True.
+        For DM4 files, optionally reads block size if read_block_size=True. The size
+        is stored right after the block name and counts the bytes that follow it, so
+        the end offset of the group is kept in _block_end for skipping.
         """
-        # Skip deprecated boolean flags (ordered/opened)
-        self._file.seek(2, 1)
-
+        self._block_end = None
         if self.version == 4 and read_block_size:
             # Read block size for DM4 format
-            block_size = self.parser(self._file, "big")
+            block_size = self._cursor.unpack(self._size_struct)
+            self._block_end = self._cursor.tell() + block_size
+
+        # Skip deprecated boolean flags (ordered/opened)
+        self._cursor.skip(2)
 
-        number_of_names = self.parser(self._file, "big")
+        number_of_names = self._cursor.unpack(self._size_struct)
         return number_of_names
 
     def _read_ChildrenBlock_header(self) -> Tuple[int, str]:
@@ -215,9 +507,9 @@ class DM_InfoParser:
             - 20: Contains subblocks (parent)
             - 21: Contains data
         """
-        identifier = dec.read_byte(self._file, "big")  # a single byte integer used as index
+        identifier = self._cursor.unpack(dec.B_byte)  # a single byte integer used as index
         # Reading the name - a string
-        length = dec.read_short(self._file, "big")  # a double byte integer
+        length = self._cursor.unpack(dec.B_short)  # a double byte integer
         block_name = self._read_string(length)
         return identifier, block_name
 
@@ -232,24 +524,34 @@ class DM_InfoParser:
             - size_data_id: 1=simple, 2=string, 3=array, >3=structure/complex
             - encryption_type: Points to specific reader method
         """
-        size_Data_id = self.parser(self._file, "big")
+        size_Data_id = self._cursor.unpack(self._size_struct)
         # Check data size validity
         if size_Data_id < 1:
             msg = f"Invalid {size_Data_id = } < 1. DM does not support this id (parsing error?)"
             _logger.exception(msg)
             raise IOError(msg)
 
-        encryption_type = self.parser(self._file, "big")
+        encryption_type = self._cursor.unpack(self._size_struct)
 
         # Before returning anything, it also checks if the pairings are correct
 
         return size_Data_id, encryption_type
 
+    def _read_DataBlock_keyword(self) -> str:
+        """Read the data block format header and return the keyword of its callables."""
+        self._read_delimiter()  # Checks the delimiter name - data
+        sizeBlock_id, encryption_type = self._read_DataType_info()  # Type of data header
+        self._check_sizeID_encryption_pair(sizeBlock_id, encryption_type)  # Checking types
+        # The type pairings are check, so we can use the size to get the correct callables
+        if sizeBlock_id > 3 and encryption_type == 20:  # Array of complex types
+            return "complexArray"
+        return self._get_callable_word(encryption_type)
+
     def _read_delimiter(self) -> None:
         """Read and validate '%%%%' delimiter between block names and data."""
         if self.version == 4:
             # Skip 8 bytes for DM4 format
-            self._file.seek(8, 1)
+            self._cursor.skip(8)
         delimiter = self._read_string(4)
         if delimiter != "%%%%":
             message = f"Error with the delimiter between blocks.\nExpected %%%%\nGot{delimiter}"
@@ -260,12 +562,58 @@ class DM_InfoParser:
     # UTILITY & HELPER METHODS
     # =============================================================================
 
+    @property
+    def _source_name(self) -> Optional[str]:
+        """Original file name if given, else the name of the file object."""
+        return self.filename or getattr(self._file, "name", None)
+
+    def _open_cursor(self) -> None:
+        """Create the byte cursor for the walk, memory-mapping the file in mmap mode."""
+        # In-memory content is already a buffer, walked in place whatever the mode
+        if isinstance(self._file, io.BytesIO):
+            self._exported_view = self._file.getbuffer()
+            self._cursor = BufferCursor(self._exported_view)
+            return
+        if isinstance(self._file, (bytes, bytearray, memoryview)):
+            self._cursor = BufferCursor(self._file)
+            return
+        if self.use_mmap or self.lazy:
+            try:
+                self._mapping = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            except (AttributeError, OSError, ValueError) as e:
+                _logger.warning(f"Could not memory-map {self._source_name}, using stream reads. {e}")
+            else:
+                self._cursor = BufferCursor(self._mapping)
+                return
+        self._cursor = StreamCursor(self._file)
+
+    def _close_cursor(self) -> None:
+        """Release the cursor and close the memory map, if any."""
+        if self._cursor is not None:
+            self._cursor.release()
+            self._cursor = None
+        if self._mapping is not None:
+            try:
+                self._mapping.close()
+            except BufferError:
+                # Views on the map left in reference cycles (e.g. by numba compiling
+                # the tag scanner kernel on its first call)
+                gc.collect()
+                self._mapping.close()
+            self._mapping = None
+        if self._exported_view is not None:
+            self._exported_view.release()
+            self._exported_view = None
+
     def _check_extension_in_fname(self) -> None:
         """Validate file has dm3 or dm4 extension."""
         # First thing we do is to check is we have an actual valid file
-        fname = (
-            self._file.name
-        )  # It is an opened file, should have a name instance variable ...
+        # Opened files have a name, in-memory content needs the original filename
+        fname = self._source_name
+        if not fname:
+            msg = "No file name to check the extension against, set the parser filename."
+            _logger.error(msg)
+            raise DMVersionError(msg)
         if not any(
             [
                 re.search(ext, fname, flags=re.IGNORECASE)
@@ -278,7 +626,7 @@ class DM_InfoParser:
             raise DMVersionError(msg)
 
     def _get_callable_parsers_dictionary(self) -> Dict[str, Tuple[Callable, Callable, Callable]]:
-        """Dictionary mapping data type keywords to their respective parser methods."""
+        """Dictionary mapping data type keywords to their respective parser methods (see _parsers)."""
         dictio = {
             "simpleType": (
                 self._catch_simpleTypeData_format,
@@ -351,8 +699,7 @@ class DM_InfoParser:
                 )
                 _logger.exception(message)
                 raise DMVersionError(message)
-        current_position = self._file.tell()
-        self._file.seek(current_position - nbytes, 0)
+        self._cursor.skip(-nbytes)
 
     # =============================================================================
     # SIMPLE DATA TYPE METHODS
@@ -362,25 +709,25 @@ class DM_InfoParser:
         """Get simple element type from memory for reader configuration."""
 
         self._backtracking_position_in_file()
-        element_type = self.parser(self._file, "big")
+        element_type = self._cursor.unpack(self._size_struct)
         return {"element_type": element_type}
 
     def _read_simpleTypeData(self, element_type: int) -> Any:
         """Read simple data type using appropriate decoder."""
-        data = self._simple_parsers_dictionary[element_type][0](self._file, self.endianness)
+        data = self._cursor.unpack(self._simple_structs[element_type])
         return data
 
     def _skip_simpleTypeData(self, element_type: int) -> Dict[str, Any]:
         """Skip simple data type and return position info."""
         sizeB = self._simple_parsers_dictionary[element_type][-1]
-        offset = self._file.tell()
+        offset = self._cursor.tell()
         dictionary_simpleDType = {
             "size": 1,
             "bytes_size": sizeB,
             "offset": offset,
             "endian": self.endianness,
         }
-        self._file.seek(sizeB, 1)  # Skip data
+        self._cursor.skip(sizeB)  # Skip data
         return dictionary_simpleDType
 
     # =============================================================================
@@ -389,16 +736,13 @@ class DM_InfoParser:
 
     def _catch_string_format(self):
         """Get string length from file header."""
-        length = self.parser(self._file, "big")
+        length = self._cursor.unpack(self._size_struct)
         return {"length": length}
 
     def _read_string(self, length: int, methods: List | None = None) -> str:
         """Read and decode string of specified length."""
-        # Reading files
-        list_characters = [
-            dec.read_char(self._file, self.endianness) for _ in range(length)
-        ]
-        string_byte_characters = b"".join(list_characters)
+        # Reading the raw bytes in one go (a view when parsing a mapped buffer)
+        string_byte_characters = self._cursor.read(length)
         string = " - "
         # Decoding byte-strings
         if not methods:
@@ -406,7 +750,7 @@ class DM_InfoParser:
         # Loop through the possible decoding methods
         for decoding_method in methods:
             try:
-                string = string_byte_characters.decode(decoding_method)
+                string = str(string_byte_characters, decoding_method)
             except UnicodeError as e:
                 msg = f"Failed reading with an encoding {decoding_method}"
                 _logger.warning(msg)
@@ -416,8 +760,8 @@ class DM_InfoParser:
 
     def _skip_string(self, length: int, data=False):
         """Skip string reading and return position info."""
-        offset = self._file.tell()
-        self._file.seek(length, 1)  # Skip string data
+        offset = self._cursor.tell()
+        self._cursor.skip(length)  # Skip string data
         string_info = {
             "size": length,
             "bytes_size": length,
@@ -432,13 +776,13 @@ class DM_InfoParser:
 
     def _catch_structure_format(self):
         """Read structure format descriptor from file."""
-        self.parser(self._file, "big")  # Skip struct length (not needed)
-        n_fields = self.parser(self._file, "big")
+        self._cursor.unpack(self._size_struct)  # Skip struct length (not needed)
+        n_fields = self._cursor.unpack(self._size_struct)
         # Read field types
         s_format = []
         for _ in range(n_fields):
-            self.parser(self._file, "big")  # Skip field length (not needed)
-            s_format.append(self.parser(self._file, "big"))
+            self._cursor.unpack(self._size_struct)  # Skip field length (not needed)
+            s_format.append(self._cursor.unpack(self._size_struct))
         return {"struct_format": tuple(s_format)}
 
     def _read_structure(self, struct_format):
@@ -449,7 +793,7 @@ class DM_InfoParser:
         # Read struct values
         values = []
         for num_type in struct_format:
-            data = self._simple_parsers_dictionary[num_type][0](self._file, self.endianness)
+            data = self._cursor.unpack(self._simple_structs[num_type])
             values.append(data)
 
         return tuple(values)
@@ -460,12 +804,12 @@ class DM_InfoParser:
         self._check_multipleElementObjects_DataTypes(struct_format)
 
         # Calculate size and skip
-        offset = self._file.tell()
+        offset = self._cursor.tell()
         struct_Bsize = 0
         for num_type in struct_format:
             struct_Bsize += self._simple_parsers_dictionary[num_type][-1]
 
-        self._file.seek(struct_Bsize, 1)  # Skip struct data
+        self._cursor.skip(struct_Bsize)  # Skip struct data
 
         # Create the info dictionary
         dictionary_struct_info = {
@@ -484,8 +828,8 @@ class DM_InfoParser:
     def _catch_simpleTypesArray_format(self):
         """Read array format (element type and length) from file header."""
         # Read array header
-        element_encryption = self.parser(self._file, "big")
-        size = self.parser(self._file, "big")
+        element_encryption = self._cursor.unpack(self._size_struct)
+        size = self._cursor.unpack(self._size_struct)
         return {"element_encryption_type": element_encryption, "length": size}
 
     def _read_simpleTypesArray(self, element_encryption_type, length):
@@ -493,17 +837,25 @@ class DM_InfoParser:
         # Validate element type
         self._check_multipleElementObjects_DataTypes([element_encryption_type])
 
-        reader = self._simple_parsers_dictionary[element_encryption_type][0]
-        data = [reader(self._file, self.endianness) for _ in range(length)]
-        
+        dtype = self._numpy_dtypes[element_encryption_type]
+        raw = self._cursor.read(dtype.itemsize * length)
+
         # Convert to string if appropriate (type 4 = ushort, often used for strings)
-        if element_encryption_type == 4 and data:
+        if element_encryption_type == 4 and length:
             try:
-                data = "".join([chr(i) for i in data])
-            except Exception as e:
-                _logger.warning(f"Skipped array-to-string conversion. Exception: {e}")
-                data = self._skip_string(length=length * 2)
-        return data
+                return str(raw, self._utf16_codec, "surrogatepass")
+            except UnicodeDecodeError as e:
+                _logger.warning(f"UTF-16 decoding failed, converting code units one by one. Exception: {e}")
+                return "".join([chr(i) for i in np.frombuffer(raw, dtype=dtype).tolist()])
+
+        array = np.frombuffer(raw, dtype=dtype)
+        if length > self.array_threshold:
+            # Own copy in native byte order, so no view on the file buffer outlives the parse
+            return array.astype(dtype.newbyteorder("="))
+        if element_encryption_type == 9:
+            # Keep one bytes object per char (numpy would strip null characters)
+            return [bytes(raw[i:i + 1]) for i in range(length)]
+        return array.tolist()
 
     def _skip_simpleTypesArray(self, element_encryption_type, length):
         """Skip simple array reading and return position info."""
@@ -521,9 +873,9 @@ class DM_InfoParser:
             "size": length,  # Size of the array (number of elements)
             "endian": self.endianness,  # endianess of the elements
             "bytes_size": size_bytes,  # Size of the array in bytes
-            "offset": self._file.tell(),
+            "offset": self._cursor.tell(),
         }  # offset position of the array in the memory
-        self._file.seek(size_bytes, 1)  # Skipping data -> Not read
+        self._cursor.skip(size_bytes)  # Skipping data -> Not read
         return data
 
     # =============================================================================
@@ -532,11 +884,11 @@ class DM_InfoParser:
 
     def _catch_complexTypesArray_format(self):
         """Read format header for complex arrays (strings, structures, arrays)."""
-        element_encryption_type = self.parser(self._file, "big")
+        element_encryption_type = self._cursor.unpack(self._size_struct)
         keyword = self._get_callable_word(element_encryption_type)
-        parsers_dict = self._get_callable_parsers_dictionary()
+        parsers_dict = self._parsers
         format_definition = parsers_dict[keyword][0]()  # Definition of the elements
-        array_size = self.parser(self._file, "big")
+        array_size = self._cursor.unpack(self._size_struct)
         return {
             "keyword": keyword,
             "array_size": array_size,
@@ -545,22 +897,48 @@ class DM_InfoParser:
 
     def _read_complexTypesArray(self, keyword, array_size, format_definition):
         """Read array of complex types using appropriate reader."""
+        if keyword == "structure":
+            return self._read_structuresArray(array_size, **format_definition)
         # Let us read the arrays of length == array_size
-        reader = self._get_callable_parsers_dictionary()[keyword][1]
+        reader = self._parsers[keyword][1]
         # And we read all the data inside, according to the type of reader we got ...
         data = [reader(**format_definition) for el in range(array_size)]
         return data
 
+    def _read_structuresArray(self, array_size, struct_format):
+        """
+        Read an array of structures (calibration tables, (x, y) lists...) in one buffer read.
+
+        The struct format is mapped to a numpy structured dtype in the file byte order
+        (fields f0, f1, ...). Arrays longer than array_threshold are returned as a record
+        array in native byte order, shorter ones as a list of tuples, like _read_structure.
+        """
+        self._check_multipleElementObjects_DataTypes(struct_format)
+
+        dtype = self._struct_dtypes.get(struct_format)
+        if dtype is None:
+            dtype = self._struct_dtypes[struct_format] = np.dtype([
+                # Raw bytes for chars, 'S1' would strip null characters
+                (f"f{i}", "V1" if num_type == 9 else self._numpy_dtypes[num_type])
+                for i, num_type in enumerate(struct_format)
+            ])
+        raw = self._cursor.read(dtype.itemsize * array_size)
+        array = np.frombuffer(raw, dtype=dtype)
+        if array_size > self.array_threshold:
+            # Own copy in native byte order, so no view on the file buffer outlives the parse
+            return array.astype(dtype.newbyteorder("=")).view(np.recarray)
+        return array.tolist()
+
     def _skip_complexTypesArray(self, keyword, array_size, format_definition):
         """Skip complex array reading and return position info."""
-        skipper = self._get_callable_parsers_dictionary()[keyword][-1]
+        skipper = self._parsers[keyword][-1]
         # This will advance an element_size length the pointer position in memory,
         # appart from retrieving the offset, size, size in bytes and endiannes in a
         # data dictionary
         element_data = skipper(**format_definition)
         # We advance the pointer the (array_size -1)*element_bytesSize positions
         # still to be moved
-        self._file.seek(element_data["bytes_size"] * (array_size - 1), 1)
+        self._cursor.skip(element_data["bytes_size"] * (array_size - 1))
         # We substitute the size by the actual array size read from header
         element_data["size"] = array_size
         # and the size in bytes by the actual size for the whole array
@@ -0,0 +1,130 @@
+"""
+Incremental DM3/DM4 header parsing, for files still being received.
+
+An upload arrives in chunks, and its tag tree is mostly known long before the
+last chunk: the tags ahead of the image data come first, the large data blocks
+are only skipped by the tag scanner, and a few tags follow them. DM_StreamParser
+is fed the prefix of the file received so far, validates the file header as
+soon as it is there, and scans the tag tree as far as that prefix allows. Once
+the whole tree is scanned, parse_file() only decodes the tags from the table.
+"""
+
+import numpy as np
+from typing import Optional
+
+from .dm_info_parser import DM_InfoParser
+from .dm_tag_scanner import DM_TagScanner, TAG_TABLE_DTYPE, SCAN_OK, SCAN_TRUNCATED, _SCAN_ERRORS, _SIMPLE_SIZES
+from ..decoders import BufferCursor
+from whateels.helpers.logging import Logger
+
+_logger = Logger.get_logger("dm_tag_scanner.log", __name__)
+
+# File header and root group header of a DM4 file (the larger of the two versions)
+_HEADER_BYTES = 26
+
+
+class DM_StreamParser(DM_TagScanner):
+    """
+    DM_TagScanner fed incrementally with the bytes of a file being received.
+
+    Call update() with the prefix received so far (any buffer, e.g. a memory map
+    of the partial file): the file header is checked first, so a file that is not
+    a DM3/DM4 file raises DMVersionError with its first chunk. The tag tree is then
+    scanned from the start as far as the prefix goes. A scan stopped at a tag not
+    yet received is only run again once the bytes it needs are there, so the data
+    blocks are jumped over in a single step and the scans stay cheap.
+
+    Once complete, parse_file() (called as for DM_TagScanner, on the whole file)
+    decodes the tags from the scanned table without scanning again. Files the
+    scanner does not support are left to the regular walker.
+
+    Parameters
+    ----------
+    filename : str, optional
+        Original name of the file, checked for its extension
+    array_threshold : int, optional
+        Tag arrays with more elements than this are returned as numpy arrays
+    """
+
+    def __init__(
+        self,
+        filename: Optional[str] = None,
+        array_threshold: int = DM_InfoParser._DEFAULT_ARRAY_THRESHOLD,
+    ) -> None:
+        super().__init__(array_threshold=array_threshold)
+        self.filename = filename
+        self.complete = False  # The whole tag tree is scanned
+        self.failed = False  # The scanner stopped on an unsupported tag
+        self.bytes_needed = _HEADER_BYTES  # Prefix length the next scan needs
+        self.tags_located = 0  # Tags scanned so far
+        self._root_tags: Optional[int] = None  # Children of the root group
+        self._root_offset: Optional[int] = None  # Offset of the first root child
+        self._streamed_table: Optional[np.ndarray] = None  # Tag table of the complete scan
+
+    # -- Public Methods --
+
+    def update(self, buffer) -> bool:
+        """
+        Scan the received prefix of the file (bytes-like object).
+
+        Returns
+        -------
+        bool
+            Whether the scan went further than before
+        """
+        view = memoryview(buffer).cast("B")
+        try:
+            if self.complete or self.failed or view.nbytes < self.bytes_needed:
+                return False
+            if self.version is None:
+                self._read_stream_header(view)
+            return self._scan_prefix(view)
+        finally:
+            view.release()
+
+    # -- Private Methods --
+
+    def _read_stream_header(self, view) -> None:
+        """Check the file header and locate the root group, raises DMVersionError for non DM files."""
+        self._check_extension_in_fname()
+        self._cursor = BufferCursor(view)
+        try:
+            self._process_file_header()
+            self._root_tags = self._read_ParentBlockSize_info()
+            self._root_offset = self._cursor.tell()
+        finally:
+            self._cursor.release()
+            self._cursor = None
+
+    def _scan_prefix(self, view) -> bool:
+        from .dm_tag_scan_kernels import _scan_tags  # Loads numba, on the first scan
+
+        buffer = np.frombuffer(view, dtype=np.uint8)
+        size_bytes = 4 if self.version == 3 else 8
+        table, position, status = _scan_tags(
+            buffer, self._root_offset, self._root_tags, size_bytes, self.version == 4, _SIMPLE_SIZES
+        )
+        del buffer
+        progressed = len(table) > self.tags_located
+        self.tags_located = len(table)
+        if status == SCAN_OK:
+            self._streamed_table = np.ascontiguousarray(table).view(TAG_TABLE_DTYPE).reshape(-1)
+            self.bytes_needed = position
+            self.complete = True
+            return True
+        if status != SCAN_TRUNCATED:
+            _logger.warning(
+                f"Tag scanner stopped ({_SCAN_ERRORS[status]}) in {self._source_name}, "
+                "the regular parser will run once the file is received."
+            )
+            self.failed = True
+            return progressed
+        # Stopped at a tag not received yet: position is its end when it is known
+        self.bytes_needed = max(position, view.nbytes + 1)
+        return progressed
+
+    def _scan(self, nnames: int) -> Optional[np.ndarray]:
+        """Table of the streamed scan when complete, a fresh scan otherwise."""
+        if self._streamed_table is not None and self._cursor.tell() == self._root_offset:
+            return self._streamed_table
+        return super()._scan(nnames)
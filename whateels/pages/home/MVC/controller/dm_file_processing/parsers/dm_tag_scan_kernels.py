@@ -0,0 +1,171 @@
+"""
+Numba kernels of DM_TagScanner: the compiled walk of the tag tree.
+
+Kept apart from dm_tag_scanner, and imported by the first scan, so that numba
+is not loaded with the parsers (i.e. with the home page).
+"""
+
+import numpy as np
+from numba import njit
+
+from .dm_tag_scanner import (
+    DEPTH, PARENT, NAME_OFFSET, NAME_LENGTH, TAG, TYPE_CODE, ELEMENT_TYPE, HEADER_OFFSET,
+    DATA_OFFSET, BYTE_SIZE, COUNT, END, _N_COLUMNS,
+    SCAN_OK, SCAN_BAD_IDENTIFIER, SCAN_BAD_DELIMITER, SCAN_UNSUPPORTED_TYPE, SCAN_TRUNCATED,
+)
+
+
+@njit(cache=True)
+def _read_size(buf, pos, size_bytes):
+    """Big endian unsigned integer of size_bytes (4 for dm3, 8 for dm4) at pos."""
+    value = 0
+    for i in range(size_bytes):
+        value = (value << 8) | buf[pos + i]
+    return value
+
+
+@njit(cache=True)
+def _simple_size(type_code, sizes):
+    if 2 <= type_code <= 12:
+        return sizes[type_code]
+    return 0
+
+
+@njit(cache=True)
+def _struct_size(buf, pos, n_fields, size_bytes, sizes):
+    """Byte size of a struct from its (name length, type) field pairs starting at pos, -1 if invalid."""
+    total = 0
+    for field in range(n_fields):
+        field_size = _simple_size(_read_size(buf, pos + (2 * field + 1) * size_bytes, size_bytes), sizes)
+        if field_size == 0:
+            return -1
+        total += field_size
+    return total
+
+
+@njit(cache=True)
+def _scan_tags(buf, pos, n_root_tags, size_bytes, dm4, sizes):
+    """
+    Walk the tag tree from pos (first child of the root group) and build the tag table.
+
+    Returns (table, position after the last tag, status).
+    """
+    n_bytes = buf.size
+    capacity = 1024
+    table = np.zeros((capacity, _N_COLUMNS), dtype=np.int64)
+    n = 0
+    # Stack of open groups: children left and row of the group
+    stack_remaining = np.empty(64, dtype=np.int64)
+    stack_row = np.empty(64, dtype=np.int64)
+    top = 0
+    stack_remaining[0] = n_root_tags
+    stack_row[0] = -1
+
+    while top >= 0:
+        if stack_remaining[top] == 0:
+            row = stack_row[top]
+            if row >= 0:
+                table[row, END] = n
+            top -= 1
+            continue
+        stack_remaining[top] -= 1
+
+        if n == capacity:
+            grown = np.zeros((capacity * 2, _N_COLUMNS), dtype=np.int64)
+            grown[:capacity] = table
+            table = grown
+            capacity *= 2
+
+        if pos + 3 > n_bytes:
+            return table[:n], pos, SCAN_TRUNCATED
+        identifier = buf[pos]
+        name_length = (np.int64(buf[pos + 1]) << 8) | buf[pos + 2]
+        table[n, DEPTH] = top
+        table[n, PARENT] = stack_row[top]
+        table[n, NAME_OFFSET] = pos + 3
+        table[n, NAME_LENGTH] = name_length
+        table[n, TAG] = identifier
+        pos += 3 + name_length
+        table[n, HEADER_OFFSET] = pos
+        if dm4:
+            pos += 8  # Tag size, not needed here
+
+        if identifier == 20:
+            pos += 2  # Deprecated flags (ordered/opened)
+            if pos + size_bytes > n_bytes:
+                return table[:n], pos, SCAN_TRUNCATED
+            n_children = _read_size(buf, pos, size_bytes)
+            pos += size_bytes
+            table[n, DATA_OFFSET] = pos
+            table[n, COUNT] = n_children
+            top += 1
+            if top == stack_row.size:
+                stack_remaining = np.concatenate((stack_remaining, np.empty(top, dtype=np.int64)))
+                stack_row = np.concatenate((stack_row, np.empty(top, dtype=np.int64)))
+            stack_remaining[top] = n_children
+            stack_row[top] = n
+            n += 1
+            continue
+
+        if identifier != 21:
+            return table[:n], pos, SCAN_BAD_IDENTIFIER
+        if pos + 4 + size_bytes > n_bytes:
+            return table[:n], pos, SCAN_TRUNCATED
+        if buf[pos] != 37 or buf[pos + 1] != 37 or buf[pos + 2] != 37 or buf[pos + 3] != 37:
+            return table[:n], pos, SCAN_BAD_DELIMITER
+        pos += 4
+        n_info = _read_size(buf, pos, size_bytes)
+        pos += size_bytes
+        info = pos
+        if n_info < 1 or info + n_info * size_bytes > n_bytes:
+            return table[:n], pos, SCAN_TRUNCATED
+        type_code = _read_size(buf, info, size_bytes)
+
+        element_type = 0
+        if n_info == 1:
+            count = 1
+            byte_size = _simple_size(type_code, sizes)
+            if byte_size == 0:
+                return table[:n], pos, SCAN_UNSUPPORTED_TYPE
+        elif type_code == 18:  # String
+            count = _read_size(buf, info + size_bytes, size_bytes)
+            byte_size = count
+        elif type_code == 15:  # Struct: 15, name length, fields, (name length, type) pairs
+            count = _read_size(buf, info + 2 * size_bytes, size_bytes)
+            byte_size = _struct_size(buf, info + 3 * size_bytes, count, size_bytes, sizes)
+            if byte_size < 0:
+                return table[:n], pos, SCAN_UNSUPPORTED_TYPE
+        elif type_code == 20:  # Array: 20, element type, element definition, length
+            element_type = _read_size(buf, info + size_bytes, size_bytes)
+            if 2 <= element_type <= 12:
+                count = _read_size(buf, info + 2 * size_bytes, size_bytes)
+                byte_size = sizes[element_type] * count
+            elif element_type == 15:
+                n_fields = _read_size(buf, info + 3 * size_bytes, size_bytes)
+                struct_size = _struct_size(buf, info + 4 * size_bytes, n_fields, size_bytes, sizes)
+                if struct_size < 0:
+                    return table[:n], pos, SCAN_UNSUPPORTED_TYPE
+                count = _read_size(buf, info + (4 + 2 * n_fields) * size_bytes, size_bytes)
+                byte_size = struct_size * count
+            elif element_type == 18:
+                string_length = _read_size(buf, info + 2 * size_bytes, size_bytes)
+                count = _read_size(buf, info + 3 * size_bytes, size_bytes)
+                byte_size = string_length * count
+            else:
+                return table[:n], pos, SCAN_UNSUPPORTED_TYPE
+        else:
+            return table[:n], pos, SCAN_UNSUPPORTED_TYPE
+
+        pos = info + n_info * size_bytes
+        table[n, TYPE_CODE] = type_code
+        table[n, ELEMENT_TYPE] = element_type
+        table[n, DATA_OFFSET] = pos
+        table[n, BYTE_SIZE] = byte_size
+        table[n, COUNT] = count
+        table[n, END] = n + 1
+        pos += byte_size
+        if pos > n_bytes:
+            return table[:n], pos, SCAN_TRUNCATED
+        n += 1
+
+    return table[:n], pos, SCAN_OK
@@ -0,0 +1,258 @@
+"""
+Numba-compiled DM3/DM4 tag scanner.
+
+Fast path next to DM_InfoParser: a ``@njit`` kernel (see dm_tag_scan_kernels,
+imported with the first scan so numba does not load with the parsers) runs once
+over the raw ``uint8`` buffer of the file and emits a flat table with one row
+per tag, without decoding any value. The Python layer then only decodes the tags of
+the requested paths, from their table offsets with the DM_InfoParser readers,
+into the usual information dictionary.
+
+Tag table columns (int64, see TAG_TABLE_DTYPE):
+
+- depth: nesting level, 0 for the children of the root group
+- parent: row of the parent group, -1 for the children of the root group
+- name_offset, name_length: position of the tag name in the file
+- tag: 20 for TagGroups, 21 for data tags
+- type_code: DM encoded type of the data (2-12 simple, 15 struct, 18 string, 20 array), 0 for groups
+- element_type: element type of arrays, 0 otherwise
+- header_offset: position right after the name, where the group/data header starts
+- data_offset: position of the payload (of the first child, for groups)
+- byte_size: size of the payload in bytes (0 for groups)
+- count: number of elements (arrays, strings), of fields (structs) or of children (groups)
+- end: row following the tag and all its descendants
+"""
+
+import numpy as np
+from typing import Any, Dict, List, Optional
+
+from .dm_info_parser import DM_InfoParser
+from .tag_path_filter import TagPathFilter, SKIP, FULL
+from ..decoders import BufferCursor
+from whateels.helpers.logging import Logger
+
+_logger = Logger.get_logger("dm_tag_scanner.log", __name__)
+
+# Tag table columns
+DEPTH = 0
+PARENT = 1
+NAME_OFFSET = 2
+NAME_LENGTH = 3
+TAG = 4
+TYPE_CODE = 5
+ELEMENT_TYPE = 6
+HEADER_OFFSET = 7
+DATA_OFFSET = 8
+BYTE_SIZE = 9
+COUNT = 10
+END = 11
+_N_COLUMNS = 12
+
+TAG_TABLE_DTYPE = np.dtype([
+    (name, np.int64) for name in (
+        "depth", "parent", "name_offset", "name_length", "tag", "type_code",
+        "element_type", "header_offset", "data_offset", "byte_size", "count", "end",
+    )
+])
+
+# Scanner status codes
+SCAN_OK = 0
+SCAN_BAD_IDENTIFIER = 1
+SCAN_BAD_DELIMITER = 2
+SCAN_UNSUPPORTED_TYPE = 3
+SCAN_TRUNCATED = 4
+
+_SCAN_ERRORS = {
+    SCAN_BAD_IDENTIFIER: "unknown tag identifier",
+    SCAN_BAD_DELIMITER: "missing %%%% delimiter",
+    SCAN_UNSUPPORTED_TYPE: "unsupported data type",
+    SCAN_TRUNCATED: "tag past the end of the buffer",
+}
+
+# Byte size of the simple types, indexed by type code (0 for non simple types)
+_SIMPLE_SIZES = np.array([0, 0, 2, 4, 2, 4, 4, 8, 1, 1, 1, 8, 8], dtype=np.int64)
+
+
+class DM_TagScanner(DM_InfoParser):
+    """
+    DM_InfoParser fast path: a compiled scan of the tag tree, then decoding of the requested paths.
+
+    Used exactly like DM_InfoParser (``file`` then ``parse_file(include, exclude)``),
+    and returns the same information dictionary. The tag table of the last scan is
+    kept in ``table``. Files that cannot be memory-mapped, or whose tags the scanner
+    does not support, are parsed by the regular walker.
+
+    The scan always covers the whole tree: DM_InfoParser remains faster to parse a
+    few paths of DM4 files, whose excluded groups it skips with a single seek.
+
+    Parameters
+    ----------
+    array_threshold : int, optional
+        Tag arrays with more elements than this are returned as numpy arrays
+    """
+
+    def __init__(self, array_threshold: int = DM_InfoParser._DEFAULT_ARRAY_THRESHOLD) -> None:
+        super().__init__(use_mmap=True, array_threshold=array_threshold, lazy=False)
+        self.table: Optional[np.ndarray] = None  # Tag table (TAG_TABLE_DTYPE records) of the last scan
+
+    def parse_file(
+        self,
+        include: Optional[List[str]] = None,
+        exclude: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Scan the DM file and decode the tags of the requested paths.
+
+        Parameters
+        ----------
+        include : list of str, optional
+            Only decode the tags under these paths, see TagPathFilter. Everything by default.
+        exclude : list of str, optional
+            Do not decode the tags under these paths.
+        """
+        self._check_extension_in_fname()
+        self._path_filter = TagPathFilter(include, exclude) if (include is not None or exclude) else None
+        self._open_cursor()
+        try:
+            self._process_file_header()
+            nnames = self._read_ParentBlockSize_info()
+            self.information_dictionary["root"] = dict()
+            root_path = () if self._path_filter is not None else None
+            self.table = self._scan(nnames) if isinstance(self._cursor, BufferCursor) else None
+            if self.table is None:
+                # Regular walk, from the first child of the root group
+                self._parse_Blocks(nnames, self.information_dictionary, "root", root_path)
+            else:
+                self._build_dictionary(self.table, self.information_dictionary, root_path)
+        finally:
+            self._close_cursor()
+        return self.information_dictionary
+
+    def _scan(self, nnames: int) -> Optional[np.ndarray]:
+        """Run the compiled scanner from the cursor position, None if it failed."""
+        from .dm_tag_scan_kernels import _scan_tags  # Loads numba, on the first scan
+
+        buffer = np.frombuffer(self._cursor.view, dtype=np.uint8)
+        size_bytes = 4 if self.version == 3 else 8
+        table, _, status = _scan_tags(
+            buffer, self._cursor.tell(), nnames, size_bytes, self.version == 4, _SIMPLE_SIZES
+        )
+        del buffer  # The view on the mapping must go before it is closed
+        if status != SCAN_OK:
+            _logger.warning(
+                f"Tag scanner stopped ({_SCAN_ERRORS[status]}) in {self._source_name}, "
+                "using the regular parser."
+            )
+            return None
+        return np.ascontiguousarray(table).view(TAG_TABLE_DTYPE).reshape(-1)
+
+    def _build_dictionary(self, table: np.ndarray, root: Dict[str, Any], root_path=None) -> None:
+        """
+        Decode the requested tags of the table into the information dictionary.
+
+        Only the children of walked groups are visited: skipped groups are jumped over
+        with their end row. Simple values, strings and simple arrays are read straight
+        from their table offsets; other tags go through the regular data block readers.
+        """
+        path_filter = self._path_filter
+        parsers_dict = self._parsers
+        cursor = self._cursor
+        tags = table["tag"].tolist()
+        type_codes = table["type_code"].tolist()
+        element_types = table["element_type"].tolist()
+        name_offsets = table["name_offset"].tolist()
+        name_lengths = table["name_length"].tolist()
+        header_offsets = table["header_offset"].tolist()
+        data_offsets = table["data_offset"].tolist()
+        counts = table["count"].tolist()
+        ends = table["end"].tolist()
+        # All the simple values at once, unless a filter leaves most of them out
+        scalars = self._decode_scalars(table) if path_filter is None else None
+
+        # (first row, stop row, dictionary, filter path, included, reader index of Data)
+        stack = [(0, len(tags), root, root_path, False, 1)]
+        while stack:
+            row, stop, info_dictionary, parent_path, parent_included, data_callable_id = stack.pop()
+            noNameData = 0
+            noNameBlock = 0
+            while row < stop:
+                name = self._tag_name(name_offsets[row], name_lengths[row])
+                if tags[row] == 21:
+                    if not name:
+                        name = f"DataBlock{noNameData}"
+                        noNameData += 1
+                    if parent_path is not None and not path_filter.selects_data(
+                        parent_path + (name,), parent_included
+                    ):
+                        row = ends[row]
+                        continue
+                    type_code = type_codes[row]
+                    if data_callable_id == 2 and name == "Data":
+                        # ImageData/Data is only located, through the regular skipper
+                        cursor.seek(header_offsets[row])
+                        callables = parsers_dict[self._read_DataBlock_keyword()]
+                        info_dictionary[name] = callables[2](**callables[0]())
+                    elif 2 <= type_code <= 12:
+                        if scalars is None:
+                            value = self._simple_structs[type_code].unpack_from(cursor.view, data_offsets[row])[0]
+                        else:
+                            value = scalars[row]
+                        info_dictionary[name] = value
+                    elif type_code == 18:
+                        cursor.seek(data_offsets[row])
+                        info_dictionary[name] = self._read_string(counts[row])
+                    elif type_code == 20 and 2 <= element_types[row] <= 12:
+                        cursor.seek(data_offsets[row])
+                        info_dictionary[name] = self._read_simpleTypesArray(element_types[row], counts[row])
+                    else:
+                        cursor.seek(header_offsets[row])
+                        callables = parsers_dict[self._read_DataBlock_keyword()]
+                        info_dictionary[name] = callables[1](**callables[0]())
+                else:
+                    if not name:
+                        name = f"GroupBlock{noNameBlock}"
+                        noNameBlock += 1
+                    child_path, included = None, False
+                    if parent_path is not None:
+                        child_path = parent_path + (name,)
+                        action, included = path_filter.group_action(child_path, parent_included)
+                        if action == SKIP:
+                            row = ends[row]
+                            continue
+                        if action == FULL:
+                            child_path = None
+                    group = info_dictionary[name] = dict()
+                    stack.append((row + 1, ends[row], group, child_path, included,
+                                  2 if name == "ImageData" else 1))
+                row = ends[row]
+
+    def _decode_scalars(self, table: np.ndarray) -> List[Any]:
+        """
+        Decode every simple (single value) data tag of the table with one numpy gather per type.
+
+        Returns a list with the value of each row, None for the other rows.
+        """
+        buffer = np.frombuffer(self._cursor.view, dtype=np.uint8)
+        type_codes = table["type_code"]
+        scalar_rows = (table["tag"] == 21) & (type_codes >= 2) & (type_codes <= 12)
+        values = np.empty(table.size, dtype=object)
+        for type_code in np.unique(type_codes[scalar_rows]).tolist():
+            rows = np.flatnonzero(scalar_rows & (type_codes == type_code))
+            dtype = self._numpy_dtypes[type_code]
+            if type_code == 9:
+                dtype = np.dtype("V1")  # bytes objects, 'S1' would strip null characters
+            offsets = table["data_offset"][rows]
+            raw = buffer[offsets[:, None] + np.arange(dtype.itemsize)]
+            values[rows] = raw.view(dtype).reshape(-1).tolist()
+        del buffer  # No view on the mapping may outlive the parse
+        return values.tolist()
+
+    def _tag_name(self, offset: int, length: int) -> str:
+        """Decode a tag name of the table."""
+        if not length:
+            return ""
+        try:
+            return str(self._cursor.view[offset:offset + length], "utf8")
+        except UnicodeError:
+            self._cursor.seek(offset)
+            return self._read_string(length)
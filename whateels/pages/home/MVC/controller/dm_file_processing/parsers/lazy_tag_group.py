@@ -0,0 +1,153 @@
+"""
+Lazy TagGroup container for DM3/DM4 metadata.
+
+A LazyTagGroup is a regular ``dict`` whose items are only decoded from the
+DM file the first time the group is accessed. The parser records the file
+offset and child count of each TagGroup while skimming the file, and hands
+a loader over to the group, so code that walks the metadata dictionary
+(DM_EELS_data, the metadata page) works unchanged on a partially decoded tree.
+
+Note that C-level consumers reading the dict storage directly (``json.dumps``
+on the raw tree, for instance) only see groups that were already loaded;
+go through ``items()`` (as ``sanitize_for_json`` does) to walk the full tree.
+"""
+
+from typing import Any, Callable, Dict
+
+
+class LazyTagGroup(dict):
+    """
+    Dictionary of tags decoded on first access.
+
+    Parameters
+    ----------
+    loader : callable
+        Returns the decoded children of the group as a dict. Called once.
+    offset : int
+        File offset of the first child tag of the group.
+    n_tags : int
+        Number of children tags stored in the group.
+    """
+
+    __slots__ = ("_loader", "offset", "n_tags")
+
+    def __init__(self, loader: Callable[[], Dict[str, Any]], offset: int, n_tags: int):
+        super().__init__()
+        self._loader = loader
+        self.offset = offset
+        self.n_tags = n_tags
+
+    @property
+    def is_loaded(self) -> bool:
+        """True once the children of the group have been decoded."""
+        return self._loader is None
+
+    def _load(self) -> None:
+        """Decode the children of the group, if not done yet."""
+        loader = self._loader
+        if loader is not None:
+            self._loader = None
+            dict.update(self, loader())
+
+    # -- Read access --
+
+    def __getitem__(self, key):
+        self._load()
+        return dict.__getitem__(self, key)
+
+    def __contains__(self, key) -> bool:
+        self._load()
+        return dict.__contains__(self, key)
+
+    def __iter__(self):
+        self._load()
+        return dict.__iter__(self)
+
+    def __reversed__(self):
+        self._load()
+        return dict.__reversed__(self)
+
+    def __len__(self) -> int:
+        self._load()
+        return dict.__len__(self)
+
+    def __eq__(self, other) -> bool:
+        self._load()
+        if isinstance(other, LazyTagGroup):
+            other._load()  # dict.__eq__ reads the storage of other directly
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other) -> bool:
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __repr__(self) -> str:
+        if self._loader is not None:
+            return f"LazyTagGroup(<{self.n_tags} tags at offset {self.offset}>)"
+        return dict.__repr__(self)
+
+    def keys(self):
+        self._load()
+        return dict.keys(self)
+
+    def values(self):
+        self._load()
+        return dict.values(self)
+
+    def items(self):
+        self._load()
+        return dict.items(self)
+
+    def get(self, key, default=None):
+        self._load()
+        return dict.get(self, key, default)
+
+    def copy(self) -> dict:
+        self._load()
+        return dict.copy(self)
+
+    def __or__(self, other):
+        self._load()
+        return dict.__or__(self, other)
+
+    def __ror__(self, other):
+        self._load()
+        return dict.__ror__(self, other)
+
+    def __reduce__(self):
+        # Pickle/deepcopy as a plain dict, the loader is bound to an open file buffer
+        return (dict, (self.copy(),))
+
+    # -- Write access (decode first, so loading never overwrites edits) --
+
+    def __setitem__(self, key, value) -> None:
+        self._load()
+        dict.__setitem__(self, key, value)
+
+    def __delitem__(self, key) -> None:
+        self._load()
+        dict.__delitem__(self, key)
+
+    def setdefault(self, key, default=None):
+        self._load()
+        return dict.setdefault(self, key, default)
+
+    def pop(self, key, *args):
+        self._load()
+        return dict.pop(self, key, *args)
+
+    def popitem(self):
+        self._load()
+        return dict.popitem(self)
+
+    def update(self, *args, **kwargs) -> None:
+        self._load()
+        dict.update(self, *args, **kwargs)
+
+    def __ior__(self, other):
+        self._load()
+        return dict.__ior__(self, other)
+
+    def clear(self) -> None:
+        self._loader = None
+        dict.clear(self)
@@ -0,0 +1,89 @@
+"""
+Include/exclude path filter for selective DM tag parsing.
+
+Paths are the keys from the root of the information dictionary joined with
+``/``, e.g. ``ImageList/GroupBlock1/ImageTags/EELS``. Each pattern segment is
+matched with ``fnmatch`` (``*``, ``?``, ``[...]``), and a ``**`` segment
+matches any number of levels, so ``**/ImageTags/EELS`` selects the EELS tags
+of every image.
+
+- include: if given, only tags matching a pattern (and everything below a
+  matching group) are decoded. Groups on the way to a match are walked.
+- exclude: tags matching a pattern are skipped, even inside included groups.
+"""
+
+from fnmatch import fnmatchcase
+from typing import Iterable, Optional, Tuple
+
+# Actions for a TagGroup
+SKIP = 0  # Jump over the whole group
+WALK = 1  # Parse the group, filtering its children
+FULL = 2  # Parse the whole subtree, no pattern can affect it
+
+
+class TagPathFilter:
+    """
+    Decides which tags of the DM tag tree are parsed.
+
+    Parameters
+    ----------
+    include : iterable of str, optional
+        Patterns of the paths to parse. None parses everything.
+    exclude : iterable of str, optional
+        Patterns of the paths to skip.
+    """
+
+    def __init__(self, include: Optional[Iterable[str]] = None, exclude: Optional[Iterable[str]] = None):
+        self.include = None if include is None else [self._split(p) for p in include]
+        self.exclude = [self._split(p) for p in exclude or ()]
+
+    def group_action(self, path: Tuple[str, ...], parent_included: bool) -> Tuple[int, bool]:
+        """
+        Return (action, included) for the TagGroup at path.
+
+        included tells whether the group itself was selected by an include pattern
+        (or an ancestor was), which is passed on as parent_included to its children.
+        """
+        if any(self._match(pattern, path, False) for pattern in self.exclude):
+            return SKIP, False
+        included = parent_included or self._is_included(path)
+        if included:
+            if any(self._match(pattern, path, True) for pattern in self.exclude):
+                return WALK, True
+            return FULL, True
+        if any(self._match(pattern, path, True) for pattern in self.include):
+            return WALK, False
+        return SKIP, False
+
+    def selects_data(self, path: Tuple[str, ...], parent_included: bool) -> bool:
+        """Whether the data tag at path is parsed."""
+        if any(self._match(pattern, path, False) for pattern in self.exclude):
+            return False
+        return parent_included or self._is_included(path)
+
+    def _is_included(self, path: Tuple[str, ...]) -> bool:
+        if self.include is None:
+            return True
+        return any(self._match(pattern, path, False) for pattern in self.include)
+
+    @staticmethod
+    def _split(pattern: str) -> Tuple[str, ...]:
+        return tuple(segment for segment in pattern.strip("/").split("/") if segment)
+
+    @classmethod
+    def _match(cls, pattern: Tuple[str, ...], path: Tuple[str, ...], partial: bool) -> bool:
+        """
+        Match path against pattern.
+
+        With partial=True, tell instead whether some path strictly below this one
+        could match the pattern (i.e. path is an ancestor of possible matches).
+        """
+        if not pattern:
+            return not path and not partial
+        if pattern[0] == "**":
+            if partial:
+                return True
+            return any(cls._match(pattern[1:], path[i:], False) for i in range(len(path) + 1))
+        if not path:
+            return partial
+        return fnmatchcase(path[0], pattern[0]) and cls._match(pattern[1:], path[1:], partial)
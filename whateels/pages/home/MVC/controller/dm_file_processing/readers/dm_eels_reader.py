@@ -13,13 +13,19 @@ Example
     eels_data = reader.read_data()
 """
 
+import time
+from contextlib import nullcontext
+
 from whateels.errors.dm.data import DMEmptyInfoDictionary, DMNonEelsError
 from whateels.shared_state import AppState
 from ..parsers import DM_InfoParser, DM_EELS_data
+from ..cache import HeaderIndexCache
 from whateels.helpers.logging import Logger
 
 _logger = Logger.get_logger("dm_file_reader.log", __name__)
 
+_default_index_cache = None  # Created on first use by DM_EELS_Reader.default_index_cache
+
 class DM_EELS_Reader:
     """
     Reader for DM3/DM4 files containing EELS data.
@@ -30,16 +36,49 @@ class DM_EELS_Reader:
     Parameters
     ----------
     filename : str
-        Path to DM3/DM4 file
+        Path to DM3/DM4 file (the original file name when content is given)
+    use_mmap : bool, optional
+        Parse the tag tree over a memory map of the file (default: True)
+    lazy : bool, optional
+        Decode TagGroups only when first accessed (default: True)
+    index_cache : HeaderIndexCache or False, optional
+        Persistent cache of parsed headers (default: the shared application
+        cache, False disables it). Not used by lazy parses.
+    content_key : ContentKey, optional
+        Key of the file, when the caller already made one (see ContentKey)
+    content : bytes, memoryview or BytesIO, optional
+        In-memory content of the file (e.g. an upload), parsed in place
+    memory_map : bool, optional
+        Map the EELS data of the file instead of reading it (default: False)
     parser : DM_InfoParser, optional
         File parser (defaults to DM_InfoParser)
     handler : DM_EELS_data, optional
         Data handler (defaults to DM_EELS_data)
+
+    The index cache is only used by eager parses (lazy=False), which decode the
+    whole tree: a lookup reads the head and tail blocks of the file, and the whole
+    file is only hashed to confirm an entry found, or to store a tree whose parse
+    took longer than that hashing. Lazy parses (the default, in the server process
+    and in the workers of a ParsePool) skim the tree faster than an entry loads,
+    and parsers given ready, such as the DM_StreamParser of an upload, should be
+    passed index_cache=False.
+
+    The file (or content) is only read while the reader is built. In lazy mode the
+    groups of file_metadata not decoded yet keep the memory map of the parser open:
+    it is closed once the last of them is decoded, when the tree is garbage
+    collected, or by close().
     """
 
     def __init__(
         self,
         filename: str,
+        use_mmap: bool = True,
+        lazy: bool = True,
+        index_cache=None,
+        content_key=None,
+        content=None,
+        memory_map: bool = False,
+        parser: DM_InfoParser = None,
     ):
         """
         Initialize reader with file validation and component injection.
@@ -47,41 +86,83 @@ class DM_EELS_Reader:
         Parameters
         ----------
         filename : str
-            Path to DM3/DM4 file to read
+            Path to DM3/DM4 file to read, or original name of the in-memory content
+        use_mmap : bool, optional
+            Decode the tag headers from a memory map instead of stream reads
+        lazy : bool, optional
+            Skim the tag tree and decode groups on first access, so only the
+            ImageList entries used for the EELS data are decoded up front
+        index_cache : HeaderIndexCache or False, optional
+            Cache looked up before parsing, a hit skips DM_InfoParser entirely.
+            Ignored when the parser is lazy: storing the tree would decode all of
+            its groups, and skimming is about as fast as loading an entry.
+        content_key : ContentKey, optional
+            Key of the file for the index cache, e.g. the one of the dataset
+            caches of the load, so the file is hashed at most once
+        content : bytes, memoryview or BytesIO, optional
+            File content already in memory, so no file is written nor opened.
+            The EELS data is then a read-only view on this buffer.
+        memory_map : bool, optional
+            Return the EELS data as a copy-on-write np.memmap of the file, paged
+            in on access (changes are never written back). Ignored for in-memory content and byte-swapped data.
         parser : DM_InfoParser, optional
-            Custom parser (default: DM_InfoParser)
+            Custom parser (default: DM_InfoParser), e.g. a DM_StreamParser that
+            scanned the file while it was uploaded
         handler : DM_EELS_data, optional  
             Custom handler (default: DM_EELS_data)
         """
 
         self._file_metadata = None
         self._processed_eels_spectrum = None
+        self._use_mmap = use_mmap
+        self._lazy = lazy
+        self._memory_map = memory_map
+        self._index_cache = self.default_index_cache() if index_cache is None else index_cache
+        self._content_key = content_key
+        self._parser = parser
+        self._active_parser = None  # Parser of file_metadata, owns the buffer of its lazy groups
 
-        self._read_data(filename)
+        self._read_data(filename, content)
 
     # -- Public Methods --
-    def _read_data(self, filename: str) -> None:
+    def _read_data(self, filename: str, content=None) -> None:
         """
-        Read and process EELS data from the DM file.
+        Read and process EELS data from the DM file, or from its in-memory content.
         """
 
-        parser = DM_InfoParser()
-        handler = DM_EELS_data()
+        parser = self._parser or DM_InfoParser(use_mmap=self._use_mmap, lazy=self._lazy)
+        parser.filename = filename
+        self._active_parser = parser
+        handler = DM_EELS_data(memory_map=self._memory_map)
+        index_cache = self._index_cache if not parser.lazy else None
 
         file_metadata_dictionary = None
         processed_eels_spectrum = None
 
-        _logger.info(f"Opening file {filename}")
-        
-        with open(filename, "rb") as binary_file_stream:
+        _logger.info(f"Opening file {filename}" if content is None else f"Reading {filename} from memory")
+        source = open(filename, "rb") if content is None else nullcontext(content)
+
+        with source as binary_file_stream:
             # Step 1: Parse file structure and extract metadata
             _logger.info(f"Starting file parsing for {filename}")
             _logger.info(f"Using parser: {parser.__module__}")
 
-            parser.file = binary_file_stream
-            file_metadata_dictionary = parser.parse_file()
-
-            _logger.info("File parsing completed successfully")
+            if index_cache:
+                # One key for the lookup and the store: the file is hashed at most once
+                key = self._content_key or index_cache.key(binary_file_stream)
+                file_metadata_dictionary = index_cache.load(binary_file_stream, key)
+
+            if file_metadata_dictionary is None:
+                parser.file = binary_file_stream
+                start = time.perf_counter()
+                file_metadata_dictionary = parser.parse_file()
+                if index_cache:
+                    index_cache.store(
+                        binary_file_stream, file_metadata_dictionary, time.perf_counter() - start, key
+                    )
+                _logger.info("File parsing completed successfully")
+            else:
+                _logger.info("Parsed header loaded from the index cache")
             _logger.info("##############")
             
             # Step 2: Extract and process EELS data
@@ -96,6 +177,19 @@ class DM_EELS_Reader:
         self._file_metadata = file_metadata_dictionary
         self._processed_eels_spectrum = processed_eels_spectrum
 
+    def close(self) -> None:
+        """Release the file buffer of the parser. Lazy groups not decoded yet can no longer be loaded."""
+        if self._active_parser is not None:
+            self._active_parser.close()
+
+    @staticmethod
+    def default_index_cache() -> HeaderIndexCache:
+        """Return the index cache shared by the readers of this process."""
+        global _default_index_cache
+        if _default_index_cache is None:
+            _default_index_cache = HeaderIndexCache()
+        return _default_index_cache
+
     @property
     def file_metadata(self):
         """Return the file metadata dictionary."""
@@ -0,0 +1,12 @@
+"""
+Data Writers for Home Page Controller
+
+This module contains writers of synthetic DM3/DM4 files, used to test and
+benchmark the DM file processing pipeline without real microscope data.
+"""
+
+from .dm_eels_writer import DM_EELS_Writer
+
+__all__ = [
+    'DM_EELS_Writer'
+]
@@ -0,0 +1,335 @@
+"""
+DM3/DM4 EELS File Writer
+
+Writes synthetic but valid Gatan DigitalMicrograph files, to test and benchmark
+the DM file processing pipeline at any size (1 MB to several GB).
+
+The files hold one EELS image under ``ImageList`` (single spectrum, spectrum line
+or spectrum image) with its calibrations, data type and the microscope tags read
+by DM_EELS_data, plus an optional ``DocumentObjectList`` of filler TagGroups with a
+chosen number of tags and nesting depth. Tag values use the simple type codes of
+DM_InfoParser (2-12), and the image data types are those of DM_EELS_data.
+
+Example
+-------
+    writer = DM_EELS_Writer(version=4, dtype="float32", n_tags=100_000)
+    writer.write("spectrum_image.dm4", shape=(128, 128, 2048))  # (y, x, Eloss)
+"""
+
+import struct
+import numpy as np
+from typing import Any, List, Optional, Tuple
+
+from whateels.helpers.logging import Logger
+
+_logger = Logger.get_logger("dm_eels_writer.log", __name__)
+
+_GROUP = 20
+_DATA = 21
+
+
+class _Tag:
+    """Serialized tag: byte segments, with the total length kept for the DM4 group sizes."""
+
+    __slots__ = ("segments", "length")
+
+    def __init__(self, segments: List[Any]):
+        self.segments = segments
+        self.length = sum(_segment_length(segment) for segment in segments)
+
+
+class _Payload:
+    """Placeholder for the image data, written (or left sparse) when the file is saved."""
+
+    __slots__ = ("nbytes",)
+
+    def __init__(self, nbytes: int):
+        self.nbytes = nbytes
+
+
+def _segment_length(segment) -> int:
+    if isinstance(segment, (bytes, bytearray)):
+        return len(segment)
+    return segment.length if isinstance(segment, _Tag) else segment.nbytes
+
+
+class DM_EELS_Writer:
+    """
+    Writer of synthetic DM3/DM4 EELS files.
+
+    Parameters
+    ----------
+    version : int, optional
+        DM version, 3 or 4. DM3 files are limited to 2 GB (signed 32 bit sizes).
+    little_endian : bool, optional
+        Byte order of the tag values and of the image data
+    dtype : str, optional
+        Image data type, one of the DM_EELS_data supported types (int8, uint8,
+        int16, uint16, int32, uint32, float32, float64)
+    n_tags : int, optional
+        Number of filler data tags written under DocumentObjectList
+    tag_depth : int, optional
+        Nesting depth of the filler groups holding the tags
+    tags_per_group : int, optional
+        Number of filler tags per innermost group
+    fill : str, optional
+        Image data when none is given: "zeros" (sparse file, fast to write) or
+        "ramp" (actual values, written in chunks)
+    energy_offset, energy_scale : float, optional
+        Energy axis calibration (eV)
+    beam_energy : float, optional
+        Acceleration voltage (V)
+    convergence_angle, collection_angle : float, optional
+        Semi-angles (mrad)
+    """
+
+    # numpy dtype -> (DM_EELS_data DataType, DM_InfoParser element type code)
+    _data_types = {
+        "int16": (1, 2),
+        "float32": (2, 6),
+        "uint8": (6, 8),
+        "int32": (7, 3),
+        "int8": (9, 10),
+        "uint16": (10, 4),
+        "uint32": (11, 5),
+        "float64": (12, 7),
+    }
+    # DM_InfoParser simple type code -> struct format of the filler values
+    _simple_formats = {2: "h", 3: "l", 4: "H", 5: "L", 6: "f", 7: "d", 8: "B", 9: "c", 10: "b", 11: "q", 12: "Q"}
+    # Dataset types, as in the home page Constants
+    SINGLE_SPECTRUM = "SSp"
+    SPECTRUM_LINE = "SLi"
+    SPECTRUM_IMAGE = "SIm"
+
+    _CHUNK_ITEMS = 16 * 2**20  # Items per chunk when writing image data
+
+    def __init__(
+        self,
+        version: int = 4,
+        little_endian: bool = True,
+        dtype: str = "float32",
+        n_tags: int = 0,
+        tag_depth: int = 1,
+        tags_per_group: int = 20,
+        fill: str = "zeros",
+        energy_offset: float = 100.0,
+        energy_scale: float = 0.25,
+        beam_energy: float = 200000.0,
+        convergence_angle: float = 10.0,
+        collection_angle: float = 20.0,
+    ):
+        if version not in (3, 4):
+            raise ValueError(f"Expected DM version 3 or 4, got {version}")
+        if np.dtype(dtype).name not in self._data_types:
+            raise ValueError(f"Unsupported image dtype {dtype}, expected one of {tuple(self._data_types)}")
+        if fill not in ("zeros", "ramp"):
+            raise ValueError(f"Unknown fill {fill!r}, expected 'zeros' or 'ramp'")
+        self.version = version
+        self.little_endian = little_endian
+        self.dtype = np.dtype(dtype)
+        self.n_tags = n_tags
+        self.tag_depth = max(1, tag_depth)
+        self.tags_per_group = max(1, tags_per_group)
+        self.fill = fill
+        self.energy_offset = energy_offset
+        self.energy_scale = energy_scale
+        self.beam_energy = beam_energy
+        self.convergence_angle = convergence_angle
+        self.collection_angle = collection_angle
+
+        self._endian = "<" if little_endian else ">"
+        self._size_format = ">l" if version == 3 else ">q"
+
+    # -- Public Methods --
+
+    def write(self, path: str, shape: Tuple[int, ...], data: Optional[np.ndarray] = None) -> int:
+        """
+        Write a DM file and return its size in bytes.
+
+        Parameters
+        ----------
+        path : str
+            Output file (.dm3 or .dm4)
+        shape : tuple of int
+            Dataset shape, in the order of the app datasets: (Eloss,) for a single
+            spectrum, (x, Eloss) for a spectrum line, (y, x, Eloss) for a spectrum image
+        data : numpy.ndarray, optional
+            Image data of that shape, written instead of the fill
+        """
+        shape = tuple(int(n) for n in shape)
+        if not 1 <= len(shape) <= 3:
+            raise ValueError(f"Expected a 1D, 2D or 3D dataset shape, got {shape}")
+        if data is not None and data.shape != shape:
+            raise ValueError(f"Data shape {data.shape} does not match {shape}")
+
+        root = [self._image_list(shape)]
+        if self.n_tags:
+            root.insert(0, self._document_object_list())
+        header_tail = self._group_header(len(root))
+        padding = bytes(8 if self.version == 3 else 16)
+        body_length = len(header_tail) + sum(tag.length for tag in root) + len(padding)
+        total = 12 + (4 if self.version == 4 else 0) + body_length
+        if self.version == 3 and total >= 2**31:
+            raise ValueError(f"DM3 files are limited to 2 GB, {total} bytes requested")
+
+        with open(path, "wb") as f:
+            f.write(struct.pack(">l", self.version))
+            f.write(struct.pack(self._size_format, total))
+            f.write(struct.pack(">l", 1 if self.little_endian else 0))
+            f.write(header_tail)
+            for tag in root:
+                self._write_tag(f, tag, shape, data)
+            f.write(padding)
+            f.truncate(total)
+        _logger.info(f"Wrote {path}: {total} bytes, DM{self.version}, shape {shape}, {self.n_tags} filler tags")
+        return total
+
+    @classmethod
+    def dataset_type(cls, shape: Tuple[int, ...]) -> str:
+        """Dataset type written for a dataset shape (SSp, SLi or SIm)."""
+        return (cls.SINGLE_SPECTRUM, cls.SPECTRUM_LINE, cls.SPECTRUM_IMAGE)[len(shape) - 1]
+
+    # -- Private Methods: image --
+
+    def _image_list(self, shape) -> _Tag:
+        """ImageList with one EELS image, dimensions stored in DM order."""
+        n_energy = shape[-1]
+        energy = (self.energy_scale, -self.energy_offset / self.energy_scale, "eV")
+        if len(shape) == 3:
+            # Spectrum image: x, y, energy (x fastest in the data)
+            dimensions = (shape[1], shape[0], n_energy)
+            calibrations = [(1.0, 0.0, "nm"), (1.0, 0.0, "nm"), energy]
+        elif len(shape) == 2:
+            # Spectrum line: energy along the image width, one row per position
+            dimensions = (n_energy, shape[0])
+            calibrations = [energy, (1.0, 0.0, "nm")]
+        else:
+            dimensions = (n_energy,)
+            calibrations = [energy]
+
+        data_type, element_type = self._data_types[self.dtype.name]
+        n_items = int(np.prod(shape))
+        data = self._data_tag("Data", (20, element_type, n_items), _Payload(n_items * self.dtype.itemsize))
+        image = self._group("", [
+            self._group("ImageData", [
+                self._group("Calibrations", [
+                    self._group("Dimension", [
+                        self._group("", [
+                            self._simple("Origin", 6, origin),
+                            self._simple("Scale", 6, scale),
+                            self._text("Units", units),
+                        ])
+                        for scale, origin, units in calibrations
+                    ]),
+                ]),
+                data,
+                self._simple("DataType", 3, data_type),
+                self._group("Dimensions", [self._simple("", 3, n) for n in dimensions]),
+            ]),
+            self._group("ImageTags", [
+                self._group("Microscope Info", [self._simple("Voltage", 7, self.beam_energy)]),
+                self._group("EELS", [
+                    self._group("Experimental Conditions", [
+                        self._simple("Convergence semi-angle (mrad)", 7, self.convergence_angle),
+                        self._simple("Collection semi-angle (mrad)", 7, self.collection_angle),
+                    ]),
+                ]),
+                self._text("Meta Data Format", self.dataset_type(shape)),
+            ]),
+            self._text("Name", f"Synthetic {self.dataset_type(shape)}"),
+        ])
+        return self._group("ImageList", [image])
+
+    def _write_image_data(self, f, shape, data, nbytes: int) -> None:
+        """Write the image data in DM order (x fastest), in the file byte order."""
+        file_dtype = self.dtype.newbyteorder(self._endian)
+        if data is not None:
+            if data.ndim == 3:
+                data = data.transpose(2, 0, 1)  # (y, x, E) -> (E, y, x)
+            flat = np.ascontiguousarray(data, dtype=file_dtype).reshape(-1)
+        elif self.fill == "zeros":
+            f.seek(nbytes, 1)  # Left sparse, reads back as zeros
+            return
+        else:
+            flat = None
+
+        n_items = nbytes // self.dtype.itemsize
+        for start in range(0, n_items, self._CHUNK_ITEMS):
+            stop = min(start + self._CHUNK_ITEMS, n_items)
+            if flat is not None:
+                chunk = flat[start:stop]
+            else:
+                chunk = (np.arange(start, stop) % 1000).astype(file_dtype)
+            f.write(chunk.tobytes())
+
+    # -- Private Methods: filler tags --
+
+    def _document_object_list(self) -> _Tag:
+        """DocumentObjectList of filler groups: n_tags values nested tag_depth levels deep."""
+        groups = []
+        for first in range(0, self.n_tags, self.tags_per_group):
+            group = self._group("", [
+                self._filler_tag(i) for i in range(first, min(first + self.tags_per_group, self.n_tags))
+            ])
+            for _ in range(self.tag_depth - 1):
+                group = self._group("", [group])
+            groups.append(group)
+        return self._group("DocumentObjectList", groups)
+
+    def _filler_tag(self, i: int) -> _Tag:
+        """One filler tag, cycling through the simple types and text."""
+        type_code = 2 + i % 12
+        if type_code == 13:
+            return self._text(f"Tag {i}", f"value {i}")
+        if type_code == 9:
+            value = bytes([65 + i % 26])
+        elif type_code in (6, 7):
+            value = i * 0.5
+        else:
+            value = i % 100
+        return self._simple(f"Tag {i}", type_code, value)
+
+    # -- Private Methods: tag serialization --
+
+    def _group_header(self, n_children: int) -> bytes:
+        return struct.pack(">bb", 0, 1) + struct.pack(self._size_format, n_children)
+
+    def _tag_header(self, identifier: int, name: str, length: int) -> bytes:
+        encoded = name.encode("latin-1")
+        header = struct.pack(">bh", identifier, len(encoded)) + encoded
+        if self.version == 4:
+            header += struct.pack(">q", length)
+        return header
+
+    def _group(self, name: str, children: List[_Tag]) -> _Tag:
+        body = [self._group_header(len(children))] + children
+        body_length = sum(_segment_length(segment) for segment in body)
+        return _Tag([self._tag_header(_GROUP, name, body_length)] + body)
+
+    def _data_tag(self, name: str, info: Tuple[int, ...], payload) -> _Tag:
+        size = self._size_format
+        body = [b"%%%%" + struct.pack(size, len(info)) + b"".join(struct.pack(size, i) for i in info), payload]
+        body_length = sum(_segment_length(segment) for segment in body)
+        return _Tag([self._tag_header(_DATA, name, body_length)] + body)
+
+    def _simple(self, name: str, type_code: int, value) -> _Tag:
+        return self._data_tag(name, (type_code,), struct.pack(self._endian + self._simple_formats[type_code], value))
+
+    def _text(self, name: str, text: str) -> _Tag:
+        # ushort (UTF-16) array, the way DM stores strings
+        payload = text.encode("utf-16-le" if self.little_endian else "utf-16-be")
+        return self._data_tag(name, (20, 4, len(payload) // 2), payload)
+
+    def _write_tag(self, f, tag: _Tag, shape, data) -> None:
+        """Write a tag and its children, iteratively so deep trees are fine."""
+        stack = [iter(tag.segments)]
+        while stack:
+            segment = next(stack[-1], None)
+            if segment is None:
+                stack.pop()
+            elif isinstance(segment, _Tag):
+                stack.append(iter(segment.segments))
+            elif isinstance(segment, _Payload):
+                self._write_image_data(f, shape, data, segment.nbytes)
+            else:
+                f.write(segment)
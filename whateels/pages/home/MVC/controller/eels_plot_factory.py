@@ -6,16 +6,18 @@ Features:
 - Supports extensible mapping of dataset types to visualizer classes.
 - Provides a consistent interface for visualization components.
 - Handles errors robustly by raising exceptions with clear messages.
+- Imports the visualizers (HoloViews, SciPy, Numba) when the first one is created,
+  not with the page.
 """
 
-from ..view.eels_plots import SpectrumLineVisualizer, SpectrumImageVisualizer
+import importlib
+import traceback
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ..model import Model
     from ..controller import Controller
-
-import traceback
+    from ..view.eels_plots import SpectrumLineVisualizer, SpectrumImageVisualizer
 
 class EELSPlotFactory:
     """
@@ -29,20 +31,23 @@ class EELSPlotFactory:
     # Error message constants
     _UNKNOWN_TYPE_ERROR = "[EELSPlotFactory] Unknown dataset type: '{}'. Supported types: {}"
     _EXCEPTION_ERROR = "[EELSPlotFactory] Exception while creating plot for dataset type '{}': {}"
+
+    # Package of the visualizer classes, imported on first use
+    _VISUALIZERS_PACKAGE = "..view.eels_plots"
     
     def __init__(self, model: "Model", controller: "Controller") -> None:
         self._model = model
         self._controller = controller
         
-        # Mapping of dataset types to visualizer classes
+        # Mapping of dataset types to visualizer class names (in eels_plots)
         # This can be extended with more visualizers as needed
         self._all_spectrum_visualizer = {
-            model.constants.SPECTRUM_LINE: SpectrumLineVisualizer,
-            model.constants.SPECTRUM_IMAGE: SpectrumImageVisualizer,
-            model.constants.SINGLE_SPECTRUM: SpectrumLineVisualizer,  # TODO Assuming single spectrum uses line visualizer
+            model.constants.SPECTRUM_LINE: 'SpectrumLineVisualizer',
+            model.constants.SPECTRUM_IMAGE: 'SpectrumImageVisualizer',
+            model.constants.SINGLE_SPECTRUM: 'SpectrumLineVisualizer',  # TODO Assuming single spectrum uses line visualizer
         }
     
-    def choose_spectrum(self, dataset_type: str) -> SpectrumLineVisualizer | SpectrumImageVisualizer | None:
+    def choose_spectrum(self, dataset_type: str) -> "SpectrumLineVisualizer | SpectrumImageVisualizer | None":
         """
         Instantiates and returns the appropriate EELS visualizer for the specified dataset type.
 
@@ -59,6 +64,7 @@ class EELSPlotFactory:
         try:
             chosed_spectrum_visualizer = self._all_spectrum_visualizer.get(dataset_type)
             if chosed_spectrum_visualizer:
+                chosed_spectrum_visualizer = self._visualizer_class(chosed_spectrum_visualizer)
                 chosed_spectrum_visualizer = chosed_spectrum_visualizer(self._model, self._controller)
                 return chosed_spectrum_visualizer
             else:
@@ -69,4 +75,9 @@ class EELSPlotFactory:
             chosed_spectrum_visualizer = None
             error_msg = self._EXCEPTION_ERROR.format(dataset_type, e)
             traceback.print_exc()
-            raise RuntimeError(error_msg) from e
\ No newline at end of file
+            raise RuntimeError(error_msg) from e
+
+    @classmethod
+    def _visualizer_class(cls, name: str):
+        """The visualizer class called name, its module imported on first use."""
+        return getattr(importlib.import_module(cls._VISUALIZERS_PACKAGE, __package__), name)
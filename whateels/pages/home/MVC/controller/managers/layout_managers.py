@@ -1,4 +1,6 @@
+import html
 import panel as pn
+import param
 from typing import TYPE_CHECKING
 
 if TYPE_CHECKING:
@@ -17,6 +19,15 @@ class LayoutManager:
     code organization and single responsibility principle.
     """
     
+    # Icons of the upload statuses (see UploadItem)
+    _UPLOAD_ICONS = {
+        "queued": "⏳",
+        "loading": "🔄",
+        "loaded": "✅",
+        "failed": "❌",
+        "cancelled": "⛔",
+    }
+
     def __init__(self, view: "View"):
         """
         Initialize the LayoutManager with a reference to the View.
@@ -27,10 +38,39 @@ class LayoutManager:
         self.view = view
     
     def show_loading_placeholder_in_main_layout(self):
-        """Show the loading placeholder in the main layout."""
+        """Show the loading placeholder in the main layout, its progress reset."""
+        self.update_loading_progress(None, "")
         self.view.main.clear()
         self.view.main.append(self.view.loading_placeholder)
+
+    def update_loading_progress(self, fraction, message: str):
+        """Show the progress of the processing (fraction from 0 to 1, None if unknown) and its current step."""
+        self.view.loading_progress.value = -1 if fraction is None else int(round(100 * fraction))
+        self.view.loading_status.object = f"<p class='feedback-message'>{html.escape(message)}</p>" if message else ""
         
+    def update_upload_status(self, items):
+        """Show the status and progress of the uploaded files (UploadItem list)."""
+        rows = []
+        for item in items:
+            percent = f" {item.fraction:.0%}" if item.status == "loading" else ""
+            rows.append(
+                f"<li class='upload-item {item.status}'>"
+                f"<span class='upload-name'>{html.escape(item.filename)}</span> "
+                f"<span class='upload-state'>{self._UPLOAD_ICONS.get(item.status, '')} "
+                f"{html.escape(item.message)}{percent}</span></li>"
+            )
+        self.view.upload_status.object = f"<ul class='upload-status'>{''.join(rows)}</ul>" if rows else ""
+
+    def update_dataset_selector(self, filenames, active_filename):
+        """List the loaded files in the dataset selector, shown once there are several."""
+        selector = self.view.dataset_selector
+        # Set programmatically: the selection watchers are not triggered
+        with param.parameterized.discard_events(selector):
+            selector.options = list(filenames)
+            if active_filename in filenames:
+                selector.value = active_filename
+        selector.visible = len(filenames) > 1
+
     def reset_main_layout(self):
         """Reset the main layout to the no-file placeholder."""
         self.view.main.clear()
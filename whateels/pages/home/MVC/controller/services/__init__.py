@@ -8,5 +8,15 @@ operations, keeping the main controller focused on orchestration.
 from .eels_file_processor import EELSFileProcessor
 from .eels_data_processor import EELSDataProcessor
 from .file_operation import FileOperation
+from .chunked_backend import ChunkedBackend
+from .data_sanitizer import DataSanitizer, DataQualityProfile
+from .dtype_policy import DTypePolicy
+from .spectrum_layout import SpectrumLayout
+from .dataset_cache import DatasetCache
+from .memory_dataset_cache import MemoryDatasetCache
+from .streaming_upload import StreamingUpload
+from .task_runner import TaskRunner, CancellationToken, OperationCancelled
+from .parse_pool import ParsePool
+from .upload_queue import UploadQueue, UploadItem
 
-__all__ = ['EELSFileProcessor', 'EELSDataProcessor', 'FileOperation']
\ No newline at end of file
+__all__ = ['EELSFileProcessor', 'EELSDataProcessor', 'FileOperation', 'ChunkedBackend', 'DataSanitizer', 'DataQualityProfile', 'DTypePolicy', 'SpectrumLayout', 'DatasetCache', 'MemoryDatasetCache', 'StreamingUpload', 'TaskRunner', 'CancellationToken', 'OperationCancelled', 'ParsePool', 'UploadQueue', 'UploadItem']
\ No newline at end of file
@@ -0,0 +1,164 @@
+"""
+Chunked (out-of-core) backend for very large spectrum images.
+
+Spectrum images larger than the memory budget are wrapped in dask arrays chunked
+along y/x (whole spectra per chunk), so reductions such as the sum image, NaN
+cleaning and per-pixel analyses stream through the cube chunk by chunk instead of
+materializing it, or its temporaries, in RAM.
+
+dask is an optional dependency: without it the backend is unavailable and the
+datasets stay plain (or memory-mapped) numpy arrays.
+"""
+
+import os
+import numpy as np
+
+try:
+    import dask
+    import dask.array as da
+except ImportError:  # Optional dependency
+    dask = None
+    da = None
+
+
+class ChunkedBackend:
+    """
+    Chunks spectrum images so their processing fits in a memory budget.
+
+    The budget bounds the working set of a computation: chunks are sized so that
+    num_workers of them, plus the temporaries of an elementwise operation on each,
+    fit in it.
+
+    Parameters
+    ----------
+    memory_budget : int, optional
+        Bytes the chunked computations may use at once
+    num_workers : int, optional
+        Threads computing chunks in parallel (default: CPU count, at most 8)
+    """
+
+    DEFAULT_MEMORY_BUDGET = 2 * 2**30
+    _TEMPORARIES = 4  # Chunk + temporaries of an operation on it (masks, cleaned copy, ...)
+
+    def __init__(self, memory_budget: int = DEFAULT_MEMORY_BUDGET, num_workers: int = None):
+        self.memory_budget = int(memory_budget)
+        self.num_workers = num_workers or min(8, os.cpu_count() or 1)
+
+    # -- Public Methods --
+
+    @staticmethod
+    def is_available() -> bool:
+        """Whether dask is installed."""
+        return da is not None
+
+    @staticmethod
+    def is_chunked(array) -> bool:
+        """Whether array is a dask (chunked) array."""
+        return da is not None and isinstance(array, da.Array)
+
+    @property
+    def chunk_bytes(self) -> int:
+        """Size budget of a single chunk."""
+        return max(1, self.memory_budget // (self.num_workers * self._TEMPORARIES))
+
+    def should_chunk(self, array) -> bool:
+        """Whether a spectrum image (3D) is too large for the budget and dask is available."""
+        return self.is_available() and array.ndim == 3 and array.nbytes > self.memory_budget
+
+    def chunk(self, array, energy_axis: int = 0):
+        """
+        Wrap a spectrum image (numpy array or np.memmap) in a dask array.
+
+        Chunks hold whole spectra: the energy axis is never split, rows (y) are
+        split first and columns (x) only when a single row exceeds the chunk budget.
+
+        Parameters
+        ----------
+        array : numpy.ndarray
+            3D cube, in DM order (Eloss, y, x) by default
+        energy_axis : int, optional
+            Position of the energy axis (0 for DM order, 2 for (y, x, Eloss))
+        """
+        if not self.is_available():
+            raise ImportError("The chunked backend requires dask (pip install dask)")
+        chunks = self._chunk_shape(array.shape, array.dtype.itemsize, energy_axis)
+        # lock=False: slices of numpy arrays and memory maps are thread-safe reads.
+        # name=False: a random name, tokenizing would hash the whole cube.
+        return da.from_array(
+            _BlockSource(array), chunks=chunks, lock=False, asarray=False, name=False,
+            meta=np.empty((0,) * array.ndim, dtype=array.dtype),
+        )
+
+    def compute(self, *objects):
+        """Compute dask arrays (or xarray objects backed by them) within the worker budget.
+
+        Returns a tuple, like dask.compute. Objects that are not chunked are returned as is.
+        """
+        if dask is None:
+            return objects
+        with dask.config.set(scheduler="threads", num_workers=self.num_workers):
+            return dask.compute(*objects)
+
+    def reduce_blocks(self, function, data):
+        """List of function(block) for every block of a chunked array, computed in a single pass."""
+        blocks = data.to_delayed().ravel()
+        return list(self.compute(*[dask.delayed(function)(block) for block in blocks]))
+
+    def map_spectra(self, function, data, dtype=None, drop_energy: bool = True):
+        """
+        Apply a per-pixel analysis to every spectrum of a chunked (y, x, Eloss) cube.
+
+        function receives a (ny, nx, Eloss) block and returns a (ny, nx) result per
+        pixel (drop_energy=True) or a block of the same shape. The result is lazy,
+        computed chunk by chunk with compute().
+        """
+        if not self.is_chunked(data):
+            return function(data)
+        dtype = dtype or data.dtype
+        if drop_energy:
+            return da.map_blocks(function, data, dtype=dtype, drop_axis=2)
+        return da.map_blocks(function, data, dtype=dtype)
+
+    # -- Private Methods --
+
+    def _chunk_shape(self, shape, itemsize, energy_axis):
+        spatial_axes = [axis for axis in range(3) if axis != energy_axis]
+        y_axis, x_axis = spatial_axes
+        n_energy = shape[energy_axis]
+        n_y, n_x = shape[y_axis], shape[x_axis]
+
+        spectra = max(1, self.chunk_bytes // (n_energy * itemsize))
+        if spectra >= n_x:
+            chunk_y, chunk_x = min(n_y, spectra // n_x), n_x
+        else:
+            chunk_y, chunk_x = 1, spectra
+
+        chunks = [0, 0, 0]
+        chunks[energy_axis] = n_energy
+        chunks[y_axis] = max(1, chunk_y)
+        chunks[x_axis] = max(1, chunk_x)
+        return tuple(chunks)
+
+    def __repr__(self):
+        budget = self.memory_budget / 2**20
+        return f"ChunkedBackend(memory_budget={budget:.0f} MiB, num_workers={self.num_workers})"
+
+
+class _BlockSource:
+    """
+    Read-only array-like over a numpy array or memory map.
+
+    dask.array.from_array copies array-likes that have a copy() method, which would
+    read a whole memory-mapped cube into RAM. This wrapper only hands out the blocks.
+    """
+
+    __slots__ = ("array", "shape", "dtype", "ndim")
+
+    def __init__(self, array):
+        self.array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.ndim = array.ndim
+
+    def __getitem__(self, key):
+        return np.asarray(self.array[key])
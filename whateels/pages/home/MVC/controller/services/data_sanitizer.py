@@ -0,0 +1,247 @@
+"""
+Single-pass sanitization of EELS data.
+
+One numba kernel walks the ElectronCount cube once: it replaces NaN/inf values
+(in place when the array is writable) and returns the counts of non-finite values
+together with the min/max/sum of the finite ones. The kernels live in
+data_sanitizer_kernels, imported by the first sanitization, so numba does not
+load with the home page. The resulting DataQualityProfile
+is stored in the dataset attributes, so later stages (dataset cleaning, plots)
+reuse it instead of scanning the cube again.
+
+Integer data cannot hold NaN/inf: it is returned as is, without scanning it
+(see DTypePolicy). Read-only data (e.g. a view on the uploaded bytes) is only
+copied when it does hold non-finite values.
+
+Memory-mapped cubes are not scanned either: the scan would page in the whole
+file, and their copy-on-write mapping turns every page patched in place into
+private memory of the process (the file itself is never written). They are
+returned as is with an unscanned profile (DataQualityProfile.unscanned), so
+the later stages use NaN-skipping reductions, which read the cube anyway.
+"""
+
+import numpy as np
+
+from .chunked_backend import ChunkedBackend
+from .dtype_policy import DTypePolicy
+
+# Layout of the statistics returned by the kernels (see data_sanitizer_kernels)
+_NAN, _POSINF, _NEGINF, _MIN, _MAX, _SUM, _N_STATS = 0, 1, 2, 3, 4, 5, 6
+
+
+class DataQualityProfile:
+    """
+    Data quality of an array, as measured by DataSanitizer before any replacement.
+
+    Attributes
+    ----------
+    size : int
+        Number of values
+    nan_count, posinf_count, neginf_count : int
+        Non-finite values found (and replaced), None if the data was not scanned
+        for them (see unscanned())
+    minimum, maximum, total : float
+        Min, max and sum of the finite values (None for min/max if there are
+        none, None for all three if the data was not scanned, e.g. integer data)
+    sanitized : bool
+        Whether the non-finite values were replaced
+    """
+
+    def __init__(self, size, nan_count=0, posinf_count=0, neginf_count=0,
+                 minimum=None, maximum=None, total=0.0, sanitized=True):
+        self.size = int(size)
+        self.nan_count = None if nan_count is None else int(nan_count)
+        self.posinf_count = None if posinf_count is None else int(posinf_count)
+        self.neginf_count = None if neginf_count is None else int(neginf_count)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.total = None if total is None else float(total)
+        self.sanitized = sanitized
+
+    @classmethod
+    def from_stats(cls, size, stats, sanitized=True):
+        finite = np.isfinite(stats[_MIN])  # min stays +inf without finite values
+        return cls(
+            size,
+            nan_count=stats[_NAN],
+            posinf_count=stats[_POSINF],
+            neginf_count=stats[_NEGINF],
+            minimum=float(stats[_MIN]) if finite else None,
+            maximum=float(stats[_MAX]) if finite else None,
+            total=stats[_SUM],
+            sanitized=sanitized,
+        )
+
+    @classmethod
+    def unscanned(cls, size):
+        """Profile of data left as is, unscanned (e.g. a memory-mapped cube): only its size is known."""
+        return cls(size, nan_count=None, posinf_count=None, neginf_count=None, total=None, sanitized=False)
+
+    @classmethod
+    def from_dict(cls, values):
+        """Profile stored in dataset attributes, None if there is none."""
+        return cls(**values) if values else None
+
+    def to_dict(self):
+        """Plain values, to be stored in the dataset attributes."""
+        return {
+            'size': self.size,
+            'nan_count': self.nan_count,
+            'posinf_count': self.posinf_count,
+            'neginf_count': self.neginf_count,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'total': self.total,
+            'sanitized': self.sanitized,
+        }
+
+    @property
+    def scanned(self) -> bool:
+        """Whether the data was scanned for non-finite values."""
+        return self.nan_count is not None
+
+    @property
+    def inf_count(self):
+        return self.posinf_count + self.neginf_count if self.scanned else None
+
+    @property
+    def non_finite_count(self):
+        return self.nan_count + self.inf_count if self.scanned else None
+
+    @property
+    def is_clean(self) -> bool:
+        """True if the data holds only finite values (now), no further check needed."""
+        return self.sanitized or self.non_finite_count == 0
+
+    @property
+    def mean(self):
+        """Mean of the finite values, None if there are none or the data was not scanned."""
+        if not self.scanned or self.total is None:
+            return None
+        finite = self.size - self.non_finite_count
+        return self.total / finite if finite else None
+
+    def __repr__(self):
+        return (
+            f"DataQualityProfile(size={self.size}, nan={self.nan_count}, inf={self.inf_count}, "
+            f"min={self.minimum}, max={self.maximum}, sum={self.total})"
+        )
+
+
+class DataSanitizer:
+    """
+    Replaces NaN/inf values and profiles the data in a single pass.
+
+    Parameters
+    ----------
+    chunked_backend : ChunkedBackend, optional
+        Computes the profile of chunked (dask) data, chunk by chunk
+    replacement : float, optional
+        Value replacing NaN/inf
+    dtype_policy : DTypePolicy, optional
+        Tells which data types can hold NaN/inf
+    """
+
+    def __init__(
+        self,
+        chunked_backend: ChunkedBackend = None,
+        replacement: float = 0.0,
+        dtype_policy: DTypePolicy = None,
+    ):
+        self.chunked_backend = chunked_backend or ChunkedBackend()
+        self.replacement = replacement
+        self.dtype_policy = dtype_policy or DTypePolicy()
+
+    # --- Public Methods ---
+
+    def sanitize(self, array, memory_mapped: bool = None):
+        """
+        Replace the non-finite values of array and profile it.
+
+        Integer arrays are returned as is, unscanned, and so are memory-mapped cubes
+        (see the module docstring). Writable numpy arrays are fixed in place,
+        read-only ones are copied only if they hold non-finite values. Chunked arrays
+        are profiled in one pass over the chunks and, if needed, cleaned lazily
+        chunk by chunk.
+
+        Parameters
+        ----------
+        array : numpy.ndarray or dask.array.Array
+            Data to sanitize
+        memory_mapped : bool, optional
+            Whether the data is read from a memory map of a file (default: whether
+            array is a np.memmap; pass it for a chunked array over a memory map)
+
+        Returns
+        -------
+        tuple
+            (sanitized array, DataQualityProfile)
+        """
+        chunked = ChunkedBackend.is_chunked(array)
+        if not chunked:
+            array = np.asanyarray(array)
+        if not self.dtype_policy.can_hold_non_finite(array.dtype):
+            # Nothing to replace, the data keeps its native (integer) type
+            return array, DataQualityProfile(array.size, total=None)
+        if memory_mapped is None:
+            memory_mapped = isinstance(array, np.memmap)
+        if memory_mapped:
+            # Not paged in, nor turned into private memory by the replacements
+            return array, DataQualityProfile.unscanned(array.size)
+        if chunked:
+            return self._sanitize_chunked(array)
+        if array.size == 0:
+            return array, DataQualityProfile(0)
+        flat = self._flat(array)
+        if flat is None:
+            # The kernels walk the values in memory order
+            array = np.ascontiguousarray(array)
+            flat = array.reshape(-1)
+
+        from .data_sanitizer_kernels import _profile_kernel, _sanitize_kernel  # Loads numba, on first use
+        if array.flags.writeable:
+            stats = _sanitize_kernel(flat, self.replacement)
+        else:
+            stats = _profile_kernel(flat)
+            if stats[_NAN] or stats[_POSINF] or stats[_NEGINF]:
+                # Copied only when there is something to replace
+                array = np.array(array)
+                _sanitize_kernel(array.reshape(-1), self.replacement)
+        return array, DataQualityProfile.from_stats(array.size, stats)
+
+    # --- Private Methods ---
+
+    @staticmethod
+    def _flat(array):
+        """1D view of the values in memory order (e.g. of a transposed cube), None if there is none."""
+        flat = array.ravel(order='K')
+        return flat if np.may_share_memory(flat, array) else None
+
+    def _sanitize_chunked(self, array):
+        blocks = self.chunked_backend.reduce_blocks(self._profile_block, array)
+        stats = np.zeros(_N_STATS)
+        stats[_MIN], stats[_MAX] = np.inf, -np.inf
+        for block_stats in blocks:
+            stats[[_NAN, _POSINF, _NEGINF, _SUM]] += block_stats[[_NAN, _POSINF, _NEGINF, _SUM]]
+            stats[_MIN] = min(stats[_MIN], block_stats[_MIN])
+            stats[_MAX] = max(stats[_MAX], block_stats[_MAX])
+        if stats[_NAN] or stats[_POSINF] or stats[_NEGINF]:
+            array = array.map_blocks(self._sanitize_block, dtype=array.dtype)
+        return array, DataQualityProfile.from_stats(array.size, stats)
+
+    @staticmethod
+    def _profile_block(block):
+        block = np.asarray(block)
+        if block.size:
+            from .data_sanitizer_kernels import _profile_kernel
+            return _profile_kernel(block.ravel(order='K'))
+        stats = np.zeros(_N_STATS)
+        stats[_MIN], stats[_MAX] = np.inf, -np.inf
+        return stats
+
+    def _sanitize_block(self, block):
+        block = np.array(block)  # Chunks may be views on read-only data
+        if block.size:
+            from .data_sanitizer_kernels import _sanitize_kernel
+            _sanitize_kernel(block.reshape(-1), self.replacement)
+        return block
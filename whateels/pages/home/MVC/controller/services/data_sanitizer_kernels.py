@@ -0,0 +1,59 @@
+"""
+Numba kernels of DataSanitizer: one pass over the values of an array.
+
+Kept apart from data_sanitizer, and imported by the first sanitization, so that
+numba is not loaded with the services (i.e. with the home page).
+"""
+
+import numpy as np
+from numba import njit
+
+from .data_sanitizer import _NAN, _POSINF, _NEGINF, _MIN, _MAX, _SUM, _N_STATS
+
+
+@njit(cache=True, nogil=True)
+def _profile_kernel(flat):
+    """Non-finite counts and min/max/sum of the finite values (read-only)."""
+    stats = np.zeros(_N_STATS)
+    stats[_MIN] = np.inf
+    stats[_MAX] = -np.inf
+    for i in range(flat.size):
+        value = flat[i]
+        if np.isfinite(value):
+            stats[_SUM] += value
+            if value < stats[_MIN]:
+                stats[_MIN] = value
+            if value > stats[_MAX]:
+                stats[_MAX] = value
+        elif np.isnan(value):
+            stats[_NAN] += 1
+        elif value > 0:
+            stats[_POSINF] += 1
+        else:
+            stats[_NEGINF] += 1
+    return stats
+
+
+@njit(cache=True, nogil=True)
+def _sanitize_kernel(flat, replacement):
+    """Same as _profile_kernel, replacing the non-finite values in place."""
+    stats = np.zeros(_N_STATS)
+    stats[_MIN] = np.inf
+    stats[_MAX] = -np.inf
+    for i in range(flat.size):
+        value = flat[i]
+        if np.isfinite(value):
+            stats[_SUM] += value
+            if value < stats[_MIN]:
+                stats[_MIN] = value
+            if value > stats[_MAX]:
+                stats[_MAX] = value
+            continue
+        if np.isnan(value):
+            stats[_NAN] += 1
+        elif value > 0:
+            stats[_POSINF] += 1
+        else:
+            stats[_NEGINF] += 1
+        flat[i] = replacement
+    return stats
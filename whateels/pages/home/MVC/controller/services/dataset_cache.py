@@ -0,0 +1,419 @@
+"""
+Persistent cache of converted EELS datasets.
+
+Turning DM bytes into the cleaned xarray Dataset (parsing, reading, sanitizing,
+reshaping) is repeated in full every time a user drops the same file again.
+DatasetCache stores the converted Dataset on disk, keyed by the file content, in
+a memory-mappable format, so a later load of the same bytes opens the cached
+arrays with mmap instead.
+
+Entries
+-------
+One directory per file, ``<probe>.<digest>/`` (see Keys), holding:
+
+- one raw ``.npy`` file per variable and coordinate (``ElectronCount.npy``,
+  ``x.npy``, ...). ElectronCount is stored spectrum-contiguous (y, x, Eloss).
+- ``metadata.pickle.z``: the parsed tag tree (zlib compressed pickle), shown on
+  the metadata page
+- ``dataset.json``: the sidecar, written last. It holds the format version, the
+  size and digest of the DM file, the dataset attributes and dims, and the
+  dtype, shape, size and BLAKE2b digest of every file of the entry.
+
+Entries are written to a temporary directory renamed into place, so a
+half-written entry is never visible. On a hit, the sidecar, the ``.npy`` headers
+and the file sizes are always checked. The digests are checked for the small
+files, and for the data too with ``verify_data=True``. A corrupted entry is
+dropped. The modification time of the sidecar is the last use of the entry, which
+drives the LRU eviction once the cache exceeds ``max_bytes``.
+
+Keys
+----
+Entries are named by the probe of a ContentKey (the file size plus its first
+and last blocks) and the BLAKE2b digest of the whole file. The file is only
+hashed once an entry is found for its probe, so a miss never hashes it, and
+files sharing a probe get entries of their own. With ``fast_key=True`` the
+probe alone decides (entries named ``<probe>/``), which matches files that only
+differ in between.
+
+Location
+--------
+The cache is off unless App.run is given a disk quota (see configure()); the
+sessions of the process then share one cache in the per-user cache directory.
+Entries hold pickles, so they are not read from a directory other users can
+write to.
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+import xarray as xr
+
+from whateels.helpers.constants import CACHE_ROOT
+from whateels.helpers.private_directory import is_private_directory, make_private_directory
+from ..dm_file_processing import ContentKey
+
+_FORMAT_VERSION = 2
+_SIDECAR = "dataset.json"
+_METADATA = "metadata.pickle.z"
+_TMP_MARK = ".tmp-"
+
+
+class DatasetCache:
+    """
+    On-disk LRU cache of converted datasets, opened memory-mapped.
+
+    Parameters
+    ----------
+    directory : str or Path, optional
+        Where entries are stored (default: ``CACHE_ROOT / "datasets"``)
+    max_bytes : int, optional
+        Disk quota of the cache, least recently used entries are evicted past it
+    fast_key : bool, optional
+        Take the probe match of an entry as a hit, without the digest of the whole file
+    verify_data : bool, optional
+        Also check the digest of the data arrays on every hit (reads them whole)
+    min_load_seconds : float, optional
+        Only store datasets whose conversion took at least this long
+    block_bytes : int, optional
+        Bytes copied (and hashed) per step when writing an array
+    """
+
+    DEFAULT_MAX_BYTES = 4 * 2**30
+    DEFAULT_MIN_LOAD_SECONDS = 0.05
+    BLOCK_BYTES = 64 * 2**20
+    STALE_TMP_SECONDS = 3600  # Temporary directories left by interrupted writes
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(
+        self,
+        directory=None,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        fast_key: bool = False,
+        verify_data: bool = False,
+        min_load_seconds: float = DEFAULT_MIN_LOAD_SECONDS,
+        block_bytes: int = BLOCK_BYTES,
+    ):
+        self.directory = Path(directory) if directory is not None else CACHE_ROOT / "datasets"
+        self.max_bytes = max_bytes
+        self.fast_key = fast_key
+        self.verify_data = verify_data
+        self.min_load_seconds = min_load_seconds
+        self.block_bytes = block_bytes
+        self._writers = []
+
+    # -- Public Methods --
+
+    @classmethod
+    def shared(cls):
+        """Cache shared by the sessions of this process, None while disabled (see configure())."""
+        with cls._shared_lock:
+            return cls._shared
+
+    @classmethod
+    def configure(cls, max_bytes: int, directory=None):
+        """
+        Enable the shared cache with a disk quota (e.g. from App.run), 0 disables it.
+
+        Returns the shared cache, None when disabled.
+        """
+        with cls._shared_lock:
+            if not max_bytes:
+                cls._shared = None
+            elif cls._shared is None or (directory is not None and Path(directory) != cls._shared.directory):
+                cls._shared = cls(directory, max_bytes=max_bytes)
+            else:
+                cls._shared.max_bytes = max_bytes
+            cache = cls._shared
+        if cache is not None:
+            cache.prune()
+        return cache
+
+    @staticmethod
+    def key(source, digest: str = None) -> ContentKey:
+        """Content key of a DM file: a path, an open binary file or in-memory content (see ContentKey)."""
+        return ContentKey.of(source, digest=digest)
+
+    def load(self, key: ContentKey):
+        """
+        Open the cached dataset of key, with its arrays memory-mapped (copy-on-write).
+
+        The file of key is only hashed when an entry is found for its probe. A hit
+        refreshes the entry for the LRU eviction.
+
+        Returns
+        -------
+        tuple or None
+            (dataset, metadata tag tree), None on a miss or a corrupted entry
+        """
+        if not is_private_directory(self.directory):
+            return None
+        found = self._probe_entries(key)
+        if not found:
+            return None  # Not hashed
+        entry = found[0] if self.fast_key else self._entry_path(key)
+        try:
+            with open(entry / _SIDECAR) as f:
+                sidecar = json.load(f)
+            if sidecar.get("version") != _FORMAT_VERSION:
+                raise ValueError(f"unknown entry format v{sidecar.get('version')}")
+            if not self._confirms(sidecar["content"], key):
+                return None  # Another file with the same probe
+            arrays = {
+                name: self._open_array(entry, name, info)
+                for name, info in sidecar["arrays"].items()
+            }
+            metadata = pickle.loads(zlib.decompress(self._read_checked(entry, _METADATA, sidecar["metadata"])))
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Warning: Dropping corrupted dataset cache entry {key.probe}: {e}")
+            self._remove(entry)
+            return None
+
+        coords = {dim: arrays.pop(dim) for dim in sidecar["coords"]}
+        dataset = xr.Dataset(
+            {name: (sidecar["variables"][name], array) for name, array in arrays.items()},
+            coords=coords,
+        )
+        dataset.attrs.update(sidecar["attrs"])
+        try:
+            os.utime(entry / _SIDECAR)
+        except OSError:
+            pass
+        return dataset, metadata
+
+    def store(self, key: ContentKey, dataset, metadata=None, load_seconds: float = None, background: bool = False) -> bool:
+        """
+        Store a converted dataset and its metadata tag tree under key, then enforce the quota.
+
+        Failures are reported and ignored, the cache is only an optimization.
+
+        Parameters
+        ----------
+        key : ContentKey
+            Content key of the DM file (see key()), its digest is computed by the write
+        dataset : xarray.Dataset
+            The converted dataset (numpy, memory-mapped or chunked arrays)
+        metadata : dict, optional
+            Parsed tag tree of the file
+        load_seconds : float, optional
+            How long the conversion took, faster ones than min_load_seconds are not stored
+        background : bool, optional
+            Write the entry in a background thread
+
+        Returns
+        -------
+        bool
+            Whether the entry is (being) written
+        """
+        if load_seconds is not None and load_seconds < self.min_load_seconds:
+            return False
+        # The digest is only needed (and then known from load()) when an entry has the probe of key
+        if self._probe_entries(key) and (self.fast_key or self._entry_path(key).is_dir()):
+            return False
+        if background:
+            writer = threading.Thread(
+                target=self._write_entry, args=(key, dataset, metadata), name="dataset-cache", daemon=True
+            )
+            self._writers = [thread for thread in self._writers if thread.is_alive()] + [writer]
+            writer.start()
+            return True
+        return self._write_entry(key, dataset, metadata)
+
+    def wait(self, timeout: float = None):
+        """Wait for the background writes."""
+        for writer in self._writers:
+            writer.join(timeout)
+
+    def entries(self):
+        """List (path, size in bytes, last use time) of the entries, least recently used first."""
+        if not self.directory.is_dir():
+            return []
+        found = []
+        for path in self.directory.iterdir():
+            if _TMP_MARK in path.name:
+                continue
+            try:
+                last_use = (path / _SIDECAR).stat().st_mtime
+                size = sum(item.stat().st_size for item in path.iterdir())
+            except OSError:
+                continue  # Incomplete or removed meanwhile
+            found.append((path, size, last_use))
+        found.sort(key=lambda entry: entry[2])
+        return found
+
+    def total_bytes(self) -> int:
+        """Current size of the cache in bytes."""
+        return sum(size for _, size, _ in self.entries())
+
+    def prune(self, max_bytes: int = None) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes
+        (default: the cache max_bytes), and leftovers of interrupted writes.
+
+        Returns
+        -------
+        int
+            Number of evicted entries
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        self._remove_stale_tmp()
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+                evicted += 1
+        return evicted
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of removed entries."""
+        return sum(self._remove(path) for path, _, _ in self.entries())
+
+    # -- Private Methods --
+
+    def _entry_path(self, key: ContentKey) -> Path:
+        """Entry of key, named after the digest of its file as well unless fast_key (hashes the file)."""
+        return self.directory / (key.probe if self.fast_key else f"{key.probe}.{key.digest}")
+
+    def _probe_entries(self, key: ContentKey):
+        """Entries of the files with the probe of key."""
+        if not self.directory.is_dir():
+            return []
+        return sorted(
+            path for path in self.directory.glob(f"{key.probe}*")
+            if _TMP_MARK not in path.name and path.name.split(".")[0] == key.probe
+        )
+
+    def _confirms(self, content, key: ContentKey) -> bool:
+        """Whether the content recorded by an entry found for the probe of key is the file of key."""
+        if content["size"] != key.size:
+            return False
+        if self.fast_key or content["digest"] is None:
+            return self.fast_key
+        try:
+            return content["digest"] == key.digest
+        except (OSError, ValueError):
+            return False
+
+    def _write_entry(self, key, dataset, metadata) -> bool:
+        tmp = None
+        try:
+            make_private_directory(self.directory)
+            tmp = Path(tempfile.mkdtemp(prefix=f"{key.probe}{_TMP_MARK}", dir=self.directory))
+            arrays = {}
+            for name, variable in dataset.variables.items():
+                arrays[name] = self._write_array(tmp / f"{name}.npy", variable.data)
+            payload = zlib.compress(pickle.dumps(metadata, protocol=pickle.HIGHEST_PROTOCOL), 1)
+            (tmp / _METADATA).write_bytes(payload)
+            sidecar = {
+                "version": _FORMAT_VERSION,
+                "created": time.time(),
+                "content": {"size": key.size, "digest": None if self.fast_key else key.digest},
+                "variables": {name: list(dataset[name].dims) for name in dataset.data_vars},
+                "coords": list(dataset.coords),
+                "attrs": dataset.attrs,
+                "arrays": arrays,
+                "metadata": {"bytes": len(payload), "digest": hashlib.blake2b(payload).hexdigest()},
+            }
+            with open(tmp / _SIDECAR, "w") as f:
+                json.dump(sidecar, f, default=_to_builtin)
+            os.replace(tmp, self._entry_path(key))
+        except Exception as e:
+            print(f"Warning: Could not store the dataset in the cache: {e}")
+            if tmp is not None:
+                self._remove(tmp)
+            return False
+        self.prune()
+        return True
+
+    def _write_array(self, path, array):
+        """Write array to a .npy file block of rows by block of rows, hashing what is written."""
+        target = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+        digest = hashlib.blake2b()
+        if target.ndim == 0 or target.size == 0:
+            blocks = [(Ellipsis, np.asarray(array))]
+        else:
+            rows = max(1, self.block_bytes // max(1, target[0].nbytes))
+            # Chunked (dask) arrays are computed block by block
+            blocks = (
+                (slice(start, start + rows), array[start:start + rows])
+                for start in range(0, target.shape[0], rows)
+            )
+        for index, block in blocks:
+            # Hashed from memory while written, the file is never read back
+            block = np.ascontiguousarray(block, dtype=target.dtype)
+            target[index] = block
+            digest.update(block.reshape(-1).view(np.uint8))
+        target.flush()
+        info = {
+            "dtype": target.dtype.str,
+            "shape": list(target.shape),
+            "bytes": os.path.getsize(path),
+            "digest": digest.hexdigest(),
+        }
+        del target
+        return info
+
+    def _open_array(self, entry, name, info):
+        """Memory map an array of an entry after checking it against the sidecar."""
+        path = entry / f"{name}.npy"
+        if os.path.getsize(path) != info["bytes"]:
+            raise ValueError(f"{path.name} has {os.path.getsize(path)} bytes, expected {info['bytes']}")
+        array = np.load(path, mmap_mode="c", allow_pickle=False)
+        if array.dtype != np.dtype(info["dtype"]) or list(array.shape) != info["shape"]:
+            raise ValueError(f"{path.name} is {array.dtype} {array.shape}, expected {info['dtype']} {info['shape']}")
+        if self.verify_data or array.nbytes <= self.block_bytes:
+            if hashlib.blake2b(np.ascontiguousarray(array).reshape(-1).view(np.uint8)).hexdigest() != info["digest"]:
+                raise ValueError(f"{path.name} does not match its digest")
+        return array
+
+    @staticmethod
+    def _read_checked(entry, name, info):
+        payload = (entry / name).read_bytes()
+        if len(payload) != info["bytes"] or hashlib.blake2b(payload).hexdigest() != info["digest"]:
+            raise ValueError(f"{name} does not match its digest")
+        return payload
+
+    def _remove_stale_tmp(self):
+        oldest_allowed = time.time() - self.STALE_TMP_SECONDS
+        for path in self.directory.glob(f"*{_TMP_MARK}*"):
+            try:
+                if path.stat().st_mtime < oldest_allowed:
+                    self._remove(path)
+            except OSError:
+                continue
+
+    @staticmethod
+    def _remove(path: Path) -> bool:
+        try:
+            shutil.rmtree(path)
+            return True
+        except OSError:
+            return False
+
+    def __repr__(self):
+        return f"DatasetCache({self.directory}, max_bytes={self.max_bytes / 2**20:.0f} MiB)"
+
+
+def _to_builtin(value):
+    """JSON fallback for the numpy values of dataset attributes."""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
@@ -0,0 +1,87 @@
+"""
+Data type policy of the load pipeline.
+
+DM files store counts as integers (uint16, int32, ...) or float32 (see
+DM_EELS_data._supported_dtypes). The cube keeps its native type from the file to
+the plots: integer cubes cannot hold NaN/inf, so they skip the non-finite handling
+entirely, and float32 cubes are never promoted to float64 by a cleaning step or a
+reduction. Reductions accumulate in an explicitly chosen (wider) type and return
+the native float type, or the exact integer accumulator for integer cubes.
+"""
+
+import numpy as np
+
+
+class DTypePolicy:
+    """
+    Chooses the data types used to process ElectronCount cubes.
+
+    Parameters
+    ----------
+    float_accumulator : numpy dtype, optional
+        Accumulation type of sums over float data (results are cast back to the
+        native float type)
+    """
+
+    def __init__(self, float_accumulator=np.float64):
+        self.float_accumulator = np.dtype(float_accumulator)
+
+    # -- Public Methods --
+
+    @staticmethod
+    def can_hold_non_finite(dtype) -> bool:
+        """Whether data of this type may hold NaN/inf values (float and complex types)."""
+        return np.dtype(dtype).kind in "fc"
+
+    def accumulation_dtype(self, dtype) -> np.dtype:
+        """Type in which sums over data of this type are accumulated."""
+        dtype = np.dtype(dtype)
+        if dtype.kind == "u":
+            return np.dtype(np.uint64)
+        if dtype.kind in "ib":
+            return np.dtype(np.int64)
+        return np.promote_types(dtype, self.float_accumulator)
+
+    def reduction_dtype(self, dtype) -> np.dtype:
+        """Type of the result of a sum: the native float type, the exact accumulator for integers."""
+        dtype = np.dtype(dtype)
+        if self.can_hold_non_finite(dtype):
+            return dtype
+        return self.accumulation_dtype(dtype)
+
+    def sum(self, data, dim, skipna: bool = False):
+        """
+        Sum of a DataArray over dim with the accumulation type of its data.
+
+        skipna=False (the default) is meant for sanitized data: NaN-skipping sums
+        of float data work on a cleaned copy of the whole array.
+        """
+        skipna = skipna and self.can_hold_non_finite(data.dtype)
+        accumulator = self.accumulation_dtype(data.dtype)
+        total = data.sum(dim, dtype=accumulator, skipna=skipna)
+        return total.astype(self.reduction_dtype(data.dtype), copy=False)
+
+    def memory_report(self, dtype, shape) -> dict:
+        """
+        Memory of a cube kept in its native type, compared with the float64 cube a
+        promoting pipeline would hold.
+
+        Returns
+        -------
+        dict
+            dtype, native_bytes, float64_bytes, saved_bytes and saved_ratio
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape, dtype=np.int64))
+        native_bytes = size * dtype.itemsize
+        float64_bytes = size * np.dtype(np.float64).itemsize
+        return {
+            "dtype": dtype.name,
+            "native_bytes": native_bytes,
+            "float64_bytes": float64_bytes,
+            "saved_bytes": float64_bytes - native_bytes,
+            "saved_ratio": 1 - native_bytes / float64_bytes if float64_bytes else 0.0,
+        }
+
+    def __repr__(self):
+        return f"DTypePolicy(float_accumulator={self.float_accumulator.name})"
@@ -25,6 +25,9 @@ Data cleaning → xarray Dataset → Type classification
 
 import numpy as np
 import xarray as xr
+from .chunked_backend import ChunkedBackend
+from .data_sanitizer import DataQualityProfile, DataSanitizer
+from .dtype_policy import DTypePolicy
 
 class EELSDataProcessor:
     """
@@ -39,44 +42,46 @@ class EELSDataProcessor:
     _AXIS_Y = 'y'
     _ELOSS = 'Eloss'
     
-    def __init__(self, model):
-        """Initialize the processor with a Model instance for constants/config."""
+    def __init__(self, model, chunked_backend: ChunkedBackend = None, dtype_policy: DTypePolicy = None):
+        """Initialize the processor with a Model instance for constants/config.
+
+        chunked_backend computes the checks on chunked (dask) data within its memory budget.
+        dtype_policy tells which data needs NaN/inf cleaning (integer data does not).
+        """
         self.model = model
+        self.chunked_backend = chunked_backend or ChunkedBackend(model.constants.MEMORY_BUDGET)
+        self.dtype_policy = dtype_policy or DTypePolicy()
 
     # --- Public Methods ---
 
     def clean_dataset(self, dataset):
-        """Replace NaN/inf values with zeros in data and coordinates."""
+        """Replace NaN/inf values with zeros in data and coordinates.
+
+        The data is only scanned when the dataset has no data quality profile
+        (see DataSanitizer) saying it is already clean, or left unscanned on
+        purpose (memory-mapped cubes); the profile is then stored in the dataset
+        attributes.
+        """
         try:
-            # Clean the main electron count data array
-            electron_count = dataset.ElectronCount.values
-            electron_count = np.nan_to_num(electron_count, nan=0.0, posinf=0.0, neginf=0.0)
-            
+            data_quality_key = self.model.constants.DATA_QUALITY
+            data_quality = DataQualityProfile.from_dict(dataset.attrs.get(data_quality_key))
+            sanitizer = DataSanitizer(self.chunked_backend, dtype_policy=self.dtype_policy)
+
+            # Clean the main electron count data array, in place when possible
+            electron_count = dataset.ElectronCount.data
+            if data_quality is None or (data_quality.scanned and not data_quality.is_clean):
+                electron_count, data_quality = sanitizer.sanitize(electron_count)
+
             # Clean all coordinate arrays to prevent axis issues
-            x_coords = dataset.coords[self._AXIS_X].values
-            y_coords = dataset.coords[self._AXIS_Y].values
-            eloss_coords = dataset.coords[self._ELOSS].values
-
-            # Sanitize coordinate arrays
-            x_coords = np.nan_to_num(x_coords, nan=0.0, posinf=0.0, neginf=0.0)
-            y_coords = np.nan_to_num(y_coords, nan=0.0, posinf=0.0, neginf=0.0)
-            eloss_coords = np.nan_to_num(eloss_coords, nan=0.0, posinf=0.0, neginf=0.0)
-            
-            # Reconstruct dataset with cleaned data and coordinates
-            cleaned_dataset = xr.Dataset(
-                {
-                    'ElectronCount': (dataset.ElectronCount.dims, electron_count)
-                },
-                coords={
-                    self._AXIS_X: x_coords, 
-                    self._AXIS_Y: y_coords, 
-                    self._ELOSS: eloss_coords
-                }
-            )
-            
-            # Preserve original metadata attributes
-            cleaned_dataset.attrs = dataset.attrs.copy()
-            
+            coords = {
+                axis: sanitizer.sanitize(np.array(dataset.coords[axis].values))[0]
+                for axis in (self._AXIS_X, self._AXIS_Y, self._ELOSS)
+            }
+
+            # Same dataset with cleaned data and coordinates, metadata attributes preserved
+            cleaned_dataset = dataset.copy(data={'ElectronCount': electron_count}).assign_coords(coords)
+            cleaned_dataset.attrs[data_quality_key] = data_quality.to_dict()
+
             return cleaned_dataset
         except Exception as e:
             print(f"Warning: Could not clean dataset: {e}")
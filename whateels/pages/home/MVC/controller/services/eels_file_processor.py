@@ -2,94 +2,374 @@
 EELS File Processor for DM3/DM4 file operations.
 
 Handles file I/O, validation, and orchestrates the file-to-dataset pipeline.
-Manages temporary files and delegates data processing to EELSDataProcessor.
+Parses uploads in memory and delegates data processing to EELSDataProcessor.
+Large uploads are spooled to disk and memory-mapped, so the ElectronCount cube
+is paged in on access instead of being held in RAM (uploads streamed to disk
+are loaded from their spool file directly), and spectrum images larger
+than the memory budget are chunked (see ChunkedBackend). Converted datasets can
+be kept in a DatasetCache, so dropping the same file again skips the conversion,
+and in the MemoryDatasetCache of the process, shared by the sessions.
+Files can be read in worker processes of a ParsePool, off the GIL of the server.
 """
 
-import os, numpy as np, xarray as xr, traceback
+import io, os, time, numpy as np, xarray as xr, traceback
 from pathlib import Path
 from whateels.errors.dm.data import DMEmptyInfoDictionary, DMNonEelsError
-from whateels.helpers import TempFile
-from whateels.shared_state import AppState
-from ..dm_file_processing import DM_EELS_Reader
+from whateels.helpers import SpoolFile
+from ..dm_file_processing import DM_EELS_Reader, ContentKey
 from .eels_data_processor import EELSDataProcessor
+from .chunked_backend import ChunkedBackend
+from .data_sanitizer import DataSanitizer
+from .dtype_policy import DTypePolicy
+from .dataset_cache import DatasetCache
+from .memory_dataset_cache import MemoryDatasetCache
+from .streaming_upload import StreamingUpload
+from .task_runner import OperationCancelled
+from .parse_pool import ParsePool
 
 class EELSFileProcessor:
     """
     Handles DM3/DM4 file I/O and orchestrates file-to-dataset processing.
     
-    Manages file validation, temporary files, and coordinates with EELSDataProcessor
+    Manages file validation, in-memory uploads, and coordinates with EELSDataProcessor
     for scientific data operations.
+
+    With memory_map, files are read as a copy-on-write np.memmap of their ElectronCount
+    data block, and uploads of at least spool_threshold bytes are first written to a
+    spool file, removed once the dataset (every array mapping it) is released.
+
+    Spectrum images larger than the memory budget of chunked_backend (default: the
+    model MEMORY_BUDGET) become dask arrays, processed chunk by chunk.
+
+    The ElectronCount data keeps its native type (see dtype_policy): integer cubes
+    are not scanned for NaN/inf, float32 cubes are not promoted.
+
+    With a dataset_cache, converted datasets are stored (in the background) keyed
+    by file content, and later loads of the same content open the cached copy.
+    With an enabled memory_cache, converted datasets are also kept in memory (keyed
+    the same way): later loads, from any session, share their arrays. A load makes
+    one ContentKey, shared by both caches and the index cache of the reader: its
+    probe reads the head and tail of the file, and the whole file is only hashed to
+    confirm a cached entry (streamed uploads are hashed as they arrive).
+
+    With an enabled parse_pool, DM files (and the spool files of uploads) are read
+    in its worker processes, and the ElectronCount data is handed back in shared
+    memory (or mapped from the file). Uploads kept in memory are read in process.
+
+    The tag tree of the last file loaded is kept in metadata, and published to the
+    AppState of the session for the metadata page unless publish_metadata is False
+    (e.g. for the files of a batch, published when shown).
+
+    progress is called with (fraction, message) between the steps of a load. It may
+    raise OperationCancelled to abort the load, which is then raised to the caller.
     """
-    
-    def __init__(self, model):
+
+    # Progress of a load, reported between its steps
+    _STEP_CACHE = (0.05, "Looking for a converted copy...")
+    _STEP_CACHED = (0.5, "Opening the converted copy...")
+    _STEP_READ = (0.1, "Reading the DM file...")
+    _STEP_SANITIZE = (0.35, "Checking the data for NaN/Inf values...")
+    _STEP_DATASET = (0.55, "Building the dataset...")
+
+    SPOOL_THRESHOLD = 256 * 2**20
+
+    def __init__(
+        self,
+        model,
+        memory_map: bool = True,
+        spool_threshold: int = SPOOL_THRESHOLD,
+        chunked_backend: ChunkedBackend = None,
+        dtype_policy: DTypePolicy = None,
+        dataset_cache: DatasetCache = None,
+        progress=None,
+        parse_pool: ParsePool = None,
+        publish_metadata: bool = True,
+        memory_cache: MemoryDatasetCache = None,
+    ):
         self.model = model
+        self.memory_map = memory_map
+        self.spool_threshold = spool_threshold
+        self.chunked_backend = chunked_backend or ChunkedBackend(model.constants.MEMORY_BUDGET)
+        self.dtype_policy = dtype_policy or DTypePolicy()
+        self.dataset_cache = dataset_cache
+        self.progress = progress
+        self.parse_pool = parse_pool
+        self.publish_metadata = publish_metadata
+        self.memory_cache = memory_cache
+        self.metadata = None  # Tag tree of the last file loaded
 
     # -- Public Methods --
 
     def process_upload(self, filename: str, file_content: bytes) -> xr.Dataset:
-        """Process uploaded file bytes into EELS dataset."""
-        # Get the correct file extension from the uploaded filename
-        file_extension = Path(filename).suffix
-        
-        # Create temporary file that will be automatically cleaned up
-        with TempFile(suffix=file_extension, prefix=self.model.constants.TEMP_PREFIX) as temp_path:
-            try:
-                # Write the file content to a temporary file
-                with open(temp_path, 'wb') as f:
-                    f.write(file_content)
-                
-                # Load the DM3/DM4 file and convert to xarray dataset
-                dataset = self.load_dm_file(temp_path)
-                
-                if dataset is not None:
-                    return dataset
-                else:
-                    print(f'Error loading file: {filename}')
-                    return None
-                    
-            except Exception as e:
-                print(f"Error during file upload processing: {e}")
-                traceback.print_exc()
+        """
+        Process uploaded file bytes into EELS dataset.
+
+        The upload is parsed in place, without a temporary file: the ElectronCount
+        data is a view on file_content as long as it needs no cleaning. Large
+        uploads are memory-mapped from a spool file instead (see memory_map).
+        file_content can also be a complete StreamingUpload, already on disk.
+        """
+        try:
+            # Load the DM3/DM4 content and convert to xarray dataset
+            if isinstance(file_content, StreamingUpload):
+                dataset = self._load_streamed_upload(filename, file_content)
+            elif self.memory_map and self._content_size(file_content) >= self.spool_threshold:
+                dataset = self._load_spooled_upload(filename, file_content)
+            else:
+                dataset = self.load_dm_file(filename, file_content)
+
+            if dataset is not None:
+                return dataset
+            else:
+                print(f'Error loading file: {filename}')
                 return None
+
+        except OperationCancelled:
+            raise
+        except Exception as e:
+            print(f"Error during file upload processing: {e}")
+            traceback.print_exc()
+            return None
     
-    def load_dm_file(self, filepath):
-        """Load DM3/DM4 file and convert to xarray dataset with metadata."""
+    def load_dm_file(self, filepath, file_content=None, original_name=None):
+        """
+        Load DM3/DM4 file and convert to xarray dataset with metadata.
+
+        filepath is the path of the file, or the original file name when its
+        content (bytes, memoryview or BytesIO) is given. original_name overrides
+        the name stored in the dataset attributes (e.g. for a spooled upload).
+        """
         try:
             # Check file size first
-            if not self._validate_file_size(filepath):
+            if not self._validate_file_size(filepath, file_content):
                 return None
 
-            # Read the file
-            dm_eels_reader = DM_EELS_Reader(filepath)
+            # Converted before: open the cached copy
+            key = self._cache_key(filepath if file_content is None else file_content)
+            dataset = self._load_cached(key, original_name or filepath)
+            if dataset is not None:
+                return dataset
+
+            return self._convert_and_cache(key, filepath, file_content, original_name)
+
+        except OperationCancelled:
+            raise
+        except Exception as exception:
+            return self._handle_file_error(exception)
+
+    # -- Private Methods --
+
+    def _convert_dm_file(self, filepath, file_content=None, original_name=None, parser=None, key=None):
+        """
+        Read a DM3/DM4 file and convert it to a dataset. Returns (dataset, metadata tag tree).
+
+        parser overrides the parser of the reader (e.g. the DM_StreamParser of an upload).
+        key is the ContentKey of the load, shared with the index cache of the reader.
+        Files (spool files included) are read in the worker processes of an enabled
+        parse_pool, in-memory content in this process (handing it over would copy it).
+        """
+        # Read the file
+        self._report(*self._STEP_READ)
+        if file_content is None and self.parse_pool is not None and self.parse_pool.enabled:
+            spectrum_image, file_metadata_dictionary = self.parse_pool.read(filepath, memory_map=self.memory_map)
+            try:
+                dataset = self._convert_spectrum(spectrum_image, file_metadata_dictionary, original_name or filepath)
+            except BaseException:
+                self.parse_pool.release(spectrum_image.data)
+                raise
+            # The dataset holds the reference of the load on the shared memory of the cube
+            self.parse_pool.bind(dataset, spectrum_image.data)
+            return dataset, file_metadata_dictionary
+
+        # A given parser scanned the tag tree already (e.g. during the upload): no index lookup
+        dm_eels_reader = DM_EELS_Reader(
+            filepath, content=file_content, memory_map=self.memory_map, parser=parser,
+            index_cache=False if parser is not None else None, content_key=key,
+        )
+        file_metadata_dictionary = dm_eels_reader.file_metadata
+        spectrum_image = dm_eels_reader.processed_eels_spectrum
+        dataset = self._convert_spectrum(spectrum_image, file_metadata_dictionary, original_name or filepath)
+        return dataset, file_metadata_dictionary
+
+    def _convert_spectrum(self, spectrum_image, file_metadata_dictionary, filename):
+        """Convert the spectrum read from a DM file (DM_EELS_data) to a dataset."""
+        # Store metadata
+        self._store_metadata(file_metadata_dictionary)
 
-            # Get file metadata
-            file_metadata_dictionary = dm_eels_reader.file_metadata
-            spectrum_image = dm_eels_reader.processed_eels_spectrum
+        # Get data and energy axis
+        electron_count_data = spectrum_image.data
+        energy_axis = spectrum_image.energy_axis
+        energy_calibration = spectrum_image.energy_calibration
 
-            # Store metadata
-            self._store_metadata(file_metadata_dictionary)
+        # Larger than the memory budget: processed chunk by chunk from here on
+        memory_mapped = isinstance(electron_count_data, np.memmap)
+        if self.chunked_backend.should_chunk(electron_count_data):
+            electron_count_data = self.chunked_backend.chunk(electron_count_data)
 
-            # Get data and energy axis
-            electron_count_data = spectrum_image.data
-            energy_axis = spectrum_image.energy_axis
+        # Replace NaN/inf values and profile the data, in a single pass (memory maps are left as is)
+        self._report(*self._STEP_SANITIZE)
+        sanitizer = DataSanitizer(self.chunked_backend, dtype_policy=self.dtype_policy)
+        electron_count_data, data_quality = sanitizer.sanitize(electron_count_data, memory_mapped=memory_mapped)
+        energy_axis, energy_quality = sanitizer.sanitize(np.array(energy_axis))
+        self._log_data_quality(data_quality, energy_quality)
+        if energy_quality.non_finite_count:
+            energy_calibration = None  # The cleaned axis no longer follows the calibration
 
-            # Check for NaN/inf in raw data
-            self._log_data_quality(electron_count_data, energy_axis)
+        # Add metadata and return
+        self._report(*self._STEP_DATASET)
+        return self._create_dataset_from_data(
+            electron_count_data, energy_axis, spectrum_image, filename,
+            data_quality, energy_calibration
+        )
 
-            # Clean energy axis for NaN/inf values
-            energy_axis = np.nan_to_num(energy_axis, nan=0.0, posinf=0.0, neginf=0.0)
+    def _convert_and_cache(self, key, filepath, file_content=None, original_name=None, parser=None):
+        """Convert a DM file, then store the dataset in the caches under key (if any)."""
+        start = time.perf_counter()
+        dataset, metadata = self._convert_dm_file(filepath, file_content, original_name, parser, key)
+        self._store_cached(key, dataset, metadata, time.perf_counter() - start)
+        return dataset
 
-            # Clean electron count data
-            electron_count_data = np.nan_to_num(electron_count_data, nan=0.0, posinf=0.0, neginf=0.0)
+    def _cache_key(self, source, digest=None):
+        """
+        ContentKey of a DM file for the dataset caches, None without a cache.
+
+        Only the head and tail of the file are read here. digest is the digest of the
+        whole file when already known (e.g. computed while the upload streamed in).
+        """
+        if self.dataset_cache is None and not self._memory_cache_enabled():
+            return None
+        self._report(*self._STEP_CACHE)
+        return ContentKey.of(source, digest=digest)
 
-            # Add metadata and return
-            dataset = self._create_dataset_from_data(electron_count_data, energy_axis, spectrum_image, filepath)
+    def _load_cached(self, key, filepath):
+        """The cached dataset of key (in memory, then on disk), None on a miss (or without a cache)."""
+        if key is None:
+            return None
+        cached = self.memory_cache.load(key) if self._memory_cache_enabled() else None
+        if cached is None:
+            cached = self._load_disk_cached(key)
+            if cached is None:
+                return None
+            if self._memory_cache_enabled():
+                self.memory_cache.store(key, *cached)
+        self._report(*self._STEP_CACHED)
+        dataset, metadata = cached
+        self._store_metadata(metadata)
+        dataset.attrs['original_name'] = os.path.basename(filepath)
+        return dataset
+
+    def _load_disk_cached(self, key):
+        """(dataset, metadata) of key in the dataset cache, None on a miss (or without it)."""
+        if self.dataset_cache is None:
+            return None
+        cached = self.dataset_cache.load(key)
+        if cached is None:
+            return None
+        dataset, metadata = cached
+        # The cached cube is already (y, x, Eloss)
+        electron_count = dataset['ElectronCount']
+        if self.chunked_backend.should_chunk(electron_count.data):
+            chunked = self.chunked_backend.chunk(electron_count.data, energy_axis=2)
+            dataset['ElectronCount'] = (electron_count.dims, chunked)
+        return dataset, metadata
+
+    def _store_cached(self, key, dataset, metadata, load_seconds):
+        """Store a converted dataset in memory, and on disk in the background."""
+        if key is None or dataset is None:
+            return
+        if self._memory_cache_enabled():
+            self.memory_cache.store(key, dataset, metadata, parse_pool=self.parse_pool)
+        if self.dataset_cache is not None:
+            self.dataset_cache.store(key, dataset, metadata, load_seconds=load_seconds, background=True)
+
+    def _memory_cache_enabled(self) -> bool:
+        return self.memory_cache is not None and self.memory_cache.enabled
+
+    def _load_spooled_upload(self, filename, file_content):
+        """Write the upload to a spool file and load it memory-mapped."""
+        # Converted before: no need to spool it
+        key = self._cache_key(file_content)
+        dataset = self._load_cached(key, filename)
+        if dataset is not None:
             return dataset
 
+        suffix = Path(filename).suffix
+        spool = SpoolFile(file_content, suffix=suffix, prefix=self.model.constants.TEMP_PREFIX)
+        return self._load_spool(spool, key, filename)
+
+    def _load_streamed_upload(self, filename, upload):
+        """Load an upload streamed to a spool file, its header scanned during the upload."""
+        if upload.error is not None or not upload.complete:
+            print(f"Error: Upload of {filename} is incomplete ({upload.error or 'chunks missing'})")
+            upload.abort()
+            return None
+        try:
+            if not self._validate_file_size(upload.path):
+                upload.abort()
+                return None
+            key = self._cache_key(upload.path, digest=upload.digest)
+            dataset = self._load_cached(key, filename)
+        except OperationCancelled:
+            upload.abort()
+            raise
         except Exception as exception:
+            upload.abort()
             return self._handle_file_error(exception)
+        if dataset is not None:
+            upload.abort()  # The cached copy is used, the spool is not needed
+            return dataset
+        return self._load_spool(upload.spool, key, filename, parser=upload.parser)
 
-    # -- Private Methods --
+    def _load_spool(self, spool, key, filename, parser=None):
+        """Load a spool file, memory-mapped, and keep it as long as the dataset maps it."""
+        try:
+            dataset = self._convert_and_cache(key, spool.path, original_name=filename, parser=parser)
+        except OperationCancelled:
+            spool.remove()
+            raise
+        except Exception as exception:
+            dataset = self._handle_file_error(exception)
+
+        mapping = self._memory_map_of(dataset)
+        if mapping is None:
+            # Not mapped (load failure or byte-swapped data): the spool is not needed
+            spool.remove()
+        else:
+            # The spool lives as long as the map, i.e. as long as the dataset data
+            spool.bind(mapping)
+        return dataset
+
+    def _report(self, fraction, message):
+        """Report the progress of a load, a cancellation checkpoint (see progress)."""
+        if self.progress is not None:
+            self.progress(fraction, message)
+
+    @staticmethod
+    def _memory_map_of(dataset):
+        """The mmap backing the ElectronCount data of a dataset, None if it is not mapped."""
+        if dataset is None:
+            return None
+        data = dataset['ElectronCount'].data
+        if ChunkedBackend.is_chunked(data):
+            # The wrapped array is held by a value of the task graph
+            candidates = [
+                getattr(value, "array", value) for value in dict(data.__dask_graph__()).values()
+            ]
+        else:
+            candidates = [data]
+        for base in candidates:
+            while isinstance(base, np.ndarray):
+                if isinstance(base, np.memmap):
+                    return base._mmap
+                base = base.base
+        return None
+
+    @staticmethod
+    def _content_size(file_content):
+        """Size in bytes of in-memory file content."""
+        if isinstance(file_content, io.BytesIO):
+            return file_content.getbuffer().nbytes
+        return memoryview(file_content).nbytes
 
     def _store_metadata(self, infoDict=None):
         """
@@ -98,38 +378,47 @@ class EELSFileProcessor:
         if not infoDict:
             message = f"Expected an information dictionary from parser. None provided : {infoDict =}"
             raise DMEmptyInfoDictionary(message)
+        self.metadata = infoDict
+        if not self.publish_metadata:
+            return
         try:
-            # Store metadata in AppState for application-wide access
-            AppState().metadata = infoDict
+            # Store metadata in the AppState of the session, for the metadata page
+            self.model.app_state.metadata = infoDict
         except Exception:
             message = f"Failed to store metadata in AppState.\n{infoDict.keys() if infoDict else 'None'}"
             raise DMNonEelsError(message)
 
-    def _validate_file_size(self, filepath):
+    def _validate_file_size(self, filepath, file_content=None):
         """Validate file size for DM files"""
-        file_size = os.path.getsize(filepath)
+        if file_content is None:
+            file_size = os.path.getsize(filepath)
+        else:
+            file_size = self._content_size(file_content)
         
         if file_size < 1000:  # Less than 1KB is suspicious for DM files
             print(f"Error: File size ({file_size} bytes) is too small for a valid DM3/DM4 file. Expected at least 1KB.")
             return False
         return True
     
-    def _log_data_quality(self, electron_count_data, energy_axis):
-        """Log data quality information"""
-        data_nan_count = np.isnan(electron_count_data).sum()
-        data_inf_count = np.isinf(electron_count_data).sum()
-        energy_nan_count = np.isnan(energy_axis).sum()
-        energy_inf_count = np.isinf(energy_axis).sum()
-        
+    @staticmethod
+    def _log_data_quality(data_quality, energy_quality):
+        """Log data quality information, from the profiles measured by DataSanitizer."""
         # Only log if there are quality issues
-        if data_nan_count > 0 or data_inf_count > 0:
-            print(f"Warning: Raw data has {data_nan_count} NaN values and {data_inf_count} Inf values")
-        if energy_nan_count > 0 or energy_inf_count > 0:
-            print(f"Warning: Energy axis has {energy_nan_count} NaN values and {energy_inf_count} Inf values")
+        if data_quality.non_finite_count:
+            print(f"Warning: Raw data has {data_quality.nan_count} NaN values and {data_quality.inf_count} Inf values")
+        if energy_quality.non_finite_count:
+            print(f"Warning: Energy axis has {energy_quality.nan_count} NaN values and {energy_quality.inf_count} Inf values")
     
-    def _create_dataset_from_data(self, electron_count_data, energy_axis, spectrum_image, filepath):
-        """Create xarray dataset from processed data"""
-        eels_data_processor = EELSDataProcessor(self.model)
+    def _create_dataset_from_data(
+        self, electron_count_data, energy_axis, spectrum_image, filepath, data_quality=None, energy_calibration=None
+    ):
+        """Create xarray dataset from processed data.
+
+        data_quality is the profile of the (already sanitized) data, so the
+        dataset cleaning does not scan it again. energy_calibration is the
+        CalibratedAxis of energy_axis, stored for constant-time range lookups.
+        """
+        eels_data_processor = EELSDataProcessor(self.model, self.chunked_backend, self.dtype_policy)
         
         # Process the data using DataService
         processed_data = eels_data_processor.process_data_for_xarray(electron_count_data, energy_axis)
@@ -151,6 +440,11 @@ class EELSFileProcessor:
             coords={'y': y_coordinates, 'x': x_coordinates, 'Eloss': energy_axis}
         )
         
+        if data_quality is not None:
+            dataset.attrs[self.model.constants.DATA_QUALITY] = data_quality.to_dict()
+        if energy_calibration is not None:
+            dataset.attrs[self.model.constants.ENERGY_CALIBRATION] = energy_calibration.to_dict()
+
         # Clean dataset for NaN/inf values
         dataset = eels_data_processor.clean_dataset(dataset)
         
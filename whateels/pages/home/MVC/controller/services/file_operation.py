@@ -2,14 +2,21 @@
 File Operation Service for handling all file-related operations.
 
 Centralizes file upload, removal, and state management logic.
-Coordinates between file processing and UI updates.
+Coordinates between file processing and UI updates. Uploads are processed in
+the background, and only the UI updates run on the event loop: the dropped
+files load in parallel through a bounded queue (see UploadQueue), each with its
+own status, and every loaded dataset is kept so the user can switch between
+them. The plots of the shown dataset are built by a TaskRunner.
 """
 
+import threading
 import traceback
 from .eels_file_processor import EELSFileProcessor
 from .eels_data_processor import EELSDataProcessor
+from .streaming_upload import StreamingUpload
+from .task_runner import TaskRunner, OperationCancelled
+from .upload_queue import UploadQueue, UploadItem
 from ..eels_plot_factory import EELSPlotFactory
-from whateels.shared_state import AppState
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -21,8 +28,10 @@ class FileOperation:
     Service responsible for coordinating all file operations.
     
     Handles:
-    - File upload workflow (processing, validation, UI updates)
-    - File removal workflow (cleanup, UI reset)
+    - File upload workflow (batches loaded in parallel, per-file status, UI updates)
+    - Dataset switching between the loaded files
+    - File removal workflow (cancellation of the processing, cleanup, UI reset)
+    - Session cleanup (close)
     - Error handling and recovery
     - Coordination between file processing and plot creation
     """
@@ -39,96 +48,281 @@ class FileOperation:
         self.controller = controller
         
         # Initialize file processing services
-        self.file_processor = EELSFileProcessor(model)
-        self.data_processor = EELSDataProcessor(model)
+        self.file_processor = self._create_file_processor()
+        self.data_processor = EELSDataProcessor(model, controller.chunked_backend, controller.dtype_policy)
+
+        # Background loading of the dropped files, a bounded number at a time for this session
+        self._upload_queue = UploadQueue(
+            self._load_upload,
+            max_parallel=model.constants.BATCH_PARALLEL,
+            max_workers=model.constants.UPLOAD_WORKERS,
+            on_update=self._show_upload_status,
+            on_loaded=self._handle_upload_loaded,
+        )
+        # Background building of the plots of the shown dataset, one at a time
+        self._task_runner = TaskRunner(model.constants.UPLOAD_WORKERS)
+        # Serializes the dataset changes of the background tasks and of the removals
+        self._dataset_lock = threading.Lock()
     
+    def start_streaming_upload(self, filename: str, on_progress=None) -> StreamingUpload:
+        """
+        Start an upload spooled to disk chunk by chunk (see StreamingUpload).
+
+        Args:
+            filename: Name of the uploaded file
+            on_progress: Called with a status message as the upload progresses
+
+        Returns:
+            StreamingUpload: Receives the chunks, then handed to handle_file_upload
+        """
+        return StreamingUpload(filename, prefix=self.model.constants.TEMP_PREFIX, on_progress=on_progress)
+
     def handle_file_upload(self, filename: str, file_content: bytes) -> bool:
         """
-        Handle the complete file upload workflow.
+        Queue a dropped file, loaded in the background.
+
+        A previous drop of the same file still loading is cancelled. The first file
+        dropped while no other one loads is shown once loaded, with its progress in
+        the loading placeholder; the others are added to the loaded datasets.
         
         Args:
             filename: Name of the uploaded file
-            file_content: Binary content of the uploaded file
+            file_content: Binary content of the uploaded file, or its complete StreamingUpload
             
         Returns:
-            bool: True if successful, False if failed
+            bool: True if the file was queued, False if it could not
         """
         try:
-            # Show loading state
-            self.controller.layout.show_loading_placeholder_in_main_layout()
-            
-            # Process the file
-            dataset = self.file_processor.process_upload(filename, file_content)
-            
-            if dataset is None:
-                self._handle_file_upload_error(filename)
-                return False
-            
-            # Update model with new dataset
-            self.model.dataset = dataset
-            
-            # Create plots and UI components
-            success = self._create_and_display_plots(dataset)
-            
-            if not success:
-                self._handle_file_upload_error(filename)
-                return False
-            
+            item = self._upload_queue.submit(filename, file_content)
+            if item.activate:
+                # Show loading state (the dataset shown so far stays loaded)
+                self._clear_shown_dataset()
+                self.controller.layout.show_loading_placeholder_in_main_layout()
             return True
-                
+
         except Exception as e:
             print(f"Error during file upload: {e}")
             traceback.print_exc()
             self._handle_file_upload_error(filename)
             return False
+
+    def show_dataset(self, filename: str) -> bool:
+        """
+        Show the dataset of a loaded file, its plots built in the background.
+
+        Args:
+            filename: Name of the loaded file
+
+        Returns:
+            bool: True if the file is loaded, False otherwise
+        """
+        dataset = self.model.datasets.get(filename)
+        if dataset is None:
+            return False
+
+        # The layout switch of the previous dataset is no longer needed
+        self.controller.spectrum_layout.cancel()
+        with self._dataset_lock:
+            self.model.dataset = dataset
+            self.model.active_filename = filename
+        self.model.app_state.metadata = self.model.file_metadata.get(filename)
+        self._update_dataset_selector()
+
+        self.controller.layout.show_loading_placeholder_in_main_layout()
+        self._task_runner.submit(
+            lambda token, progress: self._build_visualizer(dataset, token, progress),
+            on_done=lambda chosen_spectrum: self._show_upload(filename, chosen_spectrum),
+            on_error=lambda _: self._handle_file_upload_error(filename),
+            on_progress=self.controller.layout.update_loading_progress,
+        )
+        return True
+
+    def cancel_processing(self) -> None:
+        """Cancel the loading of every queued file and the building of the plots."""
+        self._upload_queue.cancel_all()
+        self._task_runner.cancel()
+
+    def wait_for_processing(self, timeout: float = None) -> None:
+        """Wait for the queued files and the plots (e.g. in scripts and tests)."""
+        self._upload_queue.wait(timeout)
+        self._task_runner.wait(timeout)
     
     def handle_file_removal(self, filename: str) -> None:
         """
         Handle the complete file removal workflow.
+
+        The removed file stops loading, or its dataset is dropped. When it was the
+        one shown, the last loaded file is shown instead (the no-file placeholder
+        when there is none).
         
         Args:
             filename: Name of the removed file
         """
         try:            
-            # Clear the dataset from model
-            self.model.dataset = None
-            
-            # Clear UI components
-            self.controller.layout.remove_dataset_info_from_sidebar()
-            self.controller.layout.reset_main_layout()
-            
-            # Reset AppState metadata
-            app_state = AppState()
-            app_state.metadata = None
-            
-            # Clear any active spectrum reference
-            if hasattr(self.controller.view, 'chosen_spectrum'):
-                self.controller.view.chosen_spectrum = None
+            item = self._upload_queue.cancel(filename)
+            with self._dataset_lock:
+                dataset = self.model.datasets.pop(filename, None)
+                self.model.file_metadata.pop(filename, None)
+                # Shown, or loading to be shown
+                shown = self.model.active_filename == filename or (
+                    item is not None and item.activate and self.model.dataset is None
+                )
+            # Its shared memory is freed once the plots drop their references
+            self.controller.parse_pool.release(dataset)
+            self.controller.layout.update_upload_status(self._upload_queue.items)
+            self._update_dataset_selector()
+            if not shown:
+                return
+
+            self._clear_shown_dataset()
+            if self.model.datasets:
+                self.show_dataset(list(self.model.datasets)[-1])
+            elif self._upload_queue.idle:
+                self._reset_layout()
+            else:
+                # The next file loaded is shown
+                self.controller.layout.show_loading_placeholder_in_main_layout()
                 
         except Exception as e:
             print(f"Error during file removal: {e}")
             traceback.print_exc()
+
+    def close(self) -> None:
+        """Release the datasets of the session and stop its processing (session destroyed)."""
+        self.cancel_processing()
+        self._clear_shown_dataset()
+        with self._dataset_lock:
+            datasets = list(self.model.datasets.values())
+            self.model.datasets.clear()
+            self.model.file_metadata.clear()
+        for dataset in datasets:
+            self.controller.parse_pool.release(dataset)
+        self.model.app_state.metadata = None
+
+    def _clear_shown_dataset(self) -> None:
+        """Stop building the plots of the shown dataset, then clear it from model."""
+        # Its layout switch is no longer needed either
+        self._task_runner.cancel()
+        self.controller.spectrum_layout.cancel()
+        with self._dataset_lock:
+            self.model.dataset = None
+            self.model.active_filename = None
+
+    def _reset_layout(self) -> None:
+        """Show the no-file placeholder, without dataset info nor metadata."""
+        self.controller.layout.remove_dataset_info_from_sidebar()
+        self.controller.layout.reset_main_layout()
+        # Reset the metadata of the session
+        self.model.app_state.metadata = None
+        # Clear any active spectrum reference
+        if hasattr(self.controller.view, 'chosen_spectrum'):
+            self.controller.view.chosen_spectrum = None
+
+    def _create_file_processor(self, progress=None) -> EELSFileProcessor:
+        """File processor with the shared backends, reporting to progress (see EELSFileProcessor)."""
+        return EELSFileProcessor(
+            self.model,
+            chunked_backend=self.controller.chunked_backend,
+            dtype_policy=self.controller.dtype_policy,
+            dataset_cache=self.controller.dataset_cache,
+            progress=progress,
+            parse_pool=self.controller.parse_pool,
+            memory_cache=self.controller.memory_cache,
+            # Published when the dataset is shown
+            publish_metadata=False,
+        )
+
+    def _load_upload(self, filename, file_content, token, progress):
+        """
+        Background part of an upload: load the dataset of a queued file into the model.
+
+        Runs in a worker thread, progress(fraction, message) is a cancellation checkpoint.
+
+        Returns:
+            The dataset, None if the file could not be loaded
+        """
+        # Own processor: the files of a batch load in parallel
+        processor = self._create_file_processor(progress)
+        dataset = processor.process_upload(filename, file_content)
+        if dataset is None:
+            return None
+
+        with self._dataset_lock:
+            if token.cancelled:
+                # Never shown: its shared memory can go
+                self.controller.parse_pool.release(dataset)
+                raise OperationCancelled()
+            previous = self.model.datasets.get(filename)
+            self.model.datasets[filename] = dataset
+            self.model.file_metadata[filename] = processor.metadata
+        # Dropped again: the dataset of the previous drop is replaced
+        self.controller.parse_pool.release(previous)
+        return dataset
+
+    def _handle_upload_loaded(self, item: UploadItem) -> None:
+        """Event loop part of an upload: list the loaded dataset, and show it if it is due."""
+        self._update_dataset_selector()
+        if item.activate or self.model.active_filename == item.filename:
+            self.show_dataset(item.filename)
+        elif self.model.dataset is None and not self._activation_pending():
+            # The file to show failed or was removed: show this one instead
+            self.show_dataset(item.filename)
+
+    def _activation_pending(self) -> bool:
+        """Whether a queued file is still loading to be shown."""
+        return any(item.activate and not item.done for item in self._upload_queue.items)
+
+    def _show_upload_status(self, item: UploadItem) -> None:
+        """Show the status of the queued files, and the progress of the one to be shown."""
+        self.controller.layout.update_upload_status(self._upload_queue.items)
+        if not item.activate or self.model.dataset is not None:
+            return
+        if item.status == UploadItem.LOADING:
+            self.controller.layout.update_loading_progress(0.7 * item.fraction, f"{item.filename}: {item.message}")
+        elif item.status == UploadItem.FAILED:
+            self._handle_file_upload_error(item.filename)
+
+    def _update_dataset_selector(self) -> None:
+        self.controller.layout.update_dataset_selector(list(self.model.datasets), self.model.active_filename)
+
+    def _build_visualizer(self, dataset, token, progress):
+        """
+        Background part of showing a dataset: build its visualizer.
+
+        Returns:
+            The visualizer of the dataset
+        """
+        progress(0.7, "Building the plots...")
+        token.raise_if_cancelled()
+        # The visualizer computes its images (e.g. the sum image) here, off the event loop
+        dataset_type = dataset.attrs.get('dataset_type', None)
+        chosen_spectrum = EELSPlotFactory(self.model, self.controller).choose_spectrum(dataset_type)
+        progress(1.0, "Showing the plots...")
+        return chosen_spectrum
+
+    def _show_upload(self, filename: str, chosen_spectrum) -> None:
+        """Event loop part of showing a dataset: show the plots of the processed file."""
+        if chosen_spectrum is None or not self._create_and_display_plots(chosen_spectrum):
+            self._handle_file_upload_error(filename)
+            return
+
+        # Spectrum-contiguous copy for the per-pixel reads, switched in when ready,
+        # then shared with the other sessions through the memory cache
+        self.controller.spectrum_layout.start(
+            self.model.dataset, on_ready=self.controller.memory_cache.share_layout
+        )
     
-    def _create_and_display_plots(self, dataset) -> bool:
+    def _create_and_display_plots(self, chosen_spectrum) -> bool:
         """
         Create EELS plots and update the UI.
         
         Args:
-            dataset: The processed EELS dataset
+            chosen_spectrum: The visualizer of the processed EELS dataset
             
         Returns:
             bool: True if successful, False if failed
         """
         try:
-            dataset_type = dataset.attrs.get('dataset_type', None)
-            
-            # Create plots using the factory
-            eels_plot_factory = EELSPlotFactory(self.model, self.controller)
-            chosen_spectrum = eels_plot_factory.choose_spectrum(dataset_type)
-            
-            if chosen_spectrum is None:
-                return False
-            
             # Store reference and create components
             self.controller.view.chosen_spectrum = chosen_spectrum
             spectrum_plots = chosen_spectrum.create_plots()
@@ -148,4 +342,4 @@ class FileOperation:
     
     def _handle_file_upload_error(self, filename: str) -> None:
         """Handle file upload error by resetting UI state."""
-        self.controller.layout.show_error_placeholder_in_main_layout()
+        self.controller.layout.show_error_placeholder_in_main_layout()
\ No newline at end of file
@@ -0,0 +1,363 @@
+"""
+Process-wide in-memory cache of converted EELS datasets.
+
+Every load builds a fresh Dataset, even when the file is already open in another
+session, or was open a moment ago in this one (e.g. switching between the files
+of a batch). MemoryDatasetCache keeps the converted datasets of the process in
+memory, keyed by file content (the ContentKeys of DatasetCache), and hands every load a
+shallow copy: the sessions share the arrays, read-only, and each gets its own
+variables and attributes (the original name, the spectrum-contiguous switch).
+
+The cache counts bytes, not entries: the size of an entry is the size of its
+arrays (memory-mapped ones too, a cached map keeps its spool file). Least
+recently used entries are evicted past max_bytes. Arrays in shared memory of a
+ParsePool get a reference of the cache, dropped on eviction.
+
+The cached cube is the transposed view of the DM data; each session copies it to
+the spectrum-contiguous layout (SpectrumLayout). The first copy done is shared
+through the entry (see share_layout()): the entry keeps it instead of the view,
+counted in the budget, and later hits get the contiguous layout with no copy.
+
+Entries are found by the probe of the key (file size, head and tail blocks), so
+a miss never hashes the file. An entry found is confirmed with the digest of the
+whole file; the digest of a stored key is computed in the background, so the load
+that stores it does not wait for it.
+
+Hits, misses, stores and evictions are counted for monitoring (see stats()).
+"""
+
+import itertools
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from ..dm_file_processing import ContentKey
+from .chunked_backend import ChunkedBackend
+from .spectrum_layout import SpectrumLayout
+
+# Encoding naming the cache entry a dataset was stored in or loaded from
+_ENTRY_ENCODING = "memory_cache_entry"
+
+
+class _Entry:
+    """A cached dataset, its content key and token, its tag tree, its size and the ParsePool holding its shared memory."""
+
+    __slots__ = ("key", "token", "dataset", "metadata", "nbytes", "parse_pool")
+
+    def __init__(self, key, token, dataset, metadata, nbytes, parse_pool):
+        self.key = key
+        self.token = token
+        self.dataset = dataset
+        self.metadata = metadata
+        self.nbytes = nbytes
+        self.parse_pool = parse_pool
+
+
+class MemoryDatasetCache:
+    """
+    In-memory LRU cache of converted datasets, shared by the sessions of the process.
+
+    Parameters
+    ----------
+    max_bytes : int, optional
+        Memory budget of the cache, least recently used entries are evicted past it
+        (0 disables the cache, see enabled)
+    fast_key : bool, optional
+        Take the probe match of an entry as a hit, without the digest of the whole file
+    """
+
+    DEFAULT_MAX_BYTES = 1 * 2**30
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, fast_key: bool = False):
+        self.max_bytes = max_bytes
+        self.fast_key = fast_key
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.evicted_bytes = 0
+        self._entries = OrderedDict()  # By key probe, least recently used first
+        self._total_bytes = 0
+        self._tokens = itertools.count()
+        self._lock = threading.Lock()
+
+    # -- Public Methods --
+
+    @classmethod
+    def shared(cls) -> "MemoryDatasetCache":
+        """Cache shared by the sessions of this process (see configure())."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def configure(cls, max_bytes: int) -> "MemoryDatasetCache":
+        """Set the memory budget of the shared cache (e.g. from App.run), evicting past it."""
+        cache = cls.shared()
+        cache.max_bytes = max_bytes
+        cache.prune()
+        return cache
+
+    @property
+    def enabled(self) -> bool:
+        """Whether datasets are kept in memory."""
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(source, digest: str = None) -> ContentKey:
+        """Content key of a DM file, as DatasetCache.key(): a path, an open binary file or in-memory content."""
+        return ContentKey.of(source, digest=digest)
+
+    @property
+    def total_bytes(self) -> int:
+        """Size of the cached datasets."""
+        with self._lock:
+            return self._total_bytes
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key.probe in self._entries
+
+    def load(self, key: ContentKey):
+        """
+        A copy of the cached dataset of key, sharing its arrays (read-only).
+
+        The file of key is only hashed when an entry is found for its probe. A hit
+        refreshes the entry for the LRU eviction, and adds a reference of the copy
+        to the shared memory of the dataset (released with the copy, see
+        ParsePool.release()).
+
+        Returns
+        -------
+        tuple or None
+            (dataset, metadata tag tree), None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key.probe)
+        # Hashed without the lock, the other loads go on meanwhile
+        confirmed = entry is not None and (self.fast_key or key.matches(entry.key))
+        with self._lock:
+            if not confirmed or self._entries.get(key.probe) is not entry:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key.probe)
+            self.hits += 1
+            if entry.parse_pool is not None:
+                entry.parse_pool.retain(entry.dataset)
+            # New variables on the same arrays: switching the arrays of a copy leaves the others
+            dataset = entry.dataset.copy(deep=False)
+        dataset.attrs = dict(dataset.attrs)
+        return dataset, entry.metadata
+
+    def store(self, key: ContentKey, dataset, metadata=None, parse_pool=None) -> bool:
+        """
+        Keep a converted dataset and its tag tree under key, then evict past the budget.
+
+        The arrays of the dataset become read-only: the loads of other sessions share them.
+        The dataset is tagged with the entry, to share its contiguous layout later
+        (see share_layout()).
+        The digest of key, if not known yet, is computed in a background thread.
+
+        Parameters
+        ----------
+        key : ContentKey
+            Content key of the DM file (see key())
+        dataset : xarray.Dataset
+            The converted dataset
+        metadata : dict, optional
+            Parsed tag tree of the file
+        parse_pool : ParsePool, optional
+            Pool holding the shared memory of the dataset, referenced until eviction
+
+        Returns
+        -------
+        bool
+            Whether the dataset is cached (not when larger than the whole budget)
+        """
+        if not self.enabled or key is None or dataset is None:
+            return False
+        nbytes = self.dataset_bytes(dataset)
+        if nbytes > self.max_bytes:
+            return False
+        cached = dataset.copy(deep=False)
+        cached.attrs = dict(cached.attrs)
+        for variable in cached.variables.values():
+            self._freeze(variable.data)
+        if parse_pool is not None:
+            parse_pool.retain(cached)
+        if not self.fast_key:
+            key.prefetch()  # Ready to confirm the next hit
+        with self._lock:
+            token = f"{key.probe}:{next(self._tokens)}"
+            dataset.encoding[_ENTRY_ENCODING] = cached.encoding[_ENTRY_ENCODING] = token
+            previous = self._entries.pop(key.probe, None)
+            if previous is not None:
+                self._total_bytes -= previous.nbytes
+            self._entries[key.probe] = _Entry(key, token, cached, metadata, nbytes, parse_pool)
+            self._total_bytes += nbytes
+            self.stores += 1
+        if previous is not None:
+            self._drop(previous)
+        self.prune()
+        return True
+
+    def share_layout(self, dataset, variable: str = "ElectronCount") -> bool:
+        """
+        Share the spectrum-contiguous copy of a cached dataset through its entry
+        (e.g. as the on_ready of SpectrumLayout.start()).
+
+        The first copy replaces the cube of the entry, which is recounted in the
+        budget and releases its shared memory: later hits get the contiguous layout.
+        A dataset whose entry holds a contiguous cube already is switched to it,
+        and its own copy dropped.
+
+        Returns
+        -------
+        bool
+            Whether the entry or the dataset was switched (not for a dataset no longer cached)
+        """
+        token = dataset.encoding.get(_ENTRY_ENCODING)
+        contiguous = dataset.variables[variable].data
+        if token is None or not SpectrumLayout.is_spectrum_contiguous(contiguous):
+            return False
+        with self._lock:
+            entry = self._entries.get(token.partition(":")[0])
+            if entry is None or entry.token != token:
+                return False
+            cached = entry.dataset.variables[variable]
+            if SpectrumLayout.is_spectrum_contiguous(cached.data):
+                shared = cached.data
+            elif cached.shape == contiguous.shape and cached.dtype == contiguous.dtype:
+                shared = None
+                self._freeze(contiguous)
+                cached.data = contiguous
+                if entry.parse_pool is not None:
+                    # No longer in shared memory: the later hits hold no reference to it
+                    entry.parse_pool.unbind(entry.dataset)
+                    entry.parse_pool = None
+                nbytes = self.dataset_bytes(entry.dataset)
+                self._total_bytes += nbytes - entry.nbytes
+                entry.nbytes = nbytes
+            else:
+                return False
+        if shared is None:
+            self.prune()
+        elif shared is not contiguous:
+            # Same values: the copy of this session is dropped for the shared one
+            dataset.variables[variable].data = shared
+        return True
+
+    def prune(self, max_bytes: int = None) -> int:
+        """
+        Evict least recently used entries until the cache fits in max_bytes
+        (default: the cache max_bytes).
+
+        Returns
+        -------
+        int
+            Number of evicted entries
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        evicted = []
+        with self._lock:
+            while self._entries and self._total_bytes > max_bytes:
+                _, entry = self._entries.popitem(last=False)
+                self._total_bytes -= entry.nbytes
+                self.evictions += 1
+                self.evicted_bytes += entry.nbytes
+                evicted.append(entry)
+        for entry in evicted:
+            self._drop(entry)
+        return len(evicted)
+
+    def discard(self, key: ContentKey) -> bool:
+        """Drop the entry of key. Returns whether there was one."""
+        with self._lock:
+            entry = self._entries.pop(key.probe, None)
+            if entry is not None:
+                self._total_bytes -= entry.nbytes
+        if entry is None:
+            return False
+        self._drop(entry)
+        return True
+
+    def clear(self) -> int:
+        """Drop every entry. Returns the number of dropped entries."""
+        with self._lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._total_bytes = 0
+        for entry in entries:
+            self._drop(entry)
+        return len(entries)
+
+    def stats(self) -> dict:
+        """Counters of the cache, for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "evicted_bytes": self.evicted_bytes,
+            }
+
+    @staticmethod
+    def dataset_bytes(dataset) -> int:
+        """Size of the arrays of a dataset, views on the same memory counted once."""
+        arrays = {}
+        for variable in dataset.variables.values():
+            data = variable.data
+            if ChunkedBackend.is_chunked(data):
+                # The wrapped arrays are held by values of the task graph
+                candidates = [getattr(value, "array", value) for value in dict(data.__dask_graph__()).values()]
+                candidates = [array for array in candidates if isinstance(array, np.ndarray)] or [data]
+            else:
+                candidates = [data]
+            for array in candidates:
+                owner = _owner_of(array)
+                arrays[id(owner)] = max(arrays.get(id(owner), 0), array.nbytes)
+        return sum(arrays.values())
+
+    # -- Private Methods --
+
+    @staticmethod
+    def _drop(entry) -> None:
+        """Release the shared memory of a dropped entry (called without the lock)."""
+        if entry.parse_pool is not None:
+            entry.parse_pool.release(entry.dataset)
+
+    @staticmethod
+    def _freeze(data) -> None:
+        """Make a numpy array read-only (chunked arrays are read-only already)."""
+        if isinstance(data, np.ndarray):
+            data.flags.writeable = False
+
+    def __repr__(self):
+        return (
+            f"MemoryDatasetCache({len(self)} entries, {self.total_bytes / 2**20:.0f} / "
+            f"{self.max_bytes / 2**20:.0f} MiB, hits={self.hits}, misses={self.misses}, "
+            f"evictions={self.evictions})"
+        )
+
+
+def _owner_of(array):
+    """The object owning the memory of an array (itself if it is not a view)."""
+    owner = array
+    while isinstance(owner, np.ndarray) and owner.base is not None:
+        owner = owner.base
+    return owner
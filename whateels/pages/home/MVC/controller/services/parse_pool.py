@@ -0,0 +1,355 @@
+"""
+Process pool parsing DM files, with a shared-memory hand-off of the ElectronCount cube.
+
+Walking the tag tree of a DM file is pure Python and holds the GIL: with several
+users uploading at once, the server threads take turns and every session stalls.
+ParsePool runs DM_EELS_Reader in worker processes instead, on files (the files
+of the server and the spool files of the uploads), never on in-memory content:
+handing it over would copy it. The worker parses lazily, as the server does, and
+sends back the tag groups it decoded (the spectrum images DM_EELS_data reads); the
+others travel as their offsets in the file, decoded by the server on first access
+(see DM_InfoParser.open_groups()). The cube is handed over without a pickled copy:
+
+- memory-mapped files are mapped again by the server, from the location of the
+  data block found by the worker
+- otherwise the worker copies the data block from its map of the file into a
+  new shared memory segment, the only copy of the cube
+
+Segments are reference-counted: a load holds one reference to its segment,
+bound to the dataset built from the cube (bind()), so it follows the dataset even
+once its arrays are replaced (e.g. by a spectrum-contiguous copy). retain() adds
+a reference, and release() (e.g. when the file is removed) drops one. At zero the
+segment is unlinked; its memory is freed once no array uses it.
+"""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from ..dm_file_processing import DM_EELS_Reader, DM_EELS_data, DM_InfoParser
+from ..dm_file_processing.parsers import LazyTagGroup
+from .chunked_backend import ChunkedBackend
+
+# Kinds of cube hand-off
+_SEGMENT = "segment"  # A segment created by the worker
+_FILE = "file"  # A copy-on-write map of the file
+
+# Dataset encoding listing the segments bound to a dataset
+_ENCODING = "shared_memory"
+
+
+class _GroupOffset:
+    """A tag group the worker did not decode: its offset and child count in the file."""
+
+    __slots__ = ("offset", "n_tags")
+
+    def __init__(self, offset, n_tags):
+        self.offset = offset
+        self.n_tags = n_tags
+
+
+def _segment_address(shm) -> int:
+    """Address of the memory of a shared memory segment."""
+    probe = np.frombuffer(shm.buf, dtype=np.uint8, count=1)
+    address = probe.__array_interface__["data"][0]
+    del probe
+    return address
+
+
+def _close_segment(shm) -> bool:
+    """Close a segment, False while arrays still use its memory."""
+    try:
+        shm.close()
+        return True
+    except BufferError:
+        return False
+
+
+def _detach(tree):
+    """The decoded part of a lazy tag tree, its groups not decoded yet as _GroupOffsets."""
+    if isinstance(tree, LazyTagGroup) and not tree.is_loaded:
+        return _GroupOffset(tree.offset, tree.n_tags)
+    if isinstance(tree, dict):
+        return {key: _detach(value) for key, value in dict.items(tree)}
+    return tree
+
+
+def _attach(tree, path):
+    """Replace the _GroupOffsets of a detached tree by lazy groups of the file at path."""
+    offsets = []
+    pending = [tree]
+    while pending:
+        group = pending.pop()
+        for name, value in group.items():
+            if isinstance(value, _GroupOffset):
+                offsets.append((group, name, value))
+            elif isinstance(value, dict):
+                pending.append(value)
+    if not offsets:
+        return tree
+    parser = DM_InfoParser(lazy=True)
+    parser.filename = path
+    # The groups keep the map of the file: they still load once a spool file is removed
+    with open(path, "rb") as f:
+        parser.file = f
+        groups = parser.open_groups([(value.offset, value.n_tags, name) for _, name, value in offsets])
+    for (group, name, _), loaded in zip(offsets, groups):
+        group[name] = loaded
+    return tree
+
+
+def _read_in_worker(path, memory_map):
+    """
+    Worker: read a DM file lazily, returning where its cube is instead of the cube.
+
+    The cube is left in the file when it can be memory-mapped as is (memory_map),
+    or copied from the map of the file into a new segment.
+
+    Returns
+    -------
+    tuple
+        (detached tag tree, hand-off descriptor)
+    """
+    reader = DM_EELS_Reader(path, memory_map=True, index_cache=False)
+    try:
+        data = reader.processed_eels_spectrum.data
+        if memory_map and isinstance(data, np.memmap):
+            handoff = (_FILE, path, data.offset, data.shape, data.dtype.str)
+        else:
+            output = shared_memory.SharedMemory(create=True, size=max(1, data.nbytes))
+            target = np.ndarray(data.shape, dtype=data.dtype, buffer=output.buf)
+            target[...] = data
+            del target
+            output.close()  # Unlinked by the server, once released
+            handoff = (_SEGMENT, output.name, 0, data.shape, data.dtype.str)
+        del data
+        return _detach(reader.file_metadata), handoff
+    finally:
+        reader.close()
+
+
+def _ready():
+    """Worker: no-op, returns once the worker process is up with its modules imported."""
+    return True
+
+
+class SharedSegment:
+    """A shared memory segment of the server process and its reference count."""
+
+    __slots__ = ("shm", "refcount", "address", "size")
+
+    def __init__(self, shm):
+        self.shm = shm
+        self.refcount = 1
+        self.size = shm.size
+        self.address = _segment_address(shm)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def holds(self, array) -> bool:
+        """Whether array is a view on the memory of this segment."""
+        address = array.__array_interface__["data"][0]
+        return self.address <= address < self.address + self.size
+
+
+class ParsePool:
+    """
+    Reads DM files in worker processes, handing the cubes over in shared memory.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Worker processes, 0 reads in the calling process (see enabled)
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = 0):
+        self.max_workers = max_workers
+        self._executor = None
+        self._segments = {}  # Live segments of the server, by name
+        self._closing = []  # Released segments whose memory is still used by arrays
+        self._lock = threading.Lock()
+
+    # -- Public Methods --
+
+    @classmethod
+    def shared(cls) -> "ParsePool":
+        """Pool shared by the sessions of this process (see configure())."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def configure(cls, max_workers: int) -> "ParsePool":
+        """Set the worker processes of the shared pool (e.g. from App.run)."""
+        pool = cls.shared()
+        if pool.max_workers != max_workers:
+            pool.shutdown()
+            pool.max_workers = max_workers
+        return pool
+
+    @property
+    def enabled(self) -> bool:
+        """Whether files are read in worker processes."""
+        return self.max_workers > 0
+
+    def start(self) -> None:
+        """Start the worker processes now, instead of on the first read."""
+        if self.enabled:
+            futures = [self._pool().submit(_ready) for _ in range(self.max_workers)]
+            for future in futures:
+                future.result()
+
+    def read(self, filepath, memory_map: bool = False):
+        """
+        Read a DM file in a worker process.
+
+        Parameters
+        ----------
+        filepath : str
+            Path of the file (e.g. the spool file of an upload)
+        memory_map : bool, optional
+            Map the cube of the file copy-on-write instead of reading it
+
+        Returns
+        -------
+        tuple
+            (DM_EELS_data with its data, tag tree), as DM_EELS_Reader gives them
+        """
+        tree, handoff = self._pool().submit(_read_in_worker, filepath, memory_map).result()
+        kind, name, offset, shape, dtype = handoff
+        if kind == _FILE:
+            data = np.memmap(name, dtype=np.dtype(dtype), mode="c", offset=offset, shape=shape)
+        else:
+            segment = self._register(shared_memory.SharedMemory(name=name))
+            # frombuffer exports the buffer of the segment: it is only closed once no array uses it
+            data = np.frombuffer(
+                segment.shm.buf, dtype=np.dtype(dtype), count=int(np.prod(shape)), offset=offset
+            ).reshape(shape)
+        try:
+            metadata = _attach(tree, filepath)
+            spectrum = DM_EELS_data()
+            spectrum.get_file_data(None, metadata)
+        except BaseException:
+            self.release(data)
+            raise
+        spectrum.data = data
+        return spectrum, metadata
+
+    def bind(self, dataset, data) -> None:
+        """Bind the segments of data (read by read()) to the dataset built from it."""
+        names = [segment.name for segment in self.segments_of(data)]
+        if names:
+            dataset.encoding[_ENCODING] = dataset.encoding.get(_ENCODING, []) + names
+
+    def segments_of(self, dataset):
+        """The live segments bound to a dataset, or whose memory its arrays (or an array) use."""
+        bound = set(getattr(dataset, "encoding", {}).get(_ENCODING, ()))
+        arrays = []
+        variables = dataset.variables.values() if hasattr(dataset, "variables") else [dataset]
+        for variable in variables:
+            data = variable if isinstance(variable, np.ndarray) else variable.data
+            if ChunkedBackend.is_chunked(data):
+                # The wrapped arrays are held by values of the task graph
+                arrays.extend(
+                    getattr(value, "array", value) for value in dict(data.__dask_graph__()).values()
+                )
+            else:
+                arrays.append(data)
+        arrays = [array for array in arrays if isinstance(array, np.ndarray)]
+        with self._lock:
+            return [
+                segment for segment in self._segments.values()
+                if segment.name in bound or any(segment.holds(array) for array in arrays)
+            ]
+
+    def retain(self, dataset) -> int:
+        """Add a reference to the segments of a dataset. Returns how many there are."""
+        segments = self.segments_of(dataset)
+        with self._lock:
+            for segment in segments:
+                segment.refcount += 1
+        return len(segments)
+
+    def release(self, dataset) -> int:
+        """
+        Drop a reference to the segments of a dataset, unlinking those left unreferenced.
+
+        Returns
+        -------
+        int
+            Number of segments unlinked
+        """
+        if dataset is None:
+            return 0
+        segments = self.segments_of(dataset)
+        unlinked = 0
+        with self._lock:
+            for segment in segments:
+                segment.refcount -= 1
+                if segment.refcount > 0:
+                    continue
+                del self._segments[segment.name]
+                segment.shm.unlink()
+                self._closing.append(segment.shm)
+                unlinked += 1
+            self._close_released()
+        return unlinked
+
+    def unbind(self, dataset) -> int:
+        """
+        Release a dataset whose arrays moved out of its segments (e.g. to a contiguous
+        copy), and unbind them: its later copies hold no reference to them.
+
+        Returns
+        -------
+        int
+            Number of segments unlinked
+        """
+        unlinked = self.release(dataset)
+        dataset.encoding.pop(_ENCODING, None)
+        return unlinked
+
+    def total_bytes(self) -> int:
+        """Size of the live segments."""
+        with self._lock:
+            return sum(segment.size for segment in self._segments.values())
+
+    def shutdown(self) -> None:
+        """Stop the worker processes (the segments stay valid)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    # -- Private Methods --
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # Spawned, not forked: the server runs threads a fork would copy mid-operation
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def _register(self, shm) -> SharedSegment:
+        segment = SharedSegment(shm)
+        with self._lock:
+            self._segments[segment.name] = segment
+            self._close_released()
+        return segment
+
+    def _close_released(self) -> None:
+        """Close the released segments no array uses anymore (called with the lock)."""
+        self._closing = [shm for shm in self._closing if not _close_segment(shm)]
+
+    def __repr__(self):
+        return f"ParsePool(max_workers={self.max_workers}, segments={len(self._segments)})"
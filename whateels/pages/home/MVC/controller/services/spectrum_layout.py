@@ -0,0 +1,173 @@
+"""
+Spectrum-contiguous storage layout for spectrum images.
+
+DM files store spectrum images as (Eloss, y, x): the (y, x, Eloss) ElectronCount
+cube is a transposed view of that block, so reading the spectrum of one pixel
+gathers one value per energy plane across the whole cube. SpectrumLayout copies
+the cube once, in a background thread, into a C-contiguous (y, x, Eloss) array,
+in memory or in a temporary .npy file on disk, and switches the dataset over to
+it when it is ready. Per-pixel spectrum reads then touch a single contiguous run.
+"""
+
+import threading
+import numpy as np
+
+from whateels.helpers import SpoolFile
+from .chunked_backend import ChunkedBackend
+
+
+class SpectrumLayout:
+    """
+    Switches spectrum images to a spectrum-contiguous layout in the background.
+
+    Parameters
+    ----------
+    mode : str, optional
+        'memory' (copy in RAM), 'disk' (copy in a temporary .npy file, memory-mapped),
+        'off', or 'auto': on disk for memory-mapped cubes or cubes larger than
+        memory_budget, in memory otherwise
+    memory_budget : int, optional
+        Largest cube copied in memory by the 'auto' mode
+    block_bytes : int, optional
+        Bytes of the source copied per step, bounding the temporaries of the copy
+    directory : str, optional
+        Directory of the disk copies (default: system temp directory)
+    prefix : str, optional
+        File name prefix of the disk copies
+    """
+
+    MEMORY = "memory"
+    DISK = "disk"
+    OFF = "off"
+    AUTO = "auto"
+    BLOCK_BYTES = 64 * 2**20
+
+    def __init__(
+        self,
+        mode: str = AUTO,
+        memory_budget: int = ChunkedBackend.DEFAULT_MEMORY_BUDGET,
+        block_bytes: int = BLOCK_BYTES,
+        directory: str = None,
+        prefix: str = "tmp_",
+    ):
+        if mode not in (self.MEMORY, self.DISK, self.OFF, self.AUTO):
+            raise ValueError(f"Unknown spectrum layout mode: {mode}")
+        self.mode = mode
+        self.memory_budget = memory_budget
+        self.block_bytes = block_bytes
+        self.directory = directory
+        self.prefix = prefix
+        self._cancelled = threading.Event()
+        self._thread = None
+
+    # -- Public Methods --
+
+    @staticmethod
+    def is_spectrum_contiguous(data) -> bool:
+        """Whether the spectra of a (y, x, Eloss) array are contiguous in memory."""
+        return isinstance(data, np.ndarray) and data.flags.c_contiguous
+
+    def storage_for(self, data):
+        """Where the contiguous copy of data goes ('memory' or 'disk'), None if no copy is needed."""
+        if self.mode == self.OFF or ChunkedBackend.is_chunked(data):
+            return None  # Chunked cubes are streamed chunk by chunk, never copied whole
+        if data.ndim != 3 or self.is_spectrum_contiguous(data):
+            return None
+        if self.mode != self.AUTO:
+            return self.mode
+        if self._is_memory_mapped(data) or data.nbytes > self.memory_budget:
+            return self.DISK
+        return self.MEMORY
+
+    def start(self, dataset, variable: str = "ElectronCount", on_ready=None):
+        """
+        Copy dataset[variable] to the contiguous layout in a background thread.
+
+        The dataset is switched over to the copy when it is ready, then on_ready(dataset)
+        is called (from the background thread). A job still running is cancelled.
+
+        Returns
+        -------
+        threading.Thread or None
+            The background job, None if the data needs no copy
+        """
+        self.cancel()
+        storage = self.storage_for(dataset[variable].data)
+        if storage is None:
+            return None
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(
+            target=self._switch_layout,
+            args=(dataset, variable, storage, self._cancelled, on_ready),
+            name="spectrum-layout",
+            daemon=True,
+        )
+        self._thread.start()
+        return self._thread
+
+    def cancel(self):
+        """Stop the running job, if any, without switching its dataset."""
+        self._cancelled.set()
+
+    def wait(self, timeout: float = None) -> bool:
+        """Wait for the running job, returns True if there is none left."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+            return not self._thread.is_alive()
+        return True
+
+    def materialize(self, data, storage: str = MEMORY, cancelled: threading.Event = None):
+        """
+        Contiguous (y, x, Eloss) copy of data, made block of rows by block of rows.
+
+        Returns None if cancelled is set before the copy is complete.
+        """
+        if storage == self.DISK:
+            spool = SpoolFile(b"", suffix=".npy", prefix=self.prefix, dir=self.directory)
+            target = np.lib.format.open_memmap(spool.path, mode="w+", dtype=data.dtype, shape=data.shape)
+        else:
+            target = np.empty(data.shape, dtype=data.dtype)
+
+        row_bytes = max(1, data[0].nbytes)
+        rows = max(1, self.block_bytes // row_bytes)
+        for start in range(0, data.shape[0], rows):
+            if cancelled is not None and cancelled.is_set():
+                del target
+                if storage == self.DISK:
+                    spool.remove()
+                return None
+            target[start:start + rows] = data[start:start + rows]
+
+        if storage == self.DISK:
+            target.flush()
+            del target
+            # Copy-on-write, like the memory maps of DM files: in-place changes stay private
+            target = np.load(spool.path, mmap_mode="c")
+            spool.bind(target._mmap)  # Removed once the copy is released
+        return target
+
+    # -- Private Methods --
+
+    def _switch_layout(self, dataset, variable, storage, cancelled, on_ready):
+        try:
+            contiguous = self.materialize(dataset[variable].data, storage, cancelled)
+            if contiguous is None or cancelled.is_set():
+                return
+            # Same values, so readers see consistent data before and after the switch
+            dataset.variables[variable].data = contiguous
+            if on_ready is not None:
+                on_ready(dataset)
+        except Exception as e:
+            print(f"Warning: Could not switch to the spectrum-contiguous layout: {e}")
+
+    @staticmethod
+    def _is_memory_mapped(data) -> bool:
+        base = data
+        while isinstance(base, np.ndarray):
+            if isinstance(base, np.memmap):
+                return True
+            base = base.base
+        return False
+
+    def __repr__(self):
+        return f"SpectrumLayout(mode={self.mode!r}, memory_budget={self.memory_budget / 2**20:.0f} MiB)"
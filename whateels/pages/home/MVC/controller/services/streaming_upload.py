@@ -0,0 +1,156 @@
+"""
+Streaming uploads of DM files, written to disk chunk by chunk.
+
+The file dropper receives uploads in chunks over the websocket. Instead of
+joining them into one bytes object (held next to the chunks, then written to a
+spool file), StreamingUpload appends every chunk to a spool file as it arrives,
+so the server holds a single chunk at a time whatever the file size. The DM
+header is scanned on the way (DM_StreamParser): a file that is not a DM file is
+rejected with its first chunk, and the tag tree is known when the last one
+arrives. Progress is reported after every chunk. The chunks are hashed as they
+are written, so the content key of the upload needs no second read of the spool.
+"""
+
+import mmap
+from pathlib import Path
+
+from whateels.helpers import SpoolFile
+from ..dm_file_processing import DM_StreamParser
+from ..dm_file_processing.cache import content_hasher
+
+
+class StreamingUpload:
+    """
+    An upload spooled to disk as it arrives, its DM header parsed incrementally.
+
+    Parameters
+    ----------
+    filename : str
+        Original name of the uploaded file
+    prefix : str, optional
+        File name prefix of the spool file
+    directory : str, optional
+        Directory of the spool file (default: system temp directory)
+    on_progress : callable, optional
+        Called with a status message after every chunk, when the upload is
+        complete, and when it is rejected
+    """
+
+    def __init__(self, filename: str, prefix: str = "tmp_", directory: str = None, on_progress=None):
+        self.filename = filename
+        self.on_progress = on_progress
+        self.spool = SpoolFile(b"", suffix=Path(filename).suffix, prefix=prefix, dir=directory)
+        self.parser = DM_StreamParser(filename)
+        self.received_bytes = 0
+        self._hasher = content_hasher()  # Digest of the received bytes, see ContentKey
+        self.complete = False
+        self.error = None  # Why the upload was rejected, if it was
+
+    # -- Public Methods --
+
+    @property
+    def path(self) -> str:
+        """Path of the spool file."""
+        return self.spool.path
+
+    @property
+    def digest(self):
+        """Digest of the whole upload (see ContentKey.digest), None until it is complete."""
+        return self._hasher.hexdigest() if self.complete and self.error is None else None
+
+    @property
+    def expected_bytes(self):
+        """Size of the file declared in its DM header, None until the header is received."""
+        return self.parser.file_size
+
+    @property
+    def progress(self):
+        """Fraction of the file received (0 to 1), None until the header is received."""
+        if self.complete:
+            return 1.0
+        if not self.expected_bytes:
+            return None
+        return min(1.0, self.received_bytes / self.expected_bytes)
+
+    def write(self, chunk) -> bool:
+        """
+        Append the next chunk of the upload and scan the header received so far.
+
+        Chunks of a rejected upload are ignored.
+
+        Returns
+        -------
+        bool
+            Whether the upload is still accepted
+        """
+        if self.error is not None:
+            return False
+        try:
+            self.spool.append(chunk)
+            self._hasher.update(chunk)
+            self.received_bytes += memoryview(chunk).nbytes
+            self._scan_header()
+        except Exception as e:
+            self.reject(str(e))
+            return False
+        self._report(self._receiving_message())
+        return True
+
+    def finish(self) -> bool:
+        """Mark the upload as complete (last chunk written). Returns whether it is accepted."""
+        if self.error is not None:
+            return False
+        if self.expected_bytes and self.received_bytes < self.expected_bytes:
+            # Truncated: its tags or its data would be read past the end of the spool
+            self.reject(f"{self.received_bytes} bytes received, its header declares {self.expected_bytes}")
+            return False
+        self.complete = True
+        self._report(f"Received {self.filename} ({self._megabytes(self.received_bytes)}), processing...")
+        return True
+
+    def reject(self, reason: str) -> None:
+        """Stop the upload and remove its spool file."""
+        self.error = reason
+        self.spool.remove()
+        self._report(f"❌ {self.filename} rejected: {reason}")
+
+    def abort(self) -> None:
+        """Drop the upload (e.g. cancelled by the user) without reporting it."""
+        self.error = self.error or "aborted"
+        self.spool.remove()
+
+    # -- Private Methods --
+
+    def _scan_header(self) -> None:
+        """Scan the received prefix, once it holds what the previous scan was missing."""
+        parser = self.parser
+        if parser.complete or parser.failed or self.received_bytes < parser.bytes_needed:
+            return
+        # The scanner only reads the tag headers, the data blocks of the map are not paged in
+        with open(self.spool.path, "rb") as f, mmap.mmap(f.fileno(), self.received_bytes, access=mmap.ACCESS_READ) as mapping:
+            parser.update(mapping)
+
+    def _receiving_message(self) -> str:
+        received = self._megabytes(self.received_bytes)
+        if self.progress is None:
+            message = f"Receiving {self.filename}: {received}"
+        else:
+            message = (
+                f"Receiving {self.filename}: {received} / {self._megabytes(self.expected_bytes)} "
+                f"({self.progress:.0%})"
+            )
+        if self.parser.version is not None:
+            state = "parsed" if self.parser.complete else "parsing"
+            message += f" · DM{self.parser.version} header {state}, {self.parser.tags_located} tags"
+        return message
+
+    def _report(self, message: str) -> None:
+        if self.on_progress is not None:
+            self.on_progress(message)
+
+    @staticmethod
+    def _megabytes(n_bytes) -> str:
+        return f"{n_bytes / 2**20:.1f} MB"
+
+    def __repr__(self):
+        return f"StreamingUpload({self.filename!r}, {self.received_bytes} bytes, complete={self.complete})"
@@ -0,0 +1,163 @@
+"""
+Background execution of the upload pipeline, off the Bokeh event loop.
+
+Panel watchers run on the server event loop: a file processed inside one
+freezes its session, and every other session served by the same thread. The
+TaskRunner runs such work in a thread pool shared by the sessions, and
+marshals its progress and result back to the document of the session that
+started it (add_next_tick_callback), where the UI can be updated safely.
+
+Every task gets a CancellationToken. Starting a new task, or cancel(), sets
+the token of the previous one: its work stops at the next checkpoint and its
+result is never shown.
+"""
+
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import panel as pn
+
+
+class OperationCancelled(Exception):
+    """Raised at a checkpoint of a task whose token was cancelled."""
+
+
+class CancellationToken:
+    """Cancellation flag of a background task, checked by the task between its steps."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self):
+        """Ask the task to stop."""
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        """Whether the task was asked to stop."""
+        return self._event.is_set()
+
+    def raise_if_cancelled(self):
+        """Checkpoint: raise OperationCancelled if the task was asked to stop."""
+        if self._event.is_set():
+            raise OperationCancelled()
+
+
+class TaskRunner:
+    """
+    Runs one task at a time in the background, for a session.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Threads of the pool shared by every runner of the process (set by the
+        first runner created)
+    document : bokeh.document.Document, optional
+        Document of the session the results are dispatched to (default: the
+        current document when a task is submitted; set it to submit from a
+        worker thread, which has none)
+    """
+
+    DEFAULT_MAX_WORKERS = 4
+
+    _executor = None
+    _executor_lock = threading.Lock()
+
+    def __init__(self, max_workers: int = DEFAULT_MAX_WORKERS, document=None):
+        self.max_workers = max_workers
+        self.document = document
+        self._token = None
+        self._future = None
+
+    # -- Public Methods --
+
+    def submit(self, work, on_done, on_error=None, on_progress=None) -> CancellationToken:
+        """
+        Run work in the background, cancelling the task still running (if any).
+
+        Parameters
+        ----------
+        work : callable
+            Called in a worker thread as work(token, progress), where progress(fraction,
+            message) reports progress and is a cancellation checkpoint
+        on_done : callable
+            Called with the result of work, on the event loop of the session
+        on_error : callable, optional
+            Called with the exception raised by work, on the event loop of the session
+        on_progress : callable, optional
+            Called with (fraction, message) on the event loop of the session
+
+        Returns
+        -------
+        CancellationToken
+            The token of the new task
+        """
+        self.cancel()
+        token = self._token = CancellationToken()
+        # The worker threads have no current document: the session of the caller is captured here
+        document = self.document if self.document is not None else pn.state.curdoc
+
+        def progress(fraction, message):
+            token.raise_if_cancelled()
+            if on_progress is not None:
+                self._dispatch(document, token, on_progress, fraction, message)
+
+        self._future = self.executor(self.max_workers).submit(
+            self._run, work, token, progress, document, on_done, on_error
+        )
+        return token
+
+    def cancel(self):
+        """Cancel the running task, its result will not be shown."""
+        if self._token is not None:
+            self._token.cancel()
+
+    def wait(self, timeout: float = None):
+        """Wait for the last task (results are dispatched, not returned)."""
+        if self._future is not None:
+            try:
+                self._future.result(timeout)
+            except Exception:
+                pass
+
+    @classmethod
+    def executor(cls, max_workers: int = DEFAULT_MAX_WORKERS) -> ThreadPoolExecutor:
+        """Thread pool shared by the runners of this process, created on first use."""
+        with cls._executor_lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="whateels-task")
+            return cls._executor
+
+    # -- Private Methods --
+
+    def _run(self, work, token, progress, document, on_done, on_error):
+        try:
+            result = work(token, progress)
+        except OperationCancelled:
+            return
+        except Exception as e:
+            if not token.cancelled:
+                print(f"Error in background task: {e}")
+                traceback.print_exc()
+                if on_error is not None:
+                    self._dispatch(document, token, on_error, e)
+            return
+        self._dispatch(document, token, on_done, result)
+
+    @staticmethod
+    def _dispatch(document, token, callback, *args):
+        """Call callback on the event loop of document (directly without a server session)."""
+        def guarded():
+            # A task cancelled meanwhile must not touch the UI
+            if not token.cancelled:
+                callback(*args)
+
+        if document is None or document.session_context is None:
+            guarded()
+            return
+        try:
+            document.add_next_tick_callback(guarded)
+        except Exception as e:
+            # The session was closed meanwhile
+            print(f"Warning: Could not update the session: {e}")
@@ -0,0 +1,225 @@
+"""
+Batch uploads: a bounded queue loading the dropped files in parallel.
+
+Users drop whole acquisition sessions, tens of DM files at once. UploadQueue
+keeps them in drop order and loads at most max_parallel of them at a time, each
+in its own background task (see TaskRunner) with its own status, progress and
+cancellation. The others wait in the queue, so a large drop neither takes over
+the thread pool shared by the sessions nor decodes every file at once. With
+worker processes in the ParsePool, the files of a batch are parsed on several
+cores at once.
+"""
+
+import threading
+import time
+from collections import deque
+
+import panel as pn
+
+from .task_runner import TaskRunner, OperationCancelled
+
+
+class UploadItem:
+    """A file of a batch upload: its status, progress and loaded result."""
+
+    QUEUED = "queued"
+    LOADING = "loading"
+    LOADED = "loaded"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, filename: str, content, activate: bool = False):
+        self.filename = filename
+        self.content = content  # Dropped once the file starts loading
+        self.activate = activate  # Shown once loaded (dropped alone, or first of its drop)
+        self.status = self.QUEUED
+        self.fraction = 0.0
+        self.message = "Waiting..."
+        self.result = None
+        self.runner = None
+
+    @property
+    def done(self) -> bool:
+        """Whether the file is loaded, failed or cancelled."""
+        return self.status in (self.LOADED, self.FAILED, self.CANCELLED)
+
+    def __repr__(self):
+        return f"UploadItem({self.filename!r}, {self.status}, {self.fraction:.0%})"
+
+
+class UploadQueue:
+    """
+    Loads the files of batch uploads in the background, at most max_parallel at a time.
+
+    Parameters
+    ----------
+    work : callable
+        Called in a worker thread as work(filename, content, token, progress), returns
+        the loaded result, None if the file could not be loaded (see TaskRunner.submit)
+    max_parallel : int, optional
+        Files loading at the same time, the others wait in the queue
+    max_workers : int, optional
+        Threads of the pool shared by the sessions (see TaskRunner)
+    on_update : callable, optional
+        Called with the UploadItem whose status or progress changed, on the event loop
+    on_loaded : callable, optional
+        Called with the UploadItem of a loaded file, on the event loop
+    document : bokeh.document.Document, optional
+        Document of the session (default: the current one), where the callbacks run
+    """
+
+    DEFAULT_MAX_PARALLEL = 2
+
+    def __init__(
+        self,
+        work,
+        max_parallel: int = DEFAULT_MAX_PARALLEL,
+        max_workers: int = TaskRunner.DEFAULT_MAX_WORKERS,
+        on_update=None,
+        on_loaded=None,
+        document=None,
+    ):
+        self.work = work
+        self.max_parallel = max(1, max_parallel)
+        self.max_workers = max_workers
+        self.on_update = on_update
+        self.on_loaded = on_loaded
+        # Captured now: the next files are started from worker threads
+        self.document = document if document is not None else pn.state.curdoc
+        self._items = {}  # By file name, in drop order
+        self._pending = deque()
+        self._running = 0
+        self._lock = threading.Lock()
+
+    # -- Public Methods --
+
+    @property
+    def items(self):
+        """The files of the uploads (UploadItem), in drop order."""
+        with self._lock:
+            return list(self._items.values())
+
+    @property
+    def idle(self) -> bool:
+        """Whether no file is loading or waiting."""
+        with self._lock:
+            return not self._running and not self._pending
+
+    def submit(self, filename: str, content) -> UploadItem:
+        """
+        Queue a dropped file, cancelling the load of a previous drop of the same name.
+
+        The first file dropped while the queue is idle is marked to be shown once
+        loaded (UploadItem.activate).
+        """
+        with self._lock:
+            previous = self._items.pop(filename, None)
+            item = UploadItem(filename, content, activate=not self._running and not self._pending)
+            self._items[filename] = item
+            self._pending.append(item)
+        if previous is not None:
+            self._cancel_item(previous)
+        self._notify(item)
+        self._pump()
+        return item
+
+    def cancel(self, filename: str):
+        """Cancel the load of a file and forget it. Returns its UploadItem, None if unknown."""
+        with self._lock:
+            item = self._items.pop(filename, None)
+        if item is not None:
+            self._cancel_item(item)
+        return item
+
+    def cancel_all(self) -> None:
+        """Cancel the loads of every file and forget them."""
+        with self._lock:
+            items = list(self._items.values())
+            self._items.clear()
+        for item in items:
+            self._cancel_item(item)
+
+    def wait(self, timeout: float = None) -> None:
+        """Wait until no file is loading or waiting (results are dispatched, not returned)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                busy = self._running or self._pending
+                runners = [item.runner for item in self._items.values() if item.runner is not None]
+            for runner in runners:
+                runner.wait(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if not busy or (deadline is not None and time.monotonic() >= deadline):
+                return
+            time.sleep(0.01)
+
+    # -- Private Methods --
+
+    def _pump(self) -> None:
+        """Start waiting files while fewer than max_parallel are loading."""
+        while True:
+            with self._lock:
+                if self._running >= self.max_parallel or not self._pending:
+                    return
+                item = self._pending.popleft()
+                self._running += 1
+                item.status = UploadItem.LOADING
+                item.message = "Starting..."
+                item.runner = TaskRunner(self.max_workers, document=self.document)
+            item.runner.submit(
+                lambda token, progress, item=item: self._run(item, token, progress),
+                on_done=lambda result, item=item: self._finish(item, result),
+                on_error=lambda error, item=item: self._fail(item, str(error)),
+                on_progress=lambda fraction, message, item=item: self._progress(item, fraction, message),
+            )
+
+    def _run(self, item, token, progress):
+        """Worker thread: load a file, then start the next waiting one."""
+        try:
+            if item.status == UploadItem.CANCELLED:
+                raise OperationCancelled()  # Cancelled before its task started
+            content, item.content = item.content, None
+            return self.work(item.filename, content, token, progress)
+        finally:
+            with self._lock:
+                self._running -= 1
+            self._pump()
+
+    def _cancel_item(self, item) -> None:
+        with self._lock:
+            if item.done:
+                return
+            if item.status == UploadItem.QUEUED:
+                self._pending.remove(item)
+            item.status = UploadItem.CANCELLED
+            item.message = "Cancelled"
+            item.content = None
+        if item.runner is not None:
+            item.runner.cancel()
+
+    def _finish(self, item, result) -> None:
+        if result is None:
+            self._fail(item, "Could not load the file")
+            return
+        item.status, item.result = UploadItem.LOADED, result
+        item.fraction, item.message = 1.0, "Loaded"
+        self._notify(item)
+        if self.on_loaded is not None:
+            self.on_loaded(item)
+
+    def _fail(self, item, message: str) -> None:
+        item.status, item.message = UploadItem.FAILED, message
+        self._notify(item)
+
+    def _progress(self, item, fraction, message) -> None:
+        item.fraction, item.message = fraction, message
+        self._notify(item)
+
+    def _notify(self, item) -> None:
+        if self.on_update is not None:
+            self.on_update(item)
+
+    def __repr__(self):
+        counts = {}
+        for item in self.items:
+            counts[item.status] = counts.get(item.status, 0) + 1
+        return f"UploadQueue(max_parallel={self.max_parallel}, {counts})"
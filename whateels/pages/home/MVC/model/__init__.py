@@ -1,15 +1,27 @@
 import xarray as xr
 
+from whateels.shared_state import AppState
 from .constants import Constants, Colors, FileDropper, Placeholders
 
 class Model:
     """
     Main application model for the WhatEELS home page.
     Stores the loaded EELS dataset, metadata, and shared configuration/state.
+
+    The datasets of every loaded file are kept (datasets, with their tag trees in
+    file_metadata), dataset being the one shown (active_filename).
+
+    app_state is the AppState of the session (default: the current session's),
+    holding the metadata shown on the metadata page.
     """
-    def __init__(self):
+    def __init__(self, app_state: AppState | None = None):
         # State attributes
-        self._dataset: xr.Dataset | None = None  # Loaded EELS dataset
+        self._dataset: xr.Dataset | None = None  # Shown EELS dataset
+        self._datasets: dict[str, xr.Dataset] = {}  # Loaded EELS datasets, by file name
+        self._file_metadata: dict[str, dict] = {}  # Parsed tag trees, by file name
+        self.active_filename: str | None = None  # File of the shown dataset
+        # Captured here: the background tasks of the session have no current session
+        self._app_state = app_state if app_state is not None else AppState.for_session()
 
         # Shared configuration and constants
         self._constants = Constants()
@@ -21,6 +33,15 @@ class Model:
     def dataset(self) -> xr.Dataset | None:
         return self._dataset
     @property
+    def datasets(self) -> dict[str, xr.Dataset]:
+        return self._datasets
+    @property
+    def file_metadata(self) -> dict[str, dict]:
+        return self._file_metadata
+    @property
+    def app_state(self) -> AppState:
+        return self._app_state
+    @property
     def constants(self) -> Constants:
         return self._constants
     @property
@@ -1,3 +1,6 @@
+import os
+
+
 class Constants:
     TEMP_PREFIX = "whateels_"
     TITLE = "WhatEELS"
@@ -11,4 +14,21 @@ class Constants:
     # Dataset types
     SPECTRUM_LINE = 'SLi'
     SPECTRUM_IMAGE = 'SIm'
-    SINGLE_SPECTRUM = 'SSp'
\ No newline at end of file
+    SINGLE_SPECTRUM = 'SSp'
+
+    # Spectrum images larger than this are processed chunk by chunk (requires dask)
+    MEMORY_BUDGET = 2 * 2**30
+
+    # Spectrum-contiguous copy of spectrum images: 'auto', 'memory', 'disk' or 'off'
+    SPECTRUM_LAYOUT = 'auto'
+
+    # Threads processing uploads in the background, shared by all the sessions
+    UPLOAD_WORKERS = max(4, os.cpu_count() or 1)
+    # Files of a batch upload loading at the same time in a session, the others are queued
+    # (also the default worker processes of the ParsePool, see App.run)
+    BATCH_PARALLEL = max(1, min(4, os.cpu_count() or 1))
+    # Dataset attribute holding the DataQualityProfile (as a dict) measured on load
+    DATA_QUALITY = 'data_quality'
+
+    # Dataset attribute holding the calibrated energy axis (CalibratedAxis, as a dict)
+    ENERGY_CALIBRATION = 'energy_calibration'
@@ -3,4 +3,5 @@ class FileDropper:
     VALID_EXTENSIONS = ('.dm3', '.dm4')
     REJECT_MESSAGE = "❌ File rejected - only EELS data files (.dm3/.dm4) are supported"
     SUCCESS_MESSAGE = "✅ Ready to analyze your EELS data"
-    FEEDBACK_MESSAGE = "No file uploaded yet... :("
\ No newline at end of file
+    FEEDBACK_MESSAGE = "No file uploaded yet... :("
+    SELECTOR_TITLE = "Shown dataset"
\ No newline at end of file
@@ -1,4 +1,4 @@
-import panel as pn, holoviews as hv
+import panel as pn
 
 from whateels.components import FileDropper
 from typing import TYPE_CHECKING
@@ -6,8 +6,7 @@ from typing import TYPE_CHECKING
 if TYPE_CHECKING:
     from ..model import Model
 
-# Initialize HoloViews with Bokeh backend
-hv.extension("bokeh", logo=False)
+# HoloViews (and its Bokeh backend) is loaded by the visualizers, when the first plot is created
 
 class View:
     """
@@ -33,10 +32,14 @@ class View:
         self._sidebar_container_layout = None
         self._dataset_info_layout = None
         self._loading_placeholder = None
+        self._loading_progress = None
+        self._loading_status = None
         self._no_file_placeholder = None
         self._error_placeholder = None
         self._chosen_spectrum = None
         self._file_dropper = None
+        self._upload_status = None
+        self._dataset_selector = None
         
         self._init_visualization_components()
 
@@ -60,6 +63,18 @@ class View:
         return self._loading_placeholder
 
 
+    @property
+    def loading_progress(self) -> pn.indicators.Progress:
+        """Progress bar of the loading placeholder (indeterminate while value is -1)."""
+        return self._loading_progress
+
+
+    @property
+    def loading_status(self) -> pn.pane.HTML:
+        """Current step of the processing, shown under the loading placeholder."""
+        return self._loading_status
+
+
     @property
     def no_file_placeholder(self) -> pn.pane.HTML:
         """HTML placeholder shown when no file is loaded."""
@@ -78,6 +93,18 @@ class View:
         return self._file_dropper
     
 
+    @property
+    def upload_status(self) -> pn.pane.HTML:
+        """Status of every uploaded file (queued, loading, loaded, failed)."""
+        return self._upload_status
+
+
+    @property
+    def dataset_selector(self) -> pn.widgets.Select:
+        """Selects the shown dataset among the loaded files (hidden with a single file)."""
+        return self._dataset_selector
+
+
     @property
     def chosen_spectrum(self):
         """The currently active plotter/visualizer instance (set after file upload)."""
@@ -111,7 +138,7 @@ class View:
 
         Sets up:
         - no_file_placeholder: shown when no file is loaded
-        - loading_placeholder: shown during file processing
+        - loading_placeholder: shown during file processing, with its progress bar and status
         - error_placeholder: shown when an error occurs
         - sidebar and main layout containers
         """
@@ -119,11 +146,23 @@ class View:
             self._model.placeholders.NO_FILE_LOADED,
             sizing_mode=self._STRETCH_BOTH
         )
+        self._loading_progress = pn.indicators.Progress(
+            value=-1,
+            max=100,
+            sizing_mode=self._STRETCH_WIDTH,
+        )
+        self._loading_status = pn.pane.HTML(
+            "",
+            css_classes=['feedback-message'],
+            sizing_mode=self._STRETCH_WIDTH,
+        )
         self._loading_placeholder = pn.Column(
             pn.pane.HTML(
                 self._model.placeholders.LOADING_FILE,
                 sizing_mode=self._STRETCH_BOTH
             ),
+            self._loading_status,
+            self._loading_progress,
             sizing_mode=self._STRETCH_BOTH,
         )
         self._error_placeholder = pn.pane.HTML(
@@ -141,8 +180,20 @@ class View:
             feedback_message=self._model.file_dropper.FEEDBACK_MESSAGE,
         )
         self._file_dropper = file_dropper
+        self._upload_status = pn.pane.HTML(
+            "",
+            sizing_mode=self._STRETCH_WIDTH,
+        )
+        self._dataset_selector = pn.widgets.Select(
+            name=self._model.file_dropper.SELECTOR_TITLE,
+            options=[],
+            visible=False,
+            sizing_mode=self._STRETCH_WIDTH,
+        )
         self._sidebar_container_layout = pn.Column(
             self._file_dropper,
+            self._upload_status,
+            self._dataset_selector,
             pn.layout.Divider(),
             pn.Spacer(height=10),
             sizing_mode=self._STRETCH_WIDTH
@@ -25,4 +25,13 @@ class AbstractEELSVisualizer(ABC):
         This method should be implemented by subclasses to provide details about
         the dataset being visualized.
         """
-        pass
\ No newline at end of file
+        pass
+
+    @staticmethod
+    def _is_sanitized(model) -> bool:
+        """
+        Whether the dataset data was sanitized on load (see DataSanitizer), i.e.
+        holds no NaN/inf values and needs no further cleaning.
+        """
+        data_quality = model.dataset.attrs.get(model.constants.DATA_QUALITY) or {}
+        return bool(data_quality.get('sanitized'))
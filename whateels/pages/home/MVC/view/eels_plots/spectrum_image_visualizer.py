@@ -8,12 +8,12 @@ import numpy as np
 import time
 
 
-from numba import jit
 from scipy.optimize import curve_fit
 from holoviews import streams
 from .abstract_eels_visualizer import AbstractEELSVisualizer
 from typing import override
-from whateels.helpers import HTML_ROOT
+from whateels.helpers import HTML_ROOT, CalibratedAxis
+from whateels.helpers import kernels
 
 from typing import TYPE_CHECKING
 if TYPE_CHECKING:
@@ -106,6 +106,11 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
         self._image = None
         self._clean_dataset = None
         self._e_axis = self._model.dataset.coords[self._model.constants.ELOSS].values
+        # Calibrated energy axis, for constant-time range slicing (None if the axis is not uniform)
+        self._e_calibration = (
+            CalibratedAxis.from_dict(self._model.dataset.attrs.get(self._model.constants.ENERGY_CALIBRATION))
+            or CalibratedAxis.from_values(self._e_axis)
+        )
         self._last_selected = {self._X_AXIS: 0, self._Y_AXIS: 0}
         self._hover_candidate = {self._X_AXIS: None, self._Y_AXIS: None, self._TIMESTAMP: 0}
         self._current_ranges = {self._X_RANGE: None, self._Y_RANGE: None}
@@ -141,9 +146,16 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
 
     # --- Plot Setup ---
     def _setup_plots(self):
-        image_data = self._model.dataset.ElectronCount.sum(self._model.constants.ELOSS)
-        image_data = image_data.fillna(0.0)
-        image_data = image_data.where(np.isfinite(image_data), 0.0)
+        # Native type sum, accumulated explicitly; no NaN-skipping copy of sanitized data
+        sanitized = self._is_sanitized(self._model)
+        image_data = self._controller.dtype_policy.sum(
+            self._model.dataset.ElectronCount, self._model.constants.ELOSS, skipna=not sanitized
+        )
+        # Chunked cubes: the sum streams through the chunks, within the memory budget
+        image_data, = self._controller.chunked_backend.compute(image_data)
+        if not sanitized:
+            image_data = image_data.fillna(0.0)
+            image_data = image_data.where(np.isfinite(image_data), 0.0)
         x_coords = self._model.dataset.coords[self._model.constants.AXIS_X]
         y_coords = self._model.dataset.coords[self._model.constants.AXIS_Y]
         x_coords = x_coords.where(np.isfinite(x_coords), 0.0)
@@ -171,10 +183,8 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
         streams.PointerXY(source=self._image).add_subscriber(self._on_hover)
 
     # --- Math Utility ---
-    @staticmethod
-    @jit
-    def powerlaw(x, A, k):
-        return A * x ** k
+    # Compiled ahead of the first hover, float64 and float32 (see whateels.helpers.kernels)
+    powerlaw = staticmethod(kernels.powerlaw)
 
     @override
     def create_plots(self):
@@ -217,6 +227,8 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
         metadata_html_path = HTML_ROOT / "metadata_info.html"
         with open(metadata_html_path, 'r', encoding='utf-8') as f:
             metadata_button_html = f.read()
+        # Links the metadata page to the state of this session
+        metadata_button_html = metadata_button_html.format(session=self._model.app_state.token)
         
         metadata_button = pn.pane.HTML(metadata_button_html, margin=0)
 
@@ -309,8 +321,9 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
         Create the spectrum plot for a given (x, y) position and range.
         Includes experimental data, range markers, and optional powerlaw fit/subtraction.
         """
-        # Extract the spectrum at the selected pixel
-        selected_spectrum = self._model.dataset.ElectronCount[y, x, :].values
+        # Extract the spectrum at the selected pixel, from the array itself: xarray
+        # indexing costs far more than the read of a spectrum-contiguous cube
+        selected_spectrum = np.asarray(self._model.dataset.ElectronCount.data[y, x, :])
 
         # Main experimental area plot
         area = hv.Area(
@@ -335,10 +348,13 @@ class SpectrumImageVisualizer(AbstractEELSVisualizer):
             return self._inconsistent_overlay_opts(overlays, x, y)
 
         # Powerlaw fit and subtraction (if possible)
-        # Mask for selected range
-        mask = (self._e_axis >= range_values[0]) & (self._e_axis <= range_values[1])
-        x_fit = self._e_axis[mask]
-        y_fit = selected_spectrum[mask]
+        # Selected range: a slice of the calibrated axis, a mask over the axis otherwise
+        if self._e_calibration is not None:
+            selection = self._e_calibration.slice(range_values[0], range_values[1])
+        else:
+            selection = (self._e_axis >= range_values[0]) & (self._e_axis <= range_values[1])
+        x_fit = self._e_axis[selection]
+        y_fit = selected_spectrum[selection]
 
         if len(x_fit) <= 0:
             return self._inconsistent_overlay_opts(overlays, x, y)
@@ -65,8 +65,10 @@ class SpectrumLineVisualizer(AbstractEELSVisualizer):
         """Create layout for spectrum line visualization with tap/click interaction."""
         # Sum over y dimension to create image
         image_data = self._model.dataset.ElectronCount.squeeze()
-        image_data = image_data.fillna(0.0)
-        image_data = image_data.where(np.isfinite(image_data), 0.0)
+        if not self._is_sanitized(self._model):
+            # Two full copies of the data, skipped when it was sanitized on load
+            image_data = image_data.fillna(0.0)
+            image_data = image_data.where(np.isfinite(image_data), 0.0)
         x_coords = self._model.dataset.coords[self._model.constants.AXIS_X]
         eloss_coords = self._model.dataset.coords[self._model.constants.ELOSS]
         x_coords = x_coords.where(np.isfinite(x_coords), 0.0)
@@ -140,6 +142,8 @@ class SpectrumLineVisualizer(AbstractEELSVisualizer):
         metadata_html_path = HTML_ROOT / "metadata_info.html"
         with open(metadata_html_path, 'r', encoding='utf-8') as f:
             metadata_button_html = f.read()
+        # Links the metadata page to the state of this session
+        metadata_button_html = metadata_button_html.format(session=self._model.app_state.token)
         
         metadata_button = pn.pane.HTML(metadata_button_html, margin=0)
 
@@ -1,13 +1,19 @@
+import panel as pn
+
 from whateels.shared_state import AppState
 
 class Model:
     """
     Model for the metadata page.
     Handles data and business logic for metadata information.
+
+    Shows the metadata of the home session that linked here: its AppState is
+    found by the token in the session URL argument (see AppState.token).
     """
     
-    def __init__(self):
-        self._app_state = AppState()
+    def __init__(self, app_state: AppState = None):
+        # Without a live home session, an empty state: no metadata of other sessions
+        self._app_state = app_state or AppState.from_token(self._linked_token()) or AppState()
     
     def is_metadata_available(self) -> bool:
         """Check if metadata is available."""
@@ -18,6 +24,12 @@ class Model:
         """Get raw metadata."""
         return self._app_state.metadata
 
+    @classmethod
+    def _linked_token(cls):
+        """Token of the AppState in the URL of the session, None without one."""
+        values = pn.state.session_args.get(cls.Constants.SESSION_ARG)
+        return values[0].decode() if values else None
+
     @property
     def constants(self) -> "Constants":
         """Expose constants for the metadata page."""
@@ -26,3 +38,5 @@ class Model:
     class Constants:
         TITLE = "Eels Metadata Details"
         HEADER_BACKGROUND = "#0066cc"
+        # URL argument holding the token of the AppState to show
+        SESSION_ARG = "session"
@@ -1,13 +1,21 @@
 """
 Shared Application State for WhatEELS
 
-This module provides a singleton AppState class to manage shared metadata
-across different pages and components of the WhatEELS application.
+This module provides the AppState class to share metadata across the pages
+and components of a WhatEELS session.
+
+One server process serves many browser sessions, so there is one AppState per
+session, keyed by the document of the session (pn.state.curdoc) and dropped
+when the session is destroyed. Other sessions of the same user (e.g. the
+metadata page, opened in a new tab) find it by its token, passed in their URL.
 
 The AppState uses param for reactive updates across the application.
 """
 
+import secrets
+import threading
 from typing import Optional, Dict, Any
+import panel as pn
 import param
 from .helpers.logging import Logger
 
@@ -16,14 +24,20 @@ _logger = Logger.get_logger("shared_state.log", __name__)
 
 class AppState(param.Parameterized):
     """
-    Singleton AppState class using param for reactive metadata management.
+    Session-scoped AppState class using param for reactive metadata management.
     
-    This class provides a reactive way to share metadata across the application.
+    This class provides a reactive way to share metadata across a session.
     Any Panel component can depend on the metadata parameter and will automatically
     update when the metadata changes.
+
+    Use for_session() to get the state of the current session (outside a server
+    session, e.g. in scripts, a single state shared by the process), and
+    from_token() to get the state of another session.
     """
     
-    _instance = None
+    _sessions: Dict[Any, "AppState"] = {}  # By session document, None outside a server session
+    _tokens: Dict[str, "AppState"] = {}
+    _lock = threading.Lock()
     
     # Reactive parameter for metadata
     metadata = param.Parameter(default=None, doc="""
@@ -31,16 +45,58 @@ class AppState(param.Parameterized):
         or {'error': str} if extraction failed.
     """)
     
-    def __new__(cls):
-        if cls._instance is None:
-            cls._instance = super().__new__(cls)
-        return cls._instance
-    
-    def __init__(self):
-        # Only initialize once
-        if not hasattr(self, '_initialized'):
-            super().__init__()
-            self._initialized = True
+    def __init__(self, **params):
+        super().__init__(**params)
+        # Names the state in the URLs of the other sessions (not the session id, which grants access to it)
+        self.token = secrets.token_urlsafe(16)
+
+    @classmethod
+    def for_session(cls, document=None) -> "AppState":
+        """
+        Return the state of a session, created on first use.
+
+        Args:
+            document: Document of the session (default: pn.state.curdoc)
+
+        Returns:
+            AppState: The state of the session, dropped when the session is destroyed
+        """
+        document = document if document is not None else pn.state.curdoc
+        key = document if document is not None and document.session_context is not None else None
+        with cls._lock:
+            state = cls._sessions.get(key)
+            if state is not None:
+                return state
+            state = cls._sessions[key] = cls()
+            cls._tokens[state.token] = state
+        if key is not None:
+            document.on_session_destroyed(lambda session_context: cls.discard(key))
+        _logger.info(f"Created the state of session {state.token[:6]}... ({len(cls._sessions)} sessions)")
+        return state
+
+    @classmethod
+    def from_token(cls, token: Optional[str]) -> Optional["AppState"]:
+        """Return the state of a live session by its token, None if there is none."""
+        with cls._lock:
+            return cls._tokens.get(token)
+
+    @classmethod
+    def discard(cls, document=None) -> None:
+        """Drop the state of a session (called when the session is destroyed)."""
+        with cls._lock:
+            state = cls._sessions.pop(document, None)
+            if state is not None:
+                cls._tokens.pop(state.token, None)
+        if state is not None:
+            # Frees the metadata, and clears it in the pages still watching it
+            state.metadata = None
+            _logger.info(f"Dropped the state of session {state.token[:6]}... ({len(cls._sessions)} sessions)")
+
+    @classmethod
+    def session_count(cls) -> int:
+        """Number of live states."""
+        with cls._lock:
+            return len(cls._sessions)
     
     @param.depends('metadata', watch=True)
     def _on_metadata_change(self):